@@ -0,0 +1,8 @@
+"""Performance benchmarks for F5 XC user and group synchronization.
+
+The suite generates synthetic HR exports in the ``User-Database.csv`` layout,
+runs the parse, diff and end-to-end sync paths against an in-process fake
+XC API server, and stores timings as JSON for regression comparison.
+
+Run with ``python -m benchmarks --help``.
+"""
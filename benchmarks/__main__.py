@@ -0,0 +1,82 @@
+"""Command-line entry point: ``python -m benchmarks``."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import List, Optional
+
+from .runner import CASES, format_table, run_suite, write_results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark suite and write results as JSON."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark CSV parsing, diffing and end-to-end sync.",
+    )
+    parser.add_argument(
+        "--sizes",
+        default="1k,100k",
+        help="Comma-separated row counts (e.g. 1k,100k,1m)",
+    )
+    parser.add_argument(
+        "--cases",
+        default=",".join(CASES),
+        help=f"Comma-separated benchmark cases ({', '.join(CASES)})",
+    )
+    parser.add_argument(
+        "--output", default="benchmark-results.json", help="Results JSON path"
+    )
+    parser.add_argument("--groups", type=int, default=None, help="Distinct groups")
+    parser.add_argument(
+        "--memberships", type=int, default=1, help="Entitlement rows per user"
+    )
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-dn-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Server latency")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Server jitter")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 probability")
+    parser.add_argument(
+        "--e2e-max-rows",
+        type=int,
+        default=100_000,
+        help="Skip end-to-end sync above this many rows",
+    )
+    parser.add_argument(
+        "--no-isolate",
+        action="store_true",
+        help="Run cases in this process (peak RSS becomes cumulative)",
+    )
+    args = parser.parse_args(argv)
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = sorted(set(cases) - set(CASES))
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    document = run_suite(
+        sizes=[s for s in args.sizes.split(",") if s.strip()],
+        cases=cases,
+        e2e_max_rows=args.e2e_max_rows,
+        isolate=not args.no_isolate,
+        config_overrides={
+            "groups": args.groups,
+            "memberships_per_user": args.memberships,
+            "duplicate_rate": args.duplicate_rate,
+            "invalid_dn_rate": args.invalid_dn_rate,
+        },
+        server_options={
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "rate_429": args.rate_429,
+        },
+    )
+    write_results(document, args.output)
+    print("\n".join(format_table(document)))
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
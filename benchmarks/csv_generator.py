@@ -0,0 +1,194 @@
+"""Synthetic HR export generator.
+
+Produces CSV files in the exact column layout of the sample
+``User-Database.csv`` export (one row per user per entitlement, all fields
+quoted, UTF-8 with BOM) so the parsers are exercised with realistic input.
+"""
+
+from __future__ import annotations
+
+import csv
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, List
+
+# Column layout of the HR export, in order (note the trailing space in
+# "Job Level " which is present in the real export).
+HR_COLUMNS: List[str] = [
+    "User Name",
+    "Login ID",
+    "User Display Name",
+    "Cof Account Type",
+    "Application Name",
+    "Entitlement Attribute",
+    "Entitlement Display Name",
+    "Related Application",
+    "Sox",
+    "Job Level ",
+    "Job Title",
+    "Created Date",
+    "Account Locker",
+    "Employee Status",
+    "Email",
+    "Cost Center",
+    "Finc Level 4",
+    "Manager EID",
+    "Manager Name",
+    "Manager Email",
+]
+
+_FIRST_NAMES = ["Alice", "Bob", "Carol", "David", "Erin", "Frank", "Grace", "Heidi"]
+_LAST_NAMES = ["Anderson", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia"]
+_JOB_TITLES = ["Software Engineer", "Analyst", "Manager", "Architect", "Operator"]
+_COST_CENTERS = ["IT Infrastructure", "Finance", "Operations", "Security"]
+
+
+@dataclass(frozen=True)
+class GeneratorConfig:
+    """Shape of a synthetic HR export.
+
+    Attributes:
+        users: Number of distinct users
+        groups: Number of distinct LDAP groups to draw memberships from
+        memberships_per_user: Entitlement rows emitted per user
+        duplicate_rate: Fraction of rows emitted twice (0.0-1.0)
+        invalid_dn_rate: Fraction of entitlement cells replaced with a DN
+            that has no CN component (0.0-1.0). ``parse_csv_to_users``
+            rejects such files, so keep this at 0 for user-parse runs.
+        inactive_rate: Fraction of users with a non-"A" Employee Status
+        seed: Random seed so runs are reproducible
+        domain: Email domain for generated users
+
+    """
+
+    users: int = 1000
+    groups: int = 50
+    memberships_per_user: int = 1
+    duplicate_rate: float = 0.0
+    invalid_dn_rate: float = 0.0
+    inactive_rate: float = 0.05
+    seed: int = 42
+    domain: str = "example.com"
+
+    @property
+    def rows(self) -> int:
+        """Approximate number of data rows (excluding duplicates)."""
+        return self.users * self.memberships_per_user
+
+    @classmethod
+    def for_rows(
+        cls,
+        rows: int,
+        memberships_per_user: int = 1,
+        groups: int | None = None,
+        **overrides: Any,
+    ) -> GeneratorConfig:
+        """Build a config that yields approximately ``rows`` data rows.
+
+        Args:
+            rows: Target number of data rows
+            memberships_per_user: Entitlement rows emitted per user
+            groups: Number of groups (defaults to one group per 20 users,
+                capped at 5000)
+            **overrides: Any other GeneratorConfig fields
+
+        Returns:
+            GeneratorConfig sized for the requested row count
+
+        """
+        users = max(1, rows // max(1, memberships_per_user))
+        if groups is None:
+            groups = max(memberships_per_user, min(5000, users // 20))
+        return cls(
+            users=users,
+            groups=groups,
+            memberships_per_user=memberships_per_user,
+            **overrides,
+        )
+
+
+def group_cn(index: int) -> str:
+    """Return the CN used for the synthetic group at ``index``."""
+    return f"GRP_{index:05d}"
+
+
+def user_email(index: int, domain: str = "example.com") -> str:
+    """Return the email used for the synthetic user at ``index``."""
+    return f"user{index:07d}@{domain}"
+
+
+def generate_rows(config: GeneratorConfig) -> Iterator[List[str]]:
+    """Yield synthetic export rows (without header) for ``config``.
+
+    Args:
+        config: Export shape
+
+    Yields:
+        Row values in HR_COLUMNS order
+
+    """
+    rng = random.Random(config.seed)
+    memberships = min(config.memberships_per_user, config.groups)
+
+    for i in range(config.users):
+        first = _FIRST_NAMES[i % len(_FIRST_NAMES)]
+        last = _LAST_NAMES[(i // len(_FIRST_NAMES)) % len(_LAST_NAMES)]
+        uid = f"USER{i:07d}"
+        status = "T" if rng.random() < config.inactive_rate else "A"
+        manager = i % 100
+
+        for group_index in rng.sample(range(config.groups), memberships):
+            if rng.random() < config.invalid_dn_rate:
+                dn = f"OU=Groups{group_index},DC=example,DC=com"
+            else:
+                dn = f"CN={group_cn(group_index)},OU=Groups,DC=example,DC=com"
+
+            row = [
+                uid,
+                f"CN={uid},OU=Users,OU=All Users,DC=example,DC=com",
+                f"{first} {last}",
+                "User",
+                "Active Directory",
+                "memberOf",
+                dn,
+                "Example App",
+                "true",
+                str(40 + i % 20),
+                _JOB_TITLES[i % len(_JOB_TITLES)],
+                "2025-09-23 00:00:00",
+                "0",
+                status,
+                user_email(i, config.domain),
+                _COST_CENTERS[i % len(_COST_CENTERS)],
+                "Engineering",
+                f"MGR{manager:03d}",
+                f"Manager {manager}",
+                f"manager{manager:03d}@{config.domain}",
+            ]
+            yield row
+            if rng.random() < config.duplicate_rate:
+                yield row
+
+
+def write_hr_csv(path: str | Path, config: GeneratorConfig, bom: bool = True) -> int:
+    """Write a synthetic HR export to ``path``.
+
+    Args:
+        path: Destination file
+        config: Export shape
+        bom: Prefix the file with a UTF-8 BOM like the real export
+
+    Returns:
+        Number of data rows written
+
+    """
+    count = 0
+    encoding = "utf-8-sig" if bom else "utf-8"
+    with open(path, "w", newline="", encoding=encoding) as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        writer.writerow(HR_COLUMNS)
+        for row in generate_rows(config):
+            writer.writerow(row)
+            count += 1
+    return count
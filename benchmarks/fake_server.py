@@ -0,0 +1,557 @@
+"""Local stand-in for the F5 XC user and group API.
+
+Implements the ``user_groups`` and ``user_roles`` custom API endpoints used by
+``XCClient`` on top of in-memory state, so concurrency, rate limiting and
+retry behaviour can be load-tested on a laptop or CI runner without touching
+a real tenant.
+
+Each tenant gets its own state, lock and token-bucket rate limit, so load on
+one tenant does not serialize requests to another. The tenant is taken from
+an optional path prefix, so a server started on port 8080 serves tenant
+``acme`` at ``XC_API_URL=http://127.0.0.1:8080/acme`` (requests without a
+prefix use the ``default`` tenant).
+
+The server is a test and benchmark fixture, not part of the installed
+package. Run it standalone with ``python -m benchmarks.fake_server --help``.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from email.message import Message
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import click
+
+DEFAULT_TENANT = "default"
+
+_PATH_RE = re.compile(
+    r"^(?:/(?P<tenant>[^/]+))?/api/web/custom/namespaces/(?P<namespace>[^/]+)/"
+    r"(?P<kind>user_groups|user_roles)(?:/(?P<name>[^/]+))?/?$"
+)
+
+Reply = Tuple[int, Dict[str, Any], Dict[str, str]]
+# Request headers: a plain mapping, or http.server's parsed headers
+Headers = Union[Mapping[str, str], Message]
+
+
+@dataclass
+class FakeServerConfig:
+    """Behaviour knobs for the fake server.
+
+    Attributes:
+        latency: Fixed delay added to every response, in seconds
+        jitter: Maximum random extra delay per response, in seconds
+        rate_429: Probability (0.0-1.0) of a random 429 regardless of quota
+        rate_limit: Sustained requests/second allowed per tenant (0 = off)
+        burst: Token-bucket capacity per tenant (defaults to ``rate_limit``)
+        retry_after: Fixed ``Retry-After`` seconds on 429s; computed from the
+            token bucket when None
+        slow_rate: Probability (0.0-1.0) of a slow response
+        slow_delay: Extra delay for slow responses, in seconds
+        failure_rate: Probability (0.0-1.0) of an injected server error
+        failure_statuses: Status codes to pick from for injected errors
+        seed: Random seed for jitter and injection
+
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_429: float = 0.0
+    rate_limit: float = 0.0
+    burst: Optional[float] = None
+    retry_after: Optional[float] = None
+    slow_rate: float = 0.0
+    slow_delay: float = 1.0
+    failure_rate: float = 0.0
+    failure_statuses: Tuple[int, ...] = (500, 502, 503, 504)
+    seed: Optional[int] = None
+
+
+class TokenBucket:
+    """Token bucket used for per-tenant request quotas."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Create a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens held
+
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token.
+
+        Returns:
+            0.0 if a token was taken, otherwise seconds until one is available
+
+        """
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class TenantState:
+    """In-memory state and counters for one tenant.
+
+    Attributes:
+        groups: user_groups keyed by group name
+        users: user_roles keyed by lowercase email
+        requests: Handled requests keyed by HTTP method
+        throttled: Number of 429 responses sent
+        failed: Number of injected error responses sent
+        bucket: Rate-limit bucket, when quotas are enabled
+        versions: Change counter per collection, used as the listing ETag
+        lock: Guards the tenant's state and counters
+
+    """
+
+    groups: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    users: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    requests: Counter[str] = field(default_factory=Counter)
+    throttled: int = 0
+    failed: int = 0
+    bucket: Optional[TokenBucket] = None
+    versions: Counter[str] = field(default_factory=Counter)
+    lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+
+@dataclass
+class _FailureRule:
+    status: int
+    remaining: int
+    method: Optional[str]
+    path_contains: Optional[str]
+    retry_after: Optional[float]
+    after_apply: bool = False
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method and self.method != method:
+            return False
+        return not self.path_contains or self.path_contains in path
+
+
+class FakeXCServer:
+    """Threaded HTTP server emulating the XC user/group endpoints.
+
+    Usage:
+        with FakeXCServer(rate_limit=50, failure_rate=0.01) as server:
+            client = XCClient("acme", api_token="x", api_url=server.url_for("acme"))
+
+    Keyword arguments not listed below are FakeServerConfig fields.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        config: Optional[FakeServerConfig] = None,
+        **options: Any,
+    ) -> None:
+        """Configure the fake server.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            config: Behaviour configuration
+            **options: Overrides applied on top of ``config``
+
+        """
+        self.config = config or FakeServerConfig()
+        for key, value in options.items():
+            if not hasattr(self.config, key):
+                raise TypeError(f"Unknown fake server option: {key}")
+            setattr(self.config, key, value)
+        self.tenants: Dict[str, TenantState] = {}
+        self._rules: List[_FailureRule] = []
+        self._rng = random.Random(self.config.seed)
+        # Guards the tenant map, the failure rules and the random generator;
+        # never held while taking a tenant's lock
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL for the default tenant (use as ``XC_API_URL``)."""
+        host, port = self._httpd.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{port}"
+
+    def url_for(self, tenant: str) -> str:
+        """Base URL for a named tenant."""
+        return f"{self.url}/{tenant}"
+
+    def tenant(self, name: str = DEFAULT_TENANT) -> TenantState:
+        """Return (creating if needed) the state for ``name``."""
+        with self._lock:
+            return self._tenant(name)
+
+    def _tenant(self, name: str) -> TenantState:
+        state = self.tenants.get(name)
+        if state is None:
+            state = TenantState()
+            if self.config.rate_limit > 0:
+                capacity = self.config.burst or self.config.rate_limit
+                state.bucket = TokenBucket(self.config.rate_limit, capacity)
+            self.tenants[name] = state
+        return state
+
+    # Default-tenant shortcuts
+    @property
+    def groups(self) -> Dict[str, Dict[str, Any]]:
+        """user_groups of the default tenant."""
+        return self.tenant().groups
+
+    @property
+    def users(self) -> Dict[str, Dict[str, Any]]:
+        """user_roles of the default tenant."""
+        return self.tenant().users
+
+    @property
+    def requests(self) -> Counter[str]:
+        """Request counter of the default tenant."""
+        return self.tenant().requests
+
+    @property
+    def throttled(self) -> int:
+        """429 responses sent to the default tenant."""
+        return self.tenant().throttled
+
+    def start(self) -> FakeXCServer:
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="fake-xc-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve requests on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        """Stop serving and release the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> FakeXCServer:
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def seed_state(
+        self,
+        groups: Iterable[Dict[str, Any]] = (),
+        users: Iterable[Dict[str, Any]] = (),
+        tenant: str = DEFAULT_TENANT,
+    ) -> None:
+        """Pre-populate a tenant with group and user dictionaries.
+
+        Args:
+            groups: Group dicts (must contain ``name``)
+            users: User dicts (must contain ``email``)
+            tenant: Tenant to populate
+
+        """
+        state = self.tenant(tenant)
+        with state.lock:
+            for g in groups:
+                state.groups[g["name"]] = dict(g)
+            for u in users:
+                state.users[u["email"].lower()] = dict(u)
+            state.versions["user_groups"] += 1
+            state.versions["user_roles"] += 1
+
+    def inject_failure(
+        self,
+        status: int,
+        count: int = 1,
+        method: Optional[str] = None,
+        path_contains: Optional[str] = None,
+        retry_after: Optional[float] = None,
+        after_apply: bool = False,
+    ) -> None:
+        """Fail the next ``count`` matching requests with ``status``.
+
+        Args:
+            status: HTTP status to return
+            count: Number of requests to fail
+            method: Only match this HTTP method
+            path_contains: Only match paths containing this substring
+            retry_after: ``Retry-After`` seconds to send with the error
+            after_apply: Apply the request first and only then reply with
+                ``status``, as when a gateway loses the upstream response
+
+        """
+        with self._lock:
+            self._rules.append(
+                _FailureRule(
+                    status, count, method, path_contains, retry_after, after_apply
+                )
+            )
+
+    def _delay(self) -> None:
+        cfg = self.config
+        with self._lock:
+            delay = cfg.latency
+            if cfg.jitter:
+                delay += self._rng.uniform(0, cfg.jitter)
+            if cfg.slow_rate and self._rng.random() < cfg.slow_rate:
+                delay += cfg.slow_delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def _take_rule(
+        self, method: str, path: str, after_apply: bool
+    ) -> Optional[_FailureRule]:
+        """Use up one request of the first matching failure rule, if any."""
+        with self._lock:
+            for rule in self._rules:
+                if rule.after_apply != after_apply:
+                    continue
+                if rule.remaining > 0 and rule.matches(method, path):
+                    rule.remaining -= 1
+                    return rule
+        return None
+
+    def _chance(self, probability: float) -> bool:
+        with self._lock:
+            return self._rng.random() < probability
+
+    def _fault(
+        self, state: TenantState, method: str, path: str, after_apply: bool = False
+    ) -> Optional[Reply]:
+        """Return an injected error reply, if any applies.
+
+        The caller holds the tenant's lock. With ``after_apply`` only the
+        rules that fire once the request has been applied are considered.
+        """
+        cfg = self.config
+        rule = self._take_rule(method, path, after_apply)
+        if rule is not None:
+            state.failed += 1
+            headers = {}
+            if rule.retry_after is not None:
+                headers["Retry-After"] = _format_retry_after(rule.retry_after)
+            if rule.status == 429:
+                state.throttled += 1
+            return rule.status, {"message": "injected failure"}, headers
+        if after_apply:
+            return None
+
+        if state.bucket is not None:
+            wait = state.bucket.take()
+            if wait > 0:
+                state.throttled += 1
+                retry_after = wait if cfg.retry_after is None else cfg.retry_after
+                return (
+                    429,
+                    {"message": "tenant rate limit exceeded"},
+                    {"Retry-After": _format_retry_after(retry_after)},
+                )
+
+        if cfg.rate_429 and self._chance(cfg.rate_429):
+            state.throttled += 1
+            headers = {}
+            if cfg.retry_after is not None:
+                headers["Retry-After"] = _format_retry_after(cfg.retry_after)
+            return 429, {"message": "rate limited"}, headers
+
+        if cfg.failure_rate and self._chance(cfg.failure_rate):
+            state.failed += 1
+            with self._lock:
+                status = self._rng.choice(cfg.failure_statuses)
+            return status, {"message": "injected failure"}, {}
+        return None
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        body: Optional[Dict[str, Any]],
+        headers: Optional[Headers] = None,
+    ) -> Reply:
+        """Apply a request to the in-memory state.
+
+        Listings carry an ``ETag`` that changes whenever the collection does;
+        a GET with a matching ``If-None-Match`` gets an empty 304.
+
+        Args:
+            method: HTTP method
+            path: Request path
+            body: Decoded JSON body, if any
+            headers: Request headers
+
+        Returns:
+            Tuple of (status code, JSON response body, extra headers)
+
+        """
+        match = _PATH_RE.match(path.split("?", 1)[0])
+        if not match:
+            return 404, {"message": f"no route for {path}"}, {}
+
+        kind = match.group("kind")
+        name = match.group("name")
+
+        state = self.tenant(match.group("tenant") or DEFAULT_TENANT)
+        with state.lock:
+            fault = self._fault(state, method, path)
+            if fault is not None:
+                return fault
+            state.requests[method] += 1
+            reply = self._apply(state, method, kind, name, body, headers)
+            return self._fault(state, method, path, after_apply=True) or reply
+
+    def _apply(
+        self,
+        state: TenantState,
+        method: str,
+        kind: str,
+        name: Optional[str],
+        body: Optional[Dict[str, Any]],
+        headers: Optional[Headers],
+    ) -> Reply:
+        """Apply a routed request to a tenant's state; caller holds its lock."""
+        store = state.groups if kind == "user_groups" else state.users
+        list_key = "user_groups" if kind == "user_groups" else "items"
+        etag = f'"{kind}-{state.versions[kind]}"'
+        if method != "GET":
+            # Conservatively treat every write attempt as a change
+            state.versions[kind] += 1
+
+        if name is None:
+            if method == "GET":
+                if (headers or {}).get("If-None-Match") == etag:
+                    return 304, {}, {"ETag": etag}
+                return 200, {list_key: list(store.values())}, {"ETag": etag}
+            if method == "POST" and body is not None:
+                if kind == "user_groups":
+                    key = str(body.get("name", ""))
+                else:
+                    key = str(body.get("email", "")).lower()
+                if not key:
+                    return 400, {"message": "missing identifier"}, {}
+                if key in store:
+                    return 409, {"message": f"{key} already exists"}, {}
+                store[key] = dict(body)
+                return 200, dict(body), {}
+            return 405, {"message": f"{method} not allowed"}, {}
+
+        key = name if kind == "user_groups" else name.lower()
+        if key not in store:
+            return 404, {"message": f"{name} not found"}, {}
+        if method == "GET":
+            return 200, dict(store[key]), {}
+        if method == "PUT" and body is not None:
+            store[key].update(body)
+            return 200, dict(store[key]), {}
+        if method == "DELETE":
+            del store[key]
+            return 200, {}, {}
+        return 405, {"message": f"{method} not allowed"}, {}
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this the
+            # client's delayed ACK adds ~40ms to every keep-alive request.
+            disable_nagle_algorithm = True
+
+            def _dispatch(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                server._delay()
+                try:
+                    body = json.loads(raw) if raw else None
+                except ValueError:
+                    self._send(400, {"message": "invalid JSON body"}, {})
+                    return
+                self._send(*server.handle(self.command, self.path, body, self.headers))
+
+            def _send(
+                self, status: int, payload: Dict[str, Any], headers: Dict[str, str]
+            ) -> None:
+                data = b"" if status == 304 else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+        return Handler
+
+
+def _format_retry_after(seconds: float) -> str:
+    # Retry-After carries whole seconds
+    return str(max(0, math.ceil(seconds)))
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8080, show_default=True)
+@click.option("--latency", type=float, default=0.0, help="Fixed delay (seconds)")
+@click.option("--jitter", type=float, default=0.0, help="Random extra delay")
+@click.option("--rate-limit", type=float, default=0.0, help="Requests/s per tenant")
+@click.option("--burst", type=float, default=None, help="Token bucket capacity")
+@click.option("--retry-after", type=float, default=None, help="Fixed Retry-After")
+@click.option("--rate-429", type=float, default=0.0, help="Random 429 probability")
+@click.option("--slow-rate", type=float, default=0.0, help="Slow reply probability")
+@click.option("--slow-delay", type=float, default=1.0, help="Slow reply delay")
+@click.option("--failure-rate", type=float, default=0.0, help="5xx probability")
+@click.option("--seed", type=int, default=None, help="Random seed")
+def main(host: str, port: int, **options: Any) -> None:
+    """Run a local fake F5 XC user/group API for load testing.
+
+    Point the sync tool at it with XC_API_URL=http://HOST:PORT/TENANT and any
+    XC_API_TOKEN value.
+    """
+    server = FakeXCServer(host=host, port=port, config=FakeServerConfig(**options))
+    click.echo(f"Fake XC API listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Performance regression gate.
+
+Compares a benchmark results document against the committed baseline
+(``benchmarks/baseline.json``) and fails when a tracked metric is worse than
+its budget allows. Tracked metrics per case:
+
+- ``parse_groups`` / ``parse_users``: rows/sec and peak RSS
+- ``diff``: seconds and peak RSS
+- ``e2e``: operations/sec against the fake XC server and peak RSS
+
+Run with ``python -m benchmarks.gate``; without ``--results`` the suite is
+run first using the options recorded in the baseline. Timings are only
+gated when the results come from the machine and Python version recorded in
+the baseline; elsewhere only peak RSS is compared.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .runner import format_table, run_suite, write_results
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+# Metrics tracked per benchmark and whether higher values are better
+TRACKED_METRICS: Dict[str, Dict[str, bool]] = {
+    "parse_groups": {"rows_per_sec": True, "peak_rss_mb": False},
+    "parse_users": {"rows_per_sec": True, "peak_rss_mb": False},
+    "diff": {"seconds": False, "peak_rss_mb": False},
+    "e2e": {"ops_per_sec": True, "peak_rss_mb": False},
+}
+
+# Allowed relative regression when the baseline does not set one. Timings on
+# shared CI runners are noisy, memory is not.
+DEFAULT_TOLERANCES: Dict[str, float] = {
+    "rows_per_sec": 0.30,
+    "ops_per_sec": 0.30,
+    "seconds": 0.50,
+    "peak_rss_mb": 0.20,
+}
+
+# Metrics that depend on the speed of the host
+TIMING_METRICS = frozenset({"rows_per_sec", "ops_per_sec", "seconds"})
+
+
+@dataclass
+class Check:
+    """Outcome of one metric comparison."""
+
+    case: str
+    metric: str
+    baseline: float
+    current: Optional[float]
+    limit: float
+    higher_is_better: bool
+
+    @property
+    def passed(self) -> bool:
+        """Whether the current value is within budget."""
+        if self.current is None:
+            return False
+        if self.higher_is_better:
+            return self.current >= self.limit
+        return self.current <= self.limit
+
+    def describe(self) -> str:
+        """One-line human-readable result."""
+        status = "ok  " if self.passed else "FAIL"
+        if self.current is None:
+            return f"{status} {self.case} {self.metric}: missing from results"
+        op = ">=" if self.higher_is_better else "<="
+        return (
+            f"{status} {self.case} {self.metric}: {self.current:.2f} "
+            f"(budget {op} {self.limit:.2f}, baseline {self.baseline:.2f})"
+        )
+
+
+def same_machine(baseline: Dict[str, Any], current: Dict[str, Any]) -> bool:
+    """Whether two documents were produced on the same machine and Python."""
+    return all(baseline.get(key) == current.get(key) for key in ("machine", "python"))
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: Optional[float] = None,
+    timings: bool = True,
+) -> List[Check]:
+    """Compare current results against a baseline document.
+
+    Args:
+        baseline: Baseline document (results plus optional ``tolerances``)
+        current: Results document from ``run_suite``
+        tolerance: Override every tolerance with this relative value
+        timings: Also compare the host-dependent metrics in TIMING_METRICS
+
+    Returns:
+        One Check per tracked metric of every baseline case
+
+    """
+    tolerances = {**DEFAULT_TOLERANCES, **baseline.get("tolerances", {})}
+    checks: List[Check] = []
+    for case, base in sorted(baseline["results"].items()):
+        metrics = TRACKED_METRICS.get(base.get("benchmark", case.split("@")[0]), {})
+        result = current["results"].get(case, {})
+        for metric, higher_is_better in metrics.items():
+            if metric not in base or (not timings and metric in TIMING_METRICS):
+                continue
+            allowed = tolerance if tolerance is not None else tolerances[metric]
+            factor = 1 - allowed if higher_is_better else 1 + allowed
+            checks.append(
+                Check(
+                    case=case,
+                    metric=metric,
+                    baseline=float(base[metric]),
+                    current=result.get(metric),
+                    limit=float(base[metric]) * factor,
+                    higher_is_better=higher_is_better,
+                )
+            )
+    return checks
+
+
+def _load(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the regression gate; returns 1 when any budget is exceeded."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.gate",
+        description="Fail when benchmark results regress past the baseline.",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--results",
+        type=Path,
+        default=None,
+        help="Existing results JSON (runs the suite when omitted)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=None,
+        help="Override all relative tolerances (e.g. 0.2 for 20%%)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Where to write results when the suite is run",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Replace the baseline numbers with the current results",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = _load(args.baseline)
+    if args.results:
+        current = _load(args.results)
+    else:
+        current = run_suite(**baseline.get("options", {"sizes": ["1k"]}))
+        if args.output:
+            write_results(current, args.output)
+        print("\n".join(format_table(current)) + "\n")
+
+    if args.update_baseline:
+        current["tolerances"] = baseline.get("tolerances", {})
+        write_results(current, args.baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    timings = same_machine(baseline, current)
+    if not timings:
+        print(
+            "Baseline was recorded on another machine or Python "
+            f"({baseline.get('python')}, {baseline.get('machine')}); "
+            "comparing peak RSS only. Regenerate it here with --update-baseline "
+            "to gate timings.\n"
+        )
+    checks = compare(baseline, current, args.tolerance, timings=timings)
+    for check in checks:
+        print(check.describe())
+    failed = [c for c in checks if not c.passed]
+    if failed:
+        print(f"\n{len(failed)} of {len(checks)} performance budgets exceeded")
+        return 1
+    print(f"\nAll {len(checks)} performance budgets met")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
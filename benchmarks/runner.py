@@ -0,0 +1,345 @@
+"""Benchmark cases and result collection.
+
+Each case runs in a fresh ``spawn`` subprocess by default so the reported
+peak RSS belongs to that case alone and earlier cases don't warm caches for
+later ones.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from xc_user_group_sync.client import XCClient
+from xc_user_group_sync.sync_service import GroupSyncService
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+from .csv_generator import GeneratorConfig, write_hr_csv
+from .fake_server import FakeXCServer
+
+RESULTS_SCHEMA = 1
+
+SIZES: Dict[str, int] = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+CASES = ("parse_groups", "parse_users", "diff", "e2e")
+
+
+class NullRepository:
+    """Repository that accepts every call and stores nothing.
+
+    Used by the diff benchmark so only planning and comparison are timed.
+    """
+
+    def list_groups(self, namespace: str = "system") -> Dict[str, Any]:
+        return {"user_groups": []}
+
+    def list_user_roles(self, namespace: str = "system") -> Dict[str, Any]:
+        return {"items": []}
+
+    list_users = list_user_roles
+
+    def create_group(self, group: Dict[str, Any], namespace: str = "system") -> Dict:
+        return group
+
+    def update_group(
+        self, name: str, group: Dict[str, Any], namespace: str = "system"
+    ) -> Dict:
+        return group
+
+    def delete_group(self, name: str, namespace: str = "system") -> None:
+        return None
+
+    def create_user(self, user: Dict[str, Any], namespace: str = "system") -> Dict:
+        return user
+
+    def update_user(
+        self, email: str, user: Dict[str, Any], namespace: str = "system"
+    ) -> Dict:
+        return user
+
+    def delete_user(self, email: str, namespace: str = "system") -> None:
+        return None
+
+    def get_user(self, email: str, namespace: str = "system") -> Dict[str, Any]:
+        return {"email": email}
+
+
+def parse_size(label: str) -> int:
+    """Convert a size label such as ``1k``, ``100k`` or ``1m`` to a row count."""
+    key = label.strip().lower()
+    if key in SIZES:
+        return SIZES[key]
+    if key.endswith("k"):
+        return int(float(key[:-1]) * 1_000)
+    if key.endswith("m"):
+        return int(float(key[:-1]) * 1_000_000)
+    return int(key)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def bench_parse_groups(csv_path: str, rows: int) -> Dict[str, Any]:
+    """Time ``GroupSyncService.parse_csv_to_groups``."""
+    service = GroupSyncService(NullRepository())
+    start = time.perf_counter()
+    groups = service.parse_csv_to_groups(csv_path)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+        "groups": len(groups),
+    }
+
+
+def bench_parse_users(csv_path: str, rows: int) -> Dict[str, Any]:
+    """Time ``UserSyncService.parse_csv_to_users``."""
+    service = UserSyncService(NullRepository())
+    start = time.perf_counter()
+    result = service.parse_csv_to_users(csv_path)
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+        "users": result.total_count,
+    }
+
+
+def bench_diff(csv_path: str, rows: int) -> Dict[str, Any]:
+    """Time the user and group diff (dry-run sync) against synthetic state.
+
+    Half of the planned users already exist (every fourth one with a stale
+    display name), plus a tail of extra users that would be pruned. Groups
+    exist with every other member missing.
+    """
+    repo = NullRepository()
+    user_service = UserSyncService(repo)
+    group_service = GroupSyncService(repo)
+    users = user_service.parse_csv_to_users(csv_path).users
+    groups = group_service.parse_csv_to_groups(csv_path)
+
+    existing_users: Dict[str, Dict] = {}
+    for i, user in enumerate(users[::2]):
+        data = user.model_dump()
+        if i % 4 == 0:
+            data["display_name"] = "Stale Name"
+        existing_users[user.email.lower()] = data
+    for i in range(len(users) // 10):
+        existing_users[f"extra{i}@example.com"] = {"email": f"extra{i}@example.com"}
+    existing_groups = {
+        g.name: {"name": g.name, "usernames": g.users[::2]} for g in groups
+    }
+    known_users = {u.email for u in users}
+
+    start = time.perf_counter()
+    user_stats = user_service.sync_users(
+        users, existing_users, dry_run=True, delete_users=True
+    )
+    group_stats = group_service.sync_groups(
+        groups, existing_groups, known_users, dry_run=True
+    )
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+        "user_changes": user_stats.created + user_stats.updated + user_stats.deleted,
+        "group_changes": group_stats.created + group_stats.updated,
+    }
+
+
+def bench_e2e(
+    csv_path: str,
+    rows: int,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    rate_429: float = 0.0,
+) -> Dict[str, Any]:
+    """Time a full users-then-groups sync against the fake XC server."""
+    with FakeXCServer(latency=latency, jitter=jitter, rate_429=rate_429, seed=7) as srv:
+        client = XCClient(
+            "bench",
+            api_token="bench-token",
+            api_url=srv.url,
+            max_retries=5,
+            backoff_min=0.01,
+            backoff_max=0.1,
+        )
+        user_service = UserSyncService(client)
+        group_service = GroupSyncService(client)
+
+        start = time.perf_counter()
+        result = user_service.parse_csv_to_users(csv_path)
+        user_stats = user_service.sync_users(
+            result.users, user_service.fetch_existing_users()
+        )
+        planned = group_service.parse_csv_to_groups(csv_path)
+        group_stats = group_service.sync_groups(
+            planned,
+            group_service.fetch_existing_groups(),
+            group_service.fetch_existing_users(),
+        )
+        seconds = time.perf_counter() - start
+        operations = sum(srv.requests.values())
+
+    return {
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds else 0.0,
+        "operations": operations,
+        "ops_per_sec": operations / seconds if seconds else 0.0,
+        "throttled": srv.throttled,
+        "errors": user_stats.errors + group_stats.errors,
+    }
+
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "parse_groups": bench_parse_groups,
+    "parse_users": bench_parse_users,
+    "diff": bench_diff,
+    "e2e": bench_e2e,
+}
+
+
+def _run_case(name: str, csv_path: str, rows: int, kwargs: Dict[str, Any]) -> Dict:
+    # Per-row INFO logging would dominate the timings
+    logging.disable(logging.WARNING)
+    try:
+        result = BENCHMARKS[name](csv_path, rows, **kwargs)
+    finally:
+        logging.disable(logging.NOTSET)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def run_case(
+    name: str,
+    csv_path: str,
+    rows: int,
+    isolate: bool = True,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """Run one benchmark case, optionally in a fresh subprocess.
+
+    Args:
+        name: Benchmark name (one of CASES)
+        csv_path: Generated CSV to run against
+        rows: Number of data rows in the CSV
+        isolate: Run in a spawned subprocess for a clean peak RSS
+        **kwargs: Extra arguments for the benchmark function
+
+    Returns:
+        Result dictionary with timings and peak RSS
+
+    """
+    if not isolate:
+        return _run_case(name, csv_path, rows, kwargs)
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(_run_case, name, csv_path, rows, kwargs).result()
+
+
+def machine_info() -> Dict[str, Any]:
+    """Describe the host the timings were taken on.
+
+    Timings are only comparable between runs on the same machine, so results
+    record the CPU model and count next to the Python version.
+    """
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return {"arch": platform.machine(), "cpu": cpu, "cpu_count": os.cpu_count()}
+
+
+def run_suite(
+    sizes: Iterable[str],
+    cases: Iterable[str] = CASES,
+    workdir: Optional[str] = None,
+    e2e_max_rows: int = 100_000,
+    isolate: bool = True,
+    config_overrides: Optional[Dict[str, Any]] = None,
+    server_options: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Generate inputs and run the selected cases for each size.
+
+    Args:
+        sizes: Size labels (e.g. ``["1k", "100k"]``)
+        cases: Benchmark names to run
+        workdir: Directory for generated CSVs (a temp dir when omitted)
+        e2e_max_rows: Skip the e2e case above this many rows
+        isolate: Run each case in its own subprocess
+        config_overrides: Extra GeneratorConfig fields
+        server_options: Latency/jitter/rate_429 options for the e2e case
+
+    Returns:
+        Results document ready to be written as JSON
+
+    """
+    sizes = list(sizes)
+    cases = list(cases)
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for label in sizes:
+            rows = parse_size(label)
+            config = GeneratorConfig.for_rows(rows, **(config_overrides or {}))
+            csv_path = str(Path(tmp) / f"hr_{label}.csv")
+            written = write_hr_csv(csv_path, config)
+
+            for name in cases:
+                if name == "e2e" and written > e2e_max_rows:
+                    continue
+                kwargs = dict(server_options or {}) if name == "e2e" else {}
+                result = run_case(name, csv_path, written, isolate=isolate, **kwargs)
+                result.update({"benchmark": name, "size": label, "rows": written})
+                results[f"{name}@{label}"] = result
+
+    return {
+        "schema": RESULTS_SCHEMA,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": machine_info(),
+        "options": {
+            "sizes": sizes,
+            "cases": cases,
+            "e2e_max_rows": e2e_max_rows,
+            "config_overrides": config_overrides or {},
+            "server_options": server_options or {},
+        },
+        "results": results,
+    }
+
+
+def write_results(document: Dict[str, Any], path: str | Path) -> None:
+    """Write a results document as pretty JSON."""
+    Path(path).write_text(json.dumps(document, indent=2, sort_keys=True) + "\n")
+
+
+def format_table(document: Dict[str, Any]) -> List[str]:
+    """Render a results document as aligned text lines."""
+    lines = [f"{'case':<22}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'rss MB':>9}"]
+    for key, r in document["results"].items():
+        lines.append(
+            f"{key:<22}{r['rows']:>10}{r['seconds']:>10.3f}"
+            f"{r['rows_per_sec']:>12.0f}{r['peak_rss_mb']:>9.1f}"
+        )
+    return lines
@@ -0,0 +1,402 @@
+"""Backup and restore of F5 XC groups and users.
+
+A backup is a gzip-compressed NDJSON archive of the ``user_groups`` and
+``user_roles`` listings, written as the listings are read. The first line is
+a header, every following line one entity::
+
+    {"format": "xc-state", "version": 1, "tenant": "acme", "created": ...}
+    {"kind": "user_roles", "data": {"email": "alice@example.com", ...}}
+    {"kind": "user_groups", "data": {"name": "admins", ...}}
+
+Taking one before a ``--prune`` run costs two listing requests. ``restore``
+brings the tenant back to the archived state: users missing from XC are
+created and users that changed are updated, then the same for groups (whose
+members must exist first). Nothing is deleted. Creates and updates run
+concurrently on a thread pool, throttled by a shared ``RateLimiter`` so a
+restore does not trip the tenant's API quota.
+
+Archives can also be written as compact binary snapshots (see
+``snapshot``), which ``load_backup`` recognizes by their magic bytes.
+
+The archive also works as a warm-start cache: ``warm_start`` loads it into a
+``CachingRepository``'s state cache so the next run plans against it
+without listing XC. Such listings count as served from cache, so the
+entities a plan touches are refreshed before they are changed.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from .prune import run_all
+from .snapshot import (
+    MAGIC,
+    SnapshotError,
+    is_snapshot,
+    read_snapshot,
+    write_snapshot,
+)
+from .state_cache import GROUPS, USERS, CachingRepository, group_key, user_key
+from .user_utils import user_create_body
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = "xc-state"
+ARCHIVE_VERSION = 1
+DEFAULT_RESTORE_WORKERS = 8
+# Sustained API requests per second issued by a restore
+DEFAULT_RESTORE_RATE = 10.0
+
+_KEYS: Dict[str, Callable[[Dict[str, Any]], str]] = {GROUPS: group_key, USERS: user_key}
+
+
+class BackupError(Exception):
+    """Raised when an archive cannot be read."""
+
+
+@dataclass
+class RestoreStats:
+    """Statistics from a restore."""
+
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: int = 0
+    error_details: List[Dict[str, str]] = field(default_factory=list)
+
+
+class RateLimiter:
+    """Token bucket shared by the threads of a restore."""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Create a full bucket.
+
+        Args:
+            rate: Calls allowed per second (0 disables the limit)
+            burst: Calls allowed at once (defaults to ``rate``, at least 1)
+            clock: Time source, in seconds
+            sleep: Function used to wait for a token
+
+        """
+        self.rate = rate
+        self.capacity = max(1.0, burst if burst is not None else rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a call is allowed."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+def _items(body: Dict[str, Any], list_key: str) -> List[Dict[str, Any]]:
+    items = body.get(list_key, body.get("items", []))
+    return [item for item in items if isinstance(item, dict)]
+
+
+def write_backup(
+    stream: IO[bytes],
+    repository: Any,
+    tenant: str,
+    namespace: str = "system",
+    clock: Callable[[], float] = time.time,
+    snapshot: Optional[str] = None,
+) -> Dict[str, int]:
+    """Write a compressed archive of the current groups and users.
+
+    Args:
+        stream: Binary stream receiving the archive
+        repository: Group and user repository to list XC state from
+        tenant: Tenant name recorded in the header
+        namespace: XC namespace to back up
+        clock: Time source for the header's ``created`` field
+        snapshot: Write a binary snapshot with this compression instead of
+            gzip NDJSON (see ``snapshot.COMPRESSIONS``)
+
+    Returns:
+        Number of entities written per kind
+
+    Raises:
+        requests.RequestException: If a listing fails
+
+    """
+    counts = {USERS: 0, GROUPS: 0}
+    header = {
+        "format": ARCHIVE_FORMAT,
+        "version": ARCHIVE_VERSION,
+        "tenant": tenant,
+        "namespace": namespace,
+        "created": clock(),
+    }
+    if snapshot is not None:
+        state: Dict[str, Dict[str, Dict[str, Any]]] = {USERS: {}, GROUPS: {}}
+        for kind, list_key, body in (
+            (USERS, "items", repository.list_users(namespace)),
+            (GROUPS, "user_groups", repository.list_groups(namespace)),
+        ):
+            for item in _items(body, list_key):
+                if _KEYS[kind](item):
+                    state[kind][_KEYS[kind](item)] = item
+            counts[kind] = len(state[kind])
+        write_snapshot(stream, header, state, snapshot)
+        return counts
+
+    with gzip.open(stream, "wt", encoding="utf-8") as archive:
+        archive.write(json.dumps(header) + "\n")
+        # Users first, so a restore can replay the archive in order
+        for kind, body in (
+            (USERS, repository.list_users(namespace)),
+            (GROUPS, repository.list_groups(namespace)),
+        ):
+            for item in _items(body, "user_groups" if kind == GROUPS else "items"):
+                archive.write(json.dumps({"kind": kind, "data": item}) + "\n")
+                counts[kind] += 1
+    return counts
+
+
+def read_backup(
+    stream: IO[bytes],
+) -> Tuple[Dict[str, Any], Iterator[Tuple[str, Dict[str, Any]]]]:
+    """Open an archive written by ``write_backup``.
+
+    Args:
+        stream: Binary stream holding the gzip archive
+
+    Returns:
+        ``(header, entities)``: the header and an iterator of
+        ``(kind, item)`` pairs, read lazily from the stream
+
+    Raises:
+        BackupError: If the stream is not a supported archive
+
+    """
+    archive = gzip.open(stream, "rt", encoding="utf-8")
+    try:
+        header = json.loads(archive.readline() or "null")
+    except (OSError, EOFError, ValueError) as e:
+        raise BackupError(f"Not an XC state archive: {e}")
+    if not isinstance(header, dict) or header.get("format") != ARCHIVE_FORMAT:
+        raise BackupError("Not an XC state archive")
+    if header.get("version") != ARCHIVE_VERSION:
+        raise BackupError(f"Unsupported archive version: {header.get('version')}")
+
+    def entities() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        number = 1
+        with archive:
+            try:
+                for number, line in enumerate(archive, start=2):
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    kind, item = entry["kind"], entry["data"]
+                    if kind in _KEYS and isinstance(item, dict) and _KEYS[kind](item):
+                        yield kind, item
+            except (OSError, EOFError) as e:
+                raise BackupError(f"Truncated or corrupt archive: {e}")
+            except (ValueError, KeyError, TypeError) as e:
+                raise BackupError(f"Invalid archive line {number}: {e}")
+
+    return header, entities()
+
+
+def load_backup(
+    stream: IO[bytes],
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Dict[str, Any]]]]:
+    """Read a whole archive, gzip NDJSON or binary snapshot.
+
+    Returns:
+        ``(header, state)``: ``state`` maps each kind to its entities, keyed
+        like ``StateCache`` keys them (group name, lowercase email)
+
+    Raises:
+        BackupError: If the stream is not a supported archive
+
+    """
+    state: Dict[str, Dict[str, Dict[str, Any]]] = {USERS: {}, GROUPS: {}}
+    if is_snapshot(stream.read(len(MAGIC))):
+        stream.seek(0)
+        try:
+            header, sections = read_snapshot(stream)
+        except SnapshotError as e:
+            raise BackupError(str(e))
+        entities: Iterable[Tuple[str, Dict[str, Any]]] = (
+            (kind, item) for kind, items in sections if kind in _KEYS for item in items
+        )
+    else:
+        stream.seek(0)
+        header, entities = read_backup(stream)
+    for kind, item in entities:
+        state[kind][_KEYS[kind](item)] = item
+    return header, state
+
+
+def warm_start(
+    repository: CachingRepository,
+    state: Dict[str, Dict[str, Dict[str, Any]]],
+    namespace: str = "system",
+    created: Optional[float] = None,
+) -> None:
+    """Seed a caching repository with the listings of an archive.
+
+    Args:
+        repository: Repository whose cache is seeded
+        state: Archived entities, as returned by ``load_backup``
+        namespace: XC namespace the archive was taken from
+        created: When the archive was taken (the header's ``created``), so
+            the listings age from then; None treats them as fetched now
+
+    """
+    for kind, items in state.items():
+        repository.seed(kind, items.values(), namespace, fetched_at=created)
+
+
+def _create_body(kind: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Create request for an archived listing item.
+
+    Users are created with the same body a sync sends, not the listing
+    shape they were archived in.
+    """
+    if kind != USERS:
+        return item
+    return user_create_body(
+        item.get("email") or "",
+        item.get("name") or item.get("username") or "",
+        item.get("first_name") or "",
+        item.get("last_name") or "",
+    )
+
+
+def _restore_kind(
+    kind: str,
+    archived: Dict[str, Dict[str, Any]],
+    current: Dict[str, Dict[str, Any]],
+    repository: Any,
+    stats: RestoreStats,
+    executor: Optional[Executor],
+    limiter: Optional[RateLimiter],
+    dry_run: bool,
+    namespace: str,
+) -> None:
+    to_create = sorted(key for key in archived if key not in current)
+    to_update = sorted(
+        key for key in archived if key in current and archived[key] != current[key]
+    )
+    stats.unchanged += len(archived) - len(to_create) - len(to_update)
+    entity = "user" if kind == USERS else "group"
+
+    def apply(key: str) -> None:
+        if limiter is not None:
+            limiter.acquire()
+        if key in current:
+            getattr(repository, f"update_{entity}")(key, archived[key], namespace)
+        else:
+            getattr(repository, f"create_{entity}")(
+                _create_body(kind, archived[key]), namespace
+            )
+
+    if dry_run:
+        logger.info(
+            "Dry run: would create %d and update %d %ss",
+            len(to_create),
+            len(to_update),
+            entity,
+        )
+        stats.created += len(to_create)
+        stats.updated += len(to_update)
+        return
+
+    # Same fan-out as prune deletes: one call per key on the shared executor
+    done, failures = run_all(to_create + to_update, apply, executor)
+    stats.created += sum(1 for key in done if key not in current)
+    stats.updated += sum(1 for key in done if key in current)
+    for key, error in failures.items():
+        logger.error("Failed to restore %s: %s", key, error)
+        stats.errors += 1
+        stats.error_details.append({"kind": kind, "key": key, "error": str(error)})
+
+
+def restore(
+    state: Dict[str, Dict[str, Dict[str, Any]]],
+    repository: Any,
+    executor: Optional[Executor] = None,
+    limiter: Optional[RateLimiter] = None,
+    dry_run: bool = False,
+    namespace: str = "system",
+) -> RestoreStats:
+    """Bring XC back to an archived state, without deleting anything.
+
+    Users are restored before groups. Entities identical to the archive are
+    skipped.
+
+    Args:
+        state: Archived entities, as returned by ``load_backup``
+        repository: Group and user repository to write through
+        executor: Executor running creates and updates concurrently (None
+            runs them in order)
+        limiter: Optional rate limit shared by all requests
+        dry_run: If True, count the changes without making them
+        namespace: XC namespace to restore
+
+    Returns:
+        RestoreStats of the restore
+
+    Raises:
+        requests.RequestException: If listing the current state fails
+
+    """
+    stats = RestoreStats()
+    for kind, body, list_key in (
+        (USERS, repository.list_users(namespace), "items"),
+        (GROUPS, repository.list_groups(namespace), "user_groups"),
+    ):
+        current = {_KEYS[kind](item): item for item in _items(body, list_key)}
+        _restore_kind(
+            kind,
+            state[kind],
+            current,
+            repository,
+            stats,
+            executor,
+            limiter,
+            dry_run,
+            namespace,
+        )
+    return stats
@@ -10,14 +10,62 @@ from __future__ import annotations
 import logging
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Sequence, Tuple
 
 import click
 import requests
 from dotenv import load_dotenv
 
+from .backup import (
+    DEFAULT_RESTORE_RATE,
+    DEFAULT_RESTORE_WORKERS,
+    BackupError,
+    RateLimiter,
+    load_backup,
+    restore,
+    warm_start,
+    write_backup,
+)
 from .client import XCClient
-from .sync_service import CSVParseError, GroupSyncService
-from .user_sync_service import CSVValidationResult, UserSyncService
+from .drift import DRIFT_FORMATS, DriftWriter, iter_drift
+from .ldap_source import DEFAULT_PAGE_SIZE, DEFAULT_USER_FILTER, LDAPSource
+from .logs import LOG_FORMATS, configure_logging, stop_logging, trace_entities
+from .output import (
+    DEFAULT_MAX_LINES,
+    DetailLimit,
+    DetailsFile,
+    ProgressBar,
+    planned_group_lines,
+)
+from .protocols import RecordSource
+from .prune import (
+    DEFAULT_MAX_PRUNE_PERCENT,
+    DEFAULT_PRUNE_WORKERS,
+    PruneLimitExceeded,
+    check_prune_limit,
+)
+from .retry_policy import DEFAULT_RETRY_BUDGET
+from .scheduling import (
+    Deadline,
+    DeadlineExceeded,
+    Operation,
+    count_by_priority,
+    read_leftover,
+    run_operations,
+    write_leftover,
+)
+from .selection import Selection
+from .serve import DEFAULT_MAX_CONCURRENT, DEFAULT_MAX_QUEUE, SyncServer, TargetedSync
+from .sharding import DEFAULT_SHARD_TIMEOUT, Shard, ShardCoordinator, ShardError
+from .snapshot import compression_for
+from .sources import SOURCE_FORMATS, CSVSource, detect_format, open_source
+from .state_cache import DEFAULT_TTL, GROUPS, USERS, CachingRepository, StateCache
+from .sync_service import CSVParseError, GroupSyncService, SyncStats
+from .user_sync_service import CSVValidationResult, UserSyncService, UserSyncStats
+from .watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, Watcher
+
+DEFAULT_LEFTOVER_PLAN = "xc-sync-leftover.json"
 
 
 def _create_client(
@@ -32,6 +80,8 @@ def _create_client(
     max_retries: int,
     proxy: str | None = None,
     verify: bool | str | None = None,
+    retry_budget: float = DEFAULT_RETRY_BUDGET,
+    deadline: Deadline | None = None,
 ) -> XCClient:
     """Create authenticated XC client.
 
@@ -47,6 +97,8 @@ def _create_client(
         max_retries: Maximum number of retries for failed requests
         proxy: Optional proxy URL (e.g., 'http://proxy.example.com:8080')
         verify: SSL certificate verification (True/False or path to CA bundle)
+        retry_budget: Run-wide retries allowed, as a fraction of requests
+        deadline: Optional run deadline bounding timeouts and retries
 
     Returns:
         Configured XCClient instance
@@ -65,6 +117,8 @@ def _create_client(
             max_retries=max_retries,
             proxy=proxy,
             verify=verify,
+            retry_budget=retry_budget,
+            deadline=deadline,
         )
     elif cert_file and key_file:
         return XCClient(
@@ -76,6 +130,8 @@ def _create_client(
             max_retries=max_retries,
             proxy=proxy,
             verify=verify,
+            retry_budget=retry_budget,
+            deadline=deadline,
         )
     elif api_token:
         return XCClient(
@@ -86,6 +142,8 @@ def _create_client(
             max_retries=max_retries,
             proxy=proxy,
             verify=verify,
+            retry_budget=retry_budget,
+            deadline=deadline,
         )
     else:
         raise click.UsageError(
@@ -171,7 +229,10 @@ def _display_csv_validation(result: CSVValidationResult, dry_run: bool = False)
         click.echo("\n⚠️  Validation Warnings:")
 
         if result.duplicate_emails:
-            click.echo(f"  - {len(result.duplicate_emails)} duplicate email(s) found:")
+            click.echo(
+                f"  - {len(result.duplicate_emails)} duplicate email(s) found "
+                "(rows merged into one user each):"
+            )
             for email, rows in list(result.duplicate_emails.items())[:5]:
                 click.echo(f"    • {email} (rows: {', '.join(map(str, rows))})")
             if len(result.duplicate_emails) > 5:
@@ -196,103 +257,349 @@ def _display_csv_validation(result: CSVValidationResult, dry_run: bool = False)
             )
 
 
-@click.command()
-@click.option(
-    "--csv",
-    "csv_path",
-    type=click.Path(exists=True, dir_okay=False),
-    required=True,
-    help="Path to CSV export",
-)
-@click.option("--dry-run", is_flag=True, help="Log actions without calling the API")
-@click.option(
-    "--prune",
-    is_flag=True,
-    help="Delete users and groups in F5 XC that don't exist in CSV",
-)
-@click.option(
-    "--log-level",
-    type=click.Choice(["debug", "info", "warn", "error"], case_sensitive=False),
-    default="info",
-    help="Logging level",
-)
-@click.option("--max-retries", type=int, default=3, help="Max retries for API calls")
-@click.option("--timeout", type=int, default=30, help="HTTP timeout (seconds)")
-@click.option(
-    "--proxy",
-    type=str,
-    default=None,
-    help=(
-        "Proxy URL (e.g., http://proxy.example.com:8080). "
-        "Uses HTTP_PROXY/HTTPS_PROXY env vars if not specified"
-    ),
-)
-@click.option(
-    "--ca-bundle",
-    type=click.Path(exists=True, dir_okay=False),
-    default=None,
-    help=(
-        "Path to custom CA bundle for SSL verification "
-        "(for corporate MITM proxies). "
-        "Uses REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE env vars if not specified"
-    ),
-)
-@click.option(
-    "--no-verify",
-    is_flag=True,
-    default=False,
-    help="Disable SSL certificate verification (insecure, not recommended)",
-)
-def cli(
-    csv_path: str,
+def _raise_for_user_errors(user_stats: UserSyncStats) -> None:
+    """Show user operation errors, if any, and fail the run."""
+    if not user_stats.has_errors():
+        return
+    click.echo("\nErrors encountered:")
+    for err in user_stats.error_details:
+        click.echo(f" - {err['email']}: {err['operation']} failed - {err['error']}")
+    raise click.ClickException("One or more user operations failed; see details above")
+
+
+def _format_counts(operations: List[Operation]) -> str:
+    return ", ".join(f"{n}={c}" for n, c in count_by_priority(operations).items())
+
+
+def _run_scheduled(
+    operations: List[Operation],
+    user_service: UserSyncService,
+    group_service: GroupSyncService,
+    user_stats: UserSyncStats,
+    group_stats: SyncStats,
     dry_run: bool,
-    prune: bool,
-    log_level: str,
-    max_retries: int,
-    timeout: int,
-    proxy: str | None,
-    ca_bundle: str | None,
-    no_verify: bool,
+    deadline: Deadline | None,
+    leftover_plan: str,
+) -> int:
+    """Run planned operations in priority order until done or out of time.
+
+    Args:
+        operations: User and group operations to run
+        user_service: Service applying user operations
+        group_service: Service applying group operations
+        user_stats: Statistics for user operations
+        group_stats: Statistics for group operations
+        dry_run: If True, log actions without making API changes
+        deadline: Optional run deadline
+        leftover_plan: Where to save operations not run before the deadline
+
+    Returns:
+        Number of operations left for a later run
+
+    """
+    click.echo("\n" + "=" * 60)
+    click.echo("⏱️  SCHEDULED OPERATIONS")
+    click.echo("=" * 60)
+    click.echo(f"Planned operations: {_format_counts(operations)}")
+
+    def apply(op: Operation) -> None:
+        if op.entity == "user":
+            user_service.apply_operation(op, dry_run, user_stats)
+        else:
+            group_service.apply_operation(op, dry_run, group_stats)
+
+    leftover = run_operations(operations, apply, deadline)
+
+    click.echo("\n" + user_stats.summary())
+    click.echo(group_stats.summary())
+    if leftover:
+        write_leftover(leftover_plan, leftover)
+        click.echo(
+            f"Deadline reached; {len(leftover)} operations not run "
+            f"({_format_counts(leftover)}) saved to {leftover_plan}"
+        )
+    return len(leftover)
+
+
+def _bound_output(
+    max_lines: int, details_path: str | None
+) -> Tuple[DetailLimit, DetailsFile | None]:
+    """Limit per-entity console log lines and open the details file.
+
+    Both last until the command exits.
+
+    Args:
+        max_lines: Per-entity log lines shown on the console (0 = all)
+        details_path: Optional file receiving every log line
+
+    Returns:
+        ``(limit, details)``: the console filter and the details file
+
+    """
+    limit = DetailLimit(max_lines)
+    handlers = list(logging.getLogger().handlers)
+    for handler in handlers:
+        handler.addFilter(limit)
+    details = None
+    if details_path:
+        try:
+            details = DetailsFile(details_path)
+        except OSError as e:
+            for handler in handlers:
+                handler.removeFilter(limit)
+            raise click.ClickException(f"Cannot open details file: {e}")
+
+    def close() -> None:
+        for handler in handlers:
+            handler.removeFilter(limit)
+        if details is not None:
+            details.close()
+
+    click.get_current_context().call_on_close(close)
+    return limit, details
+
+
+def _report_suppressed(limit: DetailLimit, details: DetailsFile | None) -> None:
+    """Say how many per-entity log lines the console did not show."""
+    suppressed = limit.take_suppressed()
+    if suppressed:
+        hint = (
+            f"see {details.path}"
+            if details is not None
+            else "see --details-file or --max-output-lines"
+        )
+        click.echo(f"{suppressed} more user/group log lines not shown ({hint})")
+
+
+def _file_source(csv_path: str, input_format: str) -> RecordSource | None:
+    """Record source for a non-CSV input file (CSV files are parsed directly)."""
+    source_format = detect_format(csv_path, input_format.lower())
+    if source_format == "csv":
+        return None
+    return open_source(csv_path, source_format)
+
+
+def _parse_address(value: str) -> Tuple[str, int]:
+    """Split a ``[HOST:]PORT`` option value."""
+    host, _, port = value.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise click.BadParameter(
+            f"expected [HOST:]PORT, got {value!r}", param_hint="--serve"
+        )
+
+
+def _read_selection(
+    emails: Sequence[str], groups: Sequence[str], path: str | None
+) -> Selection:
+    """Build the selection of a targeted run from options and a file.
+
+    File entries go one per line; ``#`` starts a comment. Entries with an
+    ``@`` are emails, anything else is a group name, CN or DN.
+    """
+    emails, groups = list(emails), list(groups)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                entry = line.split("#", 1)[0].strip()
+                if entry:
+                    (emails if "@" in entry else groups).append(entry)
+    try:
+        return Selection.of(emails, groups)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--only-group")
+
+
+def _sync_selection(
+    targeted: TargetedSync, selection: Selection, dry_run: bool
 ) -> None:
-    """Synchronize F5 XC users and groups from CSV file.
+    """Run one targeted sync and report each operation."""
+    start_time = time.time()
+    click.echo(
+        f"Targeted sync of {len(selection.emails)} users and "
+        f"{len(selection.groups)} groups"
+    )
+    try:
+        result = targeted.run(selection, dry_run)
+    except CSVParseError as e:
+        raise click.UsageError(str(e))
+    except ValueError as e:
+        raise click.UsageError(f"CSV validation error: {e}")
+    except requests.RequestException as e:
+        raise click.ClickException(f"API error: {e}")
+
+    for op in result["operations"]:
+        line = f"  {op['status']:<8} {op['entity']} {op['action']} {op['key']}"
+        if "error" in op:
+            line += f": {op['error']}"
+        click.echo(line)
+    if not result["operations"]:
+        click.echo("  Nothing to change")
+    click.echo(f"\n{result['users']}\n{result['groups']}")
+    click.echo(f"Execution time: {time.time() - start_time:.2f} seconds")
+    if any(op["status"] == "error" for op in result["operations"]):
+        raise click.ClickException("One or more operations failed; see above")
+
+
+def _report_drift(
+    user_service: UserSyncService,
+    group_service: GroupSyncService,
+    cache_repo: CachingRepository | None,
+    source: RecordSource,
+    path: str,
+    fmt: str,
+) -> None:
+    """Stream a drift report; only listing endpoints are called."""
+    start_time = time.time()
+    try:
+        existing_users = user_service.fetch_existing_users()
+        existing_groups = group_service.fetch_existing_groups()
+    except requests.RequestException as e:
+        raise click.ClickException(f"API error listing XC state: {e}")
+    if cache_repo is not None and (
+        cache_repo.served_from_cache(USERS) or cache_repo.served_from_cache(GROUPS)
+    ):
+        click.echo("Comparing against cached F5 XC state", err=True)
+
+    with click.open_file(path, "w", encoding="utf-8") as stream:
+        writer = DriftWriter(stream, fmt)
+        try:
+            for record in iter_drift(source, existing_users, existing_groups):
+                writer.write(record)
+        except ValueError as e:
+            raise click.UsageError(f"CSV validation error: {e}")
 
-    By default, reconciles both users and groups between CSV and F5 XC:
-    - Creates users/groups that exist in CSV but not in F5 XC
-    - Updates existing users/groups to match CSV data
-    - With --prune flag: deletes users/groups in F5 XC that aren't in CSV
+    click.echo(writer.summary(), err=True)
+    click.echo(f"Execution time: {time.time() - start_time:.2f} seconds", err=True)
 
-    This is a reconciliation tool - it ensures F5 XC matches your CSV source of truth.
 
-    Authentication via environment variables:
-    - TENANT_ID (required): Your XC tenant ID
-    - VOLT_API_P12_FILE + VES_P12_PASSWORD: P12 certificate with passphrase
-    - XC_API_URL (optional): Custom API endpoint (e.g., staging environment)
+def _load_snapshot(
+    path: str, tenant_id: str
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Dict[str, Any]]]]:
+    """Read a --backup snapshot, refusing snapshots of another tenant."""
+    try:
+        with open(path, "rb") as stream:
+            header, state = load_backup(stream)
+    except (OSError, ImportError, BackupError) as e:
+        raise click.ClickException(f"Cannot read snapshot {path}: {e}")
+    if header.get("tenant") != tenant_id:
+        raise click.ClickException(
+            f"Snapshot {path} is of tenant {header.get('tenant')!r}, "
+            f"not {tenant_id!r}"
+        )
+    return header, state
 
-    Examples:
-        # Reconcile users and groups (create/update only)
-        xc_user_group_sync --csv User-Database.csv
 
-        # Dry run to preview changes
-        xc_user_group_sync --csv User-Database.csv --dry-run
+def _backup(repository: Any, tenant_id: str, path: str) -> None:
+    """Snapshot XC groups and users to a compressed archive."""
+    start_time = time.time()
+    try:
+        with open(path, "wb") as stream:
+            counts = write_backup(
+                stream, repository, tenant_id, snapshot=compression_for(path)
+            )
+    except requests.RequestException as e:
+        raise click.ClickException(f"API error listing XC state: {e}")
+    except (OSError, ImportError) as e:
+        raise click.ClickException(f"Cannot write snapshot {path}: {e}")
+    click.echo(
+        f"Backed up {counts[USERS]} users and {counts[GROUPS]} groups to {path} "
+        f"({time.time() - start_time:.2f}s)"
+    )
 
-        # Full reconciliation including deletions
-        xc_user_group_sync --csv User-Database.csv --prune
 
-    Proxy configuration (for corporate networks):
-    - --proxy: Explicit proxy URL or use HTTP_PROXY/HTTPS_PROXY environment variables
-    - --ca-bundle: Custom CA certificate bundle for MITM SSL inspection
-    - --no-verify: Disable SSL verification (insecure, not recommended)
+def _restore(
+    repository: Any,
+    tenant_id: str,
+    path: str,
+    workers: int,
+    rate: float,
+    dry_run: bool,
+) -> None:
+    """Replay creates and updates from a snapshot; nothing is deleted."""
+    start_time = time.time()
+    header, state = _load_snapshot(path, tenant_id)
+    taken = time.strftime(
+        "%Y-%m-%d %H:%M:%S", time.localtime(float(header.get("created") or 0))
+    )
+    click.echo(
+        f"Restoring {len(state[USERS])} users and {len(state[GROUPS])} groups "
+        f"from {path} (taken {taken})"
+    )
+    try:
+        with ThreadPoolExecutor(workers, thread_name_prefix="xc-restore") as pool:
+            stats = restore(
+                state,
+                repository,
+                executor=pool,
+                limiter=RateLimiter(rate) if rate else None,
+                dry_run=dry_run,
+            )
+    except requests.RequestException as e:
+        raise click.ClickException(f"API error restoring XC state from {path}: {e}")
+
+    prefix = "Dry run: would restore" if dry_run else "Restored"
+    click.echo(
+        f"{prefix}: created={stats.created}, updated={stats.updated}, "
+        f"unchanged={stats.unchanged}, errors={stats.errors}"
+    )
+    click.echo(f"Execution time: {time.time() - start_time:.2f} seconds")
+    if stats.errors:
+        raise click.ClickException(f"{stats.errors} entities could not be restored")
+
+
+def _warm_start(cache_repo: CachingRepository, tenant_id: str, path: str) -> None:
+    """Seed the state cache from a snapshot instead of listing XC."""
+    header, state = _load_snapshot(path, tenant_id)
+    created = float(header.get("created") or 0)
+    warm_start(cache_repo, state, header.get("namespace") or "system", created)
+    age = max(0.0, time.time() - created)
+    click.echo(f"Planning against snapshot {path} ({age:.0f}s old)")
+
+
+def _sync_once(
+    user_service: UserSyncService,
+    group_service: GroupSyncService,
+    client: XCClient,
+    cache_repo: CachingRepository | None,
+    csv_path: str | None,
+    ldap_source: LDAPSource | None,
+    *,
+    input_format: str,
+    parse_workers: int,
+    dry_run: bool,
+    prune: bool,
+    revoke_first: bool,
+    deadline: Deadline | None,
+    resume: str | None,
+    leftover_plan: str,
+    shard: ShardCoordinator | None = None,
+    max_output_lines: int = 0,
+    details: DetailsFile | None = None,
+) -> None:
+    """Run one reconciliation of XC against the source.
 
     Args:
-        csv_path: Path to CSV file with user and group data
+        user_service: Service syncing users
+        group_service: Service syncing groups
+        client: XC client (for the final API summary)
+        cache_repo: State cache wrapping the client, if enabled
+        csv_path: Source file, unless reading LDAP or resuming
+        ldap_source: LDAP record source, if reading LDAP
+        input_format: Input format name, or "auto" to use the file extension
+        parse_workers: Worker processes for CSV parsing (0 = one per CPU)
         dry_run: If True, log actions without making API changes
         prune: If True, delete users/groups in F5 XC that don't exist in CSV
-        log_level: Logging verbosity level
-        max_retries: Maximum retries for failed API requests
-        timeout: HTTP timeout in seconds
-        proxy: Optional proxy URL for HTTP/HTTPS requests
-        ca_bundle: Optional path to CA certificate bundle
-        no_verify: If True, disable SSL certificate verification
+        revoke_first: If True, run access-reducing operations before additions
+        deadline: Optional run deadline
+        resume: Optional leftover plan to run instead of reading a source
+        leftover_plan: File receiving operations not run before the deadline
+        shard: Coordinator of a sharded run; only this shard's users and
+            groups are diffed and applied
+
+    Raises:
+        click.ClickException: If the sync fails or leaves work undone
 
     """
     # Always sync both users and groups - that's the tool's purpose
@@ -301,69 +608,51 @@ def cli(
     prune_groups = prune
     prune_users = prune
 
-    # Configure logging
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper(), logging.INFO),
-        format="%(levelname)s %(message)s",
-    )
+    # With --revoke-first, a deadline or a plan to resume, all writes are planned
+    # first and then run in priority order: revocations before additions
+    scheduled = revoke_first or deadline is not None or resume is not None
+    operations: List[Operation] = []
+    user_stats = UserSyncStats()
+    group_stats = SyncStats()
 
-    # Load configuration from environment
-    (
-        tenant_id,
-        api_token,
-        api_url,
-        cert_file,
-        key_file,
-        p12_file,
-        p12_password,
-    ) = _load_configuration()
+    source: RecordSource | None = ldap_source
+    if source is None and csv_path:
+        source = _file_source(csv_path, input_format)
 
-    # Determine SSL verification setting
-    # Priority: --no-verify > --ca-bundle > default (True)
-    if no_verify:
-        verify: bool | str | None = False
-    elif ca_bundle:
-        verify = ca_bundle
-    else:
-        verify = None  # Will use environment variables or default to True
+    merged: Tuple[UserSyncStats, SyncStats] | None = None
 
-    # Create authenticated client
-    try:
-        client = _create_client(
-            tenant_id,
-            api_token,
-            cert_file,
-            key_file,
-            p12_file,
-            p12_password,
-            api_url,
-            timeout,
-            max_retries,
-            proxy=proxy,
-            verify=verify,
-        )
-    except click.UsageError:
-        raise
-    except Exception as e:
-        raise click.ClickException(f"Failed to create client: {e}")
+    def own_users(users: Dict[str, Dict]) -> Dict[str, Dict]:
+        return users if shard is None else shard.shard.select_keys(users)
 
-    # Initialize services
-    group_service = GroupSyncService(client) if sync_groups else None
-    user_service = UserSyncService(client) if sync_users else None
+    def own_groups(groups: Dict[str, Dict]) -> Dict[str, Dict]:
+        return groups if shard is None else shard.shard.select_keys(groups)
 
     # Track overall execution time
     start_time = time.time()
 
+    if resume:
+        try:
+            operations = read_leftover(resume)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        click.echo(f"Resuming {len(operations)} operations from {resume}")
+
     # ===== USER SYNCHRONIZATION =====
     # Sync users FIRST to ensure they exist before creating groups that reference them
-    if sync_users:
+    if sync_users and not resume:
         click.echo("\n" + "=" * 60)
         click.echo("👤 USER SYNCHRONIZATION")
         click.echo("=" * 60)
 
         # Parse CSV for users
         try:
-            validation_result = user_service.parse_csv_to_users(csv_path)
+            if source is None:
+                assert csv_path is not None  # main requires a source
+                validation_result = user_service.parse_csv_to_users(
+                    csv_path, workers=parse_workers
+                )
+            else:
+                validation_result = user_service.parse_source_to_users(source)
         except FileNotFoundError as e:
             raise click.UsageError(str(e))
         except ValueError as e:
@@ -374,66 +663,131 @@ def cli(
         # Display CSV validation results
         _display_csv_validation(validation_result, dry_run)
 
+        planned_users = validation_result.users
+        if shard is not None:
+            planned_users = shard.shard.select(planned_users, lambda u: u.email)
+            click.echo(
+                f"Shard {shard.shard}: {len(planned_users)} of "
+                f"{len(validation_result.users)} planned users"
+            )
+
         # Fetch existing users
         try:
-            existing_users = user_service.fetch_existing_users()
+            existing_users = own_users(user_service.fetch_existing_users())
+        except DeadlineExceeded as e:
+            raise click.ClickException(f"{e} while listing users")
         except requests.RequestException as e:
             raise click.ClickException(f"API error listing users: {e}")
         except Exception as e:
             raise click.ClickException(f"Unexpected error listing users: {e}")
 
-        click.echo(f"Existing users in F5 XC: {len(existing_users)}")
-
-        # Synchronize users
-        try:
-            user_stats = user_service.sync_users(
-                validation_result.users, existing_users, dry_run, prune_users
+        # Cached listings may be stale: re-fetch just the users we'll change
+        if cache_repo is not None and cache_repo.served_from_cache(USERS):
+            touched = user_service.users_to_touch(
+                planned_users, existing_users, prune_users
             )
-        except Exception as e:
-            raise click.ClickException(f"User sync failed: {e}")
+            refreshed = 0
+            if touched:
+                try:
+                    refreshed = cache_repo.refresh_users(touched)
+                except DeadlineExceeded as e:
+                    raise click.ClickException(f"{e} while refreshing users")
+                except requests.RequestException as e:
+                    raise click.ClickException(f"API error refreshing users: {e}")
+                existing_users = own_users(user_service.fetch_existing_users())
+            click.echo(f"Using cached F5 XC users ({refreshed} refreshed)")
 
-        # Display user summary
-        click.echo("\n" + user_stats.summary())
+        click.echo(f"Existing users in F5 XC: {len(existing_users)}")
 
-        # Show error details if any
-        if user_stats.has_errors():
-            click.echo("\nErrors encountered:")
-            for err in user_stats.error_details:
-                click.echo(
-                    f" - {err['email']}: {err['operation']} failed - {err['error']}"
-                )
-            raise click.ClickException(
-                "One or more user operations failed; see details above"
+        if scheduled:
+            operations += user_service.plan_operations(
+                planned_users, existing_users, prune_users, user_stats
             )
+        else:
+            # Synchronize users
+            try:
+                user_stats = user_service.sync_users(
+                    planned_users, existing_users, dry_run, prune_users
+                )
+            except Exception as e:
+                raise click.ClickException(f"User sync failed: {e}")
+
+            # Display user summary
+            click.echo("\n" + user_stats.summary())
+            if shard is not None:
+                shard.finish("users", ok=not user_stats.has_errors())
+            _raise_for_user_errors(user_stats)
 
     # ===== GROUP SYNCHRONIZATION =====
     # Sync groups AFTER users to ensure all referenced users exist
-    if sync_groups:
+    if sync_groups and not resume:
         click.echo("\n" + "=" * 60)
         click.echo("📦 GROUP SYNCHRONIZATION")
         click.echo("=" * 60)
 
+        if shard is not None:
+            # Group members may be created by any shard
+            click.echo("Waiting for all shards to finish users...")
+            try:
+                shard.wait("users")
+            except ShardError as e:
+                raise click.ClickException(str(e))
+
         # Parse CSV for groups
         try:
-            planned_groups = group_service.parse_csv_to_groups(csv_path)
+            if source is None:
+                assert csv_path is not None  # main requires a source
+                planned_groups = group_service.parse_csv_to_groups(
+                    csv_path, workers=parse_workers
+                )
+            else:
+                planned_groups = group_service.parse_source_to_groups(source)
         except CSVParseError as e:
             raise click.UsageError(str(e))
         except Exception as e:
             raise click.ClickException(f"Failed to parse CSV for groups: {e}")
+        if shard is not None:
+            planned_groups = shard.shard.select(planned_groups, lambda g: g.name)
 
         # Display planned groups
         click.echo(f"Groups planned from CSV: {len(planned_groups)}")
-        for grp in planned_groups:
-            click.echo(f" - {grp.name}: {len(grp.users)} users")
+        for line in planned_group_lines(planned_groups, max_output_lines):
+            click.echo(line)
+        if details is not None:
+            for grp in planned_groups:
+                details.write(f"Planned group {grp.name}: {len(grp.users)} users")
 
         # Fetch existing groups
         try:
-            existing_groups = group_service.fetch_existing_groups()
+            existing_groups = own_groups(group_service.fetch_existing_groups())
+        except DeadlineExceeded as e:
+            raise click.ClickException(f"{e} while listing groups")
         except requests.RequestException as e:
             raise click.ClickException(f"API error listing groups: {e}")
         except Exception as e:
             raise click.ClickException(f"Unexpected error lists groups: {e}")
 
+        if cache_repo is not None and cache_repo.served_from_cache(GROUPS):
+            touched = group_service.groups_to_touch(
+                planned_groups, existing_groups, prune_groups
+            )
+            refreshed = 0
+            if touched:
+                try:
+                    refreshed = cache_repo.refresh_groups(touched)
+                except DeadlineExceeded as e:
+                    raise click.ClickException(f"{e} while refreshing groups")
+                except requests.RequestException as e:
+                    raise click.ClickException(f"API error refreshing groups: {e}")
+                existing_groups = own_groups(group_service.fetch_existing_groups())
+            click.echo(f"Using cached F5 XC groups ({refreshed} refreshed)")
+
+    if sync_groups and not resume and scheduled:
+        # Members are created by the user operations planned above
+        operations += group_service.plan_operations(
+            planned_groups, existing_groups, prune_groups, group_stats
+        )
+    elif sync_groups and not resume:
         # Build user validation set including planned users from user sync
         # This ensures group validation knows about users that will be/were created
         try:
@@ -441,7 +795,12 @@ def cli(
 
             # If user sync happened, include planned users in validation set
             # This handles dry-run mode where users aren't actually created yet
-            if sync_users and "validation_result" in locals():
+            # (None means the listing failed: groups are synced unvalidated)
+            if (
+                existing_users_for_groups is not None
+                and sync_users
+                and "validation_result" in locals()
+            ):
                 planned_user_emails = {user.email for user in validation_result.users}
                 existing_users_for_groups = (
                     existing_users_for_groups | planned_user_emails
@@ -475,11 +834,64 @@ def cli(
 
         # Display group summary
         click.echo("\n" + group_stats.summary())
+        if shard is not None:
+            merged = shard.report(user_stats, group_stats)
+
+        if group_stats.has_errors():
+            raise click.ClickException(
+                "One or more group operations failed; see logs for details"
+            )
 
+    if scheduled:
+        # Deletes of a scheduled run go through apply_operation one by one,
+        # so the prune limits are checked here, before anything runs. A
+        # resumed plan is checked against the tenant as it is now.
+        for kind, entity, limit in (
+            ("users", "user", user_service.max_prune_percent),
+            ("groups", "group", group_service.max_prune_percent),
+        ):
+            deleting = sum(
+                1 for op in operations if op.entity == entity and op.action == "delete"
+            )
+            if not deleting or limit is None:
+                continue
+            if not resume:
+                existing = existing_users if entity == "user" else existing_groups
+            else:
+                try:
+                    if entity == "user":
+                        existing = user_service.fetch_existing_users()
+                    else:
+                        existing = group_service.fetch_existing_groups()
+                except DeadlineExceeded as e:
+                    raise click.ClickException(f"{e} while listing {kind}")
+                except requests.RequestException as e:
+                    raise click.ClickException(f"API error listing {kind}: {e}")
+            try:
+                check_prune_limit(kind, deleting, len(existing), limit)
+            except PruneLimitExceeded as e:
+                raise click.ClickException(str(e))
+
+    if scheduled:
+        left = _run_scheduled(
+            operations,
+            user_service,
+            group_service,
+            user_stats,
+            group_stats,
+            dry_run,
+            deadline,
+            leftover_plan,
+        )
+        _raise_for_user_errors(user_stats)
         if group_stats.has_errors():
             raise click.ClickException(
                 "One or more group operations failed; see logs for details"
             )
+        if left:
+            raise click.ClickException(
+                f"Run deadline reached; finish with --resume {leftover_plan}"
+            )
 
     # ===== FINAL SUMMARY =====
     execution_time = time.time() - start_time
@@ -500,6 +912,843 @@ def cli(
         if prune_users:
             click.echo(f"Users pruned: {user_stats.deleted}")
 
+    if merged is not None:
+        click.echo(f"\nAll {shard.shard.count} shards done:")  # type: ignore[union-attr]
+        click.echo(merged[0].summary())
+        click.echo(merged[1].summary())
+
+    # Retry budget and circuit breaker activity (XCClient only)
+    api_summary = getattr(client, "api_summary", None)
+    if callable(api_summary):
+        click.echo(api_summary())
+
+
+@click.command()
+@click.option(
+    "--csv",
+    "csv_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Path to CSV export (or NDJSON/Parquet/Arrow, see --input-format)",
+)
+@click.option(
+    "--input-format",
+    type=click.Choice(["auto", *SOURCE_FORMATS], case_sensitive=False),
+    default="auto",
+    help="Input file format (auto = detect from the file extension)",
+)
+@click.option(
+    "--ldap-url",
+    type=str,
+    default=None,
+    help=(
+        "Read users from this LDAP server instead of a file "
+        "(binds as LDAP_BIND_DN/LDAP_BIND_PASSWORD)"
+    ),
+)
+@click.option("--ldap-base-dn", type=str, default=None, help="LDAP user search base")
+@click.option(
+    "--ldap-filter",
+    type=str,
+    default=DEFAULT_USER_FILTER,
+    show_default=True,
+    help="LDAP filter selecting user entries",
+)
+@click.option(
+    "--ldap-group-base",
+    type=str,
+    default=None,
+    help="Only sync memberOf groups under this DN",
+)
+@click.option(
+    "--ldap-page-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_PAGE_SIZE,
+    show_default=True,
+    help="Entries per LDAP paged-results page",
+)
+@click.option("--dry-run", is_flag=True, help="Log actions without calling the API")
+@click.option(
+    "--prune",
+    is_flag=True,
+    help="Delete users and groups in F5 XC that don't exist in CSV",
+)
+@click.option(
+    "--log-level",
+    type=click.Choice(["debug", "info", "warn", "error"], case_sensitive=False),
+    default="info",
+    help="Logging level",
+)
+@click.option(
+    "--log-format",
+    type=click.Choice(LOG_FORMATS, case_sensitive=False),
+    default="text",
+    show_default=True,
+    help="Log records as text or as one JSON object per line",
+)
+@click.option(
+    "--trace",
+    "trace_keys",
+    multiple=True,
+    metavar="EMAIL|GROUP",
+    help="Log the debug records of this user or group at info level (repeatable)",
+)
+@click.option(
+    "--max-output-lines",
+    type=click.IntRange(min=0),
+    default=DEFAULT_MAX_LINES,
+    show_default=True,
+    help=(
+        "Planned groups and per-user/group log lines shown before the rest "
+        "are summarized (0 = show all)"
+    ),
+)
+@click.option(
+    "--details-file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Append the full plan and every log line to this file",
+)
+@click.option(
+    "--progress/--no-progress",
+    default=None,
+    help="Show a progress bar while syncing [default: when on a terminal]",
+)
+@click.option("--max-retries", type=int, default=3, help="Max retries for API calls")
+@click.option(
+    "--retry-budget",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_RETRY_BUDGET,
+    show_default=True,
+    help="Run-wide retries allowed, as a fraction of API requests",
+)
+@click.option("--timeout", type=int, default=30, help="HTTP timeout (seconds)")
+@click.option(
+    "--deadline",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help=(
+        "Overall run deadline in seconds; revocations run first and unfinished "
+        "work is saved to --leftover-plan"
+    ),
+)
+@click.option(
+    "--revoke-first",
+    is_flag=True,
+    help=(
+        "Plan all changes, then run deactivations, deletions and member "
+        "removals before any additions (implied by --deadline)"
+    ),
+)
+@click.option(
+    "--leftover-plan",
+    type=click.Path(dir_okay=False),
+    default=DEFAULT_LEFTOVER_PLAN,
+    show_default=True,
+    help="File receiving operations not run before --deadline",
+)
+@click.option(
+    "--resume",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Run the operations in a leftover plan instead of reading a source",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help="Keep running and resync whenever the --csv file changes",
+)
+@click.option(
+    "--watch-dir",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="Keep running and sync the newest file dropped into this directory",
+)
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=DEFAULT_POLL_INTERVAL,
+    show_default=True,
+    help="Seconds between checks for changes in watch mode",
+)
+@click.option(
+    "--debounce",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_DEBOUNCE,
+    show_default=True,
+    help="Seconds a changed file must stay unchanged before it is synced",
+)
+@click.option(
+    "--serve",
+    metavar="[HOST:]PORT",
+    default=None,
+    help=(
+        "Serve POST /sync requests for targeted syncs of a few users or groups "
+        "(HOST defaults to 127.0.0.1)"
+    ),
+)
+@click.option(
+    "--max-concurrent-syncs",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_CONCURRENT,
+    show_default=True,
+    help="Targeted syncs run at once by --serve",
+)
+@click.option(
+    "--max-queued-syncs",
+    type=click.IntRange(min=0),
+    default=DEFAULT_MAX_QUEUE,
+    show_default=True,
+    help="Targeted syncs waiting for a slot before --serve answers 429",
+)
+@click.option(
+    "--only-email",
+    "only_emails",
+    multiple=True,
+    help="Only sync this user and its groups (repeatable)",
+)
+@click.option(
+    "--only-group",
+    "only_groups",
+    multiple=True,
+    help="Only sync this group (XC name, CN or DN) and its members (repeatable)",
+)
+@click.option(
+    "--from-file",
+    "selection_file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Only sync the emails and groups listed in this file, one per line",
+)
+@click.option(
+    "--shard",
+    metavar="I/N",
+    default=None,
+    help="Only diff and apply shard I of N (run one worker per shard)",
+)
+@click.option(
+    "--shard-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory shared by the workers of a sharded run (fresh per run)",
+)
+@click.option(
+    "--shard-timeout",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_SHARD_TIMEOUT,
+    show_default=True,
+    help="Seconds to wait for the other shards to finish their users",
+)
+@click.option(
+    "--drift-report",
+    type=click.Path(dir_okay=False, allow_dash=True),
+    default=None,
+    help="Write a read-only drift report to this file ('-' for stdout); no sync",
+)
+@click.option(
+    "--drift-format",
+    type=click.Choice(("auto",) + DRIFT_FORMATS, case_sensitive=False),
+    default="auto",
+    show_default=True,
+    help="Drift report format; auto uses csv for .csv files, else ndjson",
+)
+@click.option(
+    "--prune-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_PRUNE_WORKERS,
+    show_default=True,
+    help="Deletes run at once by --prune",
+)
+@click.option(
+    "--max-prune-percent",
+    type=click.FloatRange(min=0, max=100),
+    default=DEFAULT_MAX_PRUNE_PERCENT,
+    show_default=True,
+    help=(
+        "Abort before deleting anything if --prune would remove more than this "
+        "share of users or groups (100 disables the check)"
+    ),
+)
+@click.option(
+    "--backup",
+    "backup_path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help=(
+        "Write a compressed snapshot of XC groups and users to this file first "
+        "(without --csv/--ldap-url, only take the snapshot)"
+    ),
+)
+@click.option(
+    "--restore",
+    "restore_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Recreate and update XC groups and users from a --backup snapshot",
+)
+@click.option(
+    "--restore-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_RESTORE_WORKERS,
+    show_default=True,
+    help="Creates and updates run at once by --restore",
+)
+@click.option(
+    "--restore-rate",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_RESTORE_RATE,
+    show_default=True,
+    help="API requests per second issued by --restore (0 = unlimited)",
+)
+@click.option(
+    "--warm-start",
+    "warm_start_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Plan against a --backup snapshot instead of listing XC state",
+)
+@click.option(
+    "--parse-workers",
+    type=click.IntRange(min=0),
+    default=1,
+    help="Worker processes for CSV parsing (0 = one per CPU)",
+)
+@click.option(
+    "--state-cache",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="sqlite file caching XC groups/users between runs (disabled if unset)",
+)
+@click.option(
+    "--cache-ttl",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_TTL,
+    show_default=True,
+    help="Seconds to use cached XC state before revalidating it",
+)
+@click.option(
+    "--proxy",
+    type=str,
+    default=None,
+    help=(
+        "Proxy URL (e.g., http://proxy.example.com:8080). "
+        "Uses HTTP_PROXY/HTTPS_PROXY env vars if not specified"
+    ),
+)
+@click.option(
+    "--ca-bundle",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help=(
+        "Path to custom CA bundle for SSL verification "
+        "(for corporate MITM proxies). "
+        "Uses REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE env vars if not specified"
+    ),
+)
+@click.option(
+    "--no-verify",
+    is_flag=True,
+    default=False,
+    help="Disable SSL certificate verification (insecure, not recommended)",
+)
+def cli(
+    csv_path: str | None,
+    input_format: str,
+    ldap_url: str | None,
+    ldap_base_dn: str | None,
+    ldap_filter: str,
+    ldap_group_base: str | None,
+    ldap_page_size: int,
+    dry_run: bool,
+    prune: bool,
+    log_level: str,
+    log_format: str,
+    trace_keys: Tuple[str, ...],
+    max_output_lines: int,
+    details_file: str | None,
+    progress: bool | None,
+    max_retries: int,
+    retry_budget: float,
+    timeout: int,
+    deadline: float | None,
+    revoke_first: bool,
+    leftover_plan: str,
+    resume: str | None,
+    watch: bool,
+    watch_dir: str | None,
+    poll_interval: float,
+    debounce: float,
+    serve: str | None,
+    max_concurrent_syncs: int,
+    max_queued_syncs: int,
+    only_emails: Tuple[str, ...],
+    only_groups: Tuple[str, ...],
+    selection_file: str | None,
+    shard: str | None,
+    shard_dir: str | None,
+    shard_timeout: float,
+    drift_report: str | None,
+    drift_format: str,
+    prune_workers: int,
+    max_prune_percent: float,
+    backup_path: str | None,
+    restore_path: str | None,
+    restore_workers: int,
+    restore_rate: float,
+    warm_start_path: str | None,
+    parse_workers: int,
+    state_cache: str | None,
+    cache_ttl: float,
+    proxy: str | None,
+    ca_bundle: str | None,
+    no_verify: bool,
+) -> None:
+    """Synchronize F5 XC users and groups from CSV file.
+
+    By default, reconciles both users and groups between CSV and F5 XC:
+    - Creates users/groups that exist in CSV but not in F5 XC
+    - Updates existing users/groups to match CSV data
+    - With --prune flag: deletes users/groups in F5 XC that aren't in CSV
+
+    This is a reconciliation tool - it ensures F5 XC matches your CSV source of truth.
+
+    Authentication via environment variables:
+    - TENANT_ID (required): Your XC tenant ID
+    - VOLT_API_P12_FILE + VES_P12_PASSWORD: P12 certificate with passphrase
+    - XC_API_URL (optional): Custom API endpoint (e.g., staging environment)
+    - LDAP_BIND_DN + LDAP_BIND_PASSWORD (optional): Bind credentials for --ldap-url
+
+    Examples:
+        # Reconcile users and groups (create/update only)
+        xc_user_group_sync --csv User-Database.csv
+
+        # Dry run to preview changes
+        xc_user_group_sync --csv User-Database.csv --dry-run
+
+        # Full reconciliation including deletions
+        xc_user_group_sync --csv User-Database.csv --prune
+
+        # Read users straight from the directory instead of a CSV export
+        xc_user_group_sync --ldap-url ldaps://ldap.example.com \\
+            --ldap-base-dn OU=People,DC=example,DC=com --dry-run
+
+        # Sync single users on demand (POST /sync {"emails": [...]})
+        xc_user_group_sync --csv User-Database.csv --serve 8080
+
+        # Fix one user's access right now
+        xc_user_group_sync --csv User-Database.csv --only-email sam@example.com
+
+        # Split a very large tenant across four workers (one per node)
+        xc_user_group_sync --csv User-Database.csv --shard 1/4 \\
+            --shard-dir /shared/xc-sync/2024-06-01
+
+        # Audit what a sync would change before enabling --prune
+        xc_user_group_sync --csv User-Database.csv --drift-report drift.ndjson
+
+        # Snapshot XC before pruning, and roll back if the sync went wrong
+        xc_user_group_sync --csv User-Database.csv --prune --backup before.ndjson.gz
+        xc_user_group_sync --restore before.ndjson.gz
+
+        # Keep running and sync each export dropped into a directory
+        xc_user_group_sync --watch-dir /srv/exports --prune
+
+        # Finish within 15 minutes, then pick up the rest later
+        xc_user_group_sync --csv User-Database.csv --prune --deadline 900
+        xc_user_group_sync --resume xc-sync-leftover.json --deadline 900
+
+    Proxy configuration (for corporate networks):
+    - --proxy: Explicit proxy URL or use HTTP_PROXY/HTTPS_PROXY environment variables
+    - --ca-bundle: Custom CA certificate bundle for MITM SSL inspection
+    - --no-verify: Disable SSL verification (insecure, not recommended)
+
+    Args:
+        csv_path: Path to CSV file with user and group data
+        input_format: Input format name, or "auto" to use the file extension
+        ldap_url: LDAP server URL to read users from instead of a file
+        ldap_base_dn: Search base for LDAP users
+        ldap_filter: LDAP filter selecting user entries
+        ldap_group_base: Only keep memberOf groups under this DN
+        ldap_page_size: Entries per LDAP paged-results page
+        dry_run: If True, log actions without making API changes
+        prune: If True, delete users/groups in F5 XC that don't exist in CSV
+        log_level: Logging verbosity level
+        log_format: "text" or "json" log records
+        trace_keys: Emails and group names whose debug records are logged
+        max_output_lines: Per-entity console lines before summarizing
+        details_file: Optional file receiving the full plan and log
+        progress: Show a progress bar (None shows one on a terminal)
+        max_retries: Maximum retries for failed API requests
+        retry_budget: Run-wide retries allowed, as a fraction of API requests
+        timeout: HTTP timeout in seconds
+        deadline: Optional overall run deadline in seconds
+        revoke_first: If True, run access-reducing operations before additions
+        leftover_plan: File receiving operations not run before the deadline
+        resume: Optional leftover plan to run instead of reading a source
+        watch: If True, keep running and resync when the CSV file changes
+        watch_dir: Optional drop directory to watch instead of --csv
+        poll_interval: Seconds between checks for changes in watch mode
+        debounce: Seconds a changed file must settle before it is synced
+        serve: Optional [HOST:]PORT to serve targeted sync requests on
+        max_concurrent_syncs: Targeted syncs run at once when serving
+        max_queued_syncs: Targeted syncs allowed to wait for a slot
+        only_emails: Emails to limit this sync to
+        only_groups: Groups to limit this sync to
+        selection_file: File listing emails and groups to limit this sync to
+        shard: Optional I/N shard of a sharded run to apply
+        shard_dir: Directory coordinating the workers of a sharded run
+        shard_timeout: Seconds to wait for the other shards' users
+        drift_report: Optional path of a drift report to write instead of syncing
+        drift_format: Drift report format, or "auto" to use the file extension
+        prune_workers: Deletes run concurrently when pruning
+        max_prune_percent: Largest share of users or groups a prune may delete
+        backup_path: Optional path to snapshot XC groups and users to first
+        restore_path: Optional snapshot to restore instead of syncing
+        restore_workers: Creates and updates run concurrently when restoring
+        restore_rate: API requests per second when restoring (0 = unlimited)
+        warm_start_path: Optional snapshot to plan against instead of listing XC
+        parse_workers: Worker processes for CSV parsing (0 = one per CPU)
+        state_cache: Optional sqlite path for caching XC state between runs
+        cache_ttl: Seconds cached XC state is used without revalidation
+        proxy: Optional proxy URL for HTTP/HTTPS requests
+        ca_bundle: Optional path to CA certificate bundle
+        no_verify: If True, disable SSL certificate verification
+
+    """
+    if resume:
+        if csv_path or ldap_url:
+            raise click.UsageError(
+                "--resume cannot be combined with --csv or --ldap-url"
+            )
+    elif watch_dir:
+        if csv_path or ldap_url:
+            raise click.UsageError(
+                "--watch-dir cannot be combined with --csv or --ldap-url"
+            )
+    elif restore_path:
+        if csv_path or ldap_url:
+            raise click.UsageError(
+                "--restore cannot be combined with --csv or --ldap-url"
+            )
+    elif (csv_path and ldap_url) or not (csv_path or ldap_url or backup_path):
+        raise click.UsageError("Provide exactly one of --csv or --ldap-url")
+    if watch and not csv_path:
+        raise click.UsageError("--watch requires --csv (or use --watch-dir)")
+    if (watch or watch_dir) and (deadline or resume):
+        raise click.UsageError("--deadline and --resume cannot be used in watch mode")
+    if serve and (watch or watch_dir or deadline or resume):
+        raise click.UsageError(
+            "--serve cannot be combined with --watch, --watch-dir, --deadline "
+            "or --resume"
+        )
+    selection = _read_selection(only_emails, only_groups, selection_file)
+    if selection and (watch or watch_dir or serve or deadline or resume):
+        raise click.UsageError(
+            "--only-email, --only-group and --from-file cannot be combined with "
+            "--watch, --watch-dir, --serve, --deadline or --resume"
+        )
+    run_shard: Shard | None = None
+    if shard:
+        try:
+            run_shard = Shard.parse(shard)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--shard")
+        if not shard_dir:
+            raise click.UsageError("--shard requires --shard-dir")
+        if selection or watch or watch_dir or serve or deadline or resume:
+            raise click.UsageError(
+                "--shard cannot be combined with --watch, --watch-dir, --serve, "
+                "--deadline, --resume or a selection"
+            )
+        if revoke_first:
+            raise click.UsageError("--shard cannot be combined with --revoke-first")
+    if drift_report and (
+        selection or watch or watch_dir or serve or deadline or resume or shard
+    ):
+        raise click.UsageError(
+            "--drift-report cannot be combined with --watch, --watch-dir, --serve, "
+            "--deadline, --resume, --shard or a selection"
+        )
+    # Without a source, --backup and --restore run on their own
+    standalone = restore_path or (
+        backup_path and not (csv_path or ldap_url or resume or watch_dir)
+    )
+    if standalone and (
+        watch or serve or deadline or resume or selection or shard or drift_report
+    ):
+        raise click.UsageError(
+            "--restore (or --backup without --csv/--ldap-url) cannot be combined "
+            "with --watch, --serve, --deadline, --resume, --shard, --drift-report "
+            "or a selection"
+        )
+    if warm_start_path and (standalone or resume):
+        raise click.UsageError("--warm-start needs a source to plan against")
+    if ldap_url and not ldap_base_dn:
+        raise click.UsageError("--ldap-base-dn is required with --ldap-url")
+
+    run_deadline = Deadline(deadline) if deadline else None
+
+    # Configure logging
+    listener = configure_logging(
+        getattr(logging, log_level.upper(), logging.INFO), log_format.lower()
+    )
+    if listener is not None:
+        click.get_current_context().call_on_close(lambda: stop_logging(listener))
+    trace_entities(trace_keys)
+    click.get_current_context().call_on_close(lambda: trace_entities(()))
+    output_limit, details = _bound_output(max_output_lines, details_file)
+
+    # Load configuration from environment
+    (
+        tenant_id,
+        api_token,
+        api_url,
+        cert_file,
+        key_file,
+        p12_file,
+        p12_password,
+    ) = _load_configuration()
+
+    # Determine SSL verification setting
+    # Priority: --no-verify > --ca-bundle > default (True)
+    if no_verify:
+        verify: bool | str | None = False
+    elif ca_bundle:
+        verify = ca_bundle
+    else:
+        verify = None  # Will use environment variables or default to True
+
+    # Create authenticated client
+    try:
+        client = _create_client(
+            tenant_id,
+            api_token,
+            cert_file,
+            key_file,
+            p12_file,
+            p12_password,
+            api_url,
+            timeout,
+            max_retries,
+            proxy=proxy,
+            verify=verify,
+            retry_budget=retry_budget,
+            deadline=run_deadline,
+        )
+    except click.UsageError:
+        raise
+    except Exception as e:
+        raise click.ClickException(f"Failed to create client: {e}")
+
+    # Serve XC listings from the local state cache when enabled
+    # (and remember users whose roles entry is missing across runs)
+    repository: XCClient | CachingRepository = client
+    cache_repo: CachingRepository | None = None
+    missing_roles = None
+    if state_cache or watch or watch_dir or serve or warm_start_path:
+        # Watch and serve modes keep XC state warm in memory between syncs
+        cache = StateCache(state_cache or ":memory:")
+        cache_repo = CachingRepository(client, cache, cache_ttl)
+        repository = cache_repo
+        missing_roles = cache_repo.missing_roles()
+
+    # Backups and restores always read XC itself, never the state cache
+    if backup_path:
+        _backup(client, tenant_id, backup_path)
+    if restore_path:
+        _restore(
+            client, tenant_id, restore_path, restore_workers, restore_rate, dry_run
+        )
+        if cache_repo is not None and not dry_run:
+            # The restore wrote around the cache
+            cache_repo.cache.invalidate()
+        return
+    if standalone:
+        return
+    if warm_start_path and cache_repo is not None:
+        _warm_start(cache_repo, tenant_id, warm_start_path)
+
+    # Initialize services
+    # Prune deletes of users and groups share one thread pool
+    executor: ThreadPoolExecutor | None = None
+    if prune and prune_workers > 1:
+        executor = ThreadPoolExecutor(prune_workers, thread_name_prefix="xc-prune")
+        click.get_current_context().call_on_close(executor.shutdown)
+    max_prune = max_prune_percent if max_prune_percent < 100 else None
+    progress_bar = ProgressBar(enabled=progress)
+    group_service = GroupSyncService(
+        repository,
+        executor=executor,
+        max_prune_percent=max_prune,
+        progress=progress_bar,
+    )
+    user_service = UserSyncService(
+        repository,
+        missing_roles=missing_roles,
+        executor=executor,
+        max_prune_percent=max_prune,
+        progress=progress_bar,
+    )
+
+    ldap_source: LDAPSource | None = None
+    if ldap_url:
+        assert ldap_base_dn is not None  # checked above
+        ldap_source = LDAPSource(
+            ldap_url,
+            search_base=ldap_base_dn,
+            bind_dn=os.getenv("LDAP_BIND_DN"),
+            password=os.getenv("LDAP_BIND_PASSWORD"),
+            search_filter=ldap_filter,
+            page_size=ldap_page_size,
+            group_base=ldap_group_base,
+        )
+
+    if drift_report:
+        if drift_format == "auto":
+            drift_format = "csv" if drift_report.lower().endswith(".csv") else "ndjson"
+        # Not standalone, so there is a --csv or --ldap-url
+        if ldap_source is not None:
+            drift_source: RecordSource = ldap_source
+        else:
+            assert csv_path is not None
+            drift_source = _file_source(csv_path, input_format) or CSVSource(csv_path)
+        _report_drift(
+            user_service,
+            group_service,
+            cache_repo,
+            drift_source,
+            drift_report,
+            drift_format.lower(),
+        )
+        return
+
+    # Record source of --ldap-url or a non-CSV --csv file (None for a CSV file)
+    source: RecordSource | None = ldap_source
+    if source is None and csv_path:
+        source = _file_source(csv_path, input_format)
+
+    if selection:
+        _sync_selection(
+            TargetedSync(
+                user_service,
+                group_service,
+                csv_path=csv_path,
+                source=source,
+                cache_repo=cache_repo,
+                prune=prune,
+                scoped=True,
+            ),
+            selection,
+            dry_run,
+        )
+        return
+
+    if serve:
+        host, port = _parse_address(serve)
+        targeted = TargetedSync(
+            user_service,
+            group_service,
+            csv_path=csv_path,
+            source=source,
+            cache_repo=cache_repo,
+            prune=prune,
+            parse_workers=parse_workers,
+        )
+        try:
+            server = SyncServer(
+                (host, port),
+                targeted,
+                max_concurrent=max_concurrent_syncs,
+                max_queue=max_queued_syncs,
+                token=os.getenv("SYNC_TRIGGER_TOKEN"),
+            )
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--serve")
+        click.echo(f"Serving targeted syncs on http://{host}:{server.server_port}/sync")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            click.echo("Stopped serving")
+        finally:
+            server.server_close()
+        return
+
+    def sync_once(path: str | None) -> None:
+        try:
+            _sync_once(
+                user_service,
+                group_service,
+                client,
+                cache_repo,
+                path,
+                ldap_source,
+                input_format=input_format,
+                parse_workers=parse_workers,
+                dry_run=dry_run,
+                prune=prune,
+                revoke_first=revoke_first,
+                deadline=run_deadline,
+                resume=resume,
+                leftover_plan=leftover_plan,
+                max_output_lines=max_output_lines,
+                details=details,
+            )
+        finally:
+            _report_suppressed(output_limit, details)
+
+    if run_shard is not None:
+        assert shard_dir is not None  # checked above
+        coordinator = ShardCoordinator(shard_dir, run_shard, timeout=shard_timeout)
+        try:
+            coordinator.claim()
+        except ShardError as e:
+            raise click.ClickException(str(e))
+        try:
+            _sync_once(
+                user_service,
+                group_service,
+                client,
+                cache_repo,
+                csv_path,
+                ldap_source,
+                input_format=input_format,
+                parse_workers=parse_workers,
+                dry_run=dry_run,
+                prune=prune,
+                revoke_first=False,
+                deadline=None,
+                resume=None,
+                leftover_plan=leftover_plan,
+                shard=coordinator,
+                max_output_lines=max_output_lines,
+                details=details,
+            )
+        except BaseException:
+            # Let the other shards stop instead of waiting for our users
+            coordinator.abort("users")
+            raise
+        finally:
+            _report_suppressed(output_limit, details)
+        return
+
+    if not (watch or watch_dir):
+        sync_once(csv_path)
+        return
+
+    watch_path = watch_dir or csv_path
+    assert watch_path is not None  # --watch requires --csv
+    watcher = Watcher(watch_path, poll_interval, debounce)
+    click.echo(f"Watching {watcher.path} (polling every {poll_interval:g}s)")
+    try:
+        for path in watcher.changes():
+            click.echo(f"\nChange detected: {path}")
+            try:
+                sync_once(path)
+            except click.ClickException as e:
+                # Keep watching; the next change gets a fresh attempt
+                click.echo(f"Error: {e.format_message()}", err=True)
+    except KeyboardInterrupt:
+        click.echo("Stopped watching")
+
 
 if __name__ == "__main__":
     cli()
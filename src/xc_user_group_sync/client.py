@@ -2,7 +2,8 @@
 
 Provides a REST API client for F5 Distributed Cloud with built-in
 retry logic for transient errors, support for multiple authentication
-methods, and exponential backoff.
+methods, and exponential backoff. Which failures are retried is decided
+by ``retry_policy.RetryPolicy``.
 """
 
 from __future__ import annotations
@@ -12,18 +13,26 @@ import logging
 import os
 import tempfile
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Optional, Tuple, Union
 
 import requests
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import serialization
 from requests import Response
-from tenacity import (
-    Retrying,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_exponential,
+
+from .retry_policy import (
+    DEFAULT_FAILURE_THRESHOLD,
+    DEFAULT_RESET_TIMEOUT,
+    DEFAULT_RETRY_BUDGET,
+    TRANSIENT_STATUSES,
+    CircuitBreaker,
+    RetryBudget,
+    RetryPolicy,
+    endpoint_family,
+    is_outage,
+    transient_error,
 )
+from .scheduling import Deadline
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +61,10 @@ class XCClient:
         backoff_max: float = 8.0,
         proxy: Optional[str] = None,
         verify: Optional[Union[bool, str]] = None,
+        retry_budget: float = DEFAULT_RETRY_BUDGET,
+        breaker_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        breaker_reset: float = DEFAULT_RESET_TIMEOUT,
+        deadline: Optional[Deadline] = None,
     ) -> None:
         """Initialize the F5 XC API client.
 
@@ -77,6 +90,13 @@ class XCClient:
                   (for corporate MITM proxies)
                 If not provided, will use REQUESTS_CA_BUNDLE or
                 CURL_CA_BUNDLE env vars
+            retry_budget: Retries allowed across the client's lifetime, as a
+                fraction of requests sent
+            breaker_threshold: Consecutive failures that open the circuit
+                breaker of an endpoint family (user_groups, user_roles)
+            breaker_reset: Seconds an open circuit fails fast before probing
+            deadline: Run deadline; request timeouts and retry waits are
+                clamped to the time left
 
         Raises:
             ValueError: If no authentication method provided or invalid combination
@@ -90,28 +110,41 @@ class XCClient:
         self.backoff_multiplier = backoff_multiplier
         self.backoff_min = backoff_min
         self.backoff_max = backoff_max
+        self.retry_budget = RetryBudget(retry_budget)
+        self.retry_policy = RetryPolicy(
+            max_attempts=max_retries,
+            backoff_multiplier=backoff_multiplier,
+            backoff_min=backoff_min,
+            backoff_max=backoff_max,
+            budget=self.retry_budget,
+            deadline=deadline,
+        )
+        self.deadline = deadline
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.breakers: Dict[str, CircuitBreaker] = {}
 
         # Configure proxy settings
         # Priority: explicit parameter > environment variables > no proxy
         if proxy:
             self.session.proxies = {"http": proxy, "https": proxy}
-            logger.debug(f"Using explicit proxy: {proxy}")
+            logger.debug("Using explicit proxy: %s", proxy)
         elif os.getenv("HTTP_PROXY") or os.getenv("HTTPS_PROXY"):
             # requests.Session automatically uses HTTP_PROXY/HTTPS_PROXY env vars
             # Just log for visibility
             http_proxy = os.getenv("HTTP_PROXY") or os.getenv("http_proxy")
             https_proxy = os.getenv("HTTPS_PROXY") or os.getenv("https_proxy")
             if http_proxy:
-                logger.debug(f"Using HTTP_PROXY from environment: {http_proxy}")
+                logger.debug("Using HTTP_PROXY from environment: %s", http_proxy)
             if https_proxy:
-                logger.debug(f"Using HTTPS_PROXY from environment: {https_proxy}")
+                logger.debug("Using HTTPS_PROXY from environment: %s", https_proxy)
 
         # Configure SSL/TLS verification
         # Priority: explicit parameter > environment variables > True (default)
         if verify is not None:
             self.session.verify = verify
             if isinstance(verify, str):
-                logger.debug(f"Using custom CA bundle: {verify}")
+                logger.debug("Using custom CA bundle: %s", verify)
             elif verify is False:
                 logger.warning("SSL verification disabled - this is insecure!")
         else:
@@ -119,7 +152,7 @@ class XCClient:
             ca_bundle = os.getenv("REQUESTS_CA_BUNDLE") or os.getenv("CURL_CA_BUNDLE")
             if ca_bundle:
                 self.session.verify = ca_bundle
-                logger.debug(f"Using CA bundle from environment: {ca_bundle}")
+                logger.debug("Using CA bundle from environment: %s", ca_bundle)
             # else: defaults to True (system CA bundle)
 
         # Store temp file paths for cleanup
@@ -217,43 +250,145 @@ class XCClient:
         if self._temp_cert_file and self._temp_cert_file.exists():
             try:
                 self._temp_cert_file.unlink()
-                logger.debug(f"Deleted temporary cert file: {self._temp_cert_file}")
+                logger.debug("Deleted temporary cert file: %s", self._temp_cert_file)
             except Exception as e:
-                logger.warning(f"Failed to delete temp cert file: {e}")
+                logger.warning("Failed to delete temp cert file: %s", e)
 
         if self._temp_key_file and self._temp_key_file.exists():
             try:
                 self._temp_key_file.unlink()
-                logger.debug(f"Deleted temporary key file: {self._temp_key_file}")
+                logger.debug("Deleted temporary key file: %s", self._temp_key_file)
             except Exception as e:
-                logger.warning(f"Failed to delete temp key file: {e}")
+                logger.warning("Failed to delete temp key file: %s", e)
 
     def __del__(self) -> None:
         """Cleanup temp files when object is garbage collected."""
         self._cleanup_temp_files()
 
-    def _request(self, method: str, path: str, **kwargs: Any) -> Response:
+    def _request(
+        self, method: str, path: str, confirm: Optional[str] = None, **kwargs: Any
+    ) -> Response:
+        """Send a request, retrying according to ``self.retry_policy``.
+
+        Args:
+            method: HTTP method
+            path: API path, relative to ``base_url``
+            confirm: For creates, path of the created entity. A 409 on a
+                retried POST is then confirmed with a GET of this path and its
+                response returned instead of raising.
+            **kwargs: Passed on to ``requests.Session.request``
+
+        Returns:
+            The successful (or reconciled) response
+
+        Raises:
+            requests.RequestException: If the request fails and is either not
+                retryable or out of attempts (or retry budget)
+            CircuitOpenError: If the endpoint family's circuit is open
+            DeadlineExceeded: If the run deadline has passed
+
+        """
         url = f"{self.base_url}{path}"
-        # Use per-instance retry configuration
-        for attempt in Retrying(
-            stop=stop_after_attempt(self.max_retries),
-            wait=wait_exponential(
-                multiplier=self.backoff_multiplier,
-                min=self.backoff_min,
-                max=self.backoff_max,
-            ),
-            retry=retry_if_exception_type((requests.RequestException,)),
-            reraise=True,
-        ):
+        breaker = self._breaker(path)
+        self.retry_budget.record_request()
+        for attempt in self.retry_policy.retrying(method):
             with attempt:
-                resp = self.session.request(method, url, timeout=self.timeout, **kwargs)
-                if resp.status_code in (429, 500, 502, 503, 504):
+                timeout: float = self.timeout
+                if self.deadline is not None:
+                    timeout = self.deadline.timeout(timeout)
+                breaker.before_request()
+                try:
+                    resp = self.session.request(method, url, timeout=timeout, **kwargs)
+                except requests.RequestException:
+                    breaker.record_failure()
+                    raise
+                if resp.status_code in TRANSIENT_STATUSES:
                     # Trigger retry by raising a retriable exception
-                    raise requests.RequestException(
-                        f"Transient error: {resp.status_code}: {resp.text}"
-                    )
+                    error = transient_error(resp)
+                    if is_outage(error):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    raise error
+                breaker.record_success()
+                number = attempt.retry_state.attempt_number
+                if self.retry_policy.reconciles(method, resp.status_code, number):
+                    reconciled = self._reconcile(method, path, resp, confirm)
+                    if reconciled is not None:
+                        return reconciled
                 resp.raise_for_status()
                 return resp
+        # Unreachable: the policy reraises the last error
+        raise RuntimeError("Retry logic failed unexpectedly")
+
+    def _breaker(self, path: str) -> CircuitBreaker:
+        family = endpoint_family(path)
+        breaker = self.breakers.get(family)
+        if breaker is None:
+            breaker = self.breakers.setdefault(
+                family,
+                CircuitBreaker(family, self.breaker_threshold, self.breaker_reset),
+            )
+        return breaker
+
+    def api_summary(self) -> str:
+        """One-line summary of requests, retries and circuit breaker activity."""
+        budget = self.retry_budget
+        parts = [f"API: requests={budget.requests}, retries={budget.retries}"]
+        if budget.denied:
+            parts.append(f"retries denied by budget={budget.denied}")
+        for family, breaker in sorted(self.breakers.items()):
+            if breaker.opened:
+                parts.append(
+                    f"circuit {family} opened {breaker.opened}x "
+                    f"({breaker.rejected} failed fast)"
+                )
+        return ", ".join(parts)
+
+    def _reconcile(
+        self, method: str, path: str, resp: Response, confirm: Optional[str]
+    ) -> Optional[Response]:
+        """Accept a retried request's conflict if an earlier attempt succeeded.
+
+        Returns:
+            Response to return to the caller, or None to raise ``resp``'s error
+
+        """
+        if method == "DELETE":
+            logger.info("%s already deleted by an earlier attempt", path)
+            return resp
+        if confirm is None:
+            return None
+        try:
+            existing = self.session.request(
+                "GET", f"{self.base_url}{confirm}", timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            logger.warning("Could not confirm %s after 409: %s", confirm, e)
+            return None
+        if existing.status_code != 200:
+            return None
+        logger.info("%s was created by an earlier attempt", confirm)
+        return existing
+
+    def _get_if_changed(
+        self, path: str, etag: Optional[str]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Conditional GET using ``If-None-Match``.
+
+        Args:
+            path: API path to fetch
+            etag: ETag from the previous response, if any
+
+        Returns:
+            Tuple of (decoded body, or None when unchanged (304); response ETag)
+
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        r = self._request("GET", path, headers=headers)
+        if r.status_code == 304:
+            return None, r.headers.get("ETag") or etag
+        return r.json(), r.headers.get("ETag")
 
     # User Groups (custom API)
     def list_groups(self, namespace: str = "system") -> Dict[str, Any]:
@@ -269,6 +404,42 @@ class XCClient:
         r = self._request("GET", f"/api/web/custom/namespaces/{namespace}/user_groups")
         return r.json()
 
+    def list_groups_if_changed(
+        self, etag: Optional[str], namespace: str = "system"
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """List user groups unless they are unchanged since ``etag``.
+
+        Args:
+            etag: ETag of a previously fetched listing (None to always fetch)
+            namespace: XC namespace (default: "system")
+
+        Returns:
+            Tuple of (listing, or None if unchanged; current ETag if provided)
+
+        """
+        return self._get_if_changed(
+            f"/api/web/custom/namespaces/{namespace}/user_groups", etag
+        )
+
+    def get_group(self, name: str, namespace: str = "system") -> Dict[str, Any]:
+        """Get a single user group by name.
+
+        Args:
+            name: Name of the group
+            namespace: XC namespace (default: "system")
+
+        Returns:
+            Dictionary containing group data
+
+        Raises:
+            requests.HTTPError: On API failures (including 404 if not found)
+
+        """
+        r = self._request(
+            "GET", f"/api/web/custom/namespaces/{namespace}/user_groups/{name}"
+        )
+        return r.json()
+
     def create_group(
         self, group: Dict[str, Any], namespace: str = "system"
     ) -> Dict[str, Any]:
@@ -282,10 +453,9 @@ class XCClient:
             Dictionary containing created group metadata
 
         """
+        path = f"/api/web/custom/namespaces/{namespace}/user_groups"
         r = self._request(
-            "POST",
-            f"/api/web/custom/namespaces/{namespace}/user_groups",
-            json=group,
+            "POST", path, confirm=f"{path}/{group.get('name')}", json=group
         )
         return r.json()
 
@@ -336,6 +506,23 @@ class XCClient:
         r = self._request("GET", f"/api/web/custom/namespaces/{namespace}/user_roles")
         return r.json()
 
+    def list_user_roles_if_changed(
+        self, etag: Optional[str], namespace: str = "system"
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """List user roles unless they are unchanged since ``etag``.
+
+        Args:
+            etag: ETag of a previously fetched listing (None to always fetch)
+            namespace: XC namespace (default: "system")
+
+        Returns:
+            Tuple of (listing, or None if unchanged; current ETag if provided)
+
+        """
+        return self._get_if_changed(
+            f"/api/web/custom/namespaces/{namespace}/user_roles", etag
+        )
+
     def create_user(
         self, user: Dict[str, Any], namespace: str = "system"
     ) -> Dict[str, Any]:
@@ -349,10 +536,9 @@ class XCClient:
             Dictionary containing created user metadata
 
         """
+        path = f"/api/web/custom/namespaces/{namespace}/user_roles"
         r = self._request(
-            "POST",
-            f"/api/web/custom/namespaces/{namespace}/user_roles",
-            json=user,
+            "POST", path, confirm=f"{path}/{user.get('email')}", json=user
         )
         return r.json()
 
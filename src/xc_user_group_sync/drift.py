@@ -0,0 +1,180 @@
+"""Read-only drift report between the source and F5 XC.
+
+Meant as an audit before turning on ``--prune``: the report lists every
+difference a sync would act on, one record per difference, without planning
+or applying anything. Only the listing endpoints are called.
+
+Source rows are read in one pass. Rows of the same user are merged first,
+as the sync merges them (exports repeat a user once per entitlement), so
+memory holds the XC state, the source users and the group membership map,
+but never a plan. Records are written as they are found, as NDJSON or CSV
+with the columns in ``FIELDS``:
+
+- ``missing_user`` / ``extra_user``: user only in the source / only in XC
+- ``user_attribute``: an attribute (``display_name``, ``first_name``,
+  ``last_name``, ``active`` or ``groups``) that differs
+- ``missing_group`` / ``extra_group``: group only in the source / only in XC
+- ``missing_member`` / ``extra_member``: a member the source adds to / XC
+  has beyond the source for a group present in both
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from collections import Counter, defaultdict
+from typing import IO, Any, Dict, Iterator, Optional
+
+from .protocols import RecordSource
+from .sync_service import (
+    GroupMembers,
+    _current_members,
+    add_group_membership,
+    build_planned_groups,
+)
+from .user_sync_service import (
+    UserRowAccumulator,
+    UserSyncService,
+    merge_duplicate_users,
+)
+
+FIELDS = ("kind", "key", "attribute", "source", "xc")
+DRIFT_FORMATS = ("ndjson", "csv")
+
+DriftRecord = Dict[str, Any]
+
+
+def _record(
+    kind: str,
+    key: str,
+    attribute: Optional[str] = None,
+    source: Any = None,
+    xc: Any = None,
+) -> DriftRecord:
+    return {
+        "kind": kind,
+        "key": key,
+        "attribute": attribute,
+        "source": source,
+        "xc": xc,
+    }
+
+
+def iter_drift(
+    source: RecordSource,
+    existing_users: Dict[str, Dict],
+    existing_groups: Dict[str, Dict],
+) -> Iterator[DriftRecord]:
+    """Yield the differences between a source and the current XC state.
+
+    User records come first, in source order, then groups by name.
+    Rows sharing an email are compared as one user with the union of their
+    groups.
+
+    Args:
+        source: Normalized input records
+        existing_users: Current XC users, keyed by lowercase email
+        existing_groups: Current XC groups, keyed by name
+
+    Raises:
+        ValueError: If the source is missing required columns or a row is
+            invalid
+
+    """
+    UserSyncService.validate_header(source.fieldnames)
+
+    accumulator = UserRowAccumulator(log_rows=False)
+    members: GroupMembers = defaultdict(set)
+    for record in source.records():
+        add_group_membership(members, record.entitlements, record.email)
+        accumulator.add_row(*record)
+
+    users = merge_duplicate_users(accumulator.users)
+    accumulator.users.clear()
+    seen = set()
+    for user in users:
+        email = user.email_key
+        seen.add(email)
+
+        existing = existing_users.get(email)
+        if existing is None:
+            yield _record("missing_user", email)
+            continue
+        for attribute in UserSyncService.user_differences(user, existing):
+            planned_value = getattr(user, attribute)
+            xc_value = existing.get(attribute)
+            if attribute == "groups":
+                planned_value = sorted(planned_value)
+                xc_value = sorted(xc_value or [])
+            yield _record("user_attribute", email, attribute, planned_value, xc_value)
+
+    for email in sorted(set(existing_users) - seen):
+        yield _record("extra_user", email)
+
+    planned_names = set()
+    for group in build_planned_groups(members):
+        planned_names.add(group.name)
+        existing = existing_groups.get(group.name)
+        if existing is None:
+            yield _record("missing_group", group.name, "members", len(group.users))
+            continue
+        desired = set(group.users)
+        current = set(_current_members(existing))
+        for email in sorted(desired - current):
+            yield _record("missing_member", group.name, "member", source=email)
+        for email in sorted(current - desired):
+            yield _record("extra_member", group.name, "member", xc=email)
+    members.clear()
+
+    for name in sorted(set(existing_groups) - planned_names):
+        yield _record("extra_group", name)
+
+
+class DriftWriter:
+    """Write drift records to a stream as NDJSON or CSV."""
+
+    def __init__(self, stream: IO[str], fmt: str = "ndjson") -> None:
+        """Initialize the writer.
+
+        Args:
+            stream: Text stream to write to
+            fmt: "ndjson" or "csv"
+
+        Raises:
+            ValueError: If the format is unknown
+
+        """
+        if fmt not in DRIFT_FORMATS:
+            raise ValueError(f"Unknown drift report format: {fmt}")
+        self.stream = stream
+        self.fmt = fmt
+        self.counts: Counter[str] = Counter()
+        self._csv: Optional[Any] = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(stream, fieldnames=FIELDS, lineterminator="\n")
+            self._csv.writeheader()
+
+    def write(self, record: DriftRecord) -> None:
+        """Write one record."""
+        self.counts[record["kind"]] += 1
+        if self._csv is None:
+            self.stream.write(json.dumps(record) + "\n")
+            return
+        self._csv.writerow(
+            {
+                key: (
+                    "|".join(map(str, value))
+                    if isinstance(value, list)
+                    else "" if value is None else value
+                )
+                for key, value in record.items()
+            }
+        )
+
+    def summary(self) -> str:
+        """Counts per kind of drift."""
+        if not self.counts:
+            return "Drift: none"
+        return "Drift: " + ", ".join(
+            f"{kind}={count}" for kind, count in sorted(self.counts.items())
+        )
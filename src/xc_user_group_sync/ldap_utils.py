@@ -7,6 +7,7 @@ components from LDAP DNs with F5 XC group name constraints.
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 from typing import Optional
 
 from ldap3.utils.dn import parse_dn
@@ -23,6 +24,10 @@ GROUP_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
 # - max 63 characters (DNS subdomain limit)
 DNS_1035_RE = re.compile(r"^[a-z]([a-z0-9-]*[a-z0-9])?$")
 
+# HR exports repeat the same few thousand group DNs on every row, so parsed
+# names are memoized per process. Failures are not cached (they raise).
+DN_CACHE_SIZE = 65536
+
 
 class LdapParseError(ValueError):
     """Exception raised when LDAP DN parsing fails or validation errors occur."""
@@ -30,6 +35,7 @@ class LdapParseError(ValueError):
     pass
 
 
+@lru_cache(maxsize=DN_CACHE_SIZE)
 def normalize_group_name_dns1035(name: str) -> str:
     """Normalize a group name to DNS-1035 compliance for F5 XC API.
 
@@ -87,6 +93,7 @@ def normalize_group_name_dns1035(name: str) -> str:
     return normalized
 
 
+@lru_cache(maxsize=DN_CACHE_SIZE)
 def extract_cn(dn: str) -> str:
     """Extract CN from an LDAP DN using ldap3's parser.
 
@@ -0,0 +1,120 @@
+"""Logging setup for the CLI, and cheap per-entity debug records.
+
+``configure_logging`` installs a ``QueueHandler`` on the root logger: a
+record is formatted (as text or as one JSON object per line) in the thread
+that logs it, and written to stderr by a ``QueueListener`` thread, so slow
+terminals and log collectors do not stall the threads running a sync.
+
+Per-entity debug records go through ``debug_entity``. It costs a level
+check unless debug logging is on, except for entities named with
+``trace_entities``: their records are logged at INFO, so one user or group
+can be followed through a run without turning on debug logging for all of
+them. ``tracing`` guards records whose arguments are expensive to build.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import IO, Any, Dict, Iterable, Optional
+
+from .output import DETAIL
+
+LOG_FORMATS = ("text", "json")
+TEXT_FORMAT = "%(levelname)s %(message)s"
+# Record attributes copied into JSON records when present
+JSON_EXTRAS = ("entity", "trace", "detail")
+
+_traced: frozenset[str] = frozenset()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in JSON_EXTRAS:
+            if hasattr(record, name):
+                entry[name] = getattr(record, name)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(
+    level: int, log_format: str = "text", stream: Optional[IO[str]] = None
+) -> Optional[QueueListener]:
+    """Log to ``stream`` through a queue, like ``logging.basicConfig``.
+
+    Nothing is changed if the root logger already has handlers.
+
+    Args:
+        level: Root logger level
+        log_format: One of ``LOG_FORMATS``
+        stream: Stream receiving the records (defaults to stderr)
+
+    Returns:
+        The started listener writing the records (stop it to flush them),
+        or None if logging was already configured
+
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+    handler = QueueHandler(queue.SimpleQueue())
+    handler.setFormatter(
+        JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    )
+    # Records arrive formatted; the listener only writes them
+    writer = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    listener = QueueListener(handler.queue, writer)
+    listener.start()
+    root.addHandler(handler)
+    root.setLevel(level)
+    return listener
+
+
+def stop_logging(listener: QueueListener) -> None:
+    """Write the queued records and detach the handler of ``listener``."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler) and handler.queue is listener.queue:
+            root.removeHandler(handler)
+    listener.stop()
+
+
+def trace_entities(keys: Iterable[str]) -> None:
+    """Log the debug records of these emails and group names at INFO."""
+    global _traced
+    _traced = frozenset(key.strip().lower() for key in keys)
+
+
+def tracing(logger: logging.Logger, key: str) -> bool:
+    """Whether ``debug_entity`` would log a record about ``key``."""
+    return logger.isEnabledFor(logging.DEBUG) or (
+        bool(_traced) and key.lower() in _traced
+    )
+
+
+def debug_entity(logger: logging.Logger, key: str, msg: str, *args: Any) -> None:
+    """Log a debug record about one user or group.
+
+    Args:
+        logger: Logger to log to
+        key: Email or group name the record is about
+        msg: %-style message
+        *args: Message arguments, formatted only if the record is logged
+
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args, extra={"entity": key, **DETAIL})
+    elif _traced and key.lower() in _traced:
+        logger.info(msg, *args, extra={"entity": key, "trace": True})
@@ -6,11 +6,14 @@ with proper type constraints and validation rules.
 
 from __future__ import annotations
 
+from functools import cached_property
 from typing import List, Optional
 
 from pydantic import BaseModel, EmailStr, Field, StringConstraints
 from typing_extensions import Annotated
 
+from .user_utils import email_key
+
 GroupName = Annotated[
     str, StringConstraints(pattern=r"^[A-Za-z0-9_-]+$", min_length=1, max_length=128)
 ]
@@ -43,6 +46,15 @@ class User(BaseModel):
         if not self.username:
             self.username = str(self.email)
 
+    @cached_property
+    def email_key(self) -> str:
+        """Canonical email this user is looked up by (see ``email_key``).
+
+        Computed on first use; copies made afterwards with ``model_copy``
+        share it.
+        """
+        return email_key(str(self.email))
+
 
 class Group(BaseModel):
     """Represents an F5 XC user group with members and roles.
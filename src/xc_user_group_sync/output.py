@@ -0,0 +1,236 @@
+"""Bounded console output for large syncs.
+
+A sync of a large tenant would print one line per planned group and log one
+line per user or group it creates, updates or deletes. At tens of thousands
+of entities that output costs real time on a terminal or CI log and buries
+the summaries that matter. This module keeps the console short:
+
+- ``planned_group_lines`` lists the largest groups of a plan and summarizes
+  the rest.
+- ``DetailLimit`` is a logging filter for console handlers that lets the
+  first per-entity records through and counts the ones it drops. Per-entity
+  records are logged with ``extra=DETAIL``.
+- ``ProgressBar`` redraws one status line with throughput and ETA while the
+  services apply a plan (only on a terminal, by default).
+- ``DetailsFile`` writes every log record, and any extra detail lines, to a
+  file from a background thread, so the full record costs the sync loop a
+  queue put instead of a write.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import IO, Callable, Iterator, List, Optional, Sequence, TypeVar
+
+from .models import Group
+
+T = TypeVar("T")
+
+# Per-entity lines shown on the console before the rest are summarized
+DEFAULT_MAX_LINES = 20
+# ``extra`` marking a log record as a per-entity detail line
+DETAIL = {"detail": True}
+
+DETAILS_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+
+
+def planned_group_lines(groups: Sequence[Group], limit: int) -> List[str]:
+    """Lines listing a group plan, the largest groups first when abbreviated.
+
+    Args:
+        groups: Planned groups
+        limit: Groups listed before the rest are summarized (0 lists all)
+
+    Returns:
+        One line per listed group, plus a summary of the others
+
+    """
+    if not limit or len(groups) <= limit:
+        return [f" - {grp.name}: {len(grp.users)} users" for grp in groups]
+    largest = heapq.nlargest(limit, groups, key=lambda grp: len(grp.users))
+    rest = len(groups) - limit
+    members = sum(len(grp.users) for grp in groups) - sum(
+        len(grp.users) for grp in largest
+    )
+    lines = [f" - {grp.name}: {len(grp.users)} users" for grp in largest]
+    lines.append(f" ... and {rest} smaller groups ({members} memberships)")
+    return lines
+
+
+class DetailLimit(logging.Filter):
+    """Console filter passing at most ``limit`` per-entity records.
+
+    Records without the ``DETAIL`` marker always pass. The count restarts
+    with ``take_suppressed``.
+    """
+
+    def __init__(self, limit: int) -> None:
+        """Create the filter.
+
+        Args:
+            limit: Per-entity records let through (0 lets all through)
+
+        """
+        super().__init__()
+        self.limit = limit
+        self.shown = 0
+        self.suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.limit or not getattr(record, "detail", False):
+            return True
+        # The filter may sit on several handlers; count each record once
+        shown = getattr(record, "detail_shown", None)
+        if shown is None:
+            with self._lock:
+                shown = self.shown < self.limit
+                if shown:
+                    self.shown += 1
+                else:
+                    self.suppressed += 1
+            record.detail_shown = shown
+        return shown
+
+    def take_suppressed(self) -> int:
+        """Return the number of records dropped so far and start over."""
+        with self._lock:
+            suppressed = self.suppressed
+            self.shown = self.suppressed = 0
+        return suppressed
+
+
+class ProgressBar:
+    """Single-line progress display with throughput and ETA."""
+
+    def __init__(
+        self,
+        stream: Optional[IO[str]] = None,
+        enabled: Optional[bool] = None,
+        interval: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a progress bar.
+
+        Args:
+            stream: Text stream to draw on (defaults to stderr)
+            enabled: Draw at all (None draws only if the stream is a terminal)
+            interval: Least number of seconds between redraws
+            clock: Time source, in seconds
+
+        """
+        self.stream = stream if stream is not None else sys.stderr
+        if enabled is None:
+            isatty = getattr(self.stream, "isatty", None)
+            enabled = bool(isatty and isatty())
+        self.enabled = enabled
+        self.interval = interval
+        self.clock = clock
+
+    def track(self, items: Sequence[T], label: str) -> Iterator[T]:
+        """Yield ``items``, redrawing the bar as they are consumed.
+
+        Args:
+            items: Work items, such as planned operations
+            label: Name shown before the counts
+
+        Yields:
+            The items, in order
+
+        """
+        if not self.enabled or not items:
+            yield from items
+            return
+        total = len(items)
+        start = drawn = self.clock()
+        done = 0
+        try:
+            for done, item in enumerate(items, start=1):
+                yield item
+                now = self.clock()
+                if now - drawn >= self.interval:
+                    self._draw(self.render(label, done, total, now - start))
+                    drawn = now
+        finally:
+            self._draw(self.render(label, done, total, self.clock() - start))
+            self.stream.write("\n")
+            self.stream.flush()
+
+    @staticmethod
+    def render(label: str, done: int, total: int, elapsed: float) -> str:
+        """Format one status line."""
+        width = 30
+        filled = width * done // total if total else width
+        line = (
+            f"{label} [{'#' * filled}{'-' * (width - filled)}] {done}/{total}"
+            f" {100 * done // total if total else 100}%"
+        )
+        if elapsed > 0 and done:
+            rate = done / elapsed
+            line += f" {rate:.1f}/s ETA {_duration((total - done) / rate)}"
+        return line
+
+    def _draw(self, line: str) -> None:
+        self.stream.write(f"\r{line}\x1b[K")
+        self.stream.flush()
+
+
+def _duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class DetailsFile:
+    """Full log of a run, written to a file off the sync's thread.
+
+    While open, every record reaching the root logger is queued and written
+    by a ``QueueListener`` thread, whatever the console filters drop.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open ``path`` for appending and start the writer thread.
+
+        Args:
+            path: File receiving the details
+
+        Raises:
+            OSError: If the file cannot be opened
+
+        """
+        self.path = path
+        self._file_handler = logging.FileHandler(path, encoding="utf-8")
+        self._file_handler.setFormatter(logging.Formatter(DETAILS_FORMAT))
+        self._queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        self._handler = QueueHandler(self._queue)
+        self._listener = QueueListener(self._queue, self._file_handler)
+        self._listener.start()
+        logging.getLogger().addHandler(self._handler)
+
+    def write(self, line: str) -> None:
+        """Queue a line for the file only (not the console)."""
+        self._handler.enqueue(
+            logging.makeLogRecord(
+                {"msg": line, "levelname": "INFO", "levelno": logging.INFO}
+            )
+        )
+
+    def close(self) -> None:
+        """Write everything queued and close the file."""
+        logging.getLogger().removeHandler(self._handler)
+        self._listener.stop()
+        self._file_handler.close()
+
+    def __enter__(self) -> DetailsFile:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
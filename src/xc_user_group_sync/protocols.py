@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Protocol
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Protocol, Sequence
+
+if TYPE_CHECKING:
+    from .sources import SourceRecord
 
 
 class GroupRepository(Protocol):
@@ -27,6 +30,22 @@ class GroupRepository(Protocol):
         """
         ...
 
+    def get_group(self, name: str, namespace: str = "system") -> Dict[str, Any]:
+        """Get a single group by name.
+
+        Args:
+            name: The name of the group
+            namespace: The namespace containing the group (default: "system")
+
+        Returns:
+            Group data dictionary
+
+        Raises:
+            Exception: If the operation fails (including when not found)
+
+        """
+        ...
+
     def create_group(
         self, group: Dict[str, Any], namespace: str = "system"
     ) -> Dict[str, Any]:
@@ -198,3 +217,44 @@ class UserRepository(Protocol):
 
         """
         ...
+
+
+class RecordSource(Protocol):
+    """Protocol for user/group input readers.
+
+    Sources turn an input file (CSV, NDJSON, Parquet, ...) into a stream of
+    normalized records so the sync services don't depend on the file format.
+    """
+
+    @property
+    def fieldnames(self) -> Optional[Sequence[str]]:
+        """Column names available in the source, or None if it is empty."""
+        ...
+
+    def records(self) -> Iterator[SourceRecord]:
+        """Yield normalized records in input order.
+
+        Raises:
+            ValueError: If the input is malformed
+
+        """
+        ...
+
+
+class MissingRoleStore(Protocol):
+    """Protocol for the negative cache of users without a user_roles entry.
+
+    Emails are compared case-insensitively.
+    """
+
+    def __contains__(self, email: object) -> bool:
+        """Whether ``email`` is known to have no user_roles entry."""
+        ...
+
+    def add(self, email: str) -> None:
+        """Remember that ``email`` has no user_roles entry."""
+        ...
+
+    def discard(self, email: str) -> None:
+        """Forget ``email``."""
+        ...
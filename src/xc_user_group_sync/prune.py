@@ -0,0 +1,119 @@
+"""Concurrent, guarded deletion of users and groups missing from the source.
+
+Pruning is the only part of a sync that can destroy access on a large
+scale, and the one that is most often slow: mass offboarding means
+thousands of independent deletes. This module runs them concurrently on a
+shared thread pool and refuses to start when a prune looks like the result
+of a truncated or wrong export.
+
+``check_prune_limit`` raises ``PruneLimitExceeded`` before any delete is
+issued if more than ``max_percent`` of the existing users (or groups) would
+be removed. Small prunes of up to ``PRUNE_GUARD_FLOOR`` entities are always
+allowed, so tiny tenants are not locked out.
+
+Deletions are logged as one summary line per batch instead of one line per
+entity; failures are still logged individually.
+"""
+
+from __future__ import annotations
+
+import logging
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRUNE_WORKERS = 8
+# Abort a prune removing more than this share of the existing entities
+DEFAULT_MAX_PRUNE_PERCENT = 50.0
+# Prunes of at most this many entities are never blocked
+PRUNE_GUARD_FLOOR = 5
+# Names listed in a batch summary before it is abbreviated
+SUMMARY_NAMES = 10
+
+
+class PruneLimitExceeded(Exception):
+    """Raised when a prune would remove more than the allowed share."""
+
+
+def check_prune_limit(
+    kind: str, deleting: int, existing: int, max_percent: Optional[float]
+) -> None:
+    """Refuse prunes that remove too large a share of ``kind``.
+
+    Args:
+        kind: "users" or "groups" (for the message)
+        deleting: Number of entities the prune would delete
+        existing: Number of entities currently in XC
+        max_percent: Largest share to delete, in percent (None disables)
+
+    Raises:
+        PruneLimitExceeded: If the limit would be exceeded
+
+    """
+    if max_percent is None or deleting <= PRUNE_GUARD_FLOOR or not existing:
+        return
+    percent = 100.0 * deleting / existing
+    if percent > max_percent:
+        raise PruneLimitExceeded(
+            f"Refusing to prune {deleting} of {existing} {kind} ({percent:.0f}%, "
+            f"limit {max_percent:g}%); check the source or raise "
+            "--max-prune-percent"
+        )
+
+
+def summarize(names: Sequence[str]) -> str:
+    """Comma-separated names, abbreviated after ``SUMMARY_NAMES``."""
+    shown = ", ".join(names[:SUMMARY_NAMES])
+    if len(names) > SUMMARY_NAMES:
+        shown += f" (+{len(names) - SUMMARY_NAMES} more)"
+    return shown
+
+
+def run_all(
+    keys: Sequence[str],
+    action: Callable[[str], object],
+    executor: Optional[Executor] = None,
+) -> Tuple[List[str], Dict[str, Exception]]:
+    """Call ``action`` for every key, concurrently if an executor is given.
+
+    Args:
+        keys: Emails or group names to act on
+        action: Function handling one entity
+        executor: Shared executor to run calls on (None runs them in order)
+
+    Returns:
+        ``(done, failures)``: keys handled, in input order, and the error
+        raised for every key that failed
+
+    """
+    failures: Dict[str, Exception] = {}
+    if executor is None:
+        for key in keys:
+            try:
+                action(key)
+            except Exception as e:
+                failures[key] = e
+    else:
+        futures = [(key, executor.submit(action, key)) for key in keys]
+        for key, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                failures[key] = e
+    return [key for key in keys if key not in failures], failures
+
+
+def delete_all(
+    keys: Sequence[str],
+    delete: Callable[[str], object],
+    executor: Optional[Executor] = None,
+) -> Tuple[List[str], Dict[str, Exception]]:
+    """Delete every key with ``run_all``.
+
+    Returns:
+        ``(deleted, failures)``: keys deleted, in input order, and the error
+        raised for every key that could not be deleted
+
+    """
+    return run_all(keys, delete, executor)
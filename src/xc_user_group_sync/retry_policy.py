@@ -0,0 +1,381 @@
+"""Retry classification for F5 XC API calls.
+
+Not every failure is worth another attempt. ``RetryPolicy`` decides from the
+HTTP method and the response status:
+
+- Transient statuses (408, 425, 429, 5xx gateway errors) and failures without
+  a response (connection errors, timeouts) are retried with exponential
+  backoff, waiting at least as long as the server's ``Retry-After`` asks.
+- Any other 4xx is deterministic and raised immediately.
+- A retried request can fail only because its earlier attempt succeeded: a
+  ``POST`` create answered with 409, or a ``DELETE`` answered with 404. Such
+  responses are *reconciled* rather than reported as errors; for creates
+  the caller confirms with a cheap GET first.
+
+Across a whole run, ``RetryBudget`` caps retries at a fraction of requests and
+one ``CircuitBreaker`` per endpoint family stops calling an endpoint after
+consecutive failures, so a partial outage fails the run in minutes instead of
+backing off on every one of thousands of operations.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import requests
+from tenacity import (
+    RetryCallState,
+    Retrying,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+from .scheduling import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Statuses that say "try again later" rather than "this request is wrong"
+TRANSIENT_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Status a retried request gets when an earlier attempt already took effect
+RECONCILABLE_STATUSES = {"POST": 409, "DELETE": 404}
+
+DEFAULT_RETRY_BUDGET = 0.1
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+_FAMILY_RE = re.compile(r"/namespaces/[^/]+/([^/?]+)")
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while its circuit is open."""
+
+    def __init__(self, family: str, retry_in: float) -> None:
+        super().__init__(
+            f"Circuit open for {family}: failing fast "
+            f"(next probe in {retry_in:.0f}s)"
+        )
+        self.family = family
+        self.retry_in = retry_in
+
+
+def status_of(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an exception, if it has a response."""
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds requested by the ``Retry-After`` header of an error response.
+
+    Accepts both delta-seconds and HTTP-date values; anything unparseable is
+    ignored.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("Retry-After")
+    except AttributeError:
+        return None
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether another attempt at the same request may succeed.
+
+    Errors without an HTTP status (network failures, timeouts, or non-HTTP
+    errors raised by a repository) are treated as transient. An ``HTTPError``
+    always stems from an error response, so one without a status attached is
+    not: transient statuses are raised with their response.
+    """
+    status = status_of(error)
+    if status is None:
+        return not isinstance(
+            error, (requests.HTTPError, CircuitOpenError, DeadlineExceeded)
+        )
+    return status in TRANSIENT_STATUSES
+
+
+def is_outage(error: BaseException) -> bool:
+    """Whether ``error`` suggests the endpoint is down (counts for breakers).
+
+    Throttling (429) is not an outage: the server is up and says when to
+    come back.
+    """
+    return is_transient(error) and status_of(error) != 429
+
+
+def endpoint_family(path: str) -> str:
+    """Breaker key for an API path, e.g. ``user_roles`` or ``user_groups``."""
+    match = _FAMILY_RE.search(path)
+    return match.group(1) if match else path.split("?", 1)[0]
+
+
+class RetryBudget:
+    """Run-wide cap on retries as a fraction of requests.
+
+    With a ratio of 0.1, a run of 5,000 requests may spend at most 500 (plus
+    ``min_retries``) retries in total; once spent, transient failures are
+    raised on their first attempt. Healthy runs never notice the budget,
+    while a run against a failing API stops multiplying its traffic.
+    """
+
+    def __init__(
+        self, ratio: float = DEFAULT_RETRY_BUDGET, min_retries: int = 10
+    ) -> None:
+        """Initialize the budget.
+
+        Args:
+            ratio: Retries allowed per request sent
+            min_retries: Retries always allowed, so short runs can retry
+
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        """Count a request (not its retries) against the budget."""
+        with self._lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; False when it is exhausted."""
+        with self._lock:
+            if self.retries < self.min_retries + self.ratio * self.requests:
+                self.retries += 1
+                return True
+            if self.denied == 0:
+                logger.warning(
+                    "Retry budget exhausted (%d retries for %d requests); "
+                    "failing transient errors without retrying",
+                    self.retries,
+                    self.requests,
+                )
+            self.denied += 1
+            return False
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one endpoint family.
+
+    ``closed``: requests flow; ``failure_threshold`` consecutive outage
+    errors open the circuit. ``open``: requests fail fast with
+    ``CircuitOpenError`` until ``reset_timeout`` has passed. ``half_open``:
+    a single probe request is let through; success closes the circuit,
+    failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        family: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize a closed breaker.
+
+        Args:
+            family: Endpoint family the breaker guards (for messages)
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to stay open before a half-open probe
+            clock: Time source, in seconds
+
+        """
+        self.family = family
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """Admit a request, or raise while the circuit is open.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a
+                probe already in flight
+
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                waited = self.clock() - self._opened_at
+                if waited < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.family, self.reset_timeout - waited)
+                self.state = self.HALF_OPEN
+                logger.info("Circuit for %s half-open: probing", self.family)
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.family, 0.0)
+                self._probing = True
+
+    def record_success(self) -> None:
+        """The endpoint answered: close the circuit."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit for %s closed", self.family)
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """The endpoint failed: open the circuit at the threshold."""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+                self.opened += 1
+                logger.warning(
+                    "Circuit for %s opened after %d consecutive failures",
+                    self.family,
+                    self.failures,
+                )
+
+
+class RetryPolicy:
+    """Retry and backoff rules shared by the client and the services.
+
+    Example:
+        >>> policy = RetryPolicy(max_attempts=5)
+        >>> for attempt in policy.retrying("POST"):
+        ...     with attempt:
+        ...         repository.create_user(user)
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_multiplier: float = 1.0,
+        backoff_min: float = 1.0,
+        backoff_max: float = 8.0,
+        max_retry_after: float = 60.0,
+        budget: Optional[RetryBudget] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> None:
+        """Initialize the policy.
+
+        Args:
+            max_attempts: Attempts per request, including the first
+            backoff_multiplier: Exponential backoff multiplier
+            backoff_min: Minimum backoff time in seconds
+            backoff_max: Maximum backoff time in seconds
+            max_retry_after: Upper bound on a server-requested wait, in seconds
+            budget: Run-wide retry budget shared with other policies (optional)
+            deadline: Run deadline; waits are clamped to the time left and
+                nothing is retried once it has passed (optional)
+
+        """
+        self.max_attempts = max_attempts
+        self.backoff_multiplier = backoff_multiplier
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+        self.deadline = deadline
+        self._backoff = wait_exponential(
+            multiplier=backoff_multiplier, min=backoff_min, max=backoff_max
+        )
+
+    def should_retry(
+        self, method: str, error: BaseException, attempt_number: int = 1
+    ) -> bool:
+        """Whether ``error`` from a ``method`` request deserves another attempt.
+
+        Non-idempotent requests are retried too: a duplicate create or delete
+        shows up as a reconcilable status on the next attempt. Transient
+        errors are not retried once the budget, if any, is spent or the
+        deadline has passed. Nothing is retried, or charged to the budget,
+        after the last of ``max_attempts``.
+        """
+        if not is_transient(error):
+            logger.debug(
+                "Not retrying %s after non-transient %s", method, status_of(error)
+            )
+            return False
+        if attempt_number >= self.max_attempts:
+            return False
+        if self.deadline is not None and self.deadline.expired:
+            return False
+        return self.budget is None or self.budget.try_spend()
+
+    def reconciles(self, method: str, status: int, attempt_number: int) -> bool:
+        """Whether ``status`` on a retried request means an earlier attempt won.
+
+        Only applies from the second attempt: the same status on a first
+        attempt is a genuine conflict or miss.
+        """
+        return attempt_number > 1 and RECONCILABLE_STATUSES.get(method) == status
+
+    def wait(self, retry_state: RetryCallState) -> float:
+        """Backoff before the next attempt, honouring ``Retry-After``."""
+        delay = self._backoff(retry_state)
+        outcome = retry_state.outcome
+        error = outcome.exception() if outcome is not None else None
+        requested = retry_after(error) if error is not None else None
+        if requested is not None:
+            delay = max(delay, min(requested, self.max_retry_after))
+        if self.deadline is not None:
+            delay = min(delay, self.deadline.remaining())
+        return delay
+
+    def retrying(self, method: str = "GET") -> Retrying:
+        """A tenacity ``Retrying`` loop applying this policy to ``method``."""
+
+        # tenacity asks ``retry`` before ``stop``, so the attempt number is
+        # passed along to keep the final attempt from spending the budget.
+        def retry(retry_state: RetryCallState) -> bool:
+            outcome = retry_state.outcome
+            if outcome is None or not outcome.failed:
+                return False
+            error = outcome.exception()
+            assert error is not None
+            return self.should_retry(method, error, retry_state.attempt_number)
+
+        return Retrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=self.wait,
+            retry=retry,
+            reraise=True,
+        )
+
+
+def transient_error(response: requests.Response) -> requests.HTTPError:
+    """The exception raised for a transient status, keeping the response."""
+    return requests.HTTPError(
+        f"Transient error: {response.status_code}: {response.text}",
+        response=response,
+    )
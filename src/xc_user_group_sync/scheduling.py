@@ -0,0 +1,220 @@
+"""Deadline-aware scheduling of sync operations.
+
+A maintenance window is a budget for the whole run, not per request. With a
+``Deadline`` the client clamps every request timeout and retry wait to the
+time left, and the sync work is run as a list of ``Operation`` objects in
+priority order:
+
+1. ``REVOKE``: deactivations and deletions of users
+2. ``REMOVE_MEMBERS``: group membership removals and group deletions
+3. ``ADD``: creates, additions and other updates
+
+When the deadline passes, the operations not yet run are written to a
+leftover plan (JSON) that a later run can resume with ``--resume`` instead
+of being cut off at random.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REVOKE = 0
+REMOVE_MEMBERS = 1
+ADD = 2
+
+PRIORITY_NAMES = {REVOKE: "revoke", REMOVE_MEMBERS: "remove-members", ADD: "add"}
+
+LEFTOVER_VERSION = 1
+
+
+class DeadlineExceeded(BaseException):
+    """Raised when the run deadline has passed.
+
+    Derives from ``BaseException`` (like ``KeyboardInterrupt``) so the broad
+    ``except Exception`` handlers that record per-operation errors let it
+    through to the scheduler.
+    """
+
+
+class Deadline:
+    """Wall-clock budget for a whole run.
+
+    Example:
+        >>> deadline = Deadline(900)
+        >>> requests.get(url, timeout=deadline.timeout(30))
+    """
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        """Start the clock.
+
+        Args:
+            seconds: Budget from now, in seconds
+            clock: Monotonic time source, in seconds
+
+        """
+        self.seconds = seconds
+        self.clock = clock
+        self._end = clock() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)."""
+        return max(0.0, self._end - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0
+
+    def check(self) -> None:
+        """Raise if the deadline has passed.
+
+        Raises:
+            DeadlineExceeded: If no time is left
+
+        """
+        if self.expired:
+            raise DeadlineExceeded(f"Run deadline of {self.seconds:.0f}s exceeded")
+
+    def timeout(self, timeout: float) -> float:
+        """Clamp a request timeout to the time left.
+
+        Raises:
+            DeadlineExceeded: If no time is left
+
+        """
+        self.check()
+        return min(timeout, self.remaining())
+
+
+@dataclass
+class Operation:
+    """One write against XC, as planned by a sync service.
+
+    Attributes:
+        priority: ``REVOKE``, ``REMOVE_MEMBERS`` or ``ADD``
+        entity: "user" or "group"
+        action: "create", "update", "deactivate", "remove_members" or "delete"
+        key: User email or group name
+        payload: JSON-serializable request data (saved in leftover plans)
+        subject: The planned ``User``/``Group`` object, when still in memory
+    """
+
+    priority: int
+    entity: str
+    action: str
+    key: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    subject: Any = field(default=None, repr=False, compare=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form used in leftover plans.
+
+        The payload of a user operation is only built from its ``subject``
+        here, so planning large runs does not dump every user up front.
+        """
+        payload = self.payload
+        if not payload and hasattr(self.subject, "model_dump"):
+            payload = self.subject.model_dump(mode="json")
+        return {
+            "priority": self.priority,
+            "entity": self.entity,
+            "action": self.action,
+            "key": self.key,
+            "payload": payload,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Operation":
+        """Rebuild an operation read from a leftover plan."""
+        return cls(
+            priority=int(data["priority"]),
+            entity=str(data["entity"]),
+            action=str(data["action"]),
+            key=str(data["key"]),
+            payload=dict(data.get("payload") or {}),
+        )
+
+
+def schedule(operations: Iterable[Operation]) -> List[Operation]:
+    """Order operations by priority, keeping planning order within a level."""
+    return sorted(operations, key=lambda op: op.priority)
+
+
+def run_operations(
+    operations: Iterable[Operation],
+    apply: Callable[[Operation], None],
+    deadline: Optional[Deadline] = None,
+) -> List[Operation]:
+    """Apply operations in priority order until done or out of time.
+
+    Args:
+        operations: Planned operations
+        apply: Callback that performs one operation (and records its stats)
+        deadline: Optional run deadline
+
+    Returns:
+        Operations not run because the deadline passed (empty when done)
+
+    """
+    ordered = schedule(operations)
+    for index, op in enumerate(ordered):
+        try:
+            if deadline is not None:
+                deadline.check()
+            apply(op)
+        except DeadlineExceeded as e:
+            leftover = ordered[index:]
+            logger.warning("%s: %d operations left", e, len(leftover))
+            return leftover
+    return []
+
+
+def count_by_priority(operations: Iterable[Operation]) -> Dict[str, int]:
+    """Number of operations per priority name, for summaries."""
+    counts = {name: 0 for name in PRIORITY_NAMES.values()}
+    for op in operations:
+        counts[PRIORITY_NAMES.get(op.priority, str(op.priority))] += 1
+    return counts
+
+
+def write_leftover(path: str | Path, operations: List[Operation]) -> None:
+    """Save unfinished operations as a resumable plan.
+
+    Args:
+        path: Destination JSON file
+        operations: Operations left when the deadline passed
+
+    """
+    plan = {
+        "version": LEFTOVER_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "operations": [op.to_dict() for op in operations],
+    }
+    Path(path).write_text(json.dumps(plan, indent=2) + "\n")
+
+
+def read_leftover(path: str | Path) -> List[Operation]:
+    """Load a plan written by ``write_leftover``.
+
+    Raises:
+        ValueError: If the file is not a leftover plan of a known version
+
+    """
+    try:
+        plan = json.loads(Path(path).read_text())
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{path} is not a leftover plan: {e}") from e
+    if not isinstance(plan, dict) or plan.get("version") != LEFTOVER_VERSION:
+        raise ValueError(f"{path} is not a version {LEFTOVER_VERSION} leftover plan")
+    try:
+        return [Operation.from_dict(item) for item in plan.get("operations", [])]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid operation in {path}: {e}") from e
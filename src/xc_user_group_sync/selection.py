@@ -0,0 +1,200 @@
+"""Narrow a sync down to a few users and groups.
+
+A full sync plans every user and group in the source. A targeted sync (for
+example one triggered by an HR webhook for a single employee) only needs the
+named users, the named groups, and the groups whose membership of a named
+user changes. ``Selection.apply`` cuts both the planned and the existing
+state down to those entities, so the usual planning code - including
+``prune`` - only ever touches what was asked for.
+
+``SelectedSource`` goes one step further for one-off syncs: it drops rows
+that cannot matter to a selection before they are parsed, using a substring
+check on the raw entitlements instead of DN parsing.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .ldap_utils import extract_cn, normalize_group_name_dns1035
+from .models import Group, User
+from .protocols import RecordSource
+from .sources import SourceRecord
+
+
+def normalize_group(name: str) -> str:
+    """XC name of a group given by XC name, CN or full DN.
+
+    Raises:
+        ValueError: If the name cannot be turned into a valid group name
+
+    """
+    name = name.strip()
+    if "=" in name:
+        name = extract_cn(name)
+    return normalize_group_name_dns1035(name)
+
+
+def groups_of_record(entitlements: Optional[str]) -> Set[str]:
+    """XC names of the groups in a pipe-separated entitlements value.
+
+    DNs that do not yield a valid group name are skipped.
+    """
+    names = set()
+    for dn in (entitlements or "").split("|"):
+        if dn.strip():
+            try:
+                names.add(normalize_group(dn))
+            except ValueError:
+                continue
+    return names
+
+
+def _members(group_data: Dict) -> Set[str]:
+    users = group_data.get("usernames") or group_data.get("users") or []
+    return {u.lower() for u in users}
+
+
+@dataclass
+class Selection:
+    """Users (by email) and groups (by XC name) a sync is limited to."""
+
+    emails: Set[str] = field(default_factory=set)
+    groups: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def of(cls, emails: Iterable[str] = (), groups: Iterable[str] = ()) -> "Selection":
+        """Build a selection from raw emails and group names, CNs or DNs.
+
+        Raises:
+            ValueError: If a group name is invalid
+
+        """
+        return cls(
+            emails={e.strip().lower() for e in emails if e.strip()},
+            groups={normalize_group(g) for g in groups if g.strip()},
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.emails or self.groups)
+
+    def __len__(self) -> int:
+        return len(self.emails) + len(self.groups)
+
+    def apply(
+        self,
+        planned_users: List[User],
+        planned_groups: List[Group],
+        existing_users: Dict[str, Dict],
+        existing_groups: Dict[str, Dict],
+    ) -> Tuple[List[User], List[Group], Dict[str, Dict], Dict[str, Dict]]:
+        """Restrict planned and existing state to the selected entities.
+
+        Selected are the named users, the members of named groups (so they
+        can be created first), the named groups, and every source group that
+        a named user joins or - according to XC - leaves.
+
+        Args:
+            planned_users: Desired users from the source
+            planned_groups: Desired groups from the source
+            existing_users: Current XC users, keyed by lowercase email
+            existing_groups: Current XC groups, keyed by name
+
+        Returns:
+            ``(planned_users, planned_groups, existing_users, existing_groups)``
+            limited to the selection
+
+        """
+        planned_names = {g.name for g in planned_groups}
+        group_names = set(self.groups)
+        emails = set(self.emails)
+        for grp in planned_groups:
+            members = {u.lower() for u in grp.users}
+            if grp.name in self.groups:
+                emails |= members
+            elif members & self.emails:
+                group_names.add(grp.name)
+        for name, data in existing_groups.items():
+            if name in planned_names and _members(data) & self.emails:
+                group_names.add(name)
+
+        return (
+            [u for u in planned_users if u.email.lower() in emails],
+            [g for g in planned_groups if g.name in group_names],
+            {e: d for e, d in existing_users.items() if e.lower() in emails},
+            {n: d for n, d in existing_groups.items() if n in group_names},
+        )
+
+
+class SelectedSource:
+    """Records of another source that can matter to a selection.
+
+    Kept are the rows of selected emails and every row whose entitlements
+    may contain a selected group, or a group a selected email belongs to in
+    the source. Group names are matched as substrings of the lowercased
+    entitlements (a normalized name is a prefix of its CN with ``_`` turned
+    into ``-``), so the filter keeps a superset of the rows that matter and
+    ``Selection.apply`` still has the final word. Rows with escaped DN
+    characters are always kept.
+    """
+
+    def __init__(
+        self,
+        source: RecordSource,
+        selection: Selection,
+        groups: Iterable[str] = (),
+    ) -> None:
+        """Initialize the source.
+
+        Args:
+            source: Source to filter
+            selection: Selection the rows are filtered for
+            groups: Further group names to keep rows for, e.g. the groups
+                selected users belong to in XC
+
+        """
+        self.source = source
+        self.selection = selection
+        self.extra_groups = set(groups)
+        self._groups: Optional[Set[str]] = None
+        self.rows_read = 0
+        self.rows_kept = 0
+
+    @property
+    def fieldnames(self) -> Optional[Sequence[str]]:
+        """Column names of the underlying source."""
+        return self.source.fieldnames
+
+    @property
+    def groups(self) -> Set[str]:
+        """Group names whose rows are kept.
+
+        Finding the source groups of selected emails takes one extra pass
+        over the source; only those rows have their DNs parsed.
+        """
+        if self._groups is None:
+            groups = self.selection.groups | self.extra_groups
+            if self.selection.emails:
+                for record in self.source.records():
+                    if (record.email or "").strip().lower() in self.selection.emails:
+                        groups |= groups_of_record(record.entitlements)
+            self._groups = groups
+        return self._groups
+
+    def records(self) -> Iterator[SourceRecord]:
+        """Yield the rows that can matter to the selection."""
+        emails = self.selection.emails
+        tokens = tuple(self.groups)
+        read = kept = 0
+        for record in self.source.records():
+            read += 1
+            entitlements = (record.entitlements or "").lower().replace("_", "-")
+            if (
+                (record.email or "").strip().lower() in emails
+                or "\\" in entitlements
+                or any(token in entitlements for token in tokens)
+            ):
+                kept += 1
+                yield record
+        self.rows_read, self.rows_kept = read, kept
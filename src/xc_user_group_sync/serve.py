@@ -0,0 +1,509 @@
+"""Local HTTP endpoint that runs targeted syncs on demand.
+
+Instead of waiting for the next batch run, an HR system (or an operator) can
+ask for just a few users or groups to be synced::
+
+    POST /sync  {"emails": ["sam@example.com"], "groups": [], "dry_run": false}
+
+The request is answered with the result of every operation the targeted sync
+ran. Syncs reuse one warm ``XCClient`` and the in-memory XC state cache of
+the serving process. A source file is only re-parsed when it changes; other
+sources (LDAP) are re-read at most every ``source_ttl`` seconds.
+
+Bursts are bounded: at most ``max_concurrent`` syncs run at once and at most
+``max_queue`` more wait for a slot; further requests get ``429 Too Many
+Requests`` with ``Retry-After`` instead of piling up against the tenant.
+``GET /healthz`` reports the queue.
+
+Anything beyond the local host must authenticate: the server refuses to
+listen on a non-loopback address without a bearer token.
+"""
+
+from __future__ import annotations
+
+import hmac
+import ipaddress
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from .models import Group, User
+from .protocols import RecordSource
+from .scheduling import PRIORITY_NAMES, Operation, run_operations
+from .selection import SelectedSource, Selection, groups_of_record
+from .sources import CSVSource
+from .state_cache import GROUPS, USERS, CachingRepository
+from .sync_service import GroupSyncService, SyncStats
+from .user_sync_service import UserSyncService, UserSyncStats
+from .watch import Snapshot, snapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT = 2
+DEFAULT_MAX_QUEUE = 16
+# Largest selection (emails + groups) one request may name
+MAX_SELECTION = 500
+MAX_BODY_BYTES = 1 << 20
+# Seconds a parsed non-file source (LDAP) is reused
+DEFAULT_SOURCE_TTL = 300.0
+
+
+def _is_not_found(error: requests.HTTPError) -> bool:
+    response = error.response
+    return response is not None and response.status_code == 404
+
+
+def _token_matches(authorization: Optional[str], token: str) -> bool:
+    """Check an ``Authorization`` header in constant time."""
+    expected = f"Bearer {token}".encode()
+    return hmac.compare_digest((authorization or "").encode(), expected)
+
+
+def is_loopback(host: str) -> bool:
+    """Whether ``host`` only accepts connections from the local machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class SyncQueueFull(Exception):
+    """Raised when a sync request arrives while the queue is full."""
+
+
+class TargetedSync:
+    """Run syncs limited to a ``Selection`` against warm services."""
+
+    def __init__(
+        self,
+        user_service: UserSyncService,
+        group_service: GroupSyncService,
+        csv_path: Optional[str] = None,
+        source: Optional[RecordSource] = None,
+        cache_repo: Optional[CachingRepository] = None,
+        prune: bool = False,
+        parse_workers: int = 1,
+        scoped: bool = False,
+        source_ttl: float = DEFAULT_SOURCE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize the syncer.
+
+        Args:
+            user_service: Service syncing users
+            group_service: Service syncing groups
+            csv_path: CSV file to read (unless ``source`` is given)
+            source: Record source to read instead of a CSV file
+            cache_repo: State cache behind the services, if any
+            prune: Delete selected users/groups that are not in the source
+            parse_workers: Worker processes for CSV parsing
+            scoped: Parse only the source rows a selection can match and
+                fetch each selected user and group from XC instead of
+                listing the whole tenant (best for one-off syncs without a
+                warm state cache)
+            source_ttl: Seconds a parsed source without a file (LDAP) is
+                reused before it is read again
+            clock: Time source for ``source_ttl``, in seconds
+
+        """
+        if csv_path is None and source is None:
+            raise ValueError("TargetedSync needs a csv_path or a source")
+        self.user_service = user_service
+        self.group_service = group_service
+        self.csv_path = csv_path
+        self.source = source
+        self.cache_repo = cache_repo
+        self.prune = prune
+        self.parse_workers = parse_workers
+        self.scoped = scoped
+        self.source_ttl = source_ttl
+        self.clock = clock
+        # (file snapshot or None, parse time, users, groups)
+        self._parsed: Optional[
+            Tuple[Optional[Snapshot], float, List[User], List[Group]]
+        ] = None
+        self._parse_lock = threading.Lock()
+
+    def _source_path(self) -> Optional[str]:
+        if self.source is None:
+            return self.csv_path
+        return getattr(self.source, "path", None)
+
+    def load(self) -> Tuple[List[User], List[Group]]:
+        """Planned users and groups from the last parse while still current.
+
+        A file is parsed again when it changes; a source without a file is
+        read again once ``source_ttl`` has passed.
+        """
+        with self._parse_lock:
+            now = self.clock()
+            path = self._source_path()
+            current = snapshot(path) if path is not None else None
+            if self._parsed is not None:
+                parsed, parsed_at, users, groups = self._parsed
+                if path is not None and parsed == current:
+                    return users, groups
+                if path is None and now - parsed_at < self.source_ttl:
+                    return users, groups
+            if self.source is None:
+                assert self.csv_path is not None  # checked in __init__
+                users = self.user_service.parse_csv_to_users(
+                    self.csv_path, workers=self.parse_workers
+                ).users
+                groups = self.group_service.parse_csv_to_groups(
+                    self.csv_path, workers=self.parse_workers
+                )
+            else:
+                users = self.user_service.parse_source_to_users(self.source).users
+                groups = self.group_service.parse_source_to_groups(self.source)
+            self._parsed = (current, now, users, groups)
+            return users, groups
+
+    def _get_users(self, emails: Iterable[str]) -> Dict[str, Dict]:
+        """GET each user; users XC does not know are left out."""
+        found = {}
+        for email in emails:
+            try:
+                data = self.user_service.repository.get_user(email)
+            except requests.HTTPError as e:
+                if not _is_not_found(e):
+                    raise
+                continue
+            found[email] = {"email": email, **data}
+        return found
+
+    def _get_groups(self, names: Iterable[str]) -> Dict[str, Dict]:
+        """GET each group; groups XC does not know are left out."""
+        found = {}
+        for name in names:
+            try:
+                found[name] = self.group_service.repository.get_group(name)
+            except requests.HTTPError as e:
+                if not _is_not_found(e):
+                    raise
+        return found
+
+    def _scoped(
+        self, selection: Selection
+    ) -> Tuple[List[User], List[Group], Dict[str, Dict], Dict[str, Dict]]:
+        """Parse and fetch only what the selection touches."""
+        start = time.monotonic()
+        existing_users = self._get_users(sorted(selection.emails))
+        # Groups the selected users are in according to XC, so leaving one
+        # is seen even though the source no longer mentions it
+        left = set()
+        for data in existing_users.values():
+            left |= groups_of_record("|".join(data.get("groups") or []))
+
+        base = self.source
+        if base is None:
+            assert self.csv_path is not None  # checked in __init__
+            base = CSVSource(self.csv_path)
+        source = SelectedSource(base, selection, groups=left)
+        users = self.user_service.parse_source_to_users(source).users
+        groups = self.group_service.parse_source_to_groups(source)
+
+        # Everything Selection.apply can keep: named groups, source groups of
+        # selected users and their members
+        names = selection.groups | left
+        emails = set(existing_users)
+        for grp in groups:
+            members = {u.lower() for u in grp.users}
+            if grp.name in selection.groups:
+                emails |= members
+            elif members & selection.emails:
+                names.add(grp.name)
+        existing_users.update(self._get_users(sorted(emails - set(existing_users))))
+        existing_groups = self._get_groups(sorted(names))
+        logger.info(
+            "Scoped sync: kept %d of %d source rows, fetched %d users and "
+            "%d groups in %.3fs",
+            source.rows_kept,
+            source.rows_read,
+            len(existing_users),
+            len(existing_groups),
+            time.monotonic() - start,
+        )
+        return selection.apply(users, groups, existing_users, existing_groups)
+
+    def _existing(
+        self, selection: Selection, users: List[User], groups: List[Group]
+    ) -> Tuple[List[User], List[Group], Dict[str, Dict], Dict[str, Dict]]:
+        """Apply the selection to the source and the current XC state."""
+        existing_users = self.user_service.fetch_existing_users()
+        existing_groups = self.group_service.fetch_existing_groups()
+        selected = selection.apply(users, groups, existing_users, existing_groups)
+        cache = self.cache_repo
+        if cache is None:
+            return selected
+
+        # Cached listings may be stale: re-fetch what the selection touches
+        refreshed = 0
+        if cache.served_from_cache(USERS):
+            emails = self.user_service.users_to_touch(
+                selected[0], selected[2], self.prune
+            )
+            if emails:
+                refreshed += cache.refresh_users(emails)
+        if cache.served_from_cache(GROUPS):
+            names = self.group_service.groups_to_touch(
+                selected[1], selected[3], self.prune
+            )
+            if names:
+                refreshed += cache.refresh_groups(names)
+        if not refreshed:
+            return selected
+        existing_users = self.user_service.fetch_existing_users()
+        existing_groups = self.group_service.fetch_existing_groups()
+        return selection.apply(users, groups, existing_users, existing_groups)
+
+    def run(self, selection: Selection, dry_run: bool = False) -> Dict[str, Any]:
+        """Sync the selected users and groups.
+
+        Args:
+            selection: Users and groups to sync
+            dry_run: If True, log actions without making API changes
+
+        Returns:
+            JSON-serializable result with one entry per operation
+
+        """
+        if self.scoped:
+            selected = self._scoped(selection)
+        else:
+            users, groups = self.load()
+            selected = self._existing(selection, users, groups)
+        planned_users, planned_groups, existing_users, existing_groups = selected
+
+        user_stats = UserSyncStats()
+        group_stats = SyncStats()
+        operations = self.user_service.plan_operations(
+            planned_users, existing_users, self.prune, user_stats
+        ) + self.group_service.plan_operations(
+            planned_groups, existing_groups, self.prune, group_stats
+        )
+
+        results: List[Dict[str, Any]] = []
+
+        def apply(op: Operation) -> None:
+            # Outcomes are read from the stats the services update
+            error = None
+            status = "dry_run" if dry_run else "ok"
+            if op.entity == "user":
+                errors = len(user_stats.error_details)
+                skipped = user_stats.skipped_known_missing
+                self.user_service.apply_operation(op, dry_run, user_stats)
+                if len(user_stats.error_details) > errors:
+                    error = str(user_stats.error_details[errors]["error"])
+                elif user_stats.skipped_known_missing > skipped:
+                    status = "skipped"
+            else:
+                errors = len(group_stats.error_details)
+                self.group_service.apply_operation(op, dry_run, group_stats)
+                if len(group_stats.error_details) > errors:
+                    error = str(group_stats.error_details[errors]["error"])
+
+            result = {
+                "entity": op.entity,
+                "action": op.action,
+                "key": op.key,
+                "priority": PRIORITY_NAMES[op.priority],
+                "status": "error" if error else status,
+            }
+            if error:
+                result["error"] = error
+            results.append(result)
+
+        run_operations(operations, apply)
+        return {
+            "dry_run": dry_run,
+            "operations": results,
+            "users": user_stats.summary(),
+            "groups": group_stats.summary(),
+        }
+
+
+class SyncServer(ThreadingHTTPServer):
+    """HTTP server running ``TargetedSync`` requests with bounded concurrency."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        sync: TargetedSync,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        token: Optional[str] = None,
+    ) -> None:
+        """Bind the server.
+
+        Args:
+            address: ``(host, port)`` to listen on (port 0 picks a free port)
+            sync: Syncer running the requests
+            max_concurrent: Syncs allowed to run at once
+            max_queue: Syncs allowed to wait for a slot
+            token: If set, requests must send ``Authorization: Bearer <token>``;
+                required unless the host is a loopback address
+
+        Raises:
+            ValueError: If a non-loopback address is given without a token
+
+        """
+        if not token and not is_loopback(address[0]):
+            raise ValueError(
+                f"Refusing to serve on {address[0] or 'all interfaces'} without "
+                "a token; set SYNC_TRIGGER_TOKEN or listen on 127.0.0.1"
+            )
+        super().__init__(address, _Handler)
+        self.sync = sync
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.token = token
+        self.running = 0
+        self.pending = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Wait for a free sync slot.
+
+        Raises:
+            SyncQueueFull: If ``max_queue`` requests are already waiting
+
+        """
+        with self._lock:
+            if self.pending >= self.max_concurrent + self.max_queue:
+                self.rejected += 1
+                raise SyncQueueFull()
+            self.pending += 1
+        try:
+            with self._slots:
+                with self._lock:
+                    self.running += 1
+                try:
+                    yield
+                finally:
+                    with self._lock:
+                        self.running -= 1
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def status(self) -> Dict[str, Any]:
+        """Queue state reported by ``/healthz``."""
+        with self._lock:
+            return {
+                "status": "ok",
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "rejected": self.rejected,
+            }
+
+
+def parse_request(body: Any) -> Tuple[Selection, bool]:
+    """Validate a ``POST /sync`` body.
+
+    Raises:
+        ValueError: If the body is malformed or the selection is empty or
+            too large
+
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Request body must be a JSON object")
+    lists = {}
+    for key in ("emails", "groups"):
+        value = body.get(key, [])
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            raise ValueError(f"'{key}' must be a list of strings")
+        lists[key] = value
+    dry_run = body.get("dry_run", False)
+    if not isinstance(dry_run, bool):
+        raise ValueError("'dry_run' must be true or false")
+
+    selection = Selection.of(lists["emails"], lists["groups"])
+    if not selection:
+        raise ValueError("Name at least one email or group")
+    if len(selection) > MAX_SELECTION:
+        raise ValueError(
+            f"At most {MAX_SELECTION} emails and groups per request; "
+            "run a full sync instead"
+        )
+    return selection, dry_run
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: SyncServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path != "/healthz":
+            self._send(404, {"error": "Not found"})
+            return
+        self._send(200, self.server.status())
+
+    def do_POST(self) -> None:
+        if self.path != "/sync":
+            self._send(404, {"error": "Not found"})
+            return
+        token = self.server.token
+        if token and not _token_matches(self.headers.get("Authorization"), token):
+            self._send(401, {"error": "Missing or invalid bearer token"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            # The body is left unread, so the connection cannot be reused
+            self.close_connection = True
+            if length < 0:
+                self._send(400, {"error": "Invalid Content-Length"})
+            else:
+                self._send(413, {"error": "Request body too large"})
+            return
+        try:
+            selection, dry_run = parse_request(json.loads(self.rfile.read(length)))
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+
+        try:
+            with self.server.slot():
+                result = self.server.sync.run(selection, dry_run)
+        except SyncQueueFull:
+            self._send(
+                429, {"error": "Sync queue is full"}, headers={"Retry-After": "5"}
+            )
+            return
+        except Exception as e:
+            logger.exception("Targeted sync failed")
+            self._send(500, {"error": f"Sync failed: {e}"})
+            return
+        self._send(200, result)
+
+    def _send(
+        self, status: int, body: Dict[str, Any], headers: Optional[Dict] = None
+    ) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.info("%s %s", self.address_string(), format % args)
@@ -0,0 +1,247 @@
+"""Split one sync across several worker processes or nodes.
+
+Every worker reads the whole source and XC state, but only diffs and applies
+the users and groups of its own shard: ``shard_of`` maps each email and
+group name to one of N shards with a stable hash (the same on every node
+and Python version, unlike ``hash()``). Diffing and JSON handling then scale
+with the number of workers instead of being capped by one interpreter.
+
+Workers coordinate through files in a shared directory (local or a shared
+filesystem). Lock files are created with ``O_EXCL``, which is atomic on
+local and network filesystems alike:
+
+- ``shard-<i>.claim`` - held by the worker running shard i, so two workers
+  can never apply the same shard
+- ``users-<i>.done`` - shard i finished its users. Groups reference users,
+  so no shard starts on groups before every shard's users are done
+- ``shard-<i>.json`` - stats of shard i; the first worker to see all of
+  them creates ``summary.json`` with the merged totals
+
+Use a fresh directory for every run.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+import zlib
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+from .sync_service import SyncStats
+from .user_sync_service import UserSyncStats
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker waits for the other shards to finish their users
+DEFAULT_SHARD_TIMEOUT = 3600.0
+POLL_INTERVAL = 1.0
+
+T = TypeVar("T")
+
+
+class ShardError(Exception):
+    """Raised when shards cannot be coordinated."""
+
+
+def shard_of(key: str, count: int) -> int:
+    """Stable shard number in ``range(count)`` for an email or group name."""
+    return zlib.crc32(key.lower().encode("utf-8")) % count
+
+
+@dataclass(frozen=True)
+class Shard:
+    """One of ``count`` shards, numbered from 0."""
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Shard":
+        """Parse ``I/N`` (1 <= I <= N) as given on the command line.
+
+        Raises:
+            ValueError: If the value is malformed or out of range
+
+        """
+        number, sep, count = value.partition("/")
+        try:
+            shard = cls(int(number) - 1, int(count))
+        except ValueError:
+            raise ValueError(f"expected I/N, got {value!r}") from None
+        if not sep or shard.count < 1 or not 0 <= shard.index < shard.count:
+            raise ValueError(f"expected I/N with 1 <= I <= N, got {value!r}")
+        return shard
+
+    def __str__(self) -> str:
+        return f"{self.index + 1}/{self.count}"
+
+    def owns(self, key: str) -> bool:
+        """Whether the email or group name belongs to this shard."""
+        return shard_of(key, self.count) == self.index
+
+    def select(self, items: Iterable[T], key: Callable[[T], str]) -> List[T]:
+        """Items whose key belongs to this shard."""
+        return [item for item in items if self.owns(key(item))]
+
+    def select_keys(self, mapping: Dict[str, T]) -> Dict[str, T]:
+        """Entries of a name- or email-keyed mapping owned by this shard."""
+        return {k: v for k, v in mapping.items() if self.owns(k)}
+
+
+def _create_exclusive(path: Path, data: Dict[str, Any]) -> bool:
+    """Create ``path`` with ``data`` unless it exists; False if it did."""
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str)
+    return True
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        # Still being written by another worker
+        return None
+
+
+def merge_stats(results: Iterable[Dict[str, Any]]) -> Tuple[UserSyncStats, SyncStats]:
+    """Sum the user and group stats written by each shard."""
+    user_stats = UserSyncStats()
+    group_stats = SyncStats()
+    for result in results:
+        for stats, data in (
+            (user_stats, result["users"]),
+            (group_stats, result["groups"]),
+        ):
+            for f in fields(stats):
+                value = data.get(f.name)
+                if value is not None:
+                    setattr(stats, f.name, getattr(stats, f.name) + value)
+    return user_stats, group_stats
+
+
+class ShardCoordinator:
+    """File-based coordination of the workers of one sharded run."""
+
+    def __init__(
+        self,
+        directory: str,
+        shard: Shard,
+        timeout: float = DEFAULT_SHARD_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Initialize the coordinator.
+
+        Args:
+            directory: Directory shared by all workers of the run
+            shard: Shard this worker runs
+            timeout: Seconds to wait for the other shards at the barrier
+            clock: Time source (for tests)
+            sleep: Sleep function (for tests)
+
+        """
+        self.directory = Path(directory)
+        self.shard = shard
+        self.timeout = timeout
+        self.clock = clock
+        self.sleep = sleep
+        self.finished: Set[str] = set()
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name
+
+    def claim(self) -> None:
+        """Take this worker's shard.
+
+        Raises:
+            ShardError: If another worker has already claimed the shard
+
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        claim = self._path(f"shard-{self.shard.index}.claim")
+        if not _create_exclusive(
+            claim, {"count": self.shard.count, "pid": os.getpid()}
+        ):
+            raise ShardError(
+                f"Shard {self.shard} was already claimed in {self.directory}; "
+                "use a fresh --shard-dir for every run"
+            )
+
+    def finish(self, phase: str, ok: bool) -> None:
+        """Record that this shard finished ``phase`` (successfully or not)."""
+        path = self._path(f"{phase}-{self.shard.index}.done")
+        if not _create_exclusive(path, {"ok": ok}):
+            raise ShardError(f"Shard {self.shard} already finished {phase}")
+        self.finished.add(phase)
+
+    def abort(self, phase: str) -> None:
+        """Mark ``phase`` failed unless finished, so other shards stop waiting."""
+        if phase not in self.finished:
+            self.finish(phase, ok=False)
+
+    def wait(self, phase: str) -> None:
+        """Block until every shard has finished ``phase``.
+
+        Raises:
+            ShardError: If a shard failed the phase or the wait timed out
+
+        """
+        started = self.clock()
+        pending = set(range(self.shard.count))
+        while True:
+            for index in sorted(pending):
+                marker = _read_json(self._path(f"{phase}-{index}.done"))
+                if marker is None:
+                    continue
+                if not marker.get("ok"):
+                    raise ShardError(
+                        f"Shard {index + 1}/{self.shard.count} failed {phase}"
+                    )
+                pending.discard(index)
+            if not pending:
+                return
+            if self.clock() - started >= self.timeout:
+                waiting = ", ".join(
+                    f"{i + 1}/{self.shard.count}" for i in sorted(pending)
+                )
+                raise ShardError(f"Timed out waiting for shards {waiting} ({phase})")
+            self.sleep(POLL_INTERVAL)
+
+    def report(
+        self, user_stats: UserSyncStats, group_stats: SyncStats
+    ) -> Optional[Tuple[UserSyncStats, SyncStats]]:
+        """Save this shard's stats and merge them once every shard reported.
+
+        Returns:
+            Merged stats of all shards if this worker wrote the run summary,
+            otherwise None
+
+        """
+        result = {"users": asdict(user_stats), "groups": asdict(group_stats)}
+        tmp = self._path(f".shard-{self.shard.index}.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(result, f, default=str)
+        os.replace(tmp, self._path(f"shard-{self.shard.index}.json"))
+
+        results = [
+            _read_json(self._path(f"shard-{i}.json")) for i in range(self.shard.count)
+        ]
+        if any(r is None for r in results):
+            return None
+        merged = merge_stats(results)  # type: ignore[arg-type]
+        summary = {"users": asdict(merged[0]), "groups": asdict(merged[1])}
+        if not _create_exclusive(self._path("summary.json"), summary):
+            return None
+        logger.info("All %d shards done; wrote %s", self.shard.count, "summary.json")
+        return merged
@@ -0,0 +1,354 @@
+"""Compact binary snapshots of F5 XC group and user state.
+
+A JSON dump of a large tenant repeats every email once per user and once
+per group it belongs to. A snapshot stores each distinct string once, in an
+interned string table, and refers to it by index everywhere else. Entities
+are stored column by column, so group member lists and user group lists
+become plain arrays of 32-bit string indexes.
+
+Layout (all integers little-endian, sections 4-byte aligned)::
+
+    magic "XCSNAP\\r\\n" | u16 version | u16 compression | u32 header length
+    header (UTF-8 JSON, padded)
+    body, compressed as a whole unless compression is "none":
+        u32 string count | u32 blob length | u32 offsets[count + 1] | blob
+        u32 section count, then per section (one per kind):
+            u32 kind | u32 entities | u32 fields, then per field:
+                u32 name | u32 type | column
+
+Columns hold one u32 string index per entity (``MISSING`` when the entity
+lacks the field). String values are stored as is, lists of strings as
+``offsets[entities + 1]`` into a flat index array plus a presence byte per
+entity, and any other value as the index of its JSON text.
+
+Uncompressed snapshots are memory-mapped and their columns read in place,
+so loading one costs little more than building the resulting dicts. The
+``lzma`` and ``zstd`` codecs trade that for smaller files; ``zstd`` needs
+the optional ``zstandard`` package.
+"""
+
+from __future__ import annotations
+
+import json
+import lzma
+import mmap
+import struct
+import sys
+from array import array
+from typing import IO, Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+MAGIC = b"XCSNAP\r\n"
+SNAPSHOT_VERSION = 1
+COMPRESSIONS = ("none", "lzma", "zstd")
+# File suffixes selecting the snapshot format, and their compression
+SUFFIXES = {".xcsnap": "none", ".xcsnap.xz": "lzma", ".xcsnap.zst": "zstd"}
+
+MISSING = 0xFFFFFFFF
+
+_STR, _LIST, _JSON = 1, 2, 3
+_PREFIX = struct.Struct("<8sHHI")
+_U32 = struct.Struct("<I")
+_LITTLE = sys.byteorder == "little"
+
+State = Dict[str, Dict[str, Dict[str, Any]]]
+Sections = List[Tuple[str, List[Dict[str, Any]]]]
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot cannot be read."""
+
+
+def compression_for(path: str) -> str | None:
+    """Compression of the snapshot format selected by ``path``'s suffix.
+
+    Returns:
+        A value of ``COMPRESSIONS``, or None if the path is not a snapshot
+
+    """
+    lowered = path.lower()
+    for suffix, compression in SUFFIXES.items():
+        if lowered.endswith(suffix):
+            return compression
+    return None
+
+
+def _require_zstandard():
+    try:
+        import zstandard  # type: ignore[import-not-found]
+    except ImportError as e:
+        raise ImportError(
+            "zstd snapshots require zstandard; install it with "
+            "pip install 'f5-xc-user-group-sync[zstd]'"
+        ) from e
+    return zstandard
+
+
+def _pad(data: bytearray, fill: bytes = b"\0") -> None:
+    data.extend(fill * (-len(data) % 4))
+
+
+def _u32_array(values: Iterable[int]) -> bytes:
+    packed = array("I", values)
+    if not _LITTLE:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+class _Writer:
+    """Interns strings and encodes columns."""
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        index = self.ids.get(value)
+        if index is None:
+            index = self.ids[value] = len(self.ids)
+        return index
+
+    def column(self, values: Sequence[Any], present: Sequence[bool]) -> bytes:
+        if all(isinstance(v, str) for v, p in zip(values, present) if p):
+            kind = _STR
+        elif all(
+            isinstance(v, list) and all(isinstance(s, str) for s in v)
+            for v, p in zip(values, present)
+            if p
+        ):
+            kind = _LIST
+        else:
+            kind = _JSON
+
+        data = bytearray(_U32.pack(kind))
+        if kind == _LIST:
+            offsets = [0]
+            flat: List[int] = []
+            for value, p in zip(values, present):
+                if p:
+                    flat.extend(self.intern(s) for s in value)
+                offsets.append(len(flat))
+            data += _u32_array(offsets)
+            data += _U32.pack(len(flat)) + _u32_array(flat)
+            data += bytes(present)
+            _pad(data)
+            return bytes(data)
+
+        encode: Callable[[Any], str] = (
+            (lambda v: v) if kind == _STR else (lambda v: json.dumps(v))
+        )
+        data += _u32_array(
+            self.intern(encode(v)) if p else MISSING for v, p in zip(values, present)
+        )
+        return bytes(data)
+
+
+def _encode_body(state: State) -> bytes:
+    writer = _Writer()
+    sections = bytearray(_U32.pack(len(state)))
+    for kind, entities in state.items():
+        items = list(entities.values())
+        names: Dict[str, None] = {}
+        for item in items:
+            names.update(dict.fromkeys(item))
+        sections += struct.pack("<III", writer.intern(kind), len(items), len(names))
+        for name in names:
+            present = [name in item for item in items]
+            values = [item.get(name) for item in items]
+            sections += _U32.pack(writer.intern(name))
+            sections += writer.column(values, present)
+
+    blob = bytearray()
+    offsets = [0]
+    for value in writer.ids:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    body = bytearray(struct.pack("<II", len(writer.ids), len(blob)))
+    body += _u32_array(offsets)
+    body += blob
+    _pad(body)
+    return bytes(body + sections)
+
+
+def write_snapshot(
+    stream: IO[bytes],
+    header: Dict[str, Any],
+    state: State,
+    compression: str = "none",
+) -> None:
+    """Write a snapshot.
+
+    Args:
+        stream: Binary stream to write to
+        header: JSON-serializable metadata (tenant, creation time, ...)
+        state: Entities per kind, keyed as ``StateCache`` keys them
+        compression: One of ``COMPRESSIONS``
+
+    Raises:
+        ValueError: If the compression is unknown
+        ImportError: If zstd is requested without zstandard installed
+
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown snapshot compression: {compression}")
+    body = _encode_body(state)
+    if compression == "lzma":
+        body = lzma.compress(body)
+    elif compression == "zstd":
+        body = _require_zstandard().ZstdCompressor().compress(body)
+
+    meta = bytearray(json.dumps(header).encode("utf-8"))
+    _pad(meta, b" ")
+    stream.write(
+        _PREFIX.pack(
+            MAGIC, SNAPSHOT_VERSION, COMPRESSIONS.index(compression), len(meta)
+        )
+    )
+    stream.write(bytes(meta))
+    stream.write(body)
+
+
+class _Reader:
+    """Cursor over a snapshot body."""
+
+    def __init__(self, view: memoryview) -> None:
+        self.view = view
+        self.offset = 0
+
+    def u32(self) -> int:
+        (value,) = _U32.unpack_from(self.view, self.offset)
+        self.offset += 4
+        return value
+
+    def u32s(self, count: int) -> Sequence[int]:
+        end = self.offset + 4 * count
+        if end > len(self.view):
+            raise SnapshotError("Truncated snapshot")
+        chunk = self.view[self.offset : end]
+        self.offset = end
+        if _LITTLE:
+            return chunk.cast("I")  # read in place
+        swapped = array("I", chunk.tobytes())
+        swapped.byteswap()
+        return swapped
+
+    def raw(self, length: int) -> memoryview:
+        chunk = self.view[self.offset : self.offset + length]
+        self.offset += length + (-length % 4)
+        return chunk
+
+
+def _decode_body(view: memoryview) -> Sections:
+    reader = _Reader(view)
+    count, blob_length = reader.u32(), reader.u32()
+    offsets = reader.u32s(count + 1)
+    blob = reader.raw(blob_length)
+    text = str(blob, "utf-8")
+    if len(text) == blob_length:
+        # ASCII only: byte offsets are character offsets
+        strings = [text[a:b] for a, b in zip(offsets, offsets[1:])]
+    else:
+        strings = [str(blob[a:b], "utf-8") for a, b in zip(offsets, offsets[1:])]
+
+    sections: Sections = []
+    for _ in range(reader.u32()):
+        kind, size, field_count = reader.u32(), reader.u32(), reader.u32()
+        items: List[Dict[str, Any]] = [{} for _ in range(size)]
+        for _ in range(field_count):
+            name, column_type = strings[reader.u32()], reader.u32()
+            if column_type == _LIST:
+                bounds = reader.u32s(size + 1)
+                flat = [strings[k] for k in reader.u32s(reader.u32())]
+                present = reader.raw(size)
+                for i, item in enumerate(items):
+                    if present[i]:
+                        item[name] = flat[bounds[i] : bounds[i + 1]]
+            elif column_type == _STR:
+                for item, index in zip(items, reader.u32s(size)):
+                    if index != MISSING:
+                        item[name] = strings[index]
+            elif column_type == _JSON:
+                # Scalars are decoded once per distinct value; containers are
+                # decoded per entity so entities never share them
+                scalars: Dict[int, Any] = {}
+                for item, index in zip(items, reader.u32s(size)):
+                    if index == MISSING:
+                        continue
+                    if index in scalars:
+                        item[name] = scalars[index]
+                        continue
+                    value = item[name] = json.loads(strings[index])
+                    if not isinstance(value, (list, dict)):
+                        scalars[index] = value
+            else:
+                raise SnapshotError(f"Unknown column type {column_type}")
+        sections.append((strings[kind], items))
+    return sections
+
+
+def is_snapshot(prefix: bytes) -> bool:
+    """Whether a file starting with ``prefix`` is a snapshot."""
+    return prefix.startswith(MAGIC)
+
+
+def read_snapshot(stream: IO[bytes]) -> Tuple[Dict[str, Any], Sections]:
+    """Read a snapshot.
+
+    Uncompressed snapshots backed by a real file are memory-mapped.
+
+    Args:
+        stream: Binary stream positioned at the start of the snapshot
+
+    Returns:
+        ``(header, sections)``: the header and ``(kind, entities)`` pairs,
+        entities in stored order
+
+    Raises:
+        SnapshotError: If the stream is not a supported snapshot
+        ImportError: If it is zstd-compressed and zstandard is missing
+
+    """
+    start = stream.tell()
+    try:
+        mapped: mmap.mmap | None = mmap.mmap(
+            stream.fileno(), 0, access=mmap.ACCESS_READ
+        )
+    except (OSError, ValueError, AttributeError, NotImplementedError):
+        mapped = None
+    data: Any = mapped if mapped is not None else stream.read()
+    try:
+        with memoryview(data) as view:
+            return _read(view[start if mapped is not None else 0 :])
+    finally:
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # A raised error's traceback still holds views of the map;
+                # it is unmapped once they are collected
+                pass
+
+
+def _read(view: memoryview) -> Tuple[Dict[str, Any], Sections]:
+    if len(view) < _PREFIX.size:
+        raise SnapshotError("Not an XC snapshot")
+    magic, version, compression, meta_length = _PREFIX.unpack_from(view)
+    if magic != MAGIC:
+        raise SnapshotError("Not an XC snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version: {version}")
+    if compression >= len(COMPRESSIONS):
+        raise SnapshotError(f"Unknown snapshot compression: {compression}")
+    body_start = _PREFIX.size + meta_length
+    try:
+        header = json.loads(str(view[_PREFIX.size : body_start], "utf-8"))
+    except ValueError as e:
+        raise SnapshotError(f"Invalid snapshot header: {e}")
+
+    body = view[body_start:]
+    try:
+        if COMPRESSIONS[compression] == "lzma":
+            body = memoryview(lzma.decompress(body))
+        elif COMPRESSIONS[compression] == "zstd":
+            body = memoryview(_require_zstandard().ZstdDecompressor().decompress(body))
+        return header, _decode_body(body)
+    except (lzma.LZMAError, struct.error, IndexError, UnicodeDecodeError) as e:
+        raise SnapshotError(f"Truncated or corrupt snapshot: {e}")
@@ -0,0 +1,340 @@
+"""Record sources for user and group input.
+
+The sync only needs four fields per row: email, display name, employee status
+and the pipe-separated entitlement DNs. Every input format is read into the
+same normalized ``SourceRecord`` stream, which ``UserSyncService`` and
+``GroupSyncService`` consume regardless of where the data came from.
+
+Supported formats:
+
+- ``csv``: HR export, read through ``ProjectedCSVReader``
+- ``ndjson``: one JSON object per line, keyed by the CSV column names
+- ``parquet`` / ``arrow``: columnar exports, read in record batches with only
+  the needed columns decoded (requires the optional ``pyarrow`` dependency,
+  ``pip install 'f5-xc-user-group-sync[parquet]'``)
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .csv_reader import ProjectedCSVReader
+from .protocols import RecordSource
+
+# Source column for each SourceRecord field, in field order
+SOURCE_COLUMNS: Tuple[str, ...] = (
+    "Email",
+    "User Display Name",
+    "Employee Status",
+    "Entitlement Display Name",
+)
+
+# Rows per record batch for columnar formats
+DEFAULT_BATCH_SIZE = 65536
+
+
+class SourceRecord(NamedTuple):
+    """One normalized input row.
+
+    Fields are None when the source has no value for the column.
+    """
+
+    row_num: int
+    email: Optional[str]
+    display_name: Optional[str]
+    employee_status: Optional[str]
+    entitlements: Optional[str]
+
+
+def _str_or_none(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+class CSVSource:
+    """Records from a CSV export.
+
+    Row numbers match spreadsheet rows: the header is row 1, so the first
+    record is row 2 unless ``first_row`` says otherwise.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        byte_range: Optional[Tuple[int, int]] = None,
+        fieldnames: Optional[Sequence[str]] = None,
+        first_row: int = 2,
+    ):
+        """Initialize the source.
+
+        Args:
+            path: Path to the CSV file
+            byte_range: Optional (start, end) range of whole records to read
+            fieldnames: Header to use when ``byte_range`` skips the header row
+            first_row: Row number of the first record
+
+        """
+        self.path = path
+        self.byte_range = byte_range
+        self.first_row = first_row
+        # Only a caller-supplied header replaces the file's header row
+        self._header = list(fieldnames) if fieldnames is not None else None
+        self._fieldnames = self._header
+
+    @property
+    def fieldnames(self) -> Optional[List[str]]:
+        """Column names from the header row."""
+        if self._fieldnames is None:
+            with ProjectedCSVReader(self.path) as reader:
+                self._fieldnames = reader.fieldnames
+        return self._fieldnames
+
+    def records(self) -> Iterator[SourceRecord]:
+        """Yield one record per non-blank CSV row."""
+        with ProjectedCSVReader(
+            self.path, byte_range=self.byte_range, fieldnames=self._header
+        ) as reader:
+            header = set(reader.fieldnames or [])
+            present = [c for c in SOURCE_COLUMNS if c in header]
+            row_num = self.first_row
+            if len(present) == len(SOURCE_COLUMNS):
+                for row in reader.project(SOURCE_COLUMNS):
+                    yield SourceRecord(row_num, *row)
+                    row_num += 1
+                return
+
+            for row in reader.project(present):
+                values = dict(zip(present, row))
+                yield SourceRecord(row_num, *(values.get(c) for c in SOURCE_COLUMNS))
+                row_num += 1
+
+
+class NDJSONSource:
+    """Records from newline-delimited JSON.
+
+    Each line is an object keyed by the CSV column names. The first object's
+    keys act as the header; row numbers are line numbers.
+    """
+
+    def __init__(self, path: str):
+        """Initialize the source.
+
+        Args:
+            path: Path to the NDJSON file
+
+        """
+        self.path = path
+        self._fieldnames: Optional[List[str]] = None
+
+    @property
+    def fieldnames(self) -> Optional[List[str]]:
+        """Keys of the first object in the file."""
+        if self._fieldnames is None:
+            for _, obj in self._objects():
+                self._fieldnames = list(obj)
+                break
+        return self._fieldnames
+
+    def _objects(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        with open(self.path, encoding="utf-8-sig") as f:
+            for line_num, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {line_num}: invalid JSON: {e}") from e
+                if not isinstance(obj, dict):
+                    raise ValueError(f"Line {line_num}: expected a JSON object")
+                yield line_num, obj
+
+    def records(self) -> Iterator[SourceRecord]:
+        """Yield one record per JSON object."""
+        for line_num, obj in self._objects():
+            yield SourceRecord(
+                line_num, *(_str_or_none(obj.get(c)) for c in SOURCE_COLUMNS)
+            )
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # type: ignore[import-untyped]
+    except ImportError as e:
+        raise ImportError(
+            "Parquet and Arrow input require pyarrow; install it with "
+            "pip install 'f5-xc-user-group-sync[parquet]'"
+        ) from e
+    return pyarrow
+
+
+def _batch_records(batches) -> Iterator[SourceRecord]:
+    """Turn Arrow record batches into records, one column at a time."""
+    pa = _require_pyarrow()
+    row_num = 1
+    for batch in batches:
+        names = batch.schema.names
+        columns = []
+        for name in SOURCE_COLUMNS:
+            if name not in names:
+                columns.append([None] * batch.num_rows)
+                continue
+            column = batch.column(names.index(name))
+            if not pa.types.is_string(column.type):
+                column = column.cast(pa.string())
+            columns.append(column.to_pylist())
+        for values in zip(*columns):
+            yield SourceRecord(row_num, *values)
+            row_num += 1
+
+
+class ParquetSource:
+    """Records from a Parquet file.
+
+    Only the needed columns are read, in record batches of ``batch_size``
+    rows. Row numbers count records from 1.
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        """Initialize the source.
+
+        Args:
+            path: Path to the Parquet file
+            batch_size: Rows decoded per batch
+
+        """
+        self.path = path
+        self.batch_size = batch_size
+
+    @property
+    def fieldnames(self) -> List[str]:
+        """Column names from the Parquet schema."""
+        _require_pyarrow()
+        import pyarrow.parquet as pq  # type: ignore[import-untyped]
+
+        return list(pq.read_schema(self.path).names)
+
+    def records(self) -> Iterator[SourceRecord]:
+        """Yield one record per Parquet row."""
+        _require_pyarrow()
+        import pyarrow.parquet as pq  # type: ignore[import-untyped]
+
+        parquet_file = pq.ParquetFile(self.path)
+        try:
+            names = parquet_file.schema_arrow.names
+            columns = [c for c in SOURCE_COLUMNS if c in names]
+            yield from _batch_records(
+                parquet_file.iter_batches(batch_size=self.batch_size, columns=columns)
+            )
+        finally:
+            parquet_file.close()
+
+
+class ArrowSource:
+    """Records from an Arrow IPC file or stream (``.arrow`` / ``.feather``).
+
+    The file is memory-mapped and read batch by batch; only the needed
+    columns are converted to Python values. Row numbers count records from 1.
+    """
+
+    def __init__(self, path: str):
+        """Initialize the source.
+
+        Args:
+            path: Path to the Arrow IPC file
+
+        """
+        self.path = path
+
+    def _batches(self, source):
+        pa = _require_pyarrow()
+        try:
+            reader = pa.ipc.open_file(source)
+        except pa.ArrowInvalid:
+            # Not the random-access file format; try the streaming format
+            source.seek(0)
+            yield from pa.ipc.open_stream(source)
+            return
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+    @property
+    def fieldnames(self) -> List[str]:
+        """Column names from the Arrow schema."""
+        pa = _require_pyarrow()
+        with pa.memory_map(self.path) as source:
+            try:
+                schema = pa.ipc.open_file(source).schema
+            except pa.ArrowInvalid:
+                source.seek(0)
+                schema = pa.ipc.open_stream(source).schema
+        return list(schema.names)
+
+    def records(self) -> Iterator[SourceRecord]:
+        """Yield one record per Arrow row."""
+        pa = _require_pyarrow()
+        with pa.memory_map(self.path) as source:
+            yield from _batch_records(self._batches(source))
+
+
+SOURCE_FORMATS = {
+    "csv": CSVSource,
+    "ndjson": NDJSONSource,
+    "parquet": ParquetSource,
+    "arrow": ArrowSource,
+}
+
+_EXTENSION_FORMATS = {
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+
+def detect_format(path: str, input_format: str = "auto") -> str:
+    """Resolve the input format for a path.
+
+    Args:
+        path: Input file path
+        input_format: Explicit format, or "auto" to use the file extension
+            (anything unrecognized is treated as CSV)
+
+    Returns:
+        One of the keys of ``SOURCE_FORMATS``
+
+    Raises:
+        ValueError: If ``input_format`` is not a known format
+
+    """
+    if input_format == "auto":
+        return _EXTENSION_FORMATS.get(Path(path).suffix.lower(), "csv")
+    if input_format not in SOURCE_FORMATS:
+        raise ValueError(f"Unknown input format: {input_format}")
+    return input_format
+
+
+def open_source(path: str, input_format: str = "auto") -> RecordSource:
+    """Create the record source for an input file.
+
+    Args:
+        path: Input file path
+        input_format: Format name or "auto"
+
+    Returns:
+        RecordSource for the file
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If the format is unknown
+
+    """
+    if not Path(path).exists():
+        raise FileNotFoundError(f"Input file not found: {path}")
+    return SOURCE_FORMATS[detect_format(path, input_format)](path)
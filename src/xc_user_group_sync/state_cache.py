@@ -0,0 +1,572 @@
+"""Persistent cache of F5 XC group and user state.
+
+Every run needs the full ``user_groups`` and ``user_roles`` listings to plan
+changes. ``StateCache`` keeps the last fetched listings in a small sqlite
+database, one row per entity, together with the listing's ETag and fetch
+time. ``CachingRepository`` wraps ``XCClient`` and serves listings from the
+cache:
+
+- within the TTL, straight from disk (no request at all);
+- after the TTL, with a conditional GET (``If-None-Match``) so an unchanged
+  collection costs one empty 304 instead of a full listing;
+- otherwise by fetching and storing the full listing.
+
+Listings served from disk without revalidation may be stale, so callers
+refresh just the entities the plan is about to touch (``refresh_groups`` /
+``refresh_users``) before acting on them. Writes made through the repository
+are applied to the cache as well.
+
+The same database holds ``MissingRoles``, an expiring negative cache of users
+whose ``user_roles`` entry returns 404, so their updates are not retried on
+every run.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+import requests
+
+from .client import XCClient
+from .retry_policy import RetryBudget
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600.0
+# How long a user_roles 404 is remembered before the update is tried again
+DEFAULT_MISSING_TTL = 7 * 24 * 3600.0
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+GROUPS = "user_groups"
+USERS = "user_roles"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    etag TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (scope, kind)
+);
+CREATE TABLE IF NOT EXISTS entities (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (scope, kind, key)
+);
+CREATE TABLE IF NOT EXISTS missing_roles (
+    scope TEXT NOT NULL,
+    email TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (scope, email)
+);
+"""
+
+
+def group_key(group: Dict[str, Any]) -> str:
+    """Cache key for a user_groups item."""
+    return str(group.get("name", ""))
+
+
+def user_key(user: Dict[str, Any]) -> str:
+    """Cache key for a user_roles item (lowercase email or username)."""
+    return str(user.get("email") or user.get("username") or "").lower()
+
+
+def _synchronized(method: F) -> F:
+    """Run a ``StateCache`` method under the cache's lock."""
+
+    @functools.wraps(method)
+    def wrapper(self: "StateCache", *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return cast(F, wrapper)
+
+
+_KEYS: Dict[str, Callable[[Dict[str, Any]], str]] = {GROUPS: group_key, USERS: user_key}
+
+
+class StateCache:
+    """sqlite-backed store of listings keyed by (scope, kind).
+
+    ``scope`` identifies the tenant and namespace a listing belongs to, so
+    one cache file can serve several tenants. Methods may be called from
+    several threads.
+    """
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        """Open (or create) the cache database.
+
+        Args:
+            path: sqlite database path (":memory:" for a throwaway cache)
+            clock: Time source, in seconds
+
+        """
+        self.path = path
+        self.clock = clock
+        # Shared by the sync server's worker threads; calls are serialized
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    @_synchronized
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def __enter__(self) -> "StateCache":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @_synchronized
+    def listing_info(
+        self, scope: str, kind: str
+    ) -> Optional[Tuple[Optional[str], float]]:
+        """Return (etag, age in seconds) of a stored listing, if any."""
+        row = self._db.execute(
+            "SELECT etag, fetched_at FROM listings WHERE scope = ? AND kind = ?",
+            (scope, kind),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], max(0.0, self.clock() - row[1])
+
+    @_synchronized
+    def items(self, scope: str, kind: str) -> List[Dict[str, Any]]:
+        """All stored entities of a listing, ordered by key."""
+        rows = self._db.execute(
+            "SELECT body FROM entities WHERE scope = ? AND kind = ? ORDER BY key",
+            (scope, kind),
+        )
+        return [json.loads(body) for (body,) in rows]
+
+    @_synchronized
+    def store_listing(
+        self,
+        scope: str,
+        kind: str,
+        items: Iterable[Dict[str, Any]],
+        etag: Optional[str] = None,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """Replace a listing with items fetched at ``fetched_at`` (or now)."""
+        key = _KEYS[kind]
+        with self._db:
+            self._db.execute(
+                "DELETE FROM entities WHERE scope = ? AND kind = ?", (scope, kind)
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?)",
+                (
+                    (scope, kind, key(item), json.dumps(item))
+                    for item in items
+                    if isinstance(item, dict) and key(item)
+                ),
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?)",
+                (scope, kind, etag, self.clock() if fetched_at is None else fetched_at),
+            )
+
+    @_synchronized
+    def touch_listing(self, scope: str, kind: str, etag: Optional[str]) -> None:
+        """Mark a listing as revalidated now."""
+        with self._db:
+            self._db.execute(
+                "UPDATE listings SET etag = ?, fetched_at = ? "
+                "WHERE scope = ? AND kind = ?",
+                (etag, self.clock(), scope, kind),
+            )
+
+    @_synchronized
+    def put(self, scope: str, kind: str, item: Dict[str, Any]) -> None:
+        """Insert or replace one entity."""
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?)",
+                (scope, kind, _KEYS[kind](item), json.dumps(item)),
+            )
+
+    @_synchronized
+    def get(self, scope: str, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return one entity, if cached."""
+        row = self._db.execute(
+            "SELECT body FROM entities WHERE scope = ? AND kind = ? AND key = ?",
+            (scope, kind, key),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @_synchronized
+    def delete(self, scope: str, kind: str, key: str) -> None:
+        """Remove one entity."""
+        with self._db:
+            self._db.execute(
+                "DELETE FROM entities WHERE scope = ? AND kind = ? AND key = ?",
+                (scope, kind, key),
+            )
+
+    @_synchronized
+    def invalidate(self, scope: Optional[str] = None) -> None:
+        """Forget cached listings (all scopes when ``scope`` is None)."""
+        where, args = ("WHERE scope = ?", (scope,)) if scope else ("", ())
+        with self._db:
+            self._db.execute(f"DELETE FROM listings {where}", args)
+            self._db.execute(f"DELETE FROM entities {where}", args)
+            self._db.execute(f"DELETE FROM missing_roles {where}", args)
+
+    @_synchronized
+    def missing_roles(self, scope: str) -> Dict[str, float]:
+        """Emails known to have no user_roles entry, mapped to their expiry.
+
+        Expired entries are purged.
+        """
+        now = self.clock()
+        with self._db:
+            self._db.execute(
+                "DELETE FROM missing_roles WHERE scope = ? AND expires_at <= ?",
+                (scope, now),
+            )
+        rows = self._db.execute(
+            "SELECT email, expires_at FROM missing_roles WHERE scope = ?", (scope,)
+        )
+        return dict(rows)
+
+    @_synchronized
+    def add_missing_role(self, scope: str, email: str, ttl: float) -> None:
+        """Remember that ``email`` has no user_roles entry for ``ttl`` seconds."""
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO missing_roles VALUES (?, ?, ?)",
+                (scope, email.lower(), self.clock() + ttl),
+            )
+
+    @_synchronized
+    def discard_missing_role(self, scope: str, email: str) -> None:
+        """Forget a remembered user_roles 404."""
+        with self._db:
+            self._db.execute(
+                "DELETE FROM missing_roles WHERE scope = ? AND email = ?",
+                (scope, email.lower()),
+            )
+
+
+class MissingRoles:
+    """Negative cache of emails whose user_roles entry returned 404.
+
+    Such users exist in the tenant but are managed elsewhere, so every PUT
+    to their roles entry fails the same way. ``UserSyncService`` skips them
+    until the entry expires. Entries are loaded once and their expiry is
+    checked on every lookup, so long-running processes see them lapse;
+    changes are written through to the ``StateCache``. Use one instance per
+    scope (see ``CachingRepository.missing_roles``) so that entries recorded
+    by a refresh are seen by the sync in the same run.
+    """
+
+    def __init__(self, cache: StateCache, scope: str, ttl: float = DEFAULT_MISSING_TTL):
+        """Load the non-expired entries for ``scope``.
+
+        Args:
+            cache: Persistent state cache
+            scope: Tenant and namespace the entries belong to
+            ttl: Seconds a newly added entry is remembered
+
+        """
+        self.cache = cache
+        self.scope = scope
+        self.ttl = ttl
+        self._expires = cache.missing_roles(scope)
+
+    def __contains__(self, email: object) -> bool:
+        if not isinstance(email, str):
+            return False
+        expires_at = self._expires.get(email.lower())
+        if expires_at is None:
+            return False
+        if expires_at <= self.cache.clock():
+            del self._expires[email.lower()]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        now = self.cache.clock()
+        return sum(1 for expires_at in self._expires.values() if expires_at > now)
+
+    def add(self, email: str) -> None:
+        """Remember a user_roles 404 for ``email``."""
+        self._expires[email.lower()] = self.cache.clock() + self.ttl
+        self.cache.add_missing_role(self.scope, email, self.ttl)
+
+    def discard(self, email: str) -> None:
+        """Forget ``email`` (its roles entry exists after all)."""
+        if self._expires.pop(email.lower(), None) is not None:
+            self.cache.discard_missing_role(self.scope, email)
+
+
+def _is_not_found(error: Exception) -> bool:
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code == 404
+
+
+class CachingRepository:
+    """Group and user repository that serves listings from a StateCache.
+
+    Implements both ``GroupRepository`` and ``UserRepository`` on top of an
+    ``XCClient``; every write goes to the API first and is then applied to
+    the cache.
+    """
+
+    def __init__(
+        self,
+        client: XCClient,
+        cache: StateCache,
+        ttl: float = DEFAULT_TTL,
+        missing_ttl: float = DEFAULT_MISSING_TTL,
+    ):
+        """Initialize the repository.
+
+        Args:
+            client: API client used for misses, revalidation and writes
+            cache: Persistent state cache
+            ttl: Seconds a listing is used without revalidation
+            missing_ttl: Seconds a user_roles 404 is remembered
+
+        """
+        self.client = client
+        self.cache = cache
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        # (kind, namespace) pairs served from disk without asking the API
+        self._unverified: Set[Tuple[str, str]] = set()
+        self._missing_roles: Dict[str, MissingRoles] = {}
+
+    @property
+    def retry_budget(self) -> RetryBudget:
+        """The client's retry budget, for callers retrying on top of it."""
+        return self.client.retry_budget
+
+    def _scope(self, namespace: str) -> str:
+        return f"{self.client.base_url}|{namespace}"
+
+    def missing_roles(self, namespace: str = "system") -> MissingRoles:
+        """Negative cache of user_roles 404s for ``namespace``.
+
+        Always the same instance, shared with ``UserSyncService`` and
+        updated by ``get_user``, ``update_user`` and ``refresh_users``.
+        """
+        if namespace not in self._missing_roles:
+            self._missing_roles[namespace] = MissingRoles(
+                self.cache, self._scope(namespace), self.missing_ttl
+            )
+        return self._missing_roles[namespace]
+
+    def served_from_cache(self, kind: str, namespace: str = "system") -> bool:
+        """Whether the last listing of ``kind`` skipped the API entirely.
+
+        Such listings may be stale; refresh the entities you act on.
+        """
+        return (kind, namespace) in self._unverified
+
+    def seed(
+        self,
+        kind: str,
+        items: Iterable[Dict[str, Any]],
+        namespace: str = "system",
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """Store a listing obtained elsewhere, such as a backup archive.
+
+        It is served like any cached listing until the TTL expires, counted
+        from ``fetched_at`` (defaults to now), so refresh the entities you
+        act on.
+        """
+        self.cache.store_listing(
+            self._scope(namespace), kind, items, fetched_at=fetched_at
+        )
+
+    def _listing(
+        self,
+        kind: str,
+        namespace: str,
+        fetch: Callable[..., Tuple[Optional[Dict[str, Any]], Optional[str]]],
+        list_key: str,
+    ) -> Dict[str, Any]:
+        scope = self._scope(namespace)
+        info = self.cache.listing_info(scope, kind)
+        if info is not None and info[1] < self.ttl:
+            logger.debug("Using cached %s listing (age %.0fs)", kind, info[1])
+            self._unverified.add((kind, namespace))
+            return {list_key: self.cache.items(scope, kind)}
+
+        self._unverified.discard((kind, namespace))
+        body, etag = fetch(info[0] if info else None, namespace)
+        if body is None:
+            logger.debug("Cached %s listing revalidated (not modified)", kind)
+            self.cache.touch_listing(scope, kind, etag)
+            return {list_key: self.cache.items(scope, kind)}
+
+        items = body.get(list_key, body.get("items", []))
+        self.cache.store_listing(scope, kind, items, etag)
+        return body
+
+    # GroupRepository
+
+    def list_groups(self, namespace: str = "system") -> Dict[str, Any]:
+        """List groups from the cache, revalidating after the TTL."""
+        return self._listing(
+            GROUPS, namespace, self.client.list_groups_if_changed, "user_groups"
+        )
+
+    def get_group(self, name: str, namespace: str = "system") -> Dict[str, Any]:
+        """Fetch one group from the API and cache it."""
+        group = self.client.get_group(name, namespace)
+        self.cache.put(self._scope(namespace), GROUPS, group)
+        return group
+
+    def create_group(
+        self, group: Dict[str, Any], namespace: str = "system"
+    ) -> Dict[str, Any]:
+        """Create a group and cache it."""
+        result = self.client.create_group(group, namespace)
+        self.cache.put(self._scope(namespace), GROUPS, {**group, **(result or {})})
+        return result
+
+    def update_group(
+        self, name: str, group: Dict[str, Any], namespace: str = "system"
+    ) -> Dict[str, Any]:
+        """Update a group and its cached copy."""
+        result = self.client.update_group(name, group, namespace)
+        scope = self._scope(namespace)
+        cached = self.cache.get(scope, GROUPS, name) or {}
+        self.cache.put(scope, GROUPS, {**cached, **group, **(result or {})})
+        return result
+
+    def delete_group(self, name: str, namespace: str = "system") -> None:
+        """Delete a group and drop it from the cache."""
+        self.client.delete_group(name, namespace)
+        self.cache.delete(self._scope(namespace), GROUPS, name)
+
+    # UserRepository
+
+    def list_user_roles(self, namespace: str = "system") -> Dict[str, Any]:
+        """List users from the cache, revalidating after the TTL."""
+        return self._listing(
+            USERS, namespace, self.client.list_user_roles_if_changed, "items"
+        )
+
+    def list_users(self, namespace: str = "system") -> Dict[str, Any]:
+        """Alias for list_user_roles."""
+        return self.list_user_roles(namespace)
+
+    def get_user(self, email: str, namespace: str = "system") -> Dict[str, Any]:
+        """Fetch one user from the API and cache it."""
+        user = self.client.get_user(email, namespace)
+        scope = self._scope(namespace)
+        self.cache.put(scope, USERS, {"email": email, **user})
+        self.missing_roles(namespace).discard(email)
+        return user
+
+    def create_user(
+        self, user: Dict[str, Any], namespace: str = "system"
+    ) -> Dict[str, Any]:
+        """Create a user and cache it."""
+        result = self.client.create_user(user, namespace)
+        self.cache.put(self._scope(namespace), USERS, {**user, **(result or {})})
+        return result
+
+    def update_user(
+        self, email: str, user: Dict[str, Any], namespace: str = "system"
+    ) -> Dict[str, Any]:
+        """Update a user and its cached copy."""
+        result = self.client.update_user(email, user, namespace)
+        scope = self._scope(namespace)
+        cached = self.cache.get(scope, USERS, email.lower()) or {}
+        self.cache.put(scope, USERS, {**cached, **user, **(result or {})})
+        self.missing_roles(namespace).discard(email)
+        return result
+
+    def delete_user(self, email: str, namespace: str = "system") -> None:
+        """Delete a user and drop it from the cache."""
+        self.client.delete_user(email, namespace)
+        self.cache.delete(self._scope(namespace), USERS, email.lower())
+
+    # Targeted refresh
+
+    def refresh_groups(self, names: Iterable[str], namespace: str = "system") -> int:
+        """Re-fetch the given groups; groups the API no longer has are dropped.
+
+        Names missing from the cached listing are skipped: they are about to
+        be created, and a create that conflicts fails loudly on its own.
+
+        Args:
+            names: Group names the plan will touch
+            namespace: XC namespace (default: "system")
+
+        Returns:
+            Number of groups fetched
+
+        """
+        scope = self._scope(namespace)
+        fetched = 0
+        for name in names:
+            if self.cache.get(scope, GROUPS, name) is None:
+                continue
+            try:
+                self.get_group(name, namespace)
+            except requests.HTTPError as e:
+                if not _is_not_found(e):
+                    raise
+                self.cache.delete(scope, GROUPS, name)
+            fetched += 1
+        return fetched
+
+    def refresh_users(self, emails: Iterable[str], namespace: str = "system") -> int:
+        """Re-fetch the given users.
+
+        A 404 is not treated as a deletion: user_roles returns 404 for users
+        managed outside this namespace that still appear in the listing.
+        Such users are recorded in the negative cache instead. Users missing
+        from the cached listing are skipped, as for groups.
+
+        Args:
+            emails: User emails the plan will touch
+            namespace: XC namespace (default: "system")
+
+        Returns:
+            Number of users fetched
+
+        """
+        scope = self._scope(namespace)
+        fetched = 0
+        for email in emails:
+            if self.cache.get(scope, USERS, email.lower()) is None:
+                continue
+            try:
+                self.get_user(email, namespace)
+            except requests.HTTPError as e:
+                if not _is_not_found(e):
+                    raise
+                self.missing_roles(namespace).add(email)
+            fetched += 1
+        return fetched
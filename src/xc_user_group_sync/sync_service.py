@@ -12,7 +12,8 @@ Create_user contract and payload:
         - `username` (string)
         - `display_name` (string)
     Concrete repository implementations MUST accept this shape or raise an
-    exception. The operation is retried on transient errors.
+    exception. The operation is retried on transient errors only (see
+    `retry_policy`); deterministic 4xx responses fail immediately.
 
 Retry configuration:
 - `GroupSyncService` accepts retry/backoff parameters to control how many
@@ -22,26 +23,30 @@ Retry configuration:
 
 from __future__ import annotations
 
-import csv
 import logging
 from collections import defaultdict
-from dataclasses import dataclass
-from typing import ClassVar, Dict, List, Set, Tuple
-
-from tenacity import (
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_exponential,
-)
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import ClassVar, Dict, Iterable, List, Sequence, Set, Tuple
 
 from .ldap_utils import LdapParseError, extract_cn, normalize_group_name_dns1035
+from .logs import debug_entity, tracing
 from .models import Group
-from .protocols import GroupRepository
+from .output import DETAIL, ProgressBar
+from .protocols import GroupRepository, RecordSource
+from .prune import check_prune_limit, delete_all, summarize
+from .retry_policy import RetryPolicy, status_of
+from .scheduling import ADD, REMOVE_MEMBERS, Operation
+from .sources import CSVSource
 
 
 @dataclass
 class SyncStats:
-    """Statistics from a sync operation."""
+    """Statistics from a sync operation.
+
+    ``error_details`` holds the group, operation and error of each failed
+    group write.
+    """
 
     created: int = 0
     updated: int = 0
@@ -49,6 +54,7 @@ class SyncStats:
     skipped: int = 0
     errors: int = 0
     skipped_due_to_unknown: int = 0
+    error_details: List[Dict[str, str]] = field(default_factory=list)
 
     def summary(self) -> str:
         """Generate summary message."""
@@ -68,6 +74,87 @@ class CSVParseError(Exception):
     pass
 
 
+# Normalized group name -> {(original CN, email)}
+GroupMembers = Dict[str, Set[Tuple[str, str]]]
+
+
+def add_group_membership(
+    members: GroupMembers, dn: str | None, email: str | None
+) -> bool:
+    """Record one CSV row's group memberships.
+
+    Rows with an empty DN or email are ignored; DNs that cannot be parsed
+    are logged and skipped.
+
+    Args:
+        members: Membership map to update
+        dn: LDAP DNs from the "Entitlement Display Name" column
+            (pipe-separated)
+        email: User email from the "Email" column
+
+    Returns:
+        True if a membership was recorded
+
+    """
+    if not dn or not email:
+        return False
+
+    recorded = False
+    for part in dn.split("|"):
+        if not part.strip():
+            continue
+        try:
+            cn = extract_cn(part)
+            # Normalize to DNS-1035 for F5 XC API
+            normalized_name = normalize_group_name_dns1035(cn)
+        except LdapParseError as e:
+            logging.warning("Skipping row due to DN parse error: %s", e)
+            continue
+
+        # Track members by normalized name, but keep original
+        members[normalized_name].add((cn, email))
+        recorded = True
+    return recorded
+
+
+def build_planned_groups(members: GroupMembers) -> List[Group]:
+    """Turn a membership map into the sorted list of planned groups.
+
+    Args:
+        members: Normalized group name -> {(original CN, email)}
+
+    Returns:
+        Groups sorted by name, each with sorted member emails
+
+    """
+    planned = []
+    for normalized_name, user_data in sorted(members.items()):
+        # Extract just emails and get original name from first entry
+        original_name = next(iter(user_data))[0]
+        user_emails = sorted([email for _, email in user_data])
+
+        grp = Group(
+            name=normalized_name, original_name=original_name, users=user_emails
+        )
+        planned.append(grp)
+
+        # Log normalization if name changed
+        if normalized_name != original_name:
+            logging.info(
+                "Normalized group name: '%s' → '%s'",
+                original_name,
+                normalized_name,
+                extra=DETAIL,
+            )
+
+    return planned
+
+
+def _current_members(group_data: Dict) -> List[str]:
+    """Sorted member list of a group as returned by the repository."""
+    return sorted(group_data.get("usernames") or group_data.get("users") or [])
+
+
 class GroupSyncService:
     """Service for synchronizing groups from CSV to repository."""
 
@@ -81,25 +168,41 @@ class GroupSyncService:
         backoff_multiplier: float = 1.0,
         backoff_min: float = 1.0,
         backoff_max: float = 4.0,
+        executor: Executor | None = None,
+        max_prune_percent: float | None = None,
+        progress: ProgressBar | None = None,
     ):
         """Initialize service with a group repository.
 
         Args:
             repository: Implementation of GroupRepository protocol
+            executor: Shared executor running prune deletes concurrently
+                (optional; deletes run one at a time without it)
+            max_prune_percent: Refuse to prune a larger share of the existing
+                groups, in percent (optional)
+            progress: Progress bar advanced as planned groups are synced
+                (optional)
 
         """
         self.repository = repository
+        self.executor = executor
+        self.max_prune_percent = max_prune_percent
+        self.progress = progress
         # Retry/backoff tuning for user creation retries
         self.retry_attempts = int(retry_attempts)
         self.backoff_multiplier = float(backoff_multiplier)
         self.backoff_min = float(backoff_min)
         self.backoff_max = float(backoff_max)
 
-    def parse_csv_to_groups(self, csv_path: str) -> List[Group]:
+    def parse_csv_to_groups(
+        self, csv_path: str, workers: int | None = None
+    ) -> List[Group]:
         """Parse CSV file into Group objects.
 
         Args:
             csv_path: Path to CSV file with user/group mappings
+            workers: Number of worker processes for parallel parsing. None or 1
+                parses in this process; 0 uses one worker per CPU.
 
         Returns:
             List of Group objects with members
@@ -108,55 +211,52 @@ class GroupSyncService:
             CSVParseError: If CSV is malformed or missing required columns
 
         """
+        if workers is not None and workers != 1:
+            from .parallel_csv import parse_groups_parallel
+
+            return parse_groups_parallel(csv_path, workers or None)
+
+        return self.parse_source_to_groups(CSVSource(csv_path))
+
+    def parse_source_to_groups(self, source: RecordSource) -> List[Group]:
+        """Build the planned groups from any record source.
+
+        Args:
+            source: Normalized input records (CSV, NDJSON, Parquet, ...)
+
+        Returns:
+            List of Group objects with members
+
+        Raises:
+            CSVParseError: If the source is missing required columns
+
+        """
+        self.validate_header(source.fieldnames)
+
         # Track members by normalized name, storing tuples of (original_name, email)
-        members: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
-
-        with open(csv_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            header = set(reader.fieldnames or [])
-            missing = [c for c in self.REQUIRED_COLUMNS if c not in header]
-            if missing:
-                raise CSVParseError(
-                    f"CSV missing required columns: {', '.join(sorted(missing))}"
-                )
+        members: GroupMembers = defaultdict(set)
+        for record in source.records():
+            add_group_membership(members, record.entitlements, record.email)
 
-            for row in reader:
-                dn = row.get("Entitlement Display Name") or row.get(
-                    "entitlement_display_name"
-                )
-                email = row.get("Email") or row.get("email")
-                if not dn or not email:
-                    continue
+        return build_planned_groups(members)
 
-                try:
-                    cn = extract_cn(dn)
-                    # Normalize to DNS-1035 for F5 XC API
-                    normalized_name = normalize_group_name_dns1035(cn)
-                except LdapParseError as e:
-                    logging.warning("Skipping row due to DN parse error: %s", e)
-                    continue
-
-                # Track members by normalized name, but keep original
-                members[normalized_name].add((cn, email))
-
-        planned = []
-        for normalized_name, user_data in sorted(members.items()):
-            # Extract just emails and get original name from first entry
-            original_name = next(iter(user_data))[0]
-            user_emails = sorted([email for _, email in user_data])
-
-            grp = Group(
-                name=normalized_name, original_name=original_name, users=user_emails
-            )
-            planned.append(grp)
+    @classmethod
+    def validate_header(cls, fieldnames: Sequence[str] | None) -> None:
+        """Check that a CSV header contains the required columns.
 
-            # Log normalization if name changed
-            if normalized_name != original_name:
-                logging.info(
-                    "Normalized group name: '%s' → '%s'", original_name, normalized_name
-                )
+        Args:
+            fieldnames: Column names from the CSV header
 
-        return planned
+        Raises:
+            CSVParseError: If required columns are missing
+
+        """
+        header = set(fieldnames or [])
+        missing = [c for c in cls.REQUIRED_COLUMNS if c not in header]
+        if missing:
+            raise CSVParseError(
+                f"CSV missing required columns: {', '.join(sorted(missing))}"
+            )
 
     def fetch_existing_groups(self) -> Dict[str, Dict]:
         """Fetch existing groups from repository.
@@ -171,13 +271,13 @@ class GroupSyncService:
         list_resp = self.repository.list_groups()
         # F5 XC API returns groups under 'user_groups' key, not 'items'
         groups_list = list_resp.get("user_groups", list_resp.get("items", []))
-        logging.debug(f"list_groups returned {len(groups_list)} groups")
+        logging.debug("list_groups returned %d groups", len(groups_list))
         existing = {
             g["name"]: g for g in groups_list if isinstance(g, dict) and "name" in g
         }
-        logging.info(f"Fetched {len(existing)} existing groups from F5 XC")
-        if existing:
-            logging.debug(f"Existing group names: {list(existing.keys())}")
+        logging.info("Fetched %d existing groups from F5 XC", len(existing))
+        if existing and logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug("Existing group names: %s", list(existing))
         return existing
 
     def fetch_existing_users(self) -> Set[str] | None:
@@ -232,11 +332,11 @@ class GroupSyncService:
         # Attempt to create missing users (only when existing_users was None)
         for u in unknown:
             if dry_run:
-                logging.info("Would create user %s", u)
+                logging.info("Would create user %s", u, extra=DETAIL)
             else:
                 try:
                     self._create_user_with_retry({"email": u})
-                    logging.info("Created user %s", u)
+                    logging.info("Created user %s", u, extra=DETAIL)
                     current_users.add(u)
                 except Exception as e:
                     stats.errors += 1
@@ -291,7 +391,10 @@ class GroupSyncService:
         else:
             current_users = set(existing_users)
 
-        for grp in planned_groups:
+        groups: Iterable[Group] = planned_groups
+        if self.progress is not None:
+            groups = self.progress.track(planned_groups, "Groups")
+        for grp in groups:
             desired_users = sorted(grp.users)
 
             # Validate and ensure users exist
@@ -323,6 +426,7 @@ class GroupSyncService:
                 )
             else:
                 # Create new group
+                debug_entity(logging.root, grp.name, "Group %s not in F5 XC", grp.name)
                 stats = self._create_group(grp, desired_users, dry_run, stats)
 
         return stats
@@ -348,32 +452,56 @@ class GroupSyncService:
             Updated statistics object
 
         """
-        curr_users = sorted(
-            current_data.get("usernames") or current_data.get("users") or []
-        )
+        curr_users = _current_members(current_data)
         if curr_users == desired_users:
             stats.skipped += 1
-            logging.debug("No change for group %s", group.name)
+            debug_entity(logging.root, group.name, "No change for group %s", group.name)
             return stats
+        if tracing(logging.root, group.name):
+            current, desired = set(curr_users), set(desired_users)
+            debug_entity(
+                logging.root,
+                group.name,
+                "Group %s: %d members to remove, %d to add",
+                group.name,
+                len(current - desired),
+                len(desired - current),
+            )
 
-        payload = {
-            "name": group.name,
-            "display_name": group.name,
-            "usernames": desired_users,
-        }
+        return self._write_group_update(group.name, desired_users, dry_run, stats)
+
+    def _write_group_update(
+        self, name: str, usernames: List[str], dry_run: bool, stats: SyncStats
+    ) -> SyncStats:
+        """Replace a group's member list.
+
+        Args:
+            name: Group name
+            usernames: Complete new member list
+            dry_run: If True, only log without updating
+            stats: Statistics object to update
+
+        Returns:
+            Updated statistics object
+
+        """
+        payload = {"name": name, "display_name": name, "usernames": usernames}
 
         if dry_run:
             logging.info(
-                "Would update group %s (%d users)", group.name, len(desired_users)
+                "Would update group %s (%d users)", name, len(usernames), extra=DETAIL
             )
         else:
             try:
-                self.repository.update_group(group.name, payload)
+                self.repository.update_group(name, payload)
                 stats.updated += 1
-                logging.info("Updated group %s", group.name)
+                logging.info("Updated group %s", name, extra=DETAIL)
             except Exception as e:
                 stats.errors += 1
-                logging.error("Failed to update %s: %s", group.name, e)
+                stats.error_details.append(
+                    {"group": name, "operation": "update", "error": str(e)}
+                )
+                logging.error("Failed to update %s: %s", name, e)
 
         return stats
 
@@ -404,15 +532,21 @@ class GroupSyncService:
 
         if dry_run:
             logging.info(
-                "Would create group %s (%d users)", group.name, len(desired_users)
+                "Would create group %s (%d users)",
+                group.name,
+                len(desired_users),
+                extra=DETAIL,
             )
         else:
             try:
                 self.repository.create_group(payload)
                 stats.created += 1
-                logging.info("Created group %s", group.name)
+                logging.info("Created group %s", group.name, extra=DETAIL)
             except Exception as e:
                 stats.errors += 1
+                stats.error_details.append(
+                    {"group": group.name, "operation": "create", "error": str(e)}
+                )
                 # Log detailed error information for debugging
                 error_msg = str(e)
                 if hasattr(e, "response") and e.response is not None:
@@ -434,8 +568,12 @@ class GroupSyncService:
     def _create_user_with_retry(self, user: Dict[str, str]) -> Dict:
         """Create a user via repository with retries for transient failures.
 
-        Uses tenacity.Retrying with the instance's retry/backoff configuration.
-        Raises after retries are exhausted.
+        Uses a ``RetryPolicy`` built from the instance's retry/backoff
+        configuration, so non-transient 4xx errors are not retried. Retries
+        draw on the repository's retry budget, if it has one. A 409 on a
+        retry means an earlier attempt created the user; it is confirmed
+        with the repository's ``get_user``, if it has one. Raises after
+        retries are exhausted.
 
         Args:
             user: User data dictionary to create
@@ -443,25 +581,179 @@ class GroupSyncService:
         Returns:
             Created user response from repository
         """
-        from tenacity import Retrying
-
-        for attempt in Retrying(
-            stop=stop_after_attempt(self.retry_attempts),
-            wait=wait_exponential(
-                multiplier=self.backoff_multiplier,
-                min=self.backoff_min,
-                max=self.backoff_max,
-            ),
-            retry=retry_if_exception_type(Exception),
-            reraise=True,
-        ):
+        policy = RetryPolicy(
+            max_attempts=self.retry_attempts,
+            backoff_multiplier=self.backoff_multiplier,
+            backoff_min=self.backoff_min,
+            backoff_max=self.backoff_max,
+            budget=getattr(self.repository, "retry_budget", None),
+        )
+        for attempt in policy.retrying("POST"):
             with attempt:
-                return self.repository.create_user(user)
+                try:
+                    return self.repository.create_user(user)
+                except Exception as e:
+                    status = status_of(e)
+                    number = attempt.retry_state.attempt_number
+                    # GroupRepository has no get_user; only confirm if we can
+                    get_user = getattr(self.repository, "get_user", None)
+                    if (
+                        status is None
+                        or get_user is None
+                        or not policy.reconciles("POST", status, number)
+                    ):
+                        raise
+                    logging.info(
+                        "User %s was created by an earlier attempt", user["email"]
+                    )
+                    return get_user(user["email"])
 
         # This line should never be reached due to reraise=True,
         # but included for type checker satisfaction
         raise RuntimeError("Retry logic failed unexpectedly")
 
+    def plan_operations(
+        self,
+        planned_groups: List[Group],
+        existing_groups: Dict[str, Dict],
+        prune: bool = False,
+        stats: SyncStats | None = None,
+    ) -> List[Operation]:
+        """Plan the group writes a sync would make, without making them.
+
+        An update that drops members is split: a ``REMOVE_MEMBERS`` update to
+        the members that stay, then (if members are also added) an ``ADD``
+        update to the full list, so access is revoked before anything else.
+        Pruned groups are ``REMOVE_MEMBERS`` deletions. Unlike
+        ``sync_groups``, members are not validated or created here: the user
+        plan creates them first.
+
+        Args:
+            planned_groups: Groups from CSV
+            existing_groups: Currently existing groups
+            prune: Plan deletion of groups not in the CSV
+            stats: If given, unchanged groups are counted as skipped here
+
+        Returns:
+            Operations in planning order
+
+        """
+        operations = []
+        for grp in planned_groups:
+            desired = sorted(grp.users)
+            payload = {"name": grp.name, "display_name": grp.name, "usernames": desired}
+            current_data = existing_groups.get(grp.name)
+            if current_data is None:
+                debug_entity(logging.root, grp.name, "Group %s not in F5 XC", grp.name)
+                operations.append(Operation(ADD, "group", "create", grp.name, payload))
+                continue
+
+            current = _current_members(current_data)
+            if current == desired:
+                debug_entity(logging.root, grp.name, "No change for group %s", grp.name)
+                if stats is not None:
+                    stats.skipped += 1
+                continue
+            desired_set = set(desired)
+            kept = [u for u in current if u in desired_set]
+            debug_entity(
+                logging.root,
+                grp.name,
+                "Group %s: %d members to remove, %d to add",
+                grp.name,
+                len(current) - len(kept),
+                len(desired) - len(kept),
+            )
+            if len(kept) < len(current):
+                operations.append(
+                    Operation(
+                        REMOVE_MEMBERS,
+                        "group",
+                        "remove_members",
+                        grp.name,
+                        {**payload, "usernames": kept},
+                    )
+                )
+            if len(kept) < len(desired):
+                operations.append(Operation(ADD, "group", "update", grp.name, payload))
+
+        if prune:
+            planned_names = {g.name for g in planned_groups}
+            for name in existing_groups:
+                if name not in planned_names:
+                    operations.append(
+                        Operation(REMOVE_MEMBERS, "group", "delete", name)
+                    )
+        return operations
+
+    def apply_operation(self, op: Operation, dry_run: bool, stats: SyncStats) -> None:
+        """Perform one planned group operation, recording the outcome in stats.
+
+        Args:
+            op: Operation from ``plan_operations`` (or a leftover plan)
+            dry_run: If True, only log actions without making changes
+            stats: Statistics object to update
+
+        """
+        if op.action == "delete":
+            if dry_run:
+                # Counted like a dry-run user delete
+                stats.deleted += 1
+                logging.info("Would delete group %s", op.key, extra=DETAIL)
+                return
+            try:
+                self.repository.delete_group(op.key)
+                stats.deleted += 1
+                logging.info("Deleted group %s", op.key, extra=DETAIL)
+            except Exception as e:
+                stats.errors += 1
+                stats.error_details.append(
+                    {"group": op.key, "operation": "delete", "error": str(e)}
+                )
+                logging.error("Failed to delete %s: %s", op.key, e)
+            return
+
+        usernames = list(op.payload.get("usernames", []))
+        if op.action == "create":
+            self._create_group(
+                Group(name=op.key, users=usernames), usernames, dry_run, stats
+            )
+        else:
+            self._write_group_update(op.key, usernames, dry_run, stats)
+
+    def groups_to_touch(
+        self,
+        planned_groups: List[Group],
+        existing_groups: Dict[str, Dict],
+        prune: bool = False,
+    ) -> List[str]:
+        """Names of groups a sync would create, update or delete.
+
+        Used to refresh only those groups when ``existing_groups`` came from
+        a possibly stale cache.
+
+        Args:
+            planned_groups: Groups from CSV
+            existing_groups: Currently known groups
+            prune: Include groups that cleanup would delete
+
+        Returns:
+            Sorted group names
+
+        """
+        touched = set()
+        for grp in planned_groups:
+            current = existing_groups.get(grp.name)
+            if current is None:
+                touched.add(grp.name)
+                continue
+            if _current_members(current) != sorted(grp.users):
+                touched.add(grp.name)
+        if prune:
+            planned_names = {g.name for g in planned_groups}
+            touched.update(n for n in existing_groups if n not in planned_names)
+        return sorted(touched)
+
     def cleanup_orphaned_groups(
         self,
         planned_groups: List[Group],
@@ -478,26 +770,29 @@ class GroupSyncService:
         Returns:
             Number of groups deleted
 
+        Raises:
+            PruneLimitExceeded: If more than ``max_prune_percent`` of the
+                existing groups would be deleted (nothing is deleted)
+
         """
         planned_names = {g.name for g in planned_groups}
         extra = [name for name in existing_groups.keys() if name not in planned_names]
+        if not extra:
+            return 0
 
-        deleted = 0
-        errors = 0
-
-        if extra:
-            logging.info("Extra groups in repository not in CSV: %d", len(extra))
-            for name in extra:
-                logging.info(" - %s", name)
+        check_prune_limit(
+            "groups", len(extra), len(existing_groups), self.max_prune_percent
+        )
+        logging.info("Extra groups in repository not in CSV: %d", len(extra))
+        if dry_run:
+            logging.info("[DRY-RUN] Would delete groups: %s", summarize(extra))
+            return 0
 
-            if not dry_run:
-                for name in extra:
-                    try:
-                        self.repository.delete_group(name)
-                        deleted += 1
-                        logging.info("Deleted group %s", name)
-                    except Exception as e:
-                        errors += 1
-                        logging.error("Failed to delete %s: %s", name, e)
-
-        return deleted
+        deleted, failures = delete_all(
+            extra, self.repository.delete_group, self.executor
+        )
+        for name, e in failures.items():
+            logging.error("Failed to delete %s: %s", name, e)
+        if deleted:
+            logging.info("Deleted %d groups: %s", len(deleted), summarize(deleted))
+        return len(deleted)
@@ -5,39 +5,44 @@ and F5 Distributed Cloud, treating CSV as the source of truth.
 """
 
 import logging
-import re
+from concurrent.futures import Executor
 from dataclasses import dataclass, field
-from typing import Dict, List, Set
+from pathlib import Path
+from typing import Any, ClassVar, Dict, Iterable, List, Sequence, Set
 
+from xc_user_group_sync.ldap_utils import extract_cn
+from xc_user_group_sync.logs import debug_entity, tracing
 from xc_user_group_sync.models import User
-from xc_user_group_sync.protocols import UserRepository
+from xc_user_group_sync.output import DETAIL, ProgressBar
+from xc_user_group_sync.protocols import (
+    MissingRoleStore,
+    RecordSource,
+    UserRepository,
+)
+from xc_user_group_sync.prune import check_prune_limit, delete_all, summarize
+from xc_user_group_sync.scheduling import ADD, REVOKE, Operation
+from xc_user_group_sync.sources import CSVSource
+from xc_user_group_sync.user_utils import (
+    email_key,
+    parse_active_status,
+    parse_display_name,
+    user_create_body,
+    validate_email_format,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def validate_email_format(email: str) -> bool:
-    """Validate email format using simple RFC-compliant pattern.
-
-    Args:
-        email: Email address to validate
-
-    Returns:
-        True if email format is valid, False otherwise
-    """
-    pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-    return bool(re.match(pattern, email))
-
-
 @dataclass
 class CSVValidationResult:
     """Result of CSV parsing with validation warnings.
 
     Attributes:
         users: List of successfully parsed User objects
-        total_count: Total number of users in CSV
+        total_count: Number of users after merging rows that share an email
         active_count: Number of active users
         inactive_count: Number of inactive users
-        duplicate_emails: Map of duplicate emails to their row numbers
+        duplicate_emails: Map of emails on several rows to their row numbers
         invalid_emails: List of (email, row_number) tuples with invalid format
         users_without_groups: Number of users with no group assignments
         users_without_names: Number of users with missing display names
@@ -64,6 +69,222 @@ class CSVValidationResult:
         )
 
 
+def merge_duplicate_users(users: List[User]) -> List[User]:
+    """Fold users sharing an email into one user with the union of their groups.
+
+    HR exports emit one row per user per entitlement. Merging them in one
+    pass means each user is diffed and written once, with its full group
+    set, instead of once per row with conflicting groups.
+
+    Args:
+        users: Users in source order, possibly several per email
+
+    Returns:
+        One user per email (case-insensitive), in order of first
+        appearance. The first row supplies the other attributes; groups
+        keep the order they were first seen in.
+    """
+    merged: Dict[str, User] = {}
+    groups: Dict[str, Dict[str, None]] = {}
+    for user in users:
+        key = user.email_key
+        first = merged.get(key)
+        if first is None:
+            merged[key] = user
+        elif key in groups:
+            groups[key].update(dict.fromkeys(user.groups))
+        else:
+            groups[key] = dict.fromkeys(first.groups)
+            groups[key].update(dict.fromkeys(user.groups))
+    for key, union in groups.items():
+        merged[key] = merged[key].model_copy(update={"groups": list(union)})
+    return list(merged.values())
+
+
+class CSVRowError(ValueError):
+    """A CSV row could not be turned into a User.
+
+    Attributes:
+        row_num: CSV row number (the header is row 1)
+        cause: Description of the underlying error
+    """
+
+    def __init__(self, row_num: int, cause: str) -> None:
+        self.row_num = row_num
+        self.cause = cause
+        super().__init__(f"Row {row_num}: {cause}")
+
+    def __reduce__(self):
+        # Keep the structured fields when raised inside a worker process
+        return (type(self), (self.row_num, self.cause))
+
+
+class UserRowAccumulator:
+    """Builds a CSVValidationResult one CSV row at a time.
+
+    Holds the parsed users and the running validation warnings so that a
+    file can be parsed in pieces (e.g. by worker processes) and the pieces
+    merged afterwards.
+
+    Attributes:
+        rows: Number of rows added
+        log_rows: Whether to log per-row warnings (worker processes don't
+            know absolute row numbers, so the merging side logs instead)
+    """
+
+    def __init__(self, log_rows: bool = True) -> None:
+        self.log_rows = log_rows
+        self.rows = 0
+        self.users: List[User] = []
+        self.email_tracker: Dict[str, List[int]] = {}  # Track emails for duplicates
+        self.invalid_emails: List[tuple[str, int]] = []
+        self.empty_emails = 0
+        self.unique_groups: Set[str] = set()
+        # First User built for each email key and whether the email matched
+        # the format check: exports repeat a user once per entitlement row,
+        # and later rows copy that User (and its key) instead of validating
+        # the email again (EmailStr dominates parse time)
+        self._validated: Dict[str, tuple[User, bool]] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Worker processes send accumulators back; the cache stays behind
+        state = self.__dict__.copy()
+        state["_validated"] = {}
+        return state
+
+    def add_row(
+        self,
+        row_num: int,
+        email: str | None,
+        display_name: str | None,
+        employee_status: str | None,
+        entitlements: str | None,
+    ) -> None:
+        """Parse one row and record the user and any warnings.
+
+        Missing values (None, e.g. JSON nulls) are treated as empty.
+
+        Args:
+            row_num: CSV row number used in warnings and errors
+            email: "Email" column value
+            display_name: "User Display Name" column value
+            employee_status: "Employee Status" column value
+            entitlements: "Entitlement Display Name" column value
+                (pipe-separated LDAP DNs)
+
+        Raises:
+            CSVRowError: If the row cannot be parsed into a User
+        """
+        self.rows += 1
+        try:
+            email = (email or "").strip()
+            if not email:
+                self.empty_emails += 1
+                if self.log_rows:
+                    logger.warning("Row %s: Empty email, skipping", row_num)
+                return
+
+            # Track email for duplicate detection (case-insensitive)
+            key = email_key(email)
+            rows = self.email_tracker.get(key)
+            if rows is not None:
+                rows.append(row_num)
+            else:
+                self.email_tracker[key] = [row_num]
+
+            # Validate email format (once per distinct email)
+            cached = self._validated.get(key)
+            format_ok = cached[1] if cached else validate_email_format(email)
+            if not format_ok:
+                self.invalid_emails.append((email, row_num))
+                if self.log_rows:
+                    logger.warning("Row %s: Invalid email format: %s", row_num, email)
+
+            display_name = (display_name or "").strip()
+            first_name, last_name = parse_display_name(display_name)
+            active = parse_active_status(employee_status or "")
+
+            # Parse pipe-separated LDAP DNs and extract CNs
+            groups = []
+            entitlements = (entitlements or "").strip()
+            if entitlements:
+                dn_list = [dn.strip() for dn in entitlements.split("|")]
+                for dn in dn_list:
+                    if dn:
+                        cn = extract_cn(dn)
+                        if cn:
+                            groups.append(cn)
+                            self.unique_groups.add(cn)
+
+            fields: Dict[str, Any] = {
+                "display_name": display_name,
+                "first_name": first_name,
+                "last_name": last_name,
+                "active": active,
+                "groups": groups,
+            }
+            if cached:
+                user = cached[0].model_copy(update=fields)
+            else:
+                user = User(email=email, **fields)
+                # Computing the key here lets later rows' copies inherit it
+                self._validated[user.email_key] = (user, format_ok)
+            self.users.append(user)
+
+        except Exception as e:
+            raise CSVRowError(row_num, str(e)) from e
+
+    def merge(self, other: "UserRowAccumulator", row_offset: int = 0) -> None:
+        """Append another accumulator's rows after this one's.
+
+        Args:
+            other: Accumulator for the rows that follow
+            row_offset: Amount added to ``other``'s row numbers
+        """
+        self.rows += other.rows
+        self.users.extend(other.users)
+        for key, rows in other.email_tracker.items():
+            shifted = [r + row_offset for r in rows]
+            if key in self.email_tracker:
+                self.email_tracker[key].extend(shifted)
+            else:
+                self.email_tracker[key] = shifted
+        self.invalid_emails.extend(
+            (email, row + row_offset) for email, row in other.invalid_emails
+        )
+        self.empty_emails += other.empty_emails
+        self.unique_groups |= other.unique_groups
+
+    def result(self) -> CSVValidationResult:
+        """Build the validation result for all rows added so far.
+
+        Rows sharing an email are merged into one user (see
+        ``merge_duplicate_users``); counts are of merged users.
+        """
+        users = merge_duplicate_users(self.users)
+
+        # Identify duplicate emails (only those that appear more than once)
+        duplicate_emails = {
+            email: rows for email, rows in self.email_tracker.items() if len(rows) > 1
+        }
+
+        # Count active/inactive users
+        active_count = sum(1 for u in users if u.active)
+        inactive_count = len(users) - active_count
+
+        return CSVValidationResult(
+            users=users,
+            total_count=len(users),
+            active_count=active_count,
+            inactive_count=inactive_count,
+            duplicate_emails=duplicate_emails,
+            invalid_emails=self.invalid_emails,
+            users_without_groups=sum(1 for u in users if not u.groups),
+            users_without_names=sum(1 for u in users if not u.display_name),
+            unique_groups=self.unique_groups,
+        )
+
+
 @dataclass
 class UserSyncStats:
     """Statistics from user synchronization operation.
@@ -73,6 +294,8 @@ class UserSyncStats:
         updated: Number of users updated in F5 XC
         deleted: Number of users deleted from F5 XC
         unchanged: Number of users that matched and required no changes
+        skipped_known_missing: Updates skipped because the user is known to
+            have no user_roles entry (negative cache hit)
         errors: Total number of errors encountered
         error_details: List of error dictionaries with user and error info
     """
@@ -81,15 +304,21 @@ class UserSyncStats:
     updated: int = 0
     deleted: int = 0
     unchanged: int = 0
+    skipped_known_missing: int = 0
     errors: int = 0
     error_details: List[Dict[str, str]] = field(default_factory=list)
 
     def summary(self) -> str:
         """Generate human-readable summary."""
+        skipped = (
+            f"skipped_known_missing={self.skipped_known_missing}, "
+            if self.skipped_known_missing
+            else ""
+        )
         return (
             f"Users: created={self.created}, updated={self.updated}, "
             f"deleted={self.deleted}, unchanged={self.unchanged}, "
-            f"errors={self.errors}"
+            f"{skipped}errors={self.errors}"
         )
 
     def has_errors(self) -> bool:
@@ -104,23 +333,55 @@ class UserSyncService:
     as the source of truth and synchronizing F5 XC to match.
     """
 
-    def __init__(self, repository: UserRepository, retry_wait=None, retry_stop=None):
+    REQUIRED_COLUMNS: ClassVar[set[str]] = {
+        "Email",
+        "User Display Name",
+        "Employee Status",
+        "Entitlement Display Name",
+    }
+
+    def __init__(
+        self,
+        repository: UserRepository,
+        retry_wait=None,
+        retry_stop=None,
+        missing_roles: MissingRoleStore | None = None,
+        executor: Executor | None = None,
+        max_prune_percent: float | None = None,
+        progress: ProgressBar | None = None,
+    ):
         """Initialize with user repository.
 
         Args:
             repository: UserRepository implementation (typically XCClient)
             retry_wait: tenacity wait strategy for retries (optional)
             retry_stop: tenacity stop strategy for retries (optional)
+            missing_roles: Negative cache of users without a user_roles entry
+                (optional); their updates are skipped and new 404s recorded
+            executor: Shared executor running prune deletes concurrently
+                (optional; deletes run one at a time without it)
+            max_prune_percent: Refuse to prune a larger share of the existing
+                users, in percent (optional)
+            progress: Progress bar advanced as planned operations are applied
+                (optional)
         """
         self.repository = repository
+        self.executor = executor
+        self.max_prune_percent = max_prune_percent
+        self.progress = progress
         self.retry_wait = retry_wait
         self.retry_stop = retry_stop
+        self.missing_roles = missing_roles
 
-    def parse_csv_to_users(self, csv_path: str) -> CSVValidationResult:
+    def parse_csv_to_users(
+        self, csv_path: str, workers: int | None = None
+    ) -> CSVValidationResult:
         """Parse CSV file to User objects with validation warnings.
 
         Args:
             csv_path: Absolute path to CSV file
+            workers: Number of worker processes for parallel parsing. None or 1
+                parses in this process; 0 uses one worker per CPU.
 
         Returns:
             CSVValidationResult with parsed users and validation warnings
@@ -129,124 +390,59 @@ class UserSyncService:
             FileNotFoundError: If CSV file doesn't exist
             ValueError: If required CSV columns are missing
         """
-        import csv
-        from pathlib import Path
-
-        from xc_user_group_sync.ldap_utils import extract_cn
-        from xc_user_group_sync.user_utils import (
-            parse_active_status,
-            parse_display_name,
-        )
-
         csv_file = Path(csv_path)
         if not csv_file.exists():
             raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
-        users = []
-        email_tracker: Dict[str, List[int]] = {}  # Track emails for duplicates
-        invalid_emails: List[tuple[str, int]] = []
-        users_without_groups = 0
-        users_without_names = 0
-        unique_groups: Set[str] = set()
-
-        required_columns = {
-            "Email",
-            "User Display Name",
-            "Employee Status",
-            "Entitlement Display Name",
-        }
+        if workers is not None and workers != 1:
+            from xc_user_group_sync.parallel_csv import parse_users_parallel
 
-        with csv_file.open("r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
+            return parse_users_parallel(csv_path, workers or None)
 
-            # Validate required columns
-            if not reader.fieldnames:
-                raise ValueError("CSV file is empty or has no header row")
+        result = self.parse_source_to_users(CSVSource(csv_path))
+        logger.info("Parsed %d users from %s", len(result.users), csv_path)
+        return result
 
-            missing_columns = required_columns - set(reader.fieldnames)
-            if missing_columns:
-                raise ValueError(f"Missing required columns: {missing_columns}")
+    def parse_source_to_users(self, source: RecordSource) -> CSVValidationResult:
+        """Parse users from any record source with validation warnings.
 
-            for row_num, row in enumerate(reader, start=2):  # start=2 for header row
-                try:
-                    email = row["Email"].strip()
-                    if not email:
-                        logger.warning(f"Row {row_num}: Empty email, skipping")
-                        continue
-
-                    # Track email for duplicate detection (case-insensitive)
-                    email_lower = email.lower()
-                    if email_lower in email_tracker:
-                        email_tracker[email_lower].append(row_num)
-                    else:
-                        email_tracker[email_lower] = [row_num]
-
-                    # Validate email format
-                    if not validate_email_format(email):
-                        invalid_emails.append((email, row_num))
-                        logger.warning(f"Row {row_num}: Invalid email format: {email}")
-
-                    display_name = row["User Display Name"].strip()
-                    first_name, last_name = parse_display_name(display_name)
-
-                    # Track users without display names
-                    if not display_name:
-                        users_without_names += 1
-
-                    active = parse_active_status(row["Employee Status"])
-
-                    # Parse pipe-separated LDAP DNs and extract CNs
-                    groups = []
-                    entitlements = row["Entitlement Display Name"].strip()
-                    if entitlements:
-                        dn_list = [dn.strip() for dn in entitlements.split("|")]
-                        for dn in dn_list:
-                            if dn:
-                                cn = extract_cn(dn)
-                                if cn:
-                                    groups.append(cn)
-                                    unique_groups.add(cn)
-
-                    # Track users without group assignments
-                    if not groups:
-                        users_without_groups += 1
-
-                    user = User(
-                        email=email,
-                        display_name=display_name,
-                        first_name=first_name,
-                        last_name=last_name,
-                        active=active,
-                        groups=groups,
-                    )
-                    users.append(user)
+        Args:
+            source: Normalized input records (CSV, NDJSON, Parquet, ...)
 
-                except Exception as e:
-                    logger.error(f"Row {row_num}: Failed to parse user - {e}")
-                    raise ValueError(f"Row {row_num}: {e}") from e
+        Returns:
+            CSVValidationResult with parsed users and validation warnings
 
-        logger.info(f"Parsed {len(users)} users from {csv_path}")
+        Raises:
+            ValueError: If required columns are missing or a record is invalid
+        """
+        self.validate_header(source.fieldnames)
 
-        # Identify duplicate emails (only those that appear more than once)
-        duplicate_emails = {
-            email: rows for email, rows in email_tracker.items() if len(rows) > 1
-        }
+        accumulator = UserRowAccumulator()
+        for record in source.records():
+            try:
+                accumulator.add_row(*record)
+            except CSVRowError as e:
+                logger.error("Row %s: Failed to parse user - %s", e.row_num, e.cause)
+                raise
 
-        # Count active/inactive users
-        active_count = sum(1 for u in users if u.active)
-        inactive_count = len(users) - active_count
+        return accumulator.result()
 
-        return CSVValidationResult(
-            users=users,
-            total_count=len(users),
-            active_count=active_count,
-            inactive_count=inactive_count,
-            duplicate_emails=duplicate_emails,
-            invalid_emails=invalid_emails,
-            users_without_groups=users_without_groups,
-            users_without_names=users_without_names,
-            unique_groups=unique_groups,
-        )
+    @classmethod
+    def validate_header(cls, fieldnames: Sequence[str] | None) -> None:
+        """Check that a CSV header contains the required columns.
+
+        Args:
+            fieldnames: Column names from the CSV header
+
+        Raises:
+            ValueError: If the header is empty or required columns are missing
+        """
+        if not fieldnames:
+            raise ValueError("CSV file is empty or has no header row")
+
+        missing_columns = cls.REQUIRED_COLUMNS - set(fieldnames)
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {missing_columns}")
 
     def fetch_existing_users(self) -> Dict[str, Dict]:
         """Fetch users from F5 XC, return email -> user_data map.
@@ -259,11 +455,11 @@ class UserSyncService:
 
         if "items" in response:
             for user_data in response["items"]:
-                email = user_data.get("email", "").lower()
+                email = email_key(user_data.get("email") or "")
                 if email:
                     users_map[email] = user_data
 
-        logger.info(f"Fetched {len(users_map)} existing users from F5 XC")
+        logger.info("Fetched %d existing users from F5 XC", len(users_map))
         return users_map
 
     def sync_users(
@@ -283,36 +479,162 @@ class UserSyncService:
 
         Returns:
             UserSyncStats with operation counts and error details
+
+        Raises:
+            PruneLimitExceeded: If more than ``max_prune_percent`` of the
+                existing users would be deleted (nothing is changed)
         """
         stats = UserSyncStats()
 
-        # Build set of planned emails (lowercase for comparison)
-        planned_emails = {user.email.lower() for user in planned_users}
+        # Creates and updates in CSV order, then deletions
+        operations = self.plan_operations(
+            planned_users, existing_users, delete_users, stats
+        )
+        deletes = [op.key for op in operations if op.action == "delete"]
+        if deletes:
+            check_prune_limit(
+                "users", len(deletes), len(existing_users), self.max_prune_percent
+            )
+            operations = [op for op in operations if op.action != "delete"]
+        pending: Iterable[Operation] = operations
+        if self.progress is not None:
+            pending = self.progress.track(operations, "Users")
+        for op in pending:
+            self.apply_operation(op, dry_run, stats)
+        self._delete_users(deletes, dry_run, stats)
+
+        logger.info("Sync complete: %s", stats.summary())
+        return stats
 
-        # Process planned users: create or update
-        for user in planned_users:
-            email_lower = user.email.lower()
+    def plan_operations(
+        self,
+        planned_users: List[User],
+        existing_users: Dict[str, Dict],
+        delete_users: bool = False,
+        stats: UserSyncStats | None = None,
+    ) -> List[Operation]:
+        """Plan the user writes a sync would make, without making them.
 
-            if email_lower not in existing_users:
+        Deactivating an active user and deleting users are ``REVOKE``
+        operations; creates and other updates are ``ADD``.
+
+        Args:
+            planned_users: Desired user state from CSV
+            existing_users: Current user state from F5 XC
+            delete_users: If True, plan deletion of F5 XC users not in CSV
+            stats: If given, unchanged users are counted here
+
+        Returns:
+            Operations in CSV order, followed by deletions
+        """
+        operations = []
+        planned_emails = set()
+        for user in planned_users:
+            key = user.email_key
+            planned_emails.add(key)
+            existing_user = existing_users.get(key)
+            if existing_user is None:
                 # User doesn't exist - create it
-                self._create_user(user, dry_run, stats)
-            else:
-                # User exists - check if update needed
-                existing_user = existing_users[email_lower]
-                if self._user_needs_update(user, existing_user):
-                    self._update_user(user, dry_run, stats)
+                debug_entity(logger, key, "User %s not in F5 XC", user.email)
+                operations.append(
+                    Operation(ADD, "user", "create", user.email, subject=user)
+                )
+            elif self._user_needs_update(user, existing_user):
+                if tracing(logger, key):
+                    debug_entity(
+                        logger,
+                        key,
+                        "User %s differs in: %s",
+                        user.email,
+                        ", ".join(self.user_differences(user, existing_user)),
+                    )
+                if not user.active and existing_user.get("active", True):
+                    operations.append(
+                        Operation(
+                            REVOKE, "user", "deactivate", user.email, subject=user
+                        )
+                    )
                 else:
-                    logger.debug(f"User unchanged: {user.email}")
+                    operations.append(
+                        Operation(ADD, "user", "update", user.email, subject=user)
+                    )
+            else:
+                debug_entity(logger, key, "User unchanged: %s", user.email)
+                if stats is not None:
                     stats.unchanged += 1
 
         # Delete users in F5 XC that are not in CSV (if enabled)
         if delete_users:
             for email_lower in existing_users:
-                if email_lower not in planned_emails:
-                    self._delete_user(email_lower, dry_run, stats)
+                if email_key(email_lower) not in planned_emails:
+                    operations.append(Operation(REVOKE, "user", "delete", email_lower))
+        return operations
 
-        logger.info(f"Sync complete: {stats.summary()}")
-        return stats
+    def apply_operation(
+        self, op: Operation, dry_run: bool, stats: UserSyncStats
+    ) -> None:
+        """Perform one planned user operation, recording the outcome in stats.
+
+        Args:
+            op: Operation from ``plan_operations`` (or a leftover plan)
+            dry_run: If True, log without executing
+            stats: Stats object to update
+        """
+        if op.action == "delete":
+            self._delete_user(op.key, dry_run, stats)
+            return
+        user = op.subject if op.subject is not None else User(**op.payload)
+        if op.action == "create":
+            self._create_user(user, dry_run, stats)
+        elif self._known_missing(user.email):
+            debug_entity(
+                logger,
+                user.email,
+                "User %s known to have no roles entry - skipping role update",
+                user.email,
+            )
+            stats.skipped_known_missing += 1
+        else:
+            self._update_user(user, dry_run, stats)
+
+    def users_to_touch(
+        self,
+        planned_users: List[User],
+        existing_users: Dict[str, Dict],
+        delete_users: bool = False,
+    ) -> List[str]:
+        """Emails of users a sync would create, update or delete.
+
+        Used to refresh only those users when ``existing_users`` came from
+        a possibly stale cache. Updates the negative cache would skip are
+        left out.
+
+        Args:
+            planned_users: Desired user state from CSV
+            existing_users: Current user state, keyed by lowercase email
+            delete_users: Include users that would be deleted
+
+        Returns:
+            Sorted lowercase emails
+        """
+        touched = set()
+        planned_emails = set()
+        for user in planned_users:
+            key = user.email_key
+            planned_emails.add(key)
+            existing = existing_users.get(key)
+            if existing is None or (
+                self._user_needs_update(user, existing)
+                and not self._known_missing(user.email)
+            ):
+                touched.add(key)
+        if delete_users:
+            touched.update(e for e in existing_users if e not in planned_emails)
+        return sorted(touched)
+
+    def _known_missing(self, email: str) -> bool:
+        """Check the negative cache for a user without a user_roles entry."""
+        return self.missing_roles is not None and email in self.missing_roles
 
     def _user_needs_update(self, planned: User, existing: Dict) -> bool:
         """Check if user attributes differ between planned and existing state.
@@ -324,21 +646,34 @@ class UserSyncService:
         Returns:
             True if any attributes differ and update is needed
         """
+        return bool(self.user_differences(planned, existing))
+
+    @staticmethod
+    def user_differences(planned: User, existing: Dict) -> List[str]:
+        """Names of the attributes that differ between planned and existing state.
+
+        Args:
+            planned: Desired user state from CSV
+            existing: Current user state from F5 XC
+
+        Returns:
+            Differing attribute names, in a fixed order ("groups" last)
+        """
         # Compare all relevant attributes
         planned_dict = planned.model_dump()
-
-        # Check each attribute for differences
-        for key in ["display_name", "first_name", "last_name", "active"]:
-            if planned_dict.get(key) != existing.get(key):
-                return True
+        differences = [
+            key
+            for key in ["display_name", "first_name", "last_name", "active"]
+            if planned_dict.get(key) != existing.get(key)
+        ]
 
         # Compare groups (order-independent)
         planned_groups = set(planned_dict.get("groups", []))
         existing_groups = set(existing.get("groups", []))
         if planned_groups != existing_groups:
-            return True
+            differences.append("groups")
 
-        return False
+        return differences
 
     def _create_user(self, user: User, dry_run: bool, stats: UserSyncStats) -> None:
         """Create a new user in F5 XC.
@@ -350,20 +685,13 @@ class UserSyncService:
         """
         try:
             if dry_run:
-                logger.info(f"[DRY-RUN] Would create user: {user.email}")
+                logger.info("[DRY-RUN] Would create user: %s", user.email, extra=DETAIL)
             else:
-                # Only send fields that the F5 XC API expects for user creation
-                # Specify VOLTERRA_MANAGED to create local users (not SSO)
-                user_data = {
-                    "email": user.email,
-                    "name": user.username or user.email,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "type": "USER",
-                    "idm_type": "VOLTERRA_MANAGED",
-                }
+                user_data = user_create_body(
+                    user.email, user.username, user.first_name, user.last_name
+                )
                 self.repository.create_user(user_data)
-                logger.info(f"Created user: {user.email}")
+                logger.info("Created user: %s", user.email, extra=DETAIL)
             stats.created += 1
         except Exception as e:
             # Log detailed error information for debugging
@@ -372,13 +700,15 @@ class UserSyncService:
                 try:
                     error_detail = e.response.text
                     logger.error(
-                        f"Failed to create user {user.email}: "
-                        f"{error_msg}, Response: {error_detail}"
+                        "Failed to create user %s: %s, Response: %s",
+                        user.email,
+                        error_msg,
+                        error_detail,
                     )
                 except Exception:
-                    logger.error(f"Failed to create user {user.email}: {error_msg}")
+                    logger.error("Failed to create user %s: %s", user.email, error_msg)
             else:
-                logger.error(f"Failed to create user {user.email}: {error_msg}")
+                logger.error("Failed to create user %s: %s", user.email, error_msg)
             stats.errors += 1
             stats.error_details.append(
                 {"email": user.email, "operation": "create", "error": str(e)}
@@ -388,7 +718,8 @@ class UserSyncService:
         """Update an existing user in F5 XC.
 
         If user_roles entry doesn't exist (404), skips the update since the user
-        exists in the system and groups can still be managed.
+        exists in the system and groups can still be managed. The 404 is
+        recorded in the negative cache, if one is configured.
 
         Args:
             user: User with updated data
@@ -397,27 +728,31 @@ class UserSyncService:
         """
         try:
             if dry_run:
-                logger.info(f"[DRY-RUN] Would update user: {user.email}")
+                logger.info("[DRY-RUN] Would update user: %s", user.email, extra=DETAIL)
                 stats.updated += 1
             else:
                 user_data = user.model_dump()
                 try:
                     self.repository.update_user(user.email, user_data)
-                    logger.info(f"Updated user: {user.email}")
+                    logger.info("Updated user: %s", user.email, extra=DETAIL)
                     stats.updated += 1
                 except Exception as update_err:
                     # If 404, user exists but doesn't have roles entry
                     # This is OK - user exists and can still be added to groups
                     if "404" in str(update_err):
                         logger.info(
-                            f"User {user.email} exists but has no roles entry "
-                            "(likely managed elsewhere) - skipping role update"
+                            "User %s exists but has no roles entry "
+                            "(likely managed elsewhere) - skipping role update",
+                            user.email,
+                            extra=DETAIL,
                         )
+                        if self.missing_roles is not None:
+                            self.missing_roles.add(user.email)
                         stats.unchanged += 1
                     else:
                         raise
         except Exception as e:
-            logger.error(f"Failed to update user {user.email}: {e}")
+            logger.error("Failed to update user %s: %s", user.email, e)
             stats.errors += 1
             stats.error_details.append(
                 {"email": user.email, "operation": "update", "error": str(e)}
@@ -433,18 +768,50 @@ class UserSyncService:
         """
         try:
             if dry_run:
-                logger.info(f"[DRY-RUN] Would delete user: {email}")
+                logger.info("[DRY-RUN] Would delete user: %s", email, extra=DETAIL)
             else:
                 self.repository.delete_user(email)
-                logger.info(f"Deleted user: {email}")
+                logger.info("Deleted user: %s", email, extra=DETAIL)
             stats.deleted += 1
         except Exception as e:
-            logger.error(f"Failed to delete user {email}: {e}")
+            logger.error("Failed to delete user %s: %s", email, e)
             stats.errors += 1
             stats.error_details.append(
                 {"email": email, "operation": "delete", "error": str(e)}
             )
 
+    def _delete_users(
+        self, emails: List[str], dry_run: bool, stats: UserSyncStats
+    ) -> None:
+        """Delete users concurrently, logging one summary line.
+
+        Args:
+            emails: Emails of users to delete
+            dry_run: If True, log without executing
+            stats: Stats object to update
+        """
+        if not emails:
+            return
+        if dry_run:
+            logger.info(
+                "[DRY-RUN] Would delete %d users: %s", len(emails), summarize(emails)
+            )
+            stats.deleted += len(emails)
+            return
+
+        deleted, failures = delete_all(
+            emails, self.repository.delete_user, self.executor
+        )
+        stats.deleted += len(deleted)
+        for email, e in failures.items():
+            logger.error("Failed to delete user %s: %s", email, e)
+            stats.errors += 1
+            stats.error_details.append(
+                {"email": email, "operation": "delete", "error": str(e)}
+            )
+        if deleted:
+            logger.info("Deleted %d users: %s", len(deleted), summarize(deleted))
+
     def cleanup_orphaned_users(
         self,
         planned_users: List["User"],
@@ -461,21 +828,24 @@ class UserSyncService:
         Returns:
             UserSyncStats with deletion results
 
+        Raises:
+            PruneLimitExceeded: If more than ``max_prune_percent`` of the
+                existing users would be deleted (nothing is deleted)
+
         """
         stats = UserSyncStats()
-        planned_emails = {u.email.lower() for u in planned_users}
+        planned_emails = {u.email_key for u in planned_users}
         extra_emails = [
             email
             for email in existing_users.keys()
-            if email.lower() not in planned_emails
+            if email_key(email) not in planned_emails
         ]
 
         if extra_emails:
-            logger.info(f"Extra users in XC not in CSV: {len(extra_emails)}")
-            for email in extra_emails:
-                logger.info(f" - {email}")
-
-            for email in extra_emails:
-                self._delete_user(email, dry_run, stats)
+            check_prune_limit(
+                "users", len(extra_emails), len(existing_users), self.max_prune_percent
+            )
+            logger.info("Extra users in XC not in CSV: %d", len(extra_emails))
+            self._delete_users(extra_emails, dry_run, stats)
 
         return stats
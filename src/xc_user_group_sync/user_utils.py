@@ -1,5 +1,68 @@
 """Utility functions for user data parsing and transformation."""
 
+import re
+import sys
+from typing import Dict
+
+# Simple RFC-compliant pattern used for the "invalid email format" warning
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+
+def email_key(email: str) -> str:
+    """Canonical form of an email used for lookups and duplicate detection.
+
+    Emails are compared case-insensitively everywhere (source rows, XC
+    listings, selections, prunes). Keys are interned, so the many
+    dictionaries keyed by them share one string per email. Parsed users
+    carry theirs as ``User.email_key``, computed once per distinct email.
+
+    Examples:
+        >>> email_key("  Alice@Example.com ")
+        'alice@example.com'
+    """
+    return sys.intern(email.strip().lower())
+
+
+def validate_email_format(email: str) -> bool:
+    """Validate email format using simple RFC-compliant pattern.
+
+    Args:
+        email: Email address to validate
+
+    Returns:
+        True if email format is valid, False otherwise
+    """
+    return EMAIL_PATTERN.match(email) is not None
+
+
+def user_create_body(
+    email: str, name: str = "", first_name: str = "", last_name: str = ""
+) -> Dict[str, str]:
+    """Request body creating a local (not SSO) F5 XC user.
+
+    Only the fields the user_roles create API expects are sent, whatever
+    else the caller knows about the user (a planned ``User``, an archived
+    listing item).
+
+    Args:
+        email: User's email address
+        name: Username (defaults to the email)
+        first_name: Given name
+        last_name: Family name
+
+    Returns:
+        JSON body for ``create_user``
+    """
+    return {
+        "email": email,
+        "name": name or email,
+        "first_name": first_name,
+        "last_name": last_name,
+        "type": "USER",
+        # VOLTERRA_MANAGED creates local users (not SSO)
+        "idm_type": "VOLTERRA_MANAGED",
+    }
+
 
 def parse_display_name(display_name: str) -> tuple[str, str]:
     """Parse display name into (first_name, last_name).
@@ -0,0 +1,142 @@
+"""Watch a source file or drop directory and report settled changes.
+
+Used by the CLI's ``--watch`` / ``--watch-dir`` mode, which keeps one process
+(and with it the XC session, the DN caches and an in-memory state snapshot)
+alive between syncs instead of paying start-up and full listings on every
+cron run.
+
+Changes are detected by polling ``os.stat``: a file counts as changed when its
+modification time or size differs from the last sync, and as settled once it
+has stayed the same for the debounce period, so a sync never reads an export
+that is still being written. In a drop directory the newest file is synced;
+hidden and temporary files (``.tmp``, ``.part``, ``~``) are ignored.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_DEBOUNCE = 5.0
+
+_TEMP_SUFFIXES = (".tmp", ".part", ".partial", ".swp", "~")
+
+# (path, mtime in ns, size) of the file a sync would read
+Snapshot = Tuple[str, int, int]
+
+
+def _stat(path: Path) -> Optional[Snapshot]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _is_candidate(entry: os.DirEntry) -> bool:
+    name = entry.name
+    return (
+        not name.startswith(".")
+        and not name.endswith(_TEMP_SUFFIXES)
+        and entry.is_file()
+    )
+
+
+def snapshot(path: str | Path) -> Optional[Snapshot]:
+    """Current state of a watched file, or of the newest file in a directory.
+
+    Args:
+        path: File or drop directory to inspect
+
+    Returns:
+        ``(file path, mtime_ns, size)``, or None if there is nothing to sync
+
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return _stat(path)
+    newest: Optional[Snapshot] = None
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not _is_candidate(entry):
+                continue
+            st = entry.stat()
+            if newest is None or st.st_mtime_ns > newest[1]:
+                newest = (entry.path, st.st_mtime_ns, st.st_size)
+    return newest
+
+
+class Watcher:
+    """Poll a file or drop directory and yield it once changes settle.
+
+    Example:
+        >>> for path in Watcher("exports/").changes():
+        ...     sync(path)
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        debounce: float = DEFAULT_DEBOUNCE,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Start watching.
+
+        A file present at start-up is reported by the first poll.
+
+        Args:
+            path: File or drop directory to watch
+            interval: Seconds between polls
+            debounce: Seconds a change must stay unchanged before it is reported
+            clock: Monotonic time source, in seconds
+            sleep: Sleep function (replaced in tests)
+
+        """
+        self.path = Path(path)
+        self.interval = interval
+        self.debounce = debounce
+        self.clock = clock
+        self.sleep = sleep
+        self._seen = snapshot(self.path)
+        self._changed_at = clock() - debounce
+        self._synced: Optional[Snapshot] = None
+
+    def poll(self) -> Optional[str]:
+        """Check once for a settled change.
+
+        Returns:
+            Path of the file to sync, or None if there is nothing new yet
+
+        """
+        current = snapshot(self.path)
+        now = self.clock()
+        if current != self._seen:
+            logger.debug("Change detected: %s", current)
+            self._seen = current
+            self._changed_at = now
+            return None
+        if (
+            current is None
+            or current == self._synced
+            or now - self._changed_at < self.debounce
+        ):
+            return None
+        self._synced = current
+        return current[0]
+
+    def changes(self) -> Iterator[str]:
+        """Yield the file to sync after each settled change, forever."""
+        while True:
+            path = self.poll()
+            if path is not None:
+                yield path
+            else:
+                self.sleep(self.interval)
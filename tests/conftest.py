@@ -2,12 +2,57 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict
+from typing import Any, Dict, List
 from unittest.mock import Mock, patch
 
 import pytest
 from requests import Response
 
+from benchmarks.fake_server import FakeXCServer
+
+
+class FakeClock:
+    """Manually advanced time source.
+
+    Tests advance it through ``now`` or ``sleep`` (which records the wait);
+    with a ``step``, every reading advances it as well.
+    """
+
+    def __init__(self, now: float = 0.0, step: float = 0.0) -> None:
+        self.now = now
+        self.step = step
+        self.sleeps: List[float] = []
+
+    def __call__(self) -> float:
+        self.now += self.step
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """Fake time source starting at zero."""
+    return FakeClock()
+
+
+@pytest.fixture
+def xc_server():
+    """Fake XC API server with an empty default tenant."""
+    with FakeXCServer() as server:
+        yield server
+
+
+@pytest.fixture
+def xc_env(xc_server, monkeypatch):
+    """Point the CLI at ``xc_server`` through its environment variables."""
+    monkeypatch.setenv("TENANT_ID", "acme")
+    monkeypatch.setenv("XC_API_TOKEN", "token")
+    monkeypatch.setenv("XC_API_URL", xc_server.url)
+    return xc_server
+
 
 @pytest.fixture
 def mock_response():
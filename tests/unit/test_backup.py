@@ -0,0 +1,359 @@
+"""Tests for backup, restore and warm start."""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from click.testing import CliRunner
+
+from xc_user_group_sync.backup import (
+    BackupError,
+    RateLimiter,
+    load_backup,
+    restore,
+    warm_start,
+    write_backup,
+)
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.client import XCClient
+from xc_user_group_sync.state_cache import (
+    GROUPS,
+    USERS,
+    CachingRepository,
+    StateCache,
+)
+
+GROUP_STATE = [
+    {"name": "admins", "usernames": ["alice@example.com"]},
+    {"name": "devs", "usernames": ["alice@example.com", "bob@example.com"]},
+]
+USER_STATE = [
+    {"email": "alice@example.com", "first_name": "Alice"},
+    {"email": "Bob@example.com", "first_name": "Bob"},
+]
+
+
+@pytest.fixture
+def server(xc_server):
+    xc_server.seed_state(groups=GROUP_STATE, users=USER_STATE)
+    return xc_server
+
+
+def _archive(server) -> bytes:
+    stream = io.BytesIO()
+    write_backup(stream, XCClient("acme", api_token="t", api_url=server.url), "acme")
+    return stream.getvalue()
+
+
+class TestArchive:
+    """Test writing and reading archives."""
+
+    def test_round_trip(self, server):
+        stream = io.BytesIO()
+        client = XCClient("acme", api_token="t", api_url=server.url)
+
+        counts = write_backup(stream, client, "acme", clock=lambda: 123.0)
+
+        assert counts == {USERS: 2, GROUPS: 2}
+        lines = gzip.decompress(stream.getvalue()).decode().splitlines()
+        assert json.loads(lines[0])["created"] == 123.0
+        # Users come first so restores can replay in order
+        assert [json.loads(line)["kind"] for line in lines[1:]] == [
+            USERS,
+            USERS,
+            GROUPS,
+            GROUPS,
+        ]
+
+        header, state = load_backup(io.BytesIO(stream.getvalue()))
+        assert header["tenant"] == "acme"
+        assert sorted(state[USERS]) == ["alice@example.com", "bob@example.com"]
+        assert state[GROUPS]["devs"]["usernames"] == GROUP_STATE[1]["usernames"]
+
+    @pytest.mark.parametrize(
+        "data, message",
+        [
+            (b"not gzip", "Not an XC state archive"),
+            (gzip.compress(b'{"format": "other"}\n'), "Not an XC state archive"),
+            (
+                gzip.compress(b'{"format": "xc-state", "version": 9}\n'),
+                "Unsupported archive version",
+            ),
+            (
+                gzip.compress(b'{"format": "xc-state", "version": 1}\n{"kind": 1}\n'),
+                "Invalid archive line 2",
+            ),
+        ],
+    )
+    def test_rejects_bad_archives(self, data, message):
+        with pytest.raises(BackupError, match=message):
+            load_backup(io.BytesIO(data))
+
+    def test_rejects_truncated_archive(self, server):
+        data = _archive(server)
+        with pytest.raises(BackupError, match="Truncated"):
+            load_backup(io.BytesIO(data[:-12]))
+
+
+class TestRateLimiter:
+    """Test the shared token bucket."""
+
+    def test_waits_for_tokens(self, clock):
+        limiter = RateLimiter(2, clock=clock, sleep=clock.sleep)
+
+        for _ in range(4):
+            limiter.acquire()
+
+        # Two calls from the full bucket, then one every half second
+        assert clock.sleeps == [0.5, 0.5]
+
+    def test_zero_rate_is_unlimited(self, clock):
+        limiter = RateLimiter(0, clock=clock, sleep=clock.sleep)
+        for _ in range(100):
+            limiter.acquire()
+        assert clock.sleeps == []
+
+
+class TestRestore:
+    """Test replaying an archive."""
+
+    def test_recreates_and_updates_without_deleting(self, server):
+        _, state = load_backup(io.BytesIO(_archive(server)))
+        # A bad sync: bob and admins were deleted, devs lost a member,
+        # a new user appeared
+        del server.users["bob@example.com"]
+        del server.groups["admins"]
+        server.groups["devs"]["usernames"] = ["alice@example.com"]
+        server.users["new@example.com"] = {"email": "new@example.com"}
+        server.requests.clear()
+        client = XCClient("acme", api_token="t", api_url=server.url)
+
+        with ThreadPoolExecutor(4) as executor:
+            stats = restore(state, client, executor=executor, limiter=RateLimiter(0))
+
+        assert (stats.created, stats.updated, stats.unchanged) == (2, 1, 1)
+        assert stats.errors == 0
+        assert sorted(server.groups) == ["admins", "devs"]
+        assert server.groups["devs"]["usernames"] == GROUP_STATE[1]["usernames"]
+        assert "bob@example.com" in server.users
+        assert "new@example.com" in server.users
+        assert "DELETE" not in server.requests
+
+    def test_runs_concurrently(self):
+        started = threading.Barrier(3, timeout=5)
+
+        class Repository:
+            def list_users(self, namespace):
+                return {"items": []}
+
+            def list_groups(self, namespace):
+                return {"user_groups": []}
+
+            def create_user(self, user, namespace):
+                started.wait()  # only passes if three creates run at once
+
+        state = {
+            USERS: {
+                f"u{i}@example.com": {"email": f"u{i}@example.com"} for i in range(3)
+            },
+            GROUPS: {},
+        }
+        with ThreadPoolExecutor(3) as executor:
+            stats = restore(state, Repository(), executor=executor)
+
+        assert stats.created == 3
+
+    def test_dry_run_and_failures(self):
+        class Repository:
+            def list_users(self, namespace):
+                return {"items": [{"email": "a@example.com", "first_name": "Old"}]}
+
+            def list_groups(self, namespace):
+                return {"user_groups": []}
+
+            def update_user(self, email, user, namespace):
+                raise RuntimeError("boom")
+
+        state = {
+            USERS: {"a@example.com": {"email": "a@example.com", "first_name": "A"}},
+            GROUPS: {"g": {"name": "g"}},
+        }
+
+        stats = restore(state, Repository(), dry_run=True)
+        assert (stats.created, stats.updated, stats.errors) == (1, 1, 0)
+
+        stats = restore({USERS: state[USERS], GROUPS: {}}, Repository())
+        assert stats.errors == 1
+        assert stats.error_details[0]["key"] == "a@example.com"
+
+    def test_users_are_created_with_the_sync_body(self):
+        """Archived listing items are not sent back as create bodies."""
+        created = []
+
+        class Repository:
+            def list_users(self, namespace):
+                return {"items": []}
+
+            def list_groups(self, namespace):
+                return {"user_groups": []}
+
+            def create_user(self, user, namespace):
+                created.append(user)
+
+        item = {
+            "email": "Bob@example.com",
+            "name": "bob",
+            "first_name": "Bob",
+            "last_name": "B",
+            "namespace": "system",
+            "groups": ["admins"],
+            "group_names": ["admins"],
+        }
+        restore({USERS: {"bob@example.com": item}, GROUPS: {}}, Repository())
+
+        assert created == [
+            {
+                "email": "Bob@example.com",
+                "name": "bob",
+                "first_name": "Bob",
+                "last_name": "B",
+                "type": "USER",
+                "idm_type": "VOLTERRA_MANAGED",
+            }
+        ]
+
+
+def test_warm_start_serves_listings_without_requests(server):
+    _, state = load_backup(io.BytesIO(_archive(server)))
+    client = XCClient("acme", api_token="t", api_url=server.url)
+    repository = CachingRepository(client, StateCache(":memory:"))
+    server.requests.clear()
+
+    warm_start(repository, state)
+
+    assert len(repository.list_users()["items"]) == 2
+    assert len(repository.list_groups()["user_groups"]) == 2
+    assert repository.served_from_cache(USERS)
+    assert not server.requests
+
+
+def test_warm_start_ages_listings_from_the_archive(server):
+    _, state = load_backup(io.BytesIO(_archive(server)))
+    client = XCClient("acme", api_token="t", api_url=server.url)
+    repository = CachingRepository(client, StateCache(":memory:"), ttl=3600)
+    server.requests.clear()
+
+    # A day-old archive is past the TTL: the listing is fetched from XC
+    warm_start(repository, state, created=time.time() - 86400)
+
+    repository.list_users()
+    assert not repository.served_from_cache(USERS)
+    assert server.requests["GET"] == 1
+
+
+def test_cli_backup_and_restore_bypass_state_cache(server, xc_env, tmp_path):
+    """With --state-cache, backups and restores still read XC itself."""
+    cache = str(tmp_path / "state.db")
+    snapshot = str(tmp_path / "snap.ndjson.gz")
+    runner = CliRunner()
+    assert (
+        runner.invoke(cli, ["--backup", snapshot, "--state-cache", cache]).exit_code
+        == 0
+    )
+    # Fill the cache, then change XC behind its back
+    repository = CachingRepository(
+        XCClient("acme", api_token="t", api_url=server.url), StateCache(cache)
+    )
+    repository.list_users()
+    repository.list_groups()
+    server.groups["devs"]["usernames"] = ["alice@example.com"]
+
+    result = runner.invoke(cli, ["--restore", snapshot, "--state-cache", cache])
+
+    assert result.exit_code == 0, result.output
+    assert "Restored: created=0, updated=1" in result.output
+    assert server.groups["devs"]["usernames"] == GROUP_STATE[1]["usernames"]
+
+    server.users["new@example.com"] = {"email": "new@example.com"}
+    result = runner.invoke(cli, ["--backup", snapshot, "--state-cache", cache])
+    assert "Backed up 3 users" in result.output
+
+
+def test_cli_backup_prune_and_restore(server, xc_env, tmp_path, monkeypatch):
+    """A snapshot taken before a bad prune brings the tenant back."""
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(
+        "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+        "alice@example.com,Alice A,A,CN=ADMINS,DC=example\n"
+    )
+    snapshot = tmp_path / "before.ndjson.gz"
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli,
+        ["--csv", str(csv_file), "--prune", "--backup", str(snapshot)]
+        + ["--max-prune-percent", "100"],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Backed up 2 users and 2 groups" in result.output
+    assert sorted(server.groups) == ["admins"]
+
+    result = runner.invoke(cli, ["--restore", str(snapshot), "--restore-rate", "0"])
+    assert result.exit_code == 0, result.output
+    assert "Restored: created=2, updated=1" in result.output
+    assert sorted(server.groups) == ["admins", "devs"]
+    assert "bob@example.com" in server.users
+
+    # Plans against the snapshot instead of listing XC
+    server.requests.clear()
+    result = runner.invoke(
+        cli, ["--csv", str(csv_file), "--warm-start", str(snapshot), "--dry-run"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Planning against snapshot" in result.output
+
+    monkeypatch.setenv("TENANT_ID", "other")
+    result = runner.invoke(cli, ["--restore", str(snapshot)])
+    assert result.exit_code == 1
+    assert "is of tenant 'acme'" in result.output
+
+
+def test_cli_restore_api_error(server, xc_env, tmp_path, monkeypatch):
+    """API errors while restoring are reported as such."""
+    snapshot = str(tmp_path / "snap.ndjson.gz")
+    runner = CliRunner()
+    assert runner.invoke(cli, ["--backup", snapshot]).exit_code == 0
+
+    def unreachable(*args, **kwargs):
+        raise requests.ConnectionError("connection refused")
+
+    monkeypatch.setattr("xc_user_group_sync.cli.restore", unreachable)
+    result = runner.invoke(cli, ["--restore", snapshot])
+
+    assert result.exit_code == 1
+    assert f"API error restoring XC state from {snapshot}" in result.output
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--restore", "snap.gz", "--csv", "users.csv"],
+        ["--backup", "snap.gz", "--serve", "0"],
+        ["--restore", "snap.gz", "--warm-start", "snap.gz"],
+    ],
+)
+def test_backup_option_conflicts(tmp_path, monkeypatch, args):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "users.csv").write_text("Email\n")
+    (tmp_path / "snap.gz").write_bytes(b"")
+
+    result = CliRunner().invoke(cli, args)
+
+    assert result.exit_code == 2
@@ -0,0 +1,168 @@
+"""Tests for the benchmark CSV generator and runner."""
+
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+
+from benchmarks.csv_generator import HR_COLUMNS, GeneratorConfig, write_hr_csv
+from benchmarks.gate import BASELINE_PATH, TRACKED_METRICS, compare
+from benchmarks.gate import main as gate_main
+from benchmarks.runner import parse_size, run_suite
+from xc_user_group_sync.sync_service import GroupSyncService
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+
+class TestCSVGenerator:
+    """Test synthetic HR export generation."""
+
+    def test_header_matches_sample_export(self):
+        """Generated header matches User-Database.csv column for column."""
+        sample = Path(__file__).parents[2] / "User-Database.csv"
+        with open(sample, encoding="utf-8-sig") as f:
+            sample_header = next(csv.reader(f))
+        assert HR_COLUMNS == sample_header
+
+    def test_rows_and_memberships(self, tmp_path):
+        """One row per user per entitlement, parsed by both services."""
+        path = tmp_path / "hr.csv"
+        config = GeneratorConfig(users=20, groups=5, memberships_per_user=2)
+        written = write_hr_csv(path, config)
+
+        assert written == 40
+        assert path.read_bytes().startswith(b"\xef\xbb\xbf")
+        groups = GroupSyncService(None).parse_csv_to_groups(str(path))
+        assert sum(len(g.users) for g in groups) == 40
+        result = UserSyncService(None).parse_csv_to_users(str(path))
+        # Rows of one user are merged
+        assert result.total_count == 20
+        assert sum(len(u.groups) for u in result.users) == 40
+
+    def test_duplicates_and_invalid_dns(self, tmp_path):
+        """Duplicate rows are emitted and invalid DNs are skipped by group parse."""
+        path = tmp_path / "hr.csv"
+        config = GeneratorConfig(
+            users=200, groups=10, duplicate_rate=0.5, invalid_dn_rate=0.5, seed=1
+        )
+        written = write_hr_csv(path, config)
+
+        assert written > 200
+        groups = GroupSyncService(None).parse_csv_to_groups(str(path))
+        members = {e for g in groups for e in g.users}
+        assert 0 < len(members) < 200
+
+    def test_for_rows_and_parse_size(self):
+        """Row targets translate into user counts."""
+        config = GeneratorConfig.for_rows(parse_size("1k"), memberships_per_user=4)
+        assert config.users == 250
+        assert config.rows == 1000
+        assert parse_size("100k") == 100_000
+        assert parse_size("2.5m") == 2_500_000
+        assert parse_size("42") == 42
+
+
+class TestRunner:
+    """Test the benchmark runner end to end at a tiny size."""
+
+    def test_run_suite_in_process(self):
+        """Every case produces a result keyed by case and size."""
+        document = run_suite(["50"], isolate=False)
+
+        assert set(document["results"]) == {
+            "parse_groups@50",
+            "parse_users@50",
+            "diff@50",
+            "e2e@50",
+        }
+        e2e = document["results"]["e2e@50"]
+        assert e2e["errors"] == 0
+        assert e2e["operations"] > 50
+        assert all(r["peak_rss_mb"] > 0 for r in document["results"].values())
+        assert document["machine"]["cpu_count"] >= 1
+
+
+class TestGate:
+    """Test baseline comparison in the regression gate."""
+
+    BASELINE = {
+        "results": {
+            "parse_users@1k": {
+                "benchmark": "parse_users",
+                "rows_per_sec": 1000.0,
+                "peak_rss_mb": 100.0,
+            },
+            "diff@1k": {"benchmark": "diff", "seconds": 1.0, "peak_rss_mb": 100.0},
+        },
+        "tolerances": {"peak_rss_mb": 0.1},
+    }
+
+    def _current(self, rows_per_sec=1000.0, seconds=1.0, rss=100.0):
+        return {
+            "results": {
+                "parse_users@1k": {"rows_per_sec": rows_per_sec, "peak_rss_mb": rss},
+                "diff@1k": {"seconds": seconds, "peak_rss_mb": rss},
+            }
+        }
+
+    def test_within_budget(self):
+        """Small noise stays within the default tolerances."""
+        checks = compare(self.BASELINE, self._current(rows_per_sec=800, seconds=1.4))
+        assert len(checks) == 4
+        assert all(c.passed for c in checks)
+
+    def test_regressions_fail(self):
+        """Throughput drops, slower diffs and RSS growth are all caught."""
+        checks = compare(
+            self.BASELINE, self._current(rows_per_sec=500, seconds=2.0, rss=120)
+        )
+        failed = {(c.case, c.metric) for c in checks if not c.passed}
+        assert failed == {
+            ("parse_users@1k", "rows_per_sec"),
+            ("parse_users@1k", "peak_rss_mb"),
+            ("diff@1k", "seconds"),
+            ("diff@1k", "peak_rss_mb"),
+        }
+
+    def test_missing_case_and_override(self):
+        """Missing results fail; a tolerance override applies to every metric."""
+        checks = compare(self.BASELINE, {"results": {}})
+        assert not any(c.passed for c in checks)
+        assert "missing" in checks[0].describe()
+
+        checks = compare(self.BASELINE, self._current(rss=140), tolerance=0.5)
+        assert all(c.passed for c in checks)
+
+    def test_main_exit_codes(self, tmp_path, capsys):
+        """The CLI returns 1 on regression and 0 when budgets are met."""
+        baseline = tmp_path / "baseline.json"
+        results = tmp_path / "results.json"
+        baseline.write_text(json.dumps(self.BASELINE))
+
+        results.write_text(json.dumps(self._current()))
+        assert gate_main(["--baseline", str(baseline), "--results", str(results)]) == 0
+
+        results.write_text(json.dumps(self._current(rows_per_sec=10)))
+        assert gate_main(["--baseline", str(baseline), "--results", str(results)]) == 1
+        assert "budgets exceeded" in capsys.readouterr().out
+
+    def test_other_machine_gates_memory_only(self, tmp_path, capsys):
+        """Timings from another host are not compared against the baseline."""
+        baseline = tmp_path / "baseline.json"
+        results = tmp_path / "results.json"
+        baseline.write_text(json.dumps({**self.BASELINE, "machine": {"cpu": "a"}}))
+        current = {**self._current(rows_per_sec=10), "machine": {"cpu": "b"}}
+        results.write_text(json.dumps(current))
+
+        assert gate_main(["--baseline", str(baseline), "--results", str(results)]) == 0
+        assert "peak RSS only" in capsys.readouterr().out
+        checks = compare(self.BASELINE, current, timings=False)
+        assert {c.metric for c in checks} == {"peak_rss_mb"}
+
+    def test_committed_baseline_is_complete(self):
+        """The committed baseline tracks every case it was generated with."""
+        baseline = json.loads(BASELINE_PATH.read_text())
+        assert baseline["options"]["sizes"]
+        assert baseline["python"] and baseline["machine"]["cpu"]
+        for case in baseline["results"]:
+            assert case.split("@")[0] in TRACKED_METRICS
@@ -0,0 +1,94 @@
+"""Tests for the column-projected, memory-mapped CSV reader."""
+
+from __future__ import annotations
+
+import pytest
+
+from xc_user_group_sync import csv_reader
+from xc_user_group_sync.csv_reader import ProjectedCSVReader
+
+
+@pytest.fixture
+def hr_csv(tmp_path):
+    """HR-style export with a BOM, extra columns and a multi-line field."""
+    path = tmp_path / "hr.csv"
+    path.write_bytes(
+        b"\xef\xbb\xbf"
+        b'"User Name","Email","Job Title","Entitlement Display Name"\n'
+        b'"alice","alice@example.com","Engineer","CN=A,DC=example,DC=com"\n'
+        b"\n"
+        b'"bob","bob@example.com","Line one\nline two","CN=B,DC=example,DC=com"\n'
+        b'"carol","carol@example.com"\n'
+    )
+    return str(path)
+
+
+class TestProjectedCSVReader:
+    """Test header handling and column projection."""
+
+    def test_bom_is_stripped_from_header(self, hr_csv):
+        """The first column name does not carry the UTF-8 BOM."""
+        with ProjectedCSVReader(hr_csv) as reader:
+            assert reader.fieldnames[0] == "User Name"
+            assert reader.column_indices(["User Name", "Email"]) == [0, 1]
+
+    def test_project_yields_tuples_in_requested_order(self, hr_csv):
+        """Only the requested columns are returned; blank lines are skipped."""
+        with ProjectedCSVReader(hr_csv) as reader:
+            rows = list(reader.project(["Entitlement Display Name", "Email"]))
+
+        assert rows == [
+            ("CN=A,DC=example,DC=com", "alice@example.com"),
+            ("CN=B,DC=example,DC=com", "bob@example.com"),
+            (None, "carol@example.com"),
+        ]
+
+    def test_single_column(self, hr_csv):
+        """Projecting one column still yields 1-tuples."""
+        with ProjectedCSVReader(hr_csv) as reader:
+            assert next(reader.project(["Job Title"])) == ("Engineer",)
+
+    def test_unknown_column(self, hr_csv):
+        """Asking for a column that is not in the header raises KeyError."""
+        with ProjectedCSVReader(hr_csv) as reader:
+            with pytest.raises(KeyError, match="Cost Center"):
+                reader.column_indices(["Email", "Cost Center"])
+
+    def test_byte_range_with_fieldnames(self, hr_csv):
+        """A range after the header is read with the given field names."""
+        data = open(hr_csv, "rb").read()
+        start = data.index(b'"bob"')
+        end = data.index(b'"carol"')
+
+        with ProjectedCSVReader(hr_csv) as reader:
+            fieldnames = reader.fieldnames
+        with ProjectedCSVReader(
+            hr_csv, byte_range=(start, end), fieldnames=fieldnames
+        ) as reader:
+            assert list(reader.project(["User Name", "Job Title"])) == [
+                ("bob", "Line one\nline two")
+            ]
+
+    def test_empty_file(self, tmp_path):
+        """An empty file has no header and no rows."""
+        path = tmp_path / "empty.csv"
+        path.write_text("")
+        with ProjectedCSVReader(str(path)) as reader:
+            assert reader.fieldnames is None
+            assert list(reader.project([])) == []
+
+    def test_pages_released_while_reading(self, tmp_path, monkeypatch):
+        """Consumed pages are released without affecting the rows read."""
+        monkeypatch.setattr(csv_reader, "_BUFFER_SIZE", 4096)
+        monkeypatch.setattr(csv_reader, "_RELEASE_BYTES", 4096)
+        path = tmp_path / "big.csv"
+        path.write_text(
+            "Email,Note\n"
+            + "".join(f"user{i}@example.com,{'x' * 50}\n" for i in range(2000))
+        )
+
+        with ProjectedCSVReader(str(path)) as reader:
+            emails = [email for (email,) in reader.project(["Email"])]
+
+        assert len(emails) == 2000
+        assert emails[-1] == "user1999@example.com"
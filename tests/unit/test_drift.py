@@ -0,0 +1,151 @@
+"""Tests for the drift report."""
+
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.drift import DriftWriter, iter_drift
+from xc_user_group_sync.sources import SOURCE_COLUMNS, SourceRecord
+
+
+class ListSource:
+    """Record source over preset rows."""
+
+    fieldnames = SOURCE_COLUMNS
+
+    def __init__(self, rows):
+        self.rows = [SourceRecord(i + 2, *row) for i, row in enumerate(rows)]
+
+    def records(self):
+        yield from self.rows
+
+
+ROWS = [
+    ("alice@example.com", "Alice A", "A", "CN=ADMINS,DC=example"),
+    ("Bob@example.com", "Bob B", "A", "CN=ADMINS,DC=example"),
+    ("bob@example.com", "Bobby B", "A", "CN=DEVS,DC=example"),
+    ("carol@example.com", "Carol C", "T", "CN=DEVS,DC=example"),
+]
+USERS = {
+    "alice@example.com": {
+        "display_name": "Alice A",
+        "first_name": "Alice",
+        "last_name": "A",
+        "active": True,
+        "groups": ["ADMINS"],
+    },
+    "carol@example.com": {
+        "display_name": "Carol C",
+        "first_name": "Carol",
+        "last_name": "C",
+        "active": True,
+        "groups": ["OPS"],
+    },
+    "gone@example.com": {},
+}
+GROUPS = {
+    "admins": {"name": "admins", "usernames": ["alice@example.com", "x@example.com"]},
+    "old": {"name": "old", "usernames": []},
+}
+
+
+class TestIterDrift:
+    """Test which differences are reported."""
+
+    def test_reports_each_difference(self):
+        records = list(iter_drift(ListSource(ROWS), USERS, GROUPS))
+
+        assert [(r["kind"], r["key"], r["attribute"]) for r in records] == [
+            ("missing_user", "bob@example.com", None),
+            ("user_attribute", "carol@example.com", "active"),
+            ("user_attribute", "carol@example.com", "groups"),
+            ("extra_user", "gone@example.com", None),
+            ("missing_member", "admins", "member"),
+            ("extra_member", "admins", "member"),
+            ("missing_group", "devs", "members"),
+            ("extra_group", "old", None),
+        ]
+        assert records[1]["source"] is False and records[1]["xc"] is True
+        assert records[2]["source"] == ["DEVS"] and records[2]["xc"] == ["OPS"]
+        # Members are compared as the source spells them, like the sync does
+        assert records[4]["source"] == "Bob@example.com"
+        assert records[5]["xc"] == "x@example.com"
+        assert records[6]["source"] == 2
+
+    def test_missing_columns(self):
+        source = ListSource([])
+        source.fieldnames = ["Email"]
+        with pytest.raises(ValueError, match="Missing required columns"):
+            list(iter_drift(source, {}, {}))
+
+
+class TestDriftWriter:
+    """Test the output formats."""
+
+    def test_csv_flattens_lists(self):
+        stream = io.StringIO()
+        writer = DriftWriter(stream, "csv")
+        writer.write(
+            {
+                "kind": "user_attribute",
+                "key": "a@example.com",
+                "attribute": "groups",
+                "source": ["A", "B"],
+                "xc": None,
+            }
+        )
+
+        assert stream.getvalue().splitlines() == [
+            "kind,key,attribute,source,xc",
+            "user_attribute,a@example.com,groups,A|B,",
+        ]
+        assert writer.summary() == "Drift: user_attribute=1"
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            DriftWriter(io.StringIO(), "xml")
+
+
+def test_cli_drift_report_is_read_only(xc_env, tmp_path):
+    """The report mode only lists XC state and writes NDJSON or CSV."""
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(
+        "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+        "alice@example.com,Alice A,A,CN=ADMINS,DC=example\n"
+        "bob@example.com,Bob B,A,CN=ADMINS,DC=example\n"
+    )
+    xc_env.seed_state(
+        groups=[{"name": "admins", "usernames": ["alice@example.com"]}],
+        users=[{"email": "alice@example.com"}],
+    )
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli, ["--csv", str(csv_file), "--drift-report", "-", "--prune"]
+    )
+    report = tmp_path / "drift.csv"
+    csv_result = runner.invoke(
+        cli, ["--csv", str(csv_file), "--drift-report", str(report)]
+    )
+
+    assert set(xc_env.requests) == {"GET"}
+
+    assert result.exit_code == 0, result.output
+    kinds = [
+        json.loads(line)["kind"]
+        for line in result.output.splitlines()
+        if line.startswith("{")
+    ]
+    assert "missing_user" in kinds and "missing_member" in kinds
+    assert csv_result.exit_code == 0, csv_result.output
+    assert report.read_text().startswith("kind,key,attribute,source,xc")
+
+    result = CliRunner().invoke(
+        cli, ["--csv", str(csv_file), "--drift-report", "-", "--serve", "0"]
+    )
+    assert result.exit_code == 2
@@ -0,0 +1,128 @@
+"""Tests for the local fake F5 XC API server."""
+
+from __future__ import annotations
+
+import pytest
+import requests
+from click.testing import CliRunner
+
+from benchmarks.fake_server import FakeXCServer, TokenBucket, main
+from xc_user_group_sync.client import XCClient
+
+
+def _client(url: str, max_retries: int = 1) -> XCClient:
+    return XCClient(
+        "acme",
+        api_token="token",
+        api_url=url,
+        max_retries=max_retries,
+        backoff_min=0.01,
+        backoff_max=0.01,
+    )
+
+
+class TestEndpoints:
+    """Test the user_groups and user_roles endpoints through XCClient."""
+
+    def test_group_and_user_crud(self):
+        """Create, list, update and delete round-trip through the client."""
+        with FakeXCServer() as server:
+            client = _client(server.url)
+            client.create_group({"name": "admins", "usernames": []})
+            client.create_user({"email": "Alice@Example.com"})
+            client.update_group("admins", {"usernames": ["alice@example.com"]})
+
+            groups = client.list_groups()["user_groups"]
+            assert groups[0]["usernames"] == ["alice@example.com"]
+            assert client.get_user("alice@example.com")["email"] == "Alice@Example.com"
+            assert len(client.list_user_roles()["items"]) == 1
+
+            client.delete_group("admins")
+            assert client.list_groups()["user_groups"] == []
+            assert server.requests["POST"] == 2
+
+    def test_conflict_and_missing(self):
+        """Duplicate creates return 409 and unknown entities 404."""
+        with FakeXCServer() as server:
+            server.seed_state(groups=[{"name": "admins"}])
+            client = _client(server.url)
+            with pytest.raises(requests.HTTPError, match="409"):
+                client.create_group({"name": "admins"})
+            with pytest.raises(requests.HTTPError, match="404"):
+                client.delete_user("nobody@example.com")
+
+    def test_tenants_are_isolated(self):
+        """Path-prefixed tenants keep separate state."""
+        with FakeXCServer() as server:
+            _client(server.url_for("acme")).create_group({"name": "a"})
+            _client(server.url_for("globex")).create_group({"name": "b"})
+
+            assert set(server.tenant("acme").groups) == {"a"}
+            assert set(server.tenant("globex").groups) == {"b"}
+            assert server.groups == {}
+
+    def test_tenants_do_not_share_a_lock(self):
+        """A busy tenant does not hold up requests to another."""
+        with FakeXCServer() as server:
+            with server.tenant("acme").lock:
+                groups = _client(server.url_for("globex")).list_groups()
+            assert groups["user_groups"] == []
+
+
+class TestQuotasAndFaults:
+    """Test rate limiting and failure injection."""
+
+    def test_tenant_rate_limit_sends_retry_after(self):
+        """Requests beyond the burst get 429 with a Retry-After header."""
+        with FakeXCServer(rate_limit=0.5, burst=2) as server:
+            url = (
+                f"{server.url_for('acme')}/api/web/custom/namespaces/system/user_groups"
+            )
+            statuses = [requests.get(url, timeout=5) for _ in range(3)]
+
+            assert [r.status_code for r in statuses] == [200, 200, 429]
+            assert int(statuses[2].headers["Retry-After"]) >= 1
+            assert server.tenant("acme").throttled == 1
+            # Another tenant has its own bucket
+            other = f"{server.url_for('globex')}/api/web/custom/namespaces/system"
+            assert requests.get(f"{other}/user_roles", timeout=5).status_code == 200
+
+    def test_injected_failure_is_retried(self):
+        """Deterministic 503s are consumed by the client's retries."""
+        with FakeXCServer() as server:
+            server.inject_failure(503, count=2, method="GET", retry_after=0)
+            client = _client(server.url, max_retries=3)
+
+            assert client.list_groups() == {"user_groups": []}
+            assert server.tenant().failed == 2
+
+    def test_random_429_injection(self):
+        """Random 429s surface once retries run out."""
+        with FakeXCServer(rate_429=1.0, seed=3) as server:
+            with pytest.raises(requests.RequestException, match="429"):
+                _client(server.url).list_groups()
+            assert server.throttled == 1
+
+    def test_failure_rate(self):
+        """Random 5xx injection uses the configured statuses."""
+        with FakeXCServer(failure_rate=1.0, failure_statuses=(502,)) as server:
+            with pytest.raises(requests.RequestException, match="502"):
+                _client(server.url).list_user_roles()
+
+    def test_unknown_option(self):
+        """Unknown configuration keys are rejected."""
+        with pytest.raises(TypeError, match="bogus"):
+            FakeXCServer(bogus=1)
+
+    def test_token_bucket_wait(self):
+        """An empty bucket reports the wait until the next token."""
+        bucket = TokenBucket(rate=1.0, capacity=1)
+        assert bucket.take() == 0.0
+        assert 0 < bucket.take() <= 1.0
+
+
+def test_main_help():
+    """The standalone entry point documents XC_API_URL usage."""
+    result = CliRunner().invoke(main, ["--help"])
+    assert result.exit_code == 0
+    assert "XC_API_URL" in result.output
@@ -0,0 +1,233 @@
+"""Tests for the LDAP paged-search record source (offline, ldap3 mock server)."""
+
+from __future__ import annotations
+
+from unittest.mock import Mock, patch
+
+import pytest
+from click.testing import CliRunner
+from ldap3 import MOCK_SYNC, Connection, Server
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.ldap_source import LDAPSource
+from xc_user_group_sync.sources import SourceRecord
+from xc_user_group_sync.sync_service import GroupSyncService
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+BASE = "OU=People,DC=example,DC=com"
+GROUPS = "OU=Groups,DC=example,DC=com"
+DIRECTORY_SIZE = 3000
+
+
+def _add_user(connection, i, **attributes):
+    entry = {
+        "objectClass": ["top", "person", "user"],
+        "mail": f"user{i}@example.com",
+        "displayName": f"User {i}",
+        "userAccountControl": "514" if i % 10 == 0 else "512",
+        "memberOf": [f"CN=TEAM_{i % 7},{GROUPS}", "CN=Domain Users,CN=Users,DC=x"],
+    }
+    entry.update(attributes)
+    connection.strategy.add_entry(f"CN=user{i},{BASE}", entry)
+
+
+@pytest.fixture(scope="module")
+def directory():
+    """A bound mock connection to a synthetic directory."""
+    server = Server("mock-ldap")
+    connection = Connection(
+        server,
+        user="CN=svc,DC=example,DC=com",
+        password="secret",
+        client_strategy=MOCK_SYNC,
+    )
+    connection.strategy.add_entry(
+        "CN=svc,DC=example,DC=com",
+        {"objectClass": ["person"], "userPassword": "secret"},
+    )
+    for i in range(DIRECTORY_SIZE):
+        _add_user(connection, i)
+    # Not a person: must not match the default filter
+    connection.strategy.add_entry(
+        f"CN=TEAM_0,{GROUPS}", {"objectClass": ["group"], "mail": "team@example.com"}
+    )
+    connection.bind()
+    return connection
+
+
+def _source(connection, **options):
+    return LDAPSource(search_base=BASE, connection=connection, **options)
+
+
+class TestLDAPSource:
+    """Test entry mapping and paging."""
+
+    def test_streams_every_user_in_pages(self, directory):
+        """All entries are read, one search request per page."""
+        source = _source(directory, page_size=250)
+        with patch.object(directory, "search", wraps=directory.search) as search:
+            records = list(source.records())
+
+        assert len(records) == DIRECTORY_SIZE
+        assert [r.row_num for r in records] == list(range(1, DIRECTORY_SIZE + 1))
+        # 12 full pages, plus the empty page that carries the final cookie
+        assert search.call_count in (DIRECTORY_SIZE // 250, DIRECTORY_SIZE // 250 + 1)
+        # ldap3 passes the paged_size argument positionally, after controls
+        assert {call.args[10] for call in search.call_args_list} == {250}
+
+    def test_entry_mapping(self, directory):
+        """Attributes map onto the normalized record columns."""
+        records = {r.email: r for r in _source(directory).records()}
+
+        assert records["user3@example.com"] == SourceRecord(
+            records["user3@example.com"].row_num,
+            "user3@example.com",
+            "User 3",
+            "A",
+            f"CN=TEAM_3,{GROUPS}",
+        )
+        # Disabled accounts are inactive
+        assert records["user10@example.com"].employee_status == "I"
+
+    def test_group_base_filter(self, directory):
+        """memberOf DNs outside the group base are dropped."""
+        source = _source(directory, group_base="OU=Other,DC=example,DC=com")
+        record = next(source.records())
+        assert record.entitlements == ""
+
+    def test_status_attribute_options(self, directory):
+        """Other status attributes pass through; None means all active."""
+        raw = next(_source(directory, status_attribute="displayName").records())
+        assert raw.employee_status.startswith("User ")
+        assert {
+            r.employee_status
+            for r in _source(directory, status_attribute=None).records()
+        } == {"A"}
+
+    def test_requires_server_or_connection(self):
+        """A source needs somewhere to read from."""
+        with pytest.raises(ValueError, match="server URL"):
+            LDAPSource(search_base=BASE)
+        with pytest.raises(ValueError, match="page_size"):
+            LDAPSource("ldap://x", search_base=BASE, page_size=0)
+
+
+class TestPlanningFromLDAP:
+    """LDAP records feed the same user and group planning as files."""
+
+    def test_user_and_group_plans(self, directory):
+        """Users and groups are planned from one directory read each."""
+        source = _source(directory, page_size=500)
+
+        users = UserSyncService(None).parse_source_to_users(source)
+        groups = GroupSyncService(None).parse_source_to_groups(source)
+
+        assert users.total_count == DIRECTORY_SIZE
+        assert users.inactive_count == DIRECTORY_SIZE // 10
+        assert not users.duplicate_emails
+        assert users.unique_groups == {f"TEAM_{i}" for i in range(7)}
+        assert [g.name for g in groups] == [f"team-{i}" for i in range(7)]
+        assert sum(len(g.users) for g in groups) == DIRECTORY_SIZE
+
+    def test_user_in_several_groups(self):
+        """Every memberOf group of a user gets the user as a member."""
+        connection = Connection(Server("mock-ldap"), client_strategy=MOCK_SYNC)
+        _add_user(
+            connection,
+            1,
+            memberOf=[f"CN=TEAM_A,{GROUPS}", f"CN=TEAM_B,{GROUPS}"],
+            userAccountControl="512",
+        )
+        connection.bind()
+        source = _source(connection)
+
+        users = UserSyncService(None).parse_source_to_users(source)
+        groups = GroupSyncService(None).parse_source_to_groups(source)
+
+        assert users.users[0].groups == ["TEAM_A", "TEAM_B"]
+        assert [(g.name, g.users) for g in groups] == [
+            ("team-a", ["user1@example.com"]),
+            ("team-b", ["user1@example.com"]),
+        ]
+
+
+class TestCLIOptions:
+    """Test LDAP option handling in the CLI."""
+
+    @pytest.fixture
+    def env(self, monkeypatch):
+        monkeypatch.setenv("TENANT_ID", "test-tenant")
+        monkeypatch.setenv("XC_API_TOKEN", "test-token")
+        monkeypatch.setenv("LDAP_BIND_DN", "CN=svc,DC=example,DC=com")
+        monkeypatch.setenv("LDAP_BIND_PASSWORD", "secret")
+
+    def test_requires_exactly_one_input(self, env, tmp_path):
+        """--csv and --ldap-url are mutually exclusive and one is required."""
+        runner = CliRunner()
+        result = runner.invoke(cli, [])
+        assert result.exit_code != 0
+        assert "exactly one of --csv or --ldap-url" in result.output
+
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text("Email\n")
+        result = runner.invoke(cli, ["--csv", str(csv_file), "--ldap-url", "ldap://x"])
+        assert "exactly one of --csv or --ldap-url" in result.output
+
+    def test_base_dn_required(self, env):
+        """--ldap-url needs a search base."""
+        result = CliRunner().invoke(cli, ["--ldap-url", "ldap://x"])
+        assert result.exit_code != 0
+        assert "--ldap-base-dn is required" in result.output
+
+    @patch("xc_user_group_sync.cli.LDAPSource")
+    @patch("xc_user_group_sync.cli.UserSyncService")
+    @patch("xc_user_group_sync.cli.GroupSyncService")
+    @patch("xc_user_group_sync.cli.XCClient")
+    def test_ldap_source_is_built_from_options(
+        self, mock_client, mock_group_class, mock_user_class, mock_source_class, env
+    ):
+        """The CLI binds with the env credentials and parses via the source."""
+        mock_user = mock_user_class.return_value
+        mock_user.parse_source_to_users.return_value = Mock(
+            total_count=0,
+            active_count=0,
+            inactive_count=0,
+            users=[],
+            unique_groups=set(),
+            has_warnings=Mock(return_value=False),
+        )
+        mock_user.fetch_existing_users.return_value = {}
+        mock_user.sync_users.return_value.has_errors.return_value = False
+        mock_user.sync_users.return_value.summary.return_value = "Users: ok"
+        mock_group = mock_group_class.return_value
+        mock_group.parse_source_to_groups.return_value = []
+        mock_group.fetch_existing_groups.return_value = {}
+        mock_group.fetch_existing_users.return_value = set()
+        mock_group.sync_groups.return_value.has_errors.return_value = False
+        mock_group.sync_groups.return_value.summary.return_value = "Groups: ok"
+
+        result = CliRunner().invoke(
+            cli,
+            [
+                "--ldap-url",
+                "ldaps://ldap.example.com",
+                "--ldap-base-dn",
+                BASE,
+                "--ldap-page-size",
+                "1000",
+                "--dry-run",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        mock_source_class.assert_called_once()
+        args, kwargs = mock_source_class.call_args
+        assert args == ("ldaps://ldap.example.com",)
+        assert kwargs["search_base"] == BASE
+        assert kwargs["bind_dn"] == "CN=svc,DC=example,DC=com"
+        assert kwargs["password"] == "secret"
+        assert kwargs["page_size"] == 1000
+        source = mock_source_class.return_value
+        mock_user.parse_source_to_users.assert_called_once_with(source)
+        mock_group.parse_source_to_groups.assert_called_once_with(source)
+        mock_user.parse_csv_to_users.assert_not_called()
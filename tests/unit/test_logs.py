@@ -0,0 +1,153 @@
+"""Tests for logging setup and per-entity debug records."""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.logs import (
+    JsonFormatter,
+    configure_logging,
+    debug_entity,
+    stop_logging,
+    trace_entities,
+    tracing,
+)
+from xc_user_group_sync.models import User
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+logger = logging.getLogger("test_logs")
+
+
+class Exploding:
+    """Argument that fails the test if it is ever formatted."""
+
+    def __str__(self) -> str:
+        raise AssertionError("formatted a record that was not logged")
+
+
+@pytest.fixture(autouse=True)
+def untraced():
+    yield
+    trace_entities(())
+
+
+def test_json_formatter():
+    record = logger.makeRecord(
+        "test_logs",
+        logging.INFO,
+        __file__,
+        1,
+        "Created %s",
+        ("a@example.com",),
+        None,
+        extra={"entity": "a@example.com"},
+    )
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "Created a@example.com"
+    assert entry["entity"] == "a@example.com"
+    assert "trace" not in entry
+
+
+def test_configure_logging_writes_through_queue(monkeypatch):
+    root = logging.getLogger()
+    monkeypatch.setattr(root, "handlers", [])
+    monkeypatch.setattr(root, "level", root.level)
+    stream = io.StringIO()
+
+    listener = configure_logging(logging.INFO, "json", stream)
+    assert listener is not None
+    assert configure_logging(logging.INFO) is None  # already configured
+    logger.info("Fetched %d users", 3)
+    logger.debug("hidden")
+    stop_logging(listener)
+
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)["message"] for line in lines] == ["Fetched 3 users"]
+    assert root.handlers == []
+
+
+class TestDebugEntity:
+    """Test per-entity debug records."""
+
+    def test_not_formatted_when_disabled(self, caplog):
+        with caplog.at_level(logging.INFO):
+            debug_entity(logger, "a@example.com", "User %s", Exploding())
+            assert not tracing(logger, "a@example.com")
+        assert caplog.records == []
+
+    def test_traced_entities_log_at_info(self, caplog):
+        trace_entities([" A@Example.com "])
+        with caplog.at_level(logging.INFO):
+            debug_entity(logger, "a@example.com", "User %s", "a@example.com")
+            debug_entity(logger, "b@example.com", "User %s", Exploding())
+
+        [record] = caplog.records
+        assert (record.levelno, record.trace) == (logging.INFO, True)
+        assert record.getMessage() == "User a@example.com"
+
+    def test_debug_level_logs_every_entity(self, caplog):
+        with caplog.at_level(logging.DEBUG):
+            debug_entity(logger, "b@example.com", "User %s", "b@example.com")
+
+        [record] = caplog.records
+        assert (record.levelno, record.entity) == (logging.DEBUG, "b@example.com")
+
+    def test_plan_traces_differences(self, caplog):
+        trace_entities(["alice@example.com"])
+        planned = [
+            User(
+                email=f"{name}@example.com",
+                display_name=f"{name.title()} Smith",
+                first_name=name.title(),
+                last_name="Smith",
+            )
+            for name in ("alice", "bob")
+        ]
+        existing = {
+            f"{name}@example.com": {
+                "email": f"{name}@example.com",
+                "display_name": f"{name.title()} Smith",
+                "first_name": "Old" if name == "alice" else "Bob",
+                "last_name": "Smith",
+                "active": True,
+            }
+            for name in ("alice", "bob")
+        }
+
+        with caplog.at_level(logging.INFO):
+            UserSyncService(None).plan_operations(planned, existing)
+
+        assert caplog.messages == ["User alice@example.com differs in: first_name"]
+
+
+def test_cli_trace(xc_env, tmp_path, caplog):
+    """--trace follows one user through a run at the default level."""
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(
+        "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+        "alice@example.com,Alice A,A,CN=ADMINS,DC=example\n"
+        "bob@example.com,Bob B,A,CN=ADMINS,DC=example\n"
+    )
+    with caplog.at_level(logging.INFO):
+        result = CliRunner().invoke(
+            cli,
+            ["--csv", str(csv_file), "--dry-run", "--trace", "Alice@example.com"]
+            + ["--trace", "admins", "--log-format", "json"],
+        )
+
+    assert result.exit_code == 0, result.output
+    traced = [r.getMessage() for r in caplog.records if getattr(r, "trace", False)]
+    assert traced == [
+        "User alice@example.com not in F5 XC",
+        "Group admins not in F5 XC",
+    ]
+    assert not tracing(logger, "alice@example.com")
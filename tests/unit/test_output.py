@@ -0,0 +1,149 @@
+"""Tests for bounded console output."""
+
+from __future__ import annotations
+
+import io
+import logging
+
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.models import Group
+from xc_user_group_sync.output import (
+    DETAIL,
+    DetailLimit,
+    DetailsFile,
+    ProgressBar,
+    planned_group_lines,
+)
+
+
+class TestPlannedGroupLines:
+    """Test the planned group listing."""
+
+    def test_small_plans_are_listed_in_full(self):
+        groups = [Group(name="a", users=["x@example.com"]), Group(name="b", users=[])]
+        assert planned_group_lines(groups, 5) == [" - a: 1 users", " - b: 0 users"]
+
+    def test_large_plans_list_largest_groups(self):
+        groups = [
+            Group(name=f"g{i}", users=[f"u{j}@example.com" for j in range(i)])
+            for i in range(6)
+        ]
+
+        lines = planned_group_lines(groups, 2)
+
+        assert lines == [
+            " - g5: 5 users",
+            " - g4: 4 users",
+            " ... and 4 smaller groups (6 memberships)",
+        ]
+        assert len(planned_group_lines(groups, 0)) == 6
+
+
+class TestDetailLimit:
+    """Test the console filter."""
+
+    def test_passes_first_detail_records(self):
+        limit = DetailLimit(2)
+        logger = logging.getLogger("test_output.limit")
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.addFilter(limit)
+        logger.addHandler(handler)
+        logger.propagate = False
+        try:
+            for i in range(5):
+                logger.warning("Created %d", i, extra=DETAIL)
+            logger.warning("Summary")
+        finally:
+            logger.removeHandler(handler)
+
+        assert stream.getvalue().splitlines() == ["Created 0", "Created 1", "Summary"]
+        assert limit.take_suppressed() == 3
+        assert limit.take_suppressed() == 0
+
+    def test_zero_is_unlimited(self):
+        limit = DetailLimit(0)
+        record = logging.makeLogRecord({"detail": True})
+        assert all(limit.filter(record) for _ in range(100))
+
+
+class TestProgressBar:
+    """Test the progress display."""
+
+    def test_render(self):
+        line = ProgressBar.render("Users", 50, 200, 10.0)
+        assert line.startswith("Users [#######-")
+        assert line.endswith("50/200 25% 5.0/s ETA 0:30")
+
+    def test_track_draws_on_stream(self, clock):
+        stream = io.StringIO()
+        clock.step = 1.0
+        bar = ProgressBar(stream, enabled=True, interval=0, clock=clock)
+
+        assert list(bar.track([1, 2, 3], "Groups")) == [1, 2, 3]
+
+        output = stream.getvalue()
+        assert output.count("\r") == 4  # one per item, then the final state
+        assert "3/3 100%" in output
+        assert output.endswith("\n")
+
+    def test_disabled_when_not_a_terminal(self):
+        stream = io.StringIO()
+        bar = ProgressBar(stream)
+
+        assert list(bar.track([1, 2], "Groups")) == [1, 2]
+        assert not bar.enabled
+        assert stream.getvalue() == ""
+
+
+def test_details_file_gets_everything(tmp_path, caplog):
+    path = tmp_path / "details.log"
+    with caplog.at_level(logging.INFO):
+        with DetailsFile(str(path)) as details:
+            logging.getLogger("test_output.details").info("Created x", extra=DETAIL)
+            details.write("Planned group g: 3 users")
+
+    lines = path.read_text().splitlines()
+    assert lines[0].endswith("INFO Created x")
+    assert lines[1].endswith("INFO Planned group g: 3 users")
+    # Detail-only lines stay off the console
+    assert "Planned group g: 3 users" not in caplog.messages
+
+
+def test_cli_output_is_bounded(xc_env, tmp_path, caplog):
+    """A large plan prints a summary; the details file has every group."""
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(
+        "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+        + "".join(
+            f"u{i}@example.com,User {i},A,CN=GROUP{i},DC=example\n" for i in range(30)
+        )
+    )
+    details = tmp_path / "details.log"
+
+    with caplog.at_level(logging.INFO):
+        result = CliRunner().invoke(
+            cli,
+            [
+                "--csv",
+                str(csv_file),
+                "--max-output-lines",
+                "5",
+                "--details-file",
+                str(details),
+                "--no-progress",
+            ],
+        )
+
+    assert result.exit_code == 0, result.output
+    assert len(xc_env.groups) == 30
+    assert "Groups planned from CSV: 30" in result.output
+    assert " ... and 25 smaller groups (25 memberships)" in result.output
+    assert f"85 more user/group log lines not shown (see {details})" in result.output
+    text = details.read_text()
+    assert text.count("Planned group group") == 30
+    assert text.count("Created group group") == 30
+    assert text.count("Created user: u") == 30
+    assert text.count("Normalized group name") == 30
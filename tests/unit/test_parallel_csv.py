@@ -0,0 +1,125 @@
+"""Tests for parallel, byte-range chunked CSV parsing."""
+
+from __future__ import annotations
+
+import pytest
+
+from xc_user_group_sync import parallel_csv
+from xc_user_group_sync.parallel_csv import (
+    parse_groups_parallel,
+    parse_users_parallel,
+    split_csv,
+)
+from xc_user_group_sync.sync_service import CSVParseError, GroupSyncService
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+HEADER = "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+
+
+@pytest.fixture(autouse=True)
+def tiny_chunks(monkeypatch):
+    """Allow splitting test-sized files into many chunks."""
+    monkeypatch.setattr(parallel_csv, "MIN_CHUNK_BYTES", 64)
+
+
+@pytest.fixture
+def large_csv(tmp_path):
+    """CSV with quoted multi-line names, duplicates and bad emails."""
+    lines = [HEADER]
+    for i in range(300):
+        name = f'"User\nNumber {i}"' if i % 7 == 0 else f"User {i}"
+        email = f"user{i % 250}@example.com" if i % 11 else f"o'user{i}@example.com"
+        status = "A" if i % 3 else "T"
+        dn = f'"CN=GROUP_{i % 9},OU=Groups,DC=example,DC=com"'
+        lines.append(f"{email},{name},{status},{dn}\n")
+    path = tmp_path / "large.csv"
+    path.write_text("".join(lines))
+    return str(path)
+
+
+class TestSplitCSV:
+    """Test record-aligned byte range splitting."""
+
+    def test_ranges_cover_data_and_respect_quotes(self, large_csv):
+        """Ranges are contiguous, start after the header and never split a quote."""
+        header_end, ranges = split_csv(large_csv, 8)
+        data = open(large_csv, "rb").read()
+
+        assert header_end == len(HEADER)
+        assert len(ranges) == 8
+        assert ranges[0][0] == header_end
+        assert ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert data[:start].count(b'"') % 2 == 0
+            assert data[start - 1 : start] == b"\n"
+
+    def test_small_file_is_one_range(self, tmp_path, monkeypatch):
+        """Files below the minimum chunk size are not split."""
+        monkeypatch.setattr(parallel_csv, "MIN_CHUNK_BYTES", 1 << 20)
+        path = tmp_path / "small.csv"
+        path.write_text(HEADER + "a@example.com,A,A,CN=X\n")
+        assert split_csv(str(path), 16) == (
+            len(HEADER),
+            [(len(HEADER), path.stat().st_size)],
+        )
+
+    def test_empty_file(self, tmp_path):
+        """Empty files have no header and no ranges."""
+        path = tmp_path / "empty.csv"
+        path.write_text("")
+        assert split_csv(str(path), 4) == (0, [])
+
+
+class TestParallelParsing:
+    """Parallel results match the serial parsers exactly."""
+
+    def test_groups_match_serial(self, large_csv):
+        """Merged membership maps produce the same planned groups."""
+        serial = GroupSyncService(None).parse_csv_to_groups(large_csv)
+        parallel = parse_groups_parallel(large_csv, workers=4)
+
+        assert [(g.name, g.users) for g in parallel] == [
+            (g.name, g.users) for g in serial
+        ]
+
+    def test_users_match_serial(self, large_csv):
+        """Users, duplicate rows and invalid-email rows use absolute row numbers."""
+        service = UserSyncService(None)
+        serial = service.parse_csv_to_users(large_csv)
+        parallel = service.parse_csv_to_users(large_csv, workers=4)
+
+        assert [u.email for u in parallel.users] == [u.email for u in serial.users]
+        assert parallel.duplicate_emails and parallel.invalid_emails
+        assert parallel.duplicate_emails == serial.duplicate_emails
+        assert parallel.invalid_emails == serial.invalid_emails
+        assert parallel.active_count == serial.active_count
+        assert parallel.unique_groups == serial.unique_groups
+
+    def test_service_dispatch_uses_parallel_parser(self, large_csv):
+        """workers=0 means one worker per CPU."""
+        groups = GroupSyncService(None).parse_csv_to_groups(large_csv, workers=0)
+        assert len(groups) == 9
+
+    def test_row_error_reports_absolute_row(self, large_csv):
+        """A bad row deep in the file is reported with its real row number."""
+        with open(large_csv, "a") as f:
+            f.write('no-at-sign,Late User,A,"CN=LATE,DC=example,DC=com"\n')
+
+        with pytest.raises(ValueError) as serial_error:
+            UserSyncService(None).parse_csv_to_users(large_csv)
+        with pytest.raises(ValueError) as parallel_error:
+            parse_users_parallel(large_csv, workers=4)
+
+        assert str(parallel_error.value) == str(serial_error.value)
+        assert str(parallel_error.value).startswith("Row 302:")
+
+    def test_missing_columns(self, tmp_path):
+        """Header validation matches the serial parsers."""
+        path = tmp_path / "bad.csv"
+        path.write_text("Email,Other\n" + "a@example.com,x\n" * 50)
+
+        with pytest.raises(CSVParseError, match="Entitlement Display Name"):
+            parse_groups_parallel(str(path), workers=2)
+        with pytest.raises(ValueError, match="Missing required columns"):
+            parse_users_parallel(str(path), workers=2)
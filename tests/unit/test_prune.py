@@ -0,0 +1,162 @@
+"""Tests for concurrent, guarded pruning."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.models import Group, User
+from xc_user_group_sync.prune import (
+    PruneLimitExceeded,
+    check_prune_limit,
+    delete_all,
+    summarize,
+)
+from xc_user_group_sync.sync_service import GroupSyncService
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+
+class TestLimits:
+    """Test the prune safety threshold."""
+
+    def test_limit(self):
+        check_prune_limit("users", 50, 100, 50)
+        with pytest.raises(PruneLimitExceeded, match="51 of 100 users"):
+            check_prune_limit("users", 51, 100, 50)
+
+    def test_small_prunes_and_disabled_limit_pass(self):
+        check_prune_limit("groups", 5, 5, 0)
+        check_prune_limit("groups", 100, 100, None)
+
+    def test_summary_is_abbreviated(self):
+        names = [f"g{i}" for i in range(12)]
+        assert summarize(names).endswith("g9 (+2 more)")
+
+
+class TestDeleteAll:
+    """Test concurrent deletes."""
+
+    def test_runs_concurrently_and_collects_failures(self):
+        started = threading.Barrier(3, timeout=5)
+
+        def delete(key):
+            started.wait()  # only passes if three deletes run at once
+            if key == "b":
+                raise RuntimeError("boom")
+
+        with ThreadPoolExecutor(3) as executor:
+            deleted, failures = delete_all(["a", "b", "c"], delete, executor)
+
+        assert deleted == ["a", "c"]
+        assert str(failures["b"]) == "boom"
+
+    def test_without_executor(self):
+        calls = []
+        assert delete_all(["a", "b"], calls.append) == (["a", "b"], {})
+        assert calls == ["a", "b"]
+
+
+class TestServices:
+    """Test the limits and batched logs of the services."""
+
+    def test_group_prune_over_limit_deletes_nothing(self):
+        repository = Mock()
+        existing = {f"g{i}": {} for i in range(10)}
+        service = GroupSyncService(repository, max_prune_percent=50)
+
+        with pytest.raises(PruneLimitExceeded):
+            service.cleanup_orphaned_groups([Group(name="g0", users=[])], existing)
+        repository.delete_group.assert_not_called()
+
+    def test_group_prune_logs_one_summary(self, caplog):
+        repository = Mock()
+        existing = {f"g{i}": {} for i in range(10)}
+        with ThreadPoolExecutor(4) as executor:
+            service = GroupSyncService(repository, executor=executor)
+            with caplog.at_level(logging.INFO):
+                deleted = service.cleanup_orphaned_groups([], existing)
+
+        assert deleted == 10
+        assert repository.delete_group.call_count == 10
+        assert [m for m in caplog.messages if m.startswith("Deleted")] == [
+            "Deleted 10 groups: g0, g1, g2, g3, g4, g5, g6, g7, g8, g9"
+        ]
+
+    def test_user_prune_over_limit_changes_nothing(self):
+        repository = Mock()
+        existing = {f"u{i}@example.com": {} for i in range(10)}
+        planned = [
+            User(
+                email="new@example.com",
+                display_name="New User",
+                first_name="New",
+                last_name="User",
+            )
+        ]
+        service = UserSyncService(repository, max_prune_percent=50)
+
+        with pytest.raises(PruneLimitExceeded):
+            service.sync_users(planned, existing, delete_users=True)
+        assert repository.method_calls == []
+
+    def test_user_prune_failures_are_recorded(self):
+        repository = Mock()
+        repository.delete_user.side_effect = [None, RuntimeError("boom")]
+        existing = {"a@example.com": {}, "b@example.com": {}}
+
+        stats = UserSyncService(repository).sync_users([], existing, delete_users=True)
+
+        assert (stats.deleted, stats.errors) == (1, 1)
+        assert stats.error_details[0]["email"] == "b@example.com"
+
+
+CSV = (
+    "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+    "keep@example.com,Keep K,A,CN=ADMINS,DC=example\n"
+)
+
+
+@pytest.fixture
+def server(xc_env):
+    xc_env.seed_state(
+        users=[{"email": "keep@example.com"}]
+        + [{"email": f"left{i}@example.com"} for i in range(9)]
+    )
+    return xc_env
+
+
+def test_cli_refuses_mass_prune(server, tmp_path):
+    """A prune of 90% of users is refused unless the limit is raised."""
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(CSV)
+
+    result = CliRunner().invoke(cli, ["--csv", str(csv_file), "--prune"])
+    assert result.exit_code == 1
+    assert "Refusing to prune 9 of 10 users" in result.output
+    assert len(server.users) == 10
+
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--csv",
+            str(csv_file),
+            "--prune",
+            "--revoke-first",
+            "--max-prune-percent",
+            "80",
+        ],
+    )
+    assert result.exit_code == 1
+    assert "Refusing to prune" in result.output
+
+    result = CliRunner().invoke(
+        cli, ["--csv", str(csv_file), "--prune", "--max-prune-percent", "100"]
+    )
+    assert result.exit_code == 0, result.output
+    assert set(server.users) == {"keep@example.com"}
@@ -0,0 +1,317 @@
+"""Tests for retry classification and idempotent-create reconciliation."""
+
+from __future__ import annotations
+
+from email.utils import formatdate
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from benchmarks.fake_server import FakeXCServer
+from xc_user_group_sync.client import XCClient
+from xc_user_group_sync.models import Group
+from xc_user_group_sync.retry_policy import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    endpoint_family,
+    is_outage,
+    is_transient,
+    retry_after,
+    transient_error,
+)
+from xc_user_group_sync.sync_service import GroupSyncService
+
+
+def _http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def _client(url, max_retries=3):
+    return XCClient(
+        "acme",
+        api_token="token",
+        api_url=url,
+        max_retries=max_retries,
+        backoff_min=0.01,
+        backoff_max=0.01,
+    )
+
+
+class TestClassification:
+    """Test which errors are retried."""
+
+    @pytest.mark.parametrize("status", [408, 429, 500, 502, 503, 504])
+    def test_transient_statuses(self, status):
+        """Throttling and gateway errors are retried."""
+        assert is_transient(_http_error(status))
+
+    @pytest.mark.parametrize("status", [400, 401, 403, 404, 409, 422])
+    def test_client_errors_are_final(self, status):
+        """Deterministic 4xx responses are not retried."""
+        assert not is_transient(_http_error(status))
+
+    def test_errors_without_response(self):
+        """Network and non-HTTP errors are retried; bare HTTPErrors are not."""
+        assert is_transient(requests.ConnectionError("reset"))
+        assert is_transient(RuntimeError("flaky repository"))
+        assert not is_transient(requests.HTTPError("no response attached"))
+
+    def test_reconciles_only_retries(self):
+        """409 on POST and 404 on DELETE count only after a first attempt."""
+        policy = RetryPolicy()
+        assert policy.reconciles("POST", 409, 2)
+        assert policy.reconciles("DELETE", 404, 3)
+        assert not policy.reconciles("POST", 409, 1)
+        assert not policy.reconciles("PUT", 409, 2)
+
+
+class TestRetryAfter:
+    """Test Retry-After parsing and the resulting waits."""
+
+    def test_parses_seconds_and_dates(self):
+        """Both header forms are accepted; garbage is ignored."""
+        assert retry_after(_http_error(429, {"Retry-After": "7"})) == 7.0
+        date = formatdate(timeval=None, usegmt=True)
+        assert retry_after(_http_error(503, {"Retry-After": date})) <= 1.0
+        assert retry_after(_http_error(503, {"Retry-After": "soon"})) is None
+        assert retry_after(_http_error(503)) is None
+
+    def test_wait_honours_and_caps_retry_after(self):
+        """The server's wait wins over backoff, up to max_retry_after."""
+        policy = RetryPolicy(backoff_min=0.5, backoff_max=1.0, max_retry_after=10)
+        state = Mock(attempt_number=1)
+
+        state.outcome.exception.return_value = _http_error(429, {"Retry-After": "3"})
+        assert policy.wait(state) == 3.0
+        state.outcome.exception.return_value = _http_error(429, {"Retry-After": "3600"})
+        assert policy.wait(state) == 10.0
+        state.outcome.exception.return_value = _http_error(500)
+        assert policy.wait(state) == 1.0
+
+    def test_transient_error_keeps_response(self):
+        """Transient statuses surface as HTTPErrors carrying their response."""
+        error = transient_error(_http_error(503).response)
+        assert error.response.status_code == 503
+        assert "Transient error: 503" in str(error)
+
+
+class TestClientAgainstFakeServer:
+    """End-to-end behaviour of the client's retries."""
+
+    def test_client_error_is_not_retried(self):
+        """A 400 costs one request."""
+        with FakeXCServer() as server:
+            server.inject_failure(400, count=3, method="POST")
+            with pytest.raises(requests.HTTPError, match="400"):
+                _client(server.url).create_group({"name": "a", "usernames": []})
+            assert server.tenant().failed == 1
+
+    def test_lost_create_response_is_reconciled(self):
+        """A retried create that hits 409 is confirmed with a GET."""
+        with FakeXCServer() as server:
+            server.inject_failure(502, method="POST", after_apply=True)
+            client = _client(server.url)
+
+            result = client.create_user({"email": "sam@example.com"})
+
+            assert result == {"email": "sam@example.com"}
+            assert server.requests["POST"] == 2
+            assert server.requests["GET"] == 1
+
+    def test_first_attempt_conflict_is_an_error(self):
+        """A 409 without a prior attempt is a real conflict."""
+        with FakeXCServer() as server:
+            server.seed_state(groups=[{"name": "a", "usernames": []}])
+            with pytest.raises(requests.HTTPError, match="409"):
+                _client(server.url).create_group({"name": "a", "usernames": []})
+
+    def test_lost_delete_response_is_reconciled(self):
+        """A retried delete that hits 404 is treated as done."""
+        with FakeXCServer() as server:
+            server.seed_state(groups=[{"name": "a", "usernames": []}])
+            server.inject_failure(504, method="DELETE", after_apply=True)
+
+            _client(server.url).delete_group("a")
+
+            assert server.groups == {}
+            assert server.requests["DELETE"] == 2
+
+
+class TestRetryBudget:
+    """Test the run-wide retry cap."""
+
+    def test_budget_scales_with_requests(self):
+        """Retries are allowed up to min_retries + ratio * requests."""
+        budget = RetryBudget(ratio=0.1, min_retries=2)
+        for _ in range(30):
+            budget.record_request()
+
+        assert [budget.try_spend() for _ in range(6)] == [True] * 5 + [False]
+        assert (budget.retries, budget.denied) == (5, 1)
+
+    def test_policy_stops_retrying_when_spent(self):
+        """An exhausted budget turns transient errors into final ones."""
+        policy = RetryPolicy(budget=RetryBudget(ratio=0, min_retries=1))
+        assert policy.should_retry("GET", _http_error(503))
+        assert not policy.should_retry("GET", _http_error(503))
+
+    def test_final_attempt_is_not_charged(self):
+        """N failed attempts spend exactly N-1 retries from the budget."""
+        with FakeXCServer() as server:
+            server.inject_failure(503, count=10)
+            client = _client(server.url, max_retries=4)
+
+            with pytest.raises(requests.HTTPError, match="503"):
+                client.list_groups()
+
+            budget = client.retry_budget
+            assert (budget.requests, budget.retries, budget.denied) == (1, 3, 0)
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions."""
+
+    def test_open_half_open_closed(self):
+        """Consecutive failures open; a successful probe closes."""
+        now = [0.0]
+        breaker = CircuitBreaker(
+            "user_roles", failure_threshold=2, reset_timeout=10, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        breaker.before_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        with pytest.raises(CircuitOpenError, match="user_roles"):
+            breaker.before_request()
+
+        now[0] = 11
+        breaker.before_request()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        # Only one probe at a time
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert (breaker.opened, breaker.rejected) == (1, 2)
+
+    def test_failed_probe_reopens(self):
+        """A failing half-open probe opens the circuit again."""
+        now = [0.0]
+        breaker = CircuitBreaker(
+            "user_groups", failure_threshold=1, reset_timeout=5, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        now[0] = 6
+        breaker.before_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.opened == 2
+
+    def test_families_and_outages(self):
+        """Breakers are keyed by resource; 429 is not an outage."""
+        assert endpoint_family("/api/web/custom/namespaces/system/user_roles/a") == (
+            "user_roles"
+        )
+        assert endpoint_family("/other?x=1") == "/other"
+        assert is_outage(_http_error(503))
+        assert is_outage(requests.ConnectTimeout())
+        assert not is_outage(_http_error(429))
+        assert not is_transient(CircuitOpenError("user_roles", 1))
+
+    def test_client_fails_fast_per_family(self):
+        """An outage of one endpoint family opens only its circuit."""
+        with FakeXCServer() as server:
+            server.inject_failure(503, count=100, path_contains="user_roles")
+            client = XCClient(
+                "acme",
+                api_token="token",
+                api_url=server.url,
+                max_retries=2,
+                backoff_min=0.01,
+                backoff_max=0.01,
+                breaker_threshold=3,
+            )
+            for _ in range(2):
+                with pytest.raises(requests.RequestException):
+                    client.list_user_roles()
+            sent = server.tenant().failed
+
+            with pytest.raises(CircuitOpenError):
+                client.get_user("a@example.com")
+            assert server.tenant().failed == sent == 3
+            assert client.list_groups() == {"user_groups": []}
+
+            summary = client.api_summary()
+            assert "requests=4" in summary
+            assert "circuit user_roles opened 1x (2 failed fast)" in summary
+
+
+class TestServiceUserCreation:
+    """GroupSyncService only retries transient user-creation failures."""
+
+    def test_bad_request_is_not_retried(self):
+        """A deterministic 400 fails the user after one attempt."""
+        repository = Mock()
+        repository.list_user_roles.return_value = {"items": []}
+        repository.create_user.side_effect = _http_error(400)
+        service = GroupSyncService(repository, backoff_min=0.01, backoff_max=0.01)
+
+        stats = service.sync_groups(
+            [Group(name="devs", users=["bad@example.com"])], {}, existing_users=None
+        )
+
+        assert repository.create_user.call_count == 1
+        assert stats.errors >= 1
+
+    def test_transient_error_is_retried(self):
+        """A 503 is retried until creation succeeds."""
+        repository = Mock()
+        repository.create_user.side_effect = [_http_error(503), {}]
+        service = GroupSyncService(repository, backoff_min=0.01, backoff_max=0.01)
+
+        service._create_user_with_retry({"email": "sam@example.com"})
+
+        assert repository.create_user.call_count == 2
+
+    def test_conflict_after_service_retry_is_confirmed(self):
+        """A 409 once the client gave up on a lost POST counts as created."""
+        with FakeXCServer() as server:
+            # The first POST is applied but its response lost; the client's
+            # retry fails too, so the service retries with a fresh request
+            server.inject_failure(
+                503, method="POST", path_contains="user_roles", after_apply=True
+            )
+            server.inject_failure(503, method="POST", path_contains="user_roles")
+            client = XCClient(
+                "acme",
+                api_token="token",
+                api_url=server.url,
+                max_retries=2,
+                backoff_min=0.01,
+                backoff_max=0.01,
+            )
+            service = GroupSyncService(client, backoff_min=0.01, backoff_max=0.01)
+
+            created = service._create_user_with_retry({"email": "sam@example.com"})
+
+            assert created["email"] == "sam@example.com"
+            assert "sam@example.com" in server.users
+
+    def test_service_retries_respect_the_budget(self):
+        """Once the repository's budget is spent the service stops retrying."""
+        repository = Mock()
+        repository.retry_budget = RetryBudget(ratio=0, min_retries=0)
+        repository.create_user.side_effect = [_http_error(503), {}]
+        service = GroupSyncService(repository, backoff_min=0.01, backoff_max=0.01)
+
+        with pytest.raises(requests.HTTPError):
+            service._create_user_with_retry({"email": "sam@example.com"})
+
+        assert repository.create_user.call_count == 1
@@ -0,0 +1,420 @@
+"""Tests for run deadlines, priority scheduling and leftover plans."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import Mock
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.client import XCClient
+from xc_user_group_sync.models import Group, User
+from xc_user_group_sync.retry_policy import RetryPolicy
+from xc_user_group_sync.scheduling import (
+    ADD,
+    REMOVE_MEMBERS,
+    REVOKE,
+    Deadline,
+    DeadlineExceeded,
+    Operation,
+    count_by_priority,
+    read_leftover,
+    run_operations,
+    schedule,
+    write_leftover,
+)
+from xc_user_group_sync.state_cache import CachingRepository
+from xc_user_group_sync.sync_service import GroupSyncService, SyncStats
+from xc_user_group_sync.user_sync_service import UserSyncService, UserSyncStats
+
+
+def _user(email, active=True):
+    return User(
+        email=email, display_name="Name", first_name="N", last_name="", active=active
+    )
+
+
+class TestDeadline:
+    """Test the run-wide clock."""
+
+    def test_timeouts_are_clamped_then_refused(self, clock):
+        """Request timeouts shrink to the time left; none is given after."""
+        deadline = Deadline(10, clock=clock)
+        assert deadline.timeout(30) == 10
+        clock.now = 7
+        assert deadline.timeout(30) == 3
+        assert deadline.timeout(1) == 1
+
+        clock.now = 10
+        assert deadline.expired
+        with pytest.raises(DeadlineExceeded, match="10s"):
+            deadline.timeout(30)
+
+    def test_policy_respects_deadline(self, clock):
+        """Waits are clamped and nothing is retried after the deadline."""
+        policy = RetryPolicy(
+            backoff_min=5, backoff_max=5, deadline=Deadline(2, clock=clock)
+        )
+        error = ConnectionError("reset")
+        state = Mock(attempt_number=1)
+        state.outcome.exception.return_value = error
+
+        assert policy.should_retry("GET", error)
+        assert policy.wait(state) == 2
+        clock.now = 2
+        assert not policy.should_retry("GET", error)
+
+    def test_client_refuses_requests_after_deadline(self, clock, xc_server):
+        """An expired deadline stops the client before it sends anything."""
+        client = XCClient(
+            "acme",
+            api_token="token",
+            api_url=xc_server.url,
+            deadline=Deadline(1, clock=clock),
+        )
+        client.list_groups()
+        clock.now = 1
+        with pytest.raises(DeadlineExceeded):
+            client.list_groups()
+        assert xc_server.requests["GET"] == 1
+
+
+class TestScheduling:
+    """Test ordering, early stop and leftover plans."""
+
+    def test_priority_order_is_stable(self):
+        """Revocations, then removals, then additions; planning order within."""
+        ops = [
+            Operation(ADD, "user", "create", "a"),
+            Operation(REVOKE, "user", "delete", "b"),
+            Operation(REMOVE_MEMBERS, "group", "delete", "c"),
+            Operation(REVOKE, "user", "deactivate", "d"),
+        ]
+        assert [op.key for op in schedule(ops)] == ["b", "d", "c", "a"]
+        assert count_by_priority(ops) == {"revoke": 2, "remove-members": 1, "add": 1}
+
+    def test_run_stops_at_deadline(self, clock):
+        """The operation interrupted by the deadline is left over, not lost."""
+        deadline = Deadline(5, clock=clock)
+        done = []
+
+        def apply(op):
+            if op.key == "c":
+                clock.now = 5
+                deadline.check()
+            done.append(op.key)
+
+        ops = [Operation(ADD, "user", "create", key) for key in "abcd"]
+        leftover = run_operations(ops, apply, deadline)
+
+        assert done == ["a", "b"]
+        assert [op.key for op in leftover] == ["c", "d"]
+
+    def test_leftover_round_trip(self, tmp_path):
+        """User payloads are built from the subject when written."""
+        path = tmp_path / "leftover.json"
+        user = _user("sam@example.com")
+        write_leftover(
+            path,
+            [
+                Operation(ADD, "user", "create", user.email, subject=user),
+                Operation(
+                    REMOVE_MEMBERS, "group", "remove_members", "g", {"usernames": []}
+                ),
+            ],
+        )
+
+        ops = read_leftover(path)
+        assert ops[0].payload["email"] == "sam@example.com"
+        assert ops[1] == Operation(
+            REMOVE_MEMBERS, "group", "remove_members", "g", {"usernames": []}
+        )
+
+    def test_bad_leftover_is_rejected(self, tmp_path):
+        """Only leftover plans of the current version are accepted."""
+        path = tmp_path / "plan.json"
+        path.write_text("{not json")
+        with pytest.raises(ValueError, match="not a leftover plan"):
+            read_leftover(path)
+        path.write_text(json.dumps({"version": 99, "operations": []}))
+        with pytest.raises(ValueError, match="version 1"):
+            read_leftover(path)
+
+
+class TestServicePlans:
+    """Test the operations the services plan."""
+
+    def test_user_priorities(self):
+        """Deactivations and deletions are revocations."""
+        existing = {
+            "keep@example.com": {"display_name": "Old", "active": True},
+            "leave@example.com": {"display_name": "Name", "active": True},
+            "gone@example.com": {},
+        }
+        planned = [
+            _user("keep@example.com"),
+            _user("leave@example.com", active=False),
+            _user("new@example.com"),
+        ]
+        ops = UserSyncService(None).plan_operations(
+            planned, existing, True, UserSyncStats()
+        )
+        assert {(op.key, op.action, op.priority) for op in ops} == {
+            ("keep@example.com", "update", ADD),
+            ("leave@example.com", "deactivate", REVOKE),
+            ("new@example.com", "create", ADD),
+            ("gone@example.com", "delete", REVOKE),
+        }
+
+    def test_group_removals_are_split(self):
+        """Dropped members are removed before new members are added."""
+        planned = [
+            Group(name="swap", users=["b@example.com", "c@example.com"]),
+            Group(name="add", users=["a@example.com", "b@example.com"]),
+            Group(name="same", users=["a@example.com"]),
+            Group(name="new", users=[]),
+        ]
+        existing = {
+            "swap": {"usernames": ["a@example.com", "b@example.com"]},
+            "add": {"usernames": ["a@example.com"]},
+            "same": {"usernames": ["a@example.com"]},
+            "old": {"usernames": []},
+        }
+        stats = SyncStats()
+        ops = GroupSyncService(None).plan_operations(planned, existing, True, stats)
+
+        assert [(op.key, op.action, op.priority) for op in ops] == [
+            ("swap", "remove_members", REMOVE_MEMBERS),
+            ("swap", "update", ADD),
+            ("add", "update", ADD),
+            ("new", "create", ADD),
+            ("old", "delete", REMOVE_MEMBERS),
+        ]
+        assert ops[0].payload["usernames"] == ["b@example.com"]
+        assert stats.skipped == 1
+
+    def test_scheduled_user_sync(self):
+        """Planned revocations run before creates, as with --revoke-first."""
+        repository = Mock()
+        existing = {
+            "leave@example.com": {"display_name": "Name", "active": True},
+            "gone@example.com": {},
+        }
+        planned = [_user("new@example.com"), _user("leave@example.com", active=False)]
+        service = UserSyncService(repository)
+        stats = UserSyncStats()
+
+        ops = service.plan_operations(planned, existing, True, stats)
+        leftover = run_operations(
+            ops, lambda op: service.apply_operation(op, False, stats)
+        )
+
+        assert leftover == []
+
+        calls = [c[0] for c in repository.method_calls]
+        assert calls == ["update_user", "delete_user", "create_user"]
+        assert (stats.created, stats.updated, stats.deleted) == (1, 1, 1)
+
+    def test_group_apply(self):
+        """Applied group operations update stats like a regular sync."""
+        repository = Mock()
+        repository.delete_group.side_effect = Exception("500")
+        service = GroupSyncService(repository)
+        stats = SyncStats()
+        payload = {"name": "g", "display_name": "g", "usernames": ["a@example.com"]}
+
+        service.apply_operation(
+            Operation(ADD, "group", "update", "g", payload), False, stats
+        )
+        service.apply_operation(
+            Operation(ADD, "group", "create", "h", payload), False, stats
+        )
+        service.apply_operation(
+            Operation(REMOVE_MEMBERS, "group", "delete", "o"), False, stats
+        )
+
+        repository.update_group.assert_called_once_with("g", payload)
+        assert (stats.updated, stats.created, stats.errors) == (1, 1, 1)
+
+    def test_dry_run_deletes_are_counted(self):
+        """Dry-run group deletes count like dry-run user deletes."""
+        repository = Mock()
+        user_stats = UserSyncStats()
+        group_stats = SyncStats()
+
+        UserSyncService(repository).apply_operation(
+            Operation(REVOKE, "user", "delete", "a@example.com"), True, user_stats
+        )
+        GroupSyncService(repository).apply_operation(
+            Operation(REMOVE_MEMBERS, "group", "delete", "o"), True, group_stats
+        )
+
+        assert user_stats.deleted == group_stats.deleted == 1
+        repository.delete_user.assert_not_called()
+        repository.delete_group.assert_not_called()
+
+
+CSV = (
+    "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+    "alice@example.com,Alice A,A,CN=ADMINS,DC=example,DC=com\n"
+    "bob@example.com,Bob B,A,CN=ADMINS,DC=example,DC=com\n"
+)
+
+
+@pytest.fixture
+def env(xc_env):
+    """Point the CLI at a fake server with a stale member and an orphan group."""
+    xc_env.seed_state(
+        groups=[
+            {
+                "name": "admins",
+                "usernames": ["alice@example.com", "eve@example.com"],
+            },
+            {"name": "OLD", "usernames": []},
+        ],
+        users=[{"email": "alice@example.com"}, {"email": "eve@example.com"}],
+    )
+    return xc_env
+
+
+class TestCLI:
+    """End-to-end deadline runs."""
+
+    def test_deadline_run_completes(self, env, tmp_path):
+        """With time to spare, everything is applied and no plan is left."""
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text(CSV)
+        plan = tmp_path / "leftover.json"
+
+        result = CliRunner().invoke(
+            cli,
+            [
+                "--csv",
+                str(csv_file),
+                "--prune",
+                "--deadline",
+                "600",
+                "--leftover-plan",
+                str(plan),
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert "Planned operations: revoke=1, remove-members=2, add=3" in result.output
+        assert set(env.groups) == {"admins"}
+        assert sorted(env.groups["admins"]["usernames"]) == [
+            "alice@example.com",
+            "bob@example.com",
+        ]
+        assert "eve@example.com" not in env.users
+        assert not plan.exists()
+
+    def test_expired_deadline_leaves_plan_to_resume(self, env, tmp_path, monkeypatch):
+        """Work not started before the deadline is saved and resumable."""
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text(CSV)
+        plan = tmp_path / "leftover.json"
+        # Expire the deadline once planning is done
+        with monkeypatch.context() as patched:
+            patched.setattr(
+                GroupSyncService,
+                "plan_operations",
+                _expire_after(GroupSyncService.plan_operations),
+            )
+            result = CliRunner().invoke(
+                cli,
+                ["--csv", str(csv_file), "--deadline", "600"]
+                + ["--leftover-plan", str(plan)],
+            )
+        assert result.exit_code == 1
+        assert "Run deadline reached; finish with --resume" in result.output
+        assert len(read_leftover(plan)) == 4
+
+        result = CliRunner().invoke(cli, ["--resume", str(plan)])
+
+        assert result.exit_code == 0, result.output
+        assert "Resuming 4 operations" in result.output
+        assert sorted(env.groups["admins"]["usernames"]) == [
+            "alice@example.com",
+            "bob@example.com",
+        ]
+
+    @pytest.mark.parametrize("kind", ["users", "groups"])
+    def test_deadline_while_refreshing_cache(self, env, tmp_path, monkeypatch, kind):
+        """A deadline reached refreshing cached listings is a clean error."""
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text(CSV)
+        args = ["--csv", str(csv_file), "--state-cache", str(tmp_path / "cache")]
+        runner = CliRunner()
+        assert runner.invoke(cli, args + ["--dry-run"]).exit_code == 0
+
+        def expired(self, touched):
+            raise DeadlineExceeded("Run deadline reached")
+
+        monkeypatch.setattr(CachingRepository, f"refresh_{kind}", expired)
+        result = runner.invoke(cli, args + ["--deadline", "600"])
+
+        assert result.exit_code == 1
+        assert f"Run deadline reached while refreshing {kind}" in result.output
+
+    def test_revoke_first_without_deadline(self, env, tmp_path, caplog):
+        """--revoke-first schedules the run without writing a plan."""
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text(CSV)
+        caplog.set_level("INFO")
+
+        result = CliRunner().invoke(
+            cli, ["--csv", str(csv_file), "--prune", "--revoke-first"]
+        )
+
+        assert result.exit_code == 0, result.output
+        assert "Planned operations: revoke=1" in result.output
+        messages = [r.getMessage() for r in caplog.records]
+        deleted = messages.index("Deleted user: eve@example.com")
+        assert deleted < messages.index("Created user: bob@example.com")
+        assert not (tmp_path / "xc-sync-leftover.json").exists()
+
+    def test_resume_checks_prune_limit(self, xc_env, tmp_path):
+        """A resumed plan deleting most of the tenant is refused."""
+        emails = [f"user{i}@example.com" for i in range(8)]
+        xc_env.seed_state(users=[{"email": email} for email in emails])
+        plan = tmp_path / "leftover.json"
+        write_leftover(
+            plan, [Operation(REVOKE, "user", "delete", email) for email in emails[:6]]
+        )
+
+        result = CliRunner().invoke(cli, ["--resume", str(plan)])
+        assert result.exit_code == 1
+        assert "Refusing to prune 6 of 8 users" in result.output
+        assert len(xc_env.users) == 8
+
+        result = CliRunner().invoke(
+            cli, ["--resume", str(plan), "--max-prune-percent", "100"]
+        )
+        assert result.exit_code == 0, result.output
+        assert len(xc_env.users) == 2
+
+    def test_resume_excludes_sources(self, tmp_path):
+        """--resume replaces --csv."""
+        plan = tmp_path / "plan.json"
+        write_leftover(plan, [])
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text(CSV)
+
+        result = CliRunner().invoke(
+            cli, ["--resume", str(plan), "--csv", str(csv_file)]
+        )
+        assert result.exit_code == 2
+        assert "--resume cannot be combined" in result.output
+
+
+def _expire_after(plan_operations):
+    def wrapper(self, *args, **kwargs):
+        ops = plan_operations(self, *args, **kwargs)
+        deadline = self.repository.deadline
+        deadline._end = deadline.clock()
+        return ops
+
+    return wrapper
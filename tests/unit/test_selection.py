@@ -0,0 +1,197 @@
+"""Tests for narrowing a sync to selected users and groups."""
+
+from __future__ import annotations
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.client import XCClient
+from xc_user_group_sync.models import Group, User
+from xc_user_group_sync.selection import SelectedSource, Selection, normalize_group
+from xc_user_group_sync.serve import TargetedSync
+from xc_user_group_sync.sources import SOURCE_COLUMNS, SourceRecord
+from xc_user_group_sync.sync_service import GroupSyncService
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+
+def _user(email):
+    return User(email=email, display_name="N", first_name="N", last_name="")
+
+
+PLANNED_USERS = [_user(e) for e in ("a@example.com", "b@example.com", "c@example.com")]
+PLANNED_GROUPS = [
+    Group(name="admins", users=["a@example.com"]),
+    Group(name="devs", users=["b@example.com", "c@example.com"]),
+    Group(name="ops", users=["c@example.com"]),
+]
+EXISTING_USERS = {"a@example.com": {}, "b@example.com": {}, "gone@example.com": {}}
+EXISTING_GROUPS = {
+    "admins": {"usernames": ["a@example.com"]},
+    "ops": {"usernames": ["B@example.com"]},
+    "old": {"usernames": ["b@example.com"]},
+}
+
+
+class TestSelection:
+    """Test which entities a selection keeps."""
+
+    def test_group_names(self):
+        """Groups may be named by XC name, CN or DN."""
+        assert normalize_group("CN=Team_Leads,OU=Groups,DC=example") == "team-leads"
+        assert normalize_group(" admins ") == "admins"
+        with pytest.raises(ValueError):
+            normalize_group("!!!")
+
+    def test_email_selects_its_groups(self):
+        """A user's source groups and the groups it leaves are selected."""
+        users, groups, existing_users, existing_groups = Selection.of(
+            emails=["B@Example.com"]
+        ).apply(PLANNED_USERS, PLANNED_GROUPS, EXISTING_USERS, EXISTING_GROUPS)
+
+        assert [u.email for u in users] == ["b@example.com"]
+        # devs (joined) and ops (left); "old" is not in the source
+        assert [g.name for g in groups] == ["devs", "ops"]
+        assert set(existing_users) == {"b@example.com"}
+        assert set(existing_groups) == {"ops"}
+
+    def test_group_selects_its_members(self):
+        """Members of a named group are selected so they can be created."""
+        users, groups, _, existing_groups = Selection.of(groups=["devs", "old"]).apply(
+            PLANNED_USERS, PLANNED_GROUPS, EXISTING_USERS, EXISTING_GROUPS
+        )
+
+        assert [u.email for u in users] == ["b@example.com", "c@example.com"]
+        assert [g.name for g in groups] == ["devs"]
+        # Named but not in the source: kept so prune can delete it
+        assert set(existing_groups) == {"old"}
+
+    def test_unknown_email_is_only_a_deletion_candidate(self):
+        """A named user missing from the source only appears as existing."""
+        selection = Selection.of(emails=["gone@example.com"])
+        users, groups, existing_users, _ = selection.apply(
+            PLANNED_USERS, PLANNED_GROUPS, EXISTING_USERS, EXISTING_GROUPS
+        )
+        assert (users, groups) == ([], [])
+        assert set(existing_users) == {"gone@example.com"}
+        assert len(selection) == 1 and selection
+        assert not Selection.of(emails=[" "])
+
+
+class ListSource:
+    """Record source over preset rows."""
+
+    fieldnames = SOURCE_COLUMNS
+
+    def __init__(self, rows):
+        self.rows = [SourceRecord(i + 2, *row) for i, row in enumerate(rows)]
+
+    def records(self):
+        yield from self.rows
+
+
+ROWS = [
+    ("a@example.com", "A", "A", "CN=ADMINS,DC=example|CN=Team_Leads,DC=example"),
+    ("b@example.com", "B", "A", "CN=TEAM_LEADS,DC=example"),
+    ("c@example.com", "C", "A", "CN=DEVS,DC=example"),
+    ("d@example.com", "D", "A", "CN=OPS\\2C EU,DC=example"),
+    ("e@example.com", "E", "A", "CN=OLD,DC=example"),
+]
+
+
+class TestSelectedSource:
+    """Test the row prefilter."""
+
+    def test_keeps_rows_of_emails_and_their_groups(self):
+        """Rows sharing a group with a selected email are kept."""
+        source = SelectedSource(
+            ListSource(ROWS), Selection.of(emails=["a@example.com"])
+        )
+
+        emails = [r.email for r in source.records()]
+
+        # d's DN has an escape the substring check cannot see through
+        assert emails == ["a@example.com", "b@example.com", "d@example.com"]
+        assert source.groups == {"admins", "team-leads"}
+        assert (source.rows_read, source.rows_kept) == (5, 3)
+
+    def test_keeps_rows_of_named_and_extra_groups(self):
+        selection = Selection.of(groups=["CN=DEVS,DC=example"])
+        source = SelectedSource(ListSource(ROWS), selection, groups=["old"])
+        assert [r.row_num for r in source.records()] == [4, 5, 6]
+
+
+SCOPED_CSV = (
+    "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+    "alice@example.com,Alice A,A,CN=ADMINS,DC=example\n"
+    "bob@example.com,Bob B,A,CN=OLD,DC=example\n"
+    "carol@example.com,Carol C,A,CN=DEVS,DC=example\n"
+)
+
+
+@pytest.fixture
+def xc(xc_env):
+    xc_env.seed_state(
+        groups=[{"name": "old", "usernames": ["alice@example.com", "bob@example.com"]}],
+        users=[
+            {"email": "alice@example.com", "groups": ["OLD"]},
+            {"email": "bob@example.com"},
+        ],
+    )
+    return xc_env
+
+
+class TestScopedSync:
+    """Test targeted syncs that fetch single entities instead of listings."""
+
+    def test_fetches_only_selected_entities(self, xc, tmp_path, monkeypatch):
+        """A group the user left in XC is fixed without listing the tenant."""
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text(SCOPED_CSV)
+        client = XCClient("acme", api_token="token", api_url=xc.url, max_retries=1)
+        for name in ("list_users", "list_groups", "list_user_roles"):
+            monkeypatch.setattr(client, name, lambda *a, **k: pytest.fail("listed"))
+        targeted = TargetedSync(
+            UserSyncService(client),
+            GroupSyncService(client),
+            csv_path=str(csv_file),
+            scoped=True,
+        )
+
+        result = targeted.run(Selection.of(emails=["alice@example.com"]))
+
+        assert [(r["action"], r["key"]) for r in result["operations"]] == [
+            ("remove_members", "old"),
+            ("update", "alice@example.com"),
+            ("create", "admins"),
+        ]
+        assert xc.groups["old"]["usernames"] == ["bob@example.com"]
+        assert "devs" not in xc.groups
+
+    def test_cli_selection_options(self, xc, tmp_path):
+        """--from-file entries are split into emails and groups."""
+        csv_file = tmp_path / "users.csv"
+        csv_file.write_text(SCOPED_CSV)
+        selection = tmp_path / "fix.txt"
+        selection.write_text("# on-call fix\ncarol@example.com\n\nDEVS  # team\n")
+
+        result = CliRunner().invoke(
+            cli, ["--csv", str(csv_file), "--from-file", str(selection), "--dry-run"]
+        )
+
+        assert result.exit_code == 0, result.output
+        assert "Targeted sync of 1 users and 1 groups" in result.output
+        assert "dry_run  user create carol@example.com" in result.output
+        assert "dry_run  group create devs" in result.output
+        assert "admins" not in result.output
+        assert "devs" not in xc.groups
+
+        result = CliRunner().invoke(
+            cli, ["--csv", str(csv_file), "--only-group", "!!", "--dry-run"]
+        )
+        assert result.exit_code == 2
+        result = CliRunner().invoke(
+            cli, ["--csv", str(csv_file), "--only-email", "a@x.com", "--serve", "0"]
+        )
+        assert result.exit_code == 2
+        assert "cannot be combined" in result.output
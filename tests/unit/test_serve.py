@@ -0,0 +1,310 @@
+"""Tests for the targeted sync HTTP endpoint."""
+
+from __future__ import annotations
+
+import http.client
+import threading
+
+import pytest
+import requests
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.client import XCClient
+from xc_user_group_sync.selection import Selection
+from xc_user_group_sync.serve import (
+    SyncServer,
+    TargetedSync,
+    is_loopback,
+    parse_request,
+)
+from xc_user_group_sync.sources import CSVSource
+from xc_user_group_sync.state_cache import CachingRepository, StateCache
+from xc_user_group_sync.sync_service import GroupSyncService
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+CSV = (
+    "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+    "alice@example.com,Alice A,A,CN=ADMINS,DC=example,DC=com\n"
+    "bob@example.com,Bob B,A,CN=ADMINS,DC=example,DC=com\n"
+    "carol@example.com,Carol C,A,CN=DEVS,DC=example,DC=com\n"
+)
+
+
+@pytest.fixture
+def xc(xc_server):
+    xc_server.seed_state(
+        groups=[{"name": "admins", "usernames": ["alice@example.com"]}],
+        users=[{"email": "alice@example.com"}, {"email": "gone@example.com"}],
+    )
+    return xc_server
+
+
+@pytest.fixture
+def targeted(xc, tmp_path):
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(CSV)
+    client = XCClient("acme", api_token="token", api_url=xc.url, max_retries=1)
+    repo = CachingRepository(client, StateCache(":memory:"))
+    return TargetedSync(
+        UserSyncService(repo),
+        GroupSyncService(repo),
+        csv_path=str(csv_file),
+        cache_repo=repo,
+        prune=True,
+    )
+
+
+def _serve(sync, **kwargs):
+    server = SyncServer(("127.0.0.1", 0), sync, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class TestTargetedSync:
+    """Test syncs limited to a few entities."""
+
+    def test_syncs_only_the_selection(self, xc, targeted):
+        """Bob is created and added to admins; carol and devs are left alone."""
+        result = targeted.run(Selection.of(emails=["bob@example.com"]))
+
+        assert [
+            (r["entity"], r["action"], r["key"], r["status"])
+            for r in result["operations"]
+        ] == [
+            ("user", "create", "bob@example.com", "ok"),
+            ("group", "update", "admins", "ok"),
+        ]
+        assert set(xc.users) == {
+            "alice@example.com",
+            "bob@example.com",
+            "gone@example.com",
+        }
+        assert "devs" not in xc.groups
+
+    def test_prune_is_limited_to_selection(self, xc, targeted):
+        """Only a named user missing from the source is deleted."""
+        result = targeted.run(Selection.of(emails=["gone@example.com"]), dry_run=True)
+        assert result["operations"] == [
+            {
+                "entity": "user",
+                "action": "delete",
+                "key": "gone@example.com",
+                "priority": "revoke",
+                "status": "dry_run",
+            }
+        ]
+
+    def test_source_is_parsed_once_per_change(self, targeted, monkeypatch):
+        """An unchanged file is not parsed again."""
+        targeted.load()
+        monkeypatch.setattr(
+            targeted.user_service,
+            "parse_csv_to_users",
+            lambda *a, **k: pytest.fail("parsed again"),
+        )
+        users, groups = targeted.load()
+        assert len(users) == 3 and len(groups) == 2
+
+    def test_source_without_file_is_reused_within_ttl(self, targeted, clock):
+        """A source without a path (like LDAP) is read again only after the TTL."""
+
+        class DirectorySource:
+            def __init__(self, path):
+                self._csv = CSVSource(path)
+                self.reads = 0
+
+            @property
+            def fieldnames(self):
+                return self._csv.fieldnames
+
+            def records(self):
+                self.reads += 1
+                return self._csv.records()
+
+        source = DirectorySource(targeted.csv_path)
+        sync = TargetedSync(
+            targeted.user_service,
+            targeted.group_service,
+            source=source,
+            source_ttl=60,
+            clock=clock,
+        )
+        sync.load()
+        reads = source.reads
+        clock.now += 59
+        users, _ = sync.load()
+        assert source.reads == reads and len(users) == 3
+
+        clock.now += 1
+        sync.load()
+        assert source.reads > reads
+
+    def test_group_errors_are_reported(self, xc, targeted):
+        """A failed group write carries its error in the result."""
+        xc.inject_failure(400, method="POST", path_contains="user_groups")
+        result = targeted.run(Selection.of(groups=["devs"]))
+
+        (group_op,) = [op for op in result["operations"] if op["entity"] == "group"]
+        assert group_op["status"] == "error"
+        assert "400" in group_op["error"]
+
+
+class TestRequests:
+    """Test request validation."""
+
+    @pytest.mark.parametrize(
+        "body, message",
+        [
+            ([], "JSON object"),
+            ({"emails": "a@example.com"}, "list of strings"),
+            ({"emails": ["a@example.com"], "dry_run": "yes"}, "dry_run"),
+            ({}, "at least one"),
+            ({"emails": [f"{i}@example.com" for i in range(501)]}, "At most 500"),
+        ],
+    )
+    def test_invalid_bodies(self, body, message):
+        with pytest.raises(ValueError, match=message):
+            parse_request(body)
+
+
+class TestServer:
+    """End-to-end HTTP behaviour."""
+
+    def test_sync_and_health(self, xc, targeted):
+        """A sync request returns its operations; health reports the queue."""
+        server, url = _serve(targeted)
+        try:
+            response = requests.post(
+                f"{url}/sync", json={"groups": ["CN=DEVS,DC=example"]}, timeout=10
+            )
+            assert response.status_code == 200, response.text
+            keys = [op["key"] for op in response.json()["operations"]]
+            assert keys == ["carol@example.com", "devs"]
+            assert xc.groups["devs"]["usernames"] == ["carol@example.com"]
+
+            health = requests.get(f"{url}/healthz", timeout=10).json()
+            assert health == {"status": "ok", "running": 0, "queued": 0, "rejected": 0}
+            assert requests.post(f"{url}/sync", json={}, timeout=10).status_code == 400
+            assert requests.get(f"{url}/other", timeout=10).status_code == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_token_is_required_when_set(self, targeted):
+        server, url = _serve(targeted, token="s3cret")
+        try:
+            body = {"emails": ["bob@example.com"], "dry_run": True}
+            assert (
+                requests.post(f"{url}/sync", json=body, timeout=10).status_code == 401
+            )
+            for wrong in ("Bearer s3cre", "Bearer s\xe9cret"):
+                response = requests.post(
+                    f"{url}/sync",
+                    json=body,
+                    headers={"Authorization": wrong},
+                    timeout=10,
+                )
+                assert response.status_code == 401
+            response = requests.post(
+                f"{url}/sync",
+                json=body,
+                headers={"Authorization": "Bearer s3cret"},
+                timeout=10,
+            )
+            assert response.status_code == 200
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @pytest.mark.parametrize("length", ["-1", "abc"])
+    def test_invalid_content_length(self, targeted, length):
+        """A negative or non-numeric Content-Length is rejected."""
+        server, _ = _serve(targeted)
+        connection = http.client.HTTPConnection(
+            "127.0.0.1", server.server_port, timeout=10
+        )
+        try:
+            connection.putrequest("POST", "/sync")
+            connection.putheader("Content-Length", length)
+            connection.endheaders()
+            response = connection.getresponse()
+            assert response.status == 400
+            assert b"Content-Length" in response.read()
+        finally:
+            connection.close()
+            server.shutdown()
+            server.server_close()
+
+    @pytest.mark.parametrize(
+        "host, expected",
+        [
+            ("127.0.0.1", True),
+            ("::1", True),
+            ("localhost", True),
+            ("0.0.0.0", False),
+            ("", False),
+            ("sync.example.com", False),
+        ],
+    )
+    def test_is_loopback(self, host, expected):
+        assert is_loopback(host) is expected
+
+    def test_remote_address_requires_token(self, targeted):
+        """Listening beyond loopback without a token is refused."""
+        with pytest.raises(ValueError, match="without a token"):
+            SyncServer(("0.0.0.0", 0), targeted)
+        SyncServer(("0.0.0.0", 0), targeted, token="s3cret").server_close()
+
+    def test_full_queue_is_rejected(self):
+        """Requests beyond the running and queued slots get a 429."""
+        started = threading.Event()
+        release = threading.Event()
+
+        class SlowSync:
+            def run(self, selection, dry_run=False):
+                started.set()
+                release.wait(10)
+                return {"operations": []}
+
+        server, url = _serve(SlowSync(), max_concurrent=1, max_queue=0)
+        body = {"emails": ["a@example.com"]}
+        try:
+            first = threading.Thread(
+                target=requests.post, args=(f"{url}/sync",), kwargs={"json": body}
+            )
+            first.start()
+            assert started.wait(10)
+
+            response = requests.post(f"{url}/sync", json=body, timeout=10)
+            assert response.status_code == 429
+            assert response.headers["Retry-After"] == "5"
+            assert server.status()["rejected"] == 1
+        finally:
+            release.set()
+            first.join(10)
+            server.shutdown()
+            server.server_close()
+
+
+def test_cli_serve_options(xc, xc_env, tmp_path):
+    """--serve needs a valid address and excludes the other run modes."""
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(CSV)
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ["--csv", str(csv_file), "--serve", "localhost:x"])
+    assert result.exit_code == 2
+    assert "expected [HOST:]PORT" in result.output
+
+    result = runner.invoke(cli, ["--csv", str(csv_file), "--serve", "0", "--watch"])
+    assert result.exit_code == 2
+    assert "--serve cannot be combined" in result.output
+
+    result = runner.invoke(
+        cli,
+        ["--csv", str(csv_file), "--serve", "0.0.0.0:0"],
+        env={"SYNC_TRIGGER_TOKEN": ""},
+    )
+    assert result.exit_code == 2
+    assert "without a token" in result.output
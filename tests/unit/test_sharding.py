@@ -0,0 +1,154 @@
+"""Tests for sharded syncs."""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.sharding import (
+    Shard,
+    ShardCoordinator,
+    ShardError,
+    merge_stats,
+    shard_of,
+)
+from xc_user_group_sync.sync_service import SyncStats
+from xc_user_group_sync.user_sync_service import UserSyncStats
+
+
+class TestShard:
+    """Test shard assignment."""
+
+    def test_parse(self):
+        assert Shard.parse("2/4") == Shard(1, 4)
+        assert str(Shard(1, 4)) == "2/4"
+        for value in ("0/4", "5/4", "4", "a/b"):
+            with pytest.raises(ValueError):
+                Shard.parse(value)
+
+    def test_assignment_is_stable_and_covers_all_keys(self):
+        """Keys map to the same shard everywhere, regardless of case."""
+        keys = [f"user{i}@example.com" for i in range(200)]
+        assert shard_of("Alice@Example.com", 4) == shard_of("alice@example.com", 4)
+        assert shard_of("alice@example.com", 4) == 1
+        owned = [Shard(i, 4).select(keys, str) for i in range(4)]
+        assert sorted(k for part in owned for k in part) == sorted(keys)
+        assert all(owned)
+
+
+class TestCoordinator:
+    """Test the file-based barrier and stats merge."""
+
+    def _coordinators(self, tmp_path, count=2, **kwargs):
+        return [
+            ShardCoordinator(str(tmp_path), Shard(i, count), **kwargs)
+            for i in range(count)
+        ]
+
+    def test_claim_is_exclusive(self, tmp_path):
+        first, _ = self._coordinators(tmp_path)
+        first.claim()
+        with pytest.raises(ShardError, match="already claimed"):
+            ShardCoordinator(str(tmp_path), Shard(0, 2)).claim()
+
+    def test_barrier_waits_for_every_shard(self, tmp_path, clock):
+        first, second = self._coordinators(
+            tmp_path, timeout=10, clock=clock, sleep=clock.sleep
+        )
+        first.finish("users", ok=True)
+        with pytest.raises(ShardError, match="Timed out waiting for shards 2/2"):
+            first.wait("users")
+        assert clock.now == 10
+
+        second.finish("users", ok=True)
+        first.wait("users")
+
+    def test_failed_shard_stops_the_others(self, tmp_path):
+        first, second = self._coordinators(tmp_path)
+        first.finish("users", ok=True)
+        second.abort("users")
+        second.abort("users")  # already marked
+        with pytest.raises(ShardError, match="Shard 2/2 failed users"):
+            first.wait("users")
+
+    def test_last_report_writes_the_summary(self, tmp_path):
+        """Stats are summed once every shard reported."""
+        first, second = self._coordinators(tmp_path)
+        assert first.report(UserSyncStats(created=2), SyncStats(updated=1)) is None
+
+        error = {"email": "x@example.com", "operation": "create", "error": "boom"}
+        merged = second.report(
+            UserSyncStats(created=1, errors=1, error_details=[error]),
+            SyncStats(updated=2),
+        )
+
+        assert merged is not None
+        users, groups = merged
+        assert (users.created, users.errors, users.error_details) == (2 + 1, 1, [error])
+        assert groups.updated == 3
+        summary = json.loads((tmp_path / "summary.json").read_text())
+        assert summary["users"]["created"] == 3
+        # Only one worker writes the summary
+        assert first.report(UserSyncStats(created=2), SyncStats(updated=1)) is None
+
+    def test_merge_ignores_unknown_fields(self):
+        users, groups = merge_stats([{"users": {"created": 1}, "groups": {"x": 1}}])
+        assert users.created == 1 and groups == SyncStats()
+
+
+CSV = "Email,User Display Name,Employee Status,Entitlement Display Name\n" + "".join(
+    f"user{i}@example.com,User {i},A,CN=TEAM{i % 5},DC=example\n" for i in range(20)
+)
+
+
+def test_two_shards_sync_everything(xc_env, tmp_path):
+    """Two concurrent workers together create every user and group."""
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(CSV)
+    shard_dir = tmp_path / "run"
+    # The workers inherit the environment pointing at the fake server
+    args = [sys.executable, "-m", "xc_user_group_sync.cli", "--csv", str(csv_file)]
+    workers = [
+        subprocess.Popen(
+            args + ["--shard", f"{i}/2", "--shard-dir", str(shard_dir)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        for i in (1, 2)
+    ]
+    outputs = [w.communicate(timeout=60)[0] for w in workers]
+
+    assert [w.returncode for w in workers] == [0, 0], outputs
+    assert len(xc_env.users) == 20
+    assert sorted(xc_env.groups) == [f"team{i}" for i in range(5)]
+    assert all(len(g["usernames"]) == 4 for g in xc_env.groups.values())
+
+    assert sum("All 2 shards done" in out for out in outputs) == 1
+    summary = json.loads((shard_dir / "summary.json").read_text())
+    assert summary["users"]["created"] == 20
+    assert summary["groups"]["created"] == 5
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["--shard", "1/2"], "--shard-dir"),
+        (["--shard", "3/2", "--shard-dir", "run"], "1 <= I <= N"),
+        (["--shard", "1/2", "--shard-dir", "run", "--deadline", "60"], "combined"),
+        (["--shard", "1/2", "--shard-dir", "run", "--revoke-first"], "combined"),
+    ],
+)
+def test_shard_option_conflicts(tmp_path, monkeypatch, args, message):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "users.csv").write_text(CSV)
+
+    result = CliRunner().invoke(cli, ["--csv", "users.csv"] + args)
+
+    assert result.exit_code == 2
+    assert message in result.output
@@ -0,0 +1,173 @@
+"""Tests for binary state snapshots."""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync.backup import BackupError, load_backup, write_backup
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.snapshot import (
+    SnapshotError,
+    compression_for,
+    read_snapshot,
+    write_snapshot,
+)
+from xc_user_group_sync.state_cache import GROUPS, USERS
+
+STATE = {
+    USERS: {
+        "alice@example.com": {
+            "email": "alice@example.com",
+            "groups": ["admins", "devs"],
+            "active": True,
+        },
+        "bob@example.com": {"email": "bob@example.com", "namespace_roles": [{"x": 1}]},
+    },
+    GROUPS: {
+        "admins": {"name": "admins", "usernames": ["alice@example.com"]},
+        "devs": {"name": "devs", "usernames": []},
+        "empty": {"name": "empty"},
+    },
+}
+
+
+def _sections(state):
+    return [(kind, list(items.values())) for kind, items in state.items()]
+
+
+class TestFormat:
+    """Test encoding and decoding."""
+
+    @pytest.mark.parametrize("compression", ["none", "lzma"])
+    def test_round_trip(self, compression):
+        stream = io.BytesIO()
+        write_snapshot(stream, {"tenant": "acme"}, STATE, compression)
+        stream.seek(0)
+
+        header, sections = read_snapshot(stream)
+
+        assert header == {"tenant": "acme"}
+        assert sections == _sections(STATE)
+
+    def test_round_trip_from_mapped_file(self, tmp_path):
+        path = tmp_path / "state.xcsnap"
+        with open(path, "wb") as f:
+            write_snapshot(f, {}, STATE)
+
+        with open(path, "rb") as f:
+            _, sections = read_snapshot(f)
+
+        assert sections == _sections(STATE)
+
+    def test_strings_are_stored_once(self):
+        """Emails repeated across users and groups cost one table entry."""
+        emails = [f"user{i}@example.com" for i in range(1000)]
+        state = {
+            USERS: {e: {"email": e, "groups": ["g0", "g1"]} for e in emails},
+            GROUPS: {f"g{i}": {"name": f"g{i}", "usernames": emails} for i in range(2)},
+        }
+        stream = io.BytesIO()
+        write_snapshot(stream, {}, state)
+
+        as_json = len(json.dumps(state).encode())
+        assert len(stream.getvalue()) < as_json / 2
+
+    def test_zstd_requires_zstandard(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "zstandard", None)
+        with pytest.raises(ImportError, match=r"\[zstd\]"):
+            write_snapshot(io.BytesIO(), {}, STATE, "zstd")
+
+    @pytest.mark.parametrize(
+        "data, message",
+        [
+            (b"XCSNAP\r\n", "Not an XC snapshot"),
+            (b"XCSNAP\r\n\x02\x00\x00\x00\x00\x00\x00\x00", "version"),
+            (b"XCSNAP\r\n\x01\x00\x09\x00\x00\x00\x00\x00", "compression"),
+        ],
+    )
+    def test_rejects_bad_snapshots(self, data, message):
+        with pytest.raises(SnapshotError, match=message):
+            read_snapshot(io.BytesIO(data))
+
+    def test_rejects_truncated_snapshot(self):
+        stream = io.BytesIO()
+        write_snapshot(stream, {}, STATE)
+        with pytest.raises(SnapshotError, match="Truncated"):
+            read_snapshot(io.BytesIO(stream.getvalue()[:-40]))
+
+    def test_rejects_truncated_mapped_file(self, tmp_path):
+        """A cut-off file on disk fails cleanly while memory-mapped."""
+        emails = [f"user{i}@example.com" for i in range(50)]
+        state = {USERS: {e: {"email": e, "groups": ["g0", "g1"]} for e in emails}}
+        stream = io.BytesIO()
+        write_snapshot(stream, {}, state)
+        data = stream.getvalue()
+        path = tmp_path / "state.xcsnap"
+        path.write_bytes(data[: len(data) // 2])
+
+        with open(path, "rb") as f:
+            with pytest.raises(SnapshotError, match="Truncated"):
+                read_snapshot(f)
+
+    def test_compression_for(self):
+        assert compression_for("state.xcsnap") == "none"
+        assert compression_for("STATE.XCSNAP.XZ") == "lzma"
+        assert compression_for("state.xcsnap.zst") == "zstd"
+        assert compression_for("state.ndjson.gz") is None
+
+
+class TestBackups:
+    """Test snapshots as backup archives."""
+
+    class Repository:
+        def list_users(self, namespace):
+            return {"items": list(STATE[USERS].values())}
+
+        def list_groups(self, namespace):
+            return {"user_groups": list(STATE[GROUPS].values())}
+
+    def test_load_backup_reads_both_formats(self):
+        snapshot, ndjson = io.BytesIO(), io.BytesIO()
+        write_backup(snapshot, self.Repository(), "acme", snapshot="lzma")
+        write_backup(ndjson, self.Repository(), "acme")
+        snapshot.seek(0)
+        ndjson.seek(0)
+
+        from_snapshot = load_backup(snapshot)
+        from_ndjson = load_backup(ndjson)
+
+        assert from_snapshot[0]["tenant"] == "acme"
+        assert from_snapshot[1] == from_ndjson[1] == STATE
+        assert gzip.decompress(ndjson.getvalue())
+
+    def test_corrupt_snapshot_is_a_backup_error(self):
+        stream = io.BytesIO()
+        write_backup(stream, self.Repository(), "acme", snapshot="none")
+        with pytest.raises(BackupError):
+            load_backup(io.BytesIO(stream.getvalue()[:-40]))
+
+
+def test_cli_snapshot_backup_and_restore(xc_env, tmp_path):
+    """A .xcsnap backup path selects the binary format end to end."""
+    xc_env.seed_state(
+        groups=list(STATE[GROUPS].values()),
+        users=[{"email": "alice@example.com"}],
+    )
+    path = tmp_path / "state.xcsnap"
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ["--backup", str(path)])
+    assert result.exit_code == 0, result.output
+    assert path.read_bytes().startswith(b"XCSNAP")
+
+    del xc_env.groups["admins"]
+    result = runner.invoke(cli, ["--restore", str(path)])
+    assert result.exit_code == 0, result.output
+    assert "created=1" in result.output
+    assert "admins" in xc_env.groups
@@ -0,0 +1,269 @@
+"""Tests for CSV, NDJSON, Parquet and Arrow record sources."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.sources import (
+    ArrowSource,
+    CSVSource,
+    NDJSONSource,
+    ParquetSource,
+    SourceRecord,
+    detect_format,
+    open_source,
+)
+from xc_user_group_sync.sync_service import CSVParseError, GroupSyncService
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+ROWS = [
+    {
+        "Email": "alice@example.com",
+        "User Display Name": "Alice Anderson",
+        "Employee Status": "A",
+        "Entitlement Display Name": "CN=ADMINS,OU=Groups,DC=example,DC=com",
+        "Cost Center": "100",
+    },
+    {
+        "Email": "bob@example.com",
+        "User Display Name": "Bob Brown",
+        "Employee Status": "T",
+        "Entitlement Display Name": (
+            "CN=ADMINS,OU=Groups,DC=example,DC=com|CN=DEVS,OU=Groups,DC=example,DC=com"
+        ),
+        "Cost Center": "200",
+    },
+]
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    """The sample rows as CSV."""
+    path = tmp_path / "users.csv"
+    header = list(ROWS[0])
+    lines = [",".join(f'"{h}"' for h in header)]
+    lines += [",".join(f'"{row[h]}"' for h in header) for row in ROWS]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def ndjson_file(tmp_path):
+    """The sample rows as NDJSON with a blank line."""
+    path = tmp_path / "users.ndjson"
+    path.write_text(json.dumps(ROWS[0]) + "\n\n" + json.dumps(ROWS[1]) + "\n")
+    return str(path)
+
+
+def _arrow_table():
+    pa = pytest.importorskip("pyarrow")
+    return pa.Table.from_pylist(ROWS)
+
+
+class TestSources:
+    """Every source yields the same normalized records."""
+
+    def test_csv_source(self, csv_file):
+        """CSV records keep spreadsheet row numbers."""
+        records = list(CSVSource(csv_file).records())
+        assert records[0] == SourceRecord(
+            2,
+            "alice@example.com",
+            "Alice Anderson",
+            "A",
+            "CN=ADMINS,OU=Groups,DC=example,DC=com",
+        )
+        assert [r.row_num for r in records] == [2, 3]
+        assert "Cost Center" in CSVSource(csv_file).fieldnames
+
+    def test_csv_source_missing_columns(self, tmp_path):
+        """Columns absent from the header come through as None."""
+        path = tmp_path / "groups.csv"
+        path.write_text("Email,Entitlement Display Name\na@example.com,CN=X\n")
+        (record,) = CSVSource(str(path)).records()
+        assert record == SourceRecord(2, "a@example.com", None, None, "CN=X")
+
+    def test_ndjson_source(self, ndjson_file):
+        """NDJSON rows are numbered by line and skip blank lines."""
+        source = NDJSONSource(ndjson_file)
+        records = list(source.records())
+
+        assert [r.row_num for r in records] == [1, 3]
+        assert records[1].email == "bob@example.com"
+        assert source.fieldnames == list(ROWS[0])
+
+    def test_ndjson_non_string_values(self, tmp_path):
+        """Scalar values are converted to strings."""
+        path = tmp_path / "users.ndjson"
+        path.write_text(json.dumps({"Email": "a@example.com", "Employee Status": 1}))
+        (record,) = NDJSONSource(str(path)).records()
+        assert record.employee_status == "1"
+        assert record.display_name is None
+
+    def test_ndjson_invalid_line(self, tmp_path):
+        """Malformed JSON is reported with its line number."""
+        path = tmp_path / "users.ndjson"
+        path.write_text('{"Email": "a@example.com"}\n{not json\n')
+        with pytest.raises(ValueError, match="Line 2"):
+            list(NDJSONSource(str(path)).records())
+
+    def test_parquet_source(self, tmp_path):
+        """Parquet is read in batches with only the needed columns."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "users.parquet"
+        pq.write_table(_arrow_table(), path)
+
+        source = ParquetSource(str(path), batch_size=1)
+        records = list(source.records())
+
+        assert [r.email for r in records] == ["alice@example.com", "bob@example.com"]
+        assert [r.row_num for r in records] == [1, 2]
+        assert "Cost Center" in source.fieldnames
+
+    def test_arrow_file_and_stream(self, tmp_path):
+        """Both Arrow IPC file and stream formats are accepted."""
+        pa = pytest.importorskip("pyarrow")
+        table = _arrow_table().cast(
+            pa.schema([(name, pa.large_string()) for name in ROWS[0]])
+        )
+        file_path = tmp_path / "users.arrow"
+        with pa.ipc.new_file(file_path, table.schema) as writer:
+            writer.write_table(table)
+        stream_path = tmp_path / "users.ipc"
+        with pa.ipc.new_stream(stream_path, table.schema) as writer:
+            writer.write_table(table)
+
+        for path in (file_path, stream_path):
+            source = ArrowSource(str(path))
+            assert [r.employee_status for r in source.records()] == ["A", "T"]
+            assert source.fieldnames == list(ROWS[0])
+
+
+class TestFormatSelection:
+    """Test format detection and source construction."""
+
+    @pytest.mark.parametrize(
+        "path,expected",
+        [
+            ("users.csv", "csv"),
+            ("users.JSONL", "ndjson"),
+            ("users.parquet", "parquet"),
+            ("users.feather", "arrow"),
+            ("users.txt", "csv"),
+        ],
+    )
+    def test_detect_format(self, path, expected):
+        """Formats are detected from the extension, defaulting to CSV."""
+        assert detect_format(path) == expected
+
+    def test_explicit_format(self):
+        """An explicit format wins over the extension."""
+        assert detect_format("export.txt", "ndjson") == "ndjson"
+        with pytest.raises(ValueError, match="xml"):
+            detect_format("export.xml", "xml")
+
+    def test_open_source(self, ndjson_file):
+        """open_source builds the matching source and checks the path."""
+        assert isinstance(open_source(ndjson_file), NDJSONSource)
+        with pytest.raises(FileNotFoundError):
+            open_source("/nonexistent/users.parquet")
+
+
+class TestServicesConsumeRecords:
+    """The services produce the same plan from any source."""
+
+    def test_users_from_ndjson_match_csv(self, csv_file, ndjson_file):
+        """User parsing is format independent apart from row numbers."""
+        service = UserSyncService(None)
+        from_csv = service.parse_csv_to_users(csv_file)
+        from_ndjson = service.parse_source_to_users(NDJSONSource(ndjson_file))
+
+        assert from_ndjson.users == from_csv.users
+        assert from_ndjson.unique_groups == {"ADMINS", "DEVS"}
+
+    def test_groups_from_ndjson_match_csv(self, csv_file, ndjson_file):
+        """Group plans are format independent."""
+        service = GroupSyncService(None)
+        assert service.parse_source_to_groups(
+            NDJSONSource(ndjson_file)
+        ) == service.parse_csv_to_groups(csv_file)
+
+    def test_null_values_are_empty(self, tmp_path):
+        """JSON nulls parse like empty cells instead of failing the run."""
+        path = tmp_path / "users.ndjson"
+        rows = [dict(ROWS[0]), {**ROWS[1], "Entitlement Display Name": None}]
+        rows[0]["User Display Name"] = None
+        path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+
+        result = UserSyncService(None).parse_source_to_users(NDJSONSource(str(path)))
+        groups = GroupSyncService(None).parse_source_to_groups(NDJSONSource(str(path)))
+
+        assert [(u.email, u.display_name, u.groups) for u in result.users] == [
+            ("alice@example.com", "", ["ADMINS"]),
+            ("bob@example.com", "Bob Brown", []),
+        ]
+        assert [(g.name, g.users) for g in groups] == [
+            ("admins", ["alice@example.com"])
+        ]
+
+    def test_null_parquet_cells_are_empty(self, tmp_path):
+        """Null Parquet cells parse like empty cells."""
+        pa = pytest.importorskip("pyarrow")
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "users.parquet"
+        rows = [ROWS[0], {**ROWS[1], "Entitlement Display Name": None}]
+        pq.write_table(pa.Table.from_pylist(rows), path)
+
+        result = UserSyncService(None).parse_source_to_users(ParquetSource(str(path)))
+
+        assert [u.groups for u in result.users] == [["ADMINS"], []]
+        assert result.users[1].active is False
+
+    def test_missing_columns(self, tmp_path):
+        """Header validation uses the source's field names."""
+        path = tmp_path / "users.ndjson"
+        path.write_text(json.dumps({"Email": "a@example.com"}) + "\n")
+        with pytest.raises(ValueError, match="Missing required columns"):
+            UserSyncService(None).parse_source_to_users(NDJSONSource(str(path)))
+        with pytest.raises(CSVParseError, match="Entitlement Display Name"):
+            GroupSyncService(None).parse_source_to_groups(NDJSONSource(str(path)))
+
+
+@patch("xc_user_group_sync.cli.UserSyncService")
+@patch("xc_user_group_sync.cli.GroupSyncService")
+@patch("xc_user_group_sync.cli.XCClient")
+def test_cli_reads_ndjson_through_source(
+    mock_client_class, mock_group_class, mock_user_class, ndjson_file, monkeypatch
+):
+    """Non-CSV inputs are parsed through parse_source_to_*."""
+    monkeypatch.setenv("TENANT_ID", "test-tenant")
+    monkeypatch.setenv("XC_API_TOKEN", "test-token")
+    user_service = UserSyncService(None)
+    mock_user = Mock()
+    mock_user.parse_source_to_users.side_effect = user_service.parse_source_to_users
+    mock_user.fetch_existing_users.return_value = {}
+    mock_user.sync_users.return_value = Mock(
+        summary=Mock(return_value="Users: ok"), has_errors=Mock(return_value=False)
+    )
+    mock_user_class.return_value = mock_user
+    mock_group = Mock()
+    mock_group.parse_source_to_groups.return_value = []
+    mock_group.fetch_existing_groups.return_value = {}
+    mock_group.fetch_existing_users.return_value = set()
+    mock_group.sync_groups.return_value = Mock(
+        summary=Mock(return_value="Groups: ok"), has_errors=Mock(return_value=False)
+    )
+    mock_group_class.return_value = mock_group
+
+    result = CliRunner().invoke(cli, ["--csv", ndjson_file, "--dry-run"])
+
+    assert result.exit_code == 0, result.output
+    assert "Users planned from CSV: 2" in result.output
+    mock_user.parse_csv_to_users.assert_not_called()
+    (source,), _ = mock_group.parse_source_to_groups.call_args
+    assert isinstance(source, NDJSONSource)
@@ -0,0 +1,309 @@
+"""Tests for the persistent XC state cache."""
+
+from __future__ import annotations
+
+from unittest.mock import Mock
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.client import XCClient
+from xc_user_group_sync.models import Group, User
+from xc_user_group_sync.state_cache import (
+    GROUPS,
+    USERS,
+    CachingRepository,
+    MissingRoles,
+    StateCache,
+)
+from xc_user_group_sync.sync_service import GroupSyncService
+from xc_user_group_sync.user_sync_service import UserSyncService
+
+
+@pytest.fixture
+def server(xc_server):
+    """Fake XC server with a couple of groups and users."""
+    xc_server.seed_state(
+        groups=[
+            {"name": "admins", "usernames": ["alice@example.com"]},
+            {"name": "devs", "usernames": []},
+        ],
+        users=[{"email": "alice@example.com"}, {"email": "bob@example.com"}],
+    )
+    return xc_server
+
+
+def _repo(server, path, clock, ttl=60.0):
+    client = XCClient("acme", api_token="t", api_url=server.url, max_retries=1)
+    return CachingRepository(client, StateCache(str(path), clock=clock), ttl)
+
+
+class TestCachingRepository:
+    """Test TTL, revalidation and write-through."""
+
+    def test_ttl_then_revalidation(self, server, tmp_path, clock):
+        """Fresh listings skip the API; stale ones are revalidated with a 304."""
+        repo = _repo(server, tmp_path / "state.db", clock)
+
+        first = repo.list_groups()
+        assert {g["name"] for g in first["user_groups"]} == {"admins", "devs"}
+        assert not repo.served_from_cache(GROUPS)
+        gets = server.requests["GET"]
+
+        assert repo.list_groups()["user_groups"] == sorted(
+            first["user_groups"], key=lambda g: g["name"]
+        )
+        assert repo.served_from_cache(GROUPS)
+        assert server.requests["GET"] == gets
+
+        clock.now += 61
+        assert len(repo.list_groups()["user_groups"]) == 2
+        assert not repo.served_from_cache(GROUPS)
+        assert server.requests["GET"] == gets + 1
+
+    def test_changed_listing_is_refetched(self, server, tmp_path, clock):
+        """A changed collection returns the new listing after the TTL."""
+        repo = _repo(server, tmp_path / "state.db", clock)
+        repo.list_user_roles()
+        server.seed_state(users=[{"email": "carol@example.com"}])
+
+        clock.now += 61
+        emails = {u["email"] for u in repo.list_users()["items"]}
+        assert "carol@example.com" in emails
+
+    def test_cache_persists_across_runs(self, server, tmp_path, clock):
+        """A new process reads the listing from disk."""
+        path = tmp_path / "state.db"
+        _repo(server, path, clock).list_groups()
+        gets = server.requests["GET"]
+
+        repo = _repo(server, path, clock)
+        assert len(repo.list_groups()["user_groups"]) == 2
+        assert server.requests["GET"] == gets
+
+    def test_tenants_are_separate(self, server, tmp_path, clock):
+        """Listings are scoped by API URL."""
+        path = tmp_path / "state.db"
+        _repo(server, path, clock).list_groups()
+        client = XCClient("other", api_token="t", api_url=server.url_for("other"))
+        other = CachingRepository(client, StateCache(str(path), clock=clock))
+        assert other.list_groups()["user_groups"] == []
+
+    def test_writes_update_cache(self, server, tmp_path, clock):
+        """Creates, updates and deletes are reflected in cached listings."""
+        repo = _repo(server, tmp_path / "state.db", clock)
+        repo.list_groups()
+        repo.list_users()
+
+        repo.create_group({"name": "ops", "usernames": []})
+        repo.update_group("devs", {"name": "devs", "usernames": ["bob@example.com"]})
+        repo.delete_group("admins")
+        repo.create_user({"email": "Dave@example.com"})
+        repo.delete_user("bob@example.com")
+
+        groups = {g["name"]: g for g in repo.list_groups()["user_groups"]}
+        assert set(groups) == {"devs", "ops"}
+        assert groups["devs"]["usernames"] == ["bob@example.com"]
+        emails = {u["email"] for u in repo.list_users()["items"]}
+        assert emails == {"alice@example.com", "Dave@example.com"}
+
+    def test_targeted_refresh(self, server, tmp_path, clock):
+        """Refreshed groups pick up changes; missing groups are dropped."""
+        repo = _repo(server, tmp_path / "state.db", clock)
+        repo.list_groups()
+        server.groups["admins"]["usernames"] = ["bob@example.com"]
+        del server.groups["devs"]
+
+        assert repo.refresh_groups(["admins", "devs"]) == 2
+        groups = {g["name"]: g for g in repo.list_groups()["user_groups"]}
+        assert groups == {
+            "admins": {"name": "admins", "usernames": ["bob@example.com"]}
+        }
+
+    def test_user_refresh_keeps_404(self, server, tmp_path, clock):
+        """A 404 from user_roles does not remove a cached user."""
+        repo = _repo(server, tmp_path / "state.db", clock)
+        repo.list_users()
+        del server.users["bob@example.com"]
+
+        refreshed = ["bob@example.com", "alice@example.com", "new@example.com"]
+        assert repo.refresh_users(refreshed) == 2
+        assert repo.cache.get(repo._scope("system"), USERS, "bob@example.com")
+        assert "bob@example.com" in repo.missing_roles()
+
+    def test_invalidate(self, server, tmp_path, clock):
+        """Invalidated caches fetch again."""
+        repo = _repo(server, tmp_path / "state.db", clock)
+        repo.list_groups()
+        repo.cache.invalidate()
+        repo.list_groups()
+        assert not repo.served_from_cache(GROUPS)
+
+
+class TestMissingRoles:
+    """Test the negative cache of user_roles 404s."""
+
+    @staticmethod
+    def _user(email):
+        return User(
+            email=email, display_name="New Name", first_name="New", last_name=""
+        )
+
+    @staticmethod
+    def _repo_404():
+        repository = Mock()
+        repository.update_user.side_effect = Exception("404 Client Error: Not Found")
+        return repository
+
+    def test_entries_expire(self, tmp_path, clock):
+        """Entries are case-insensitive, persisted and expire after the TTL."""
+        path = str(tmp_path / "state.db")
+        missing = MissingRoles(StateCache(path, clock=clock), "t|system", ttl=100)
+        missing.add("Carol@Example.com")
+        assert "carol@example.com" in missing
+
+        reloaded = MissingRoles(StateCache(path, clock=clock), "t|system")
+        assert "CAROL@example.com" in reloaded
+        assert "carol@example.com" not in MissingRoles(reloaded.cache, "other")
+
+        clock.now += 101
+        assert len(MissingRoles(StateCache(path, clock=clock), "t|system")) == 0
+
+    def test_entries_expire_while_loaded(self, tmp_path, clock):
+        """A loaded instance stops reporting an entry once its TTL passes."""
+        missing = MissingRoles(
+            StateCache(str(tmp_path / "state.db"), clock=clock), "t|system", ttl=100
+        )
+        missing.add("carol@example.com")
+        assert len(missing) == 1
+
+        clock.now += 101
+        assert "carol@example.com" not in missing
+        assert len(missing) == 0
+
+    def test_refresh_404_is_skipped_in_same_run(self, server, tmp_path, clock):
+        """A 404 found by a refresh skips the PUT in the same sync."""
+        repo = _repo(server, tmp_path / "state.db", clock)
+        service = UserSyncService(repo, missing_roles=repo.missing_roles())
+        existing = {u["email"]: u for u in repo.list_users()["items"]}
+        del server.users["bob@example.com"]
+
+        repo.refresh_users(["bob@example.com"])
+        stats = service.sync_users([self._user("bob@example.com")], existing)
+
+        assert stats.skipped_known_missing == 1
+        assert server.requests["PUT"] == 0
+
+    def test_update_404_is_skipped_next_run(self, tmp_path, clock):
+        """A 404 is recorded on the first run and skips the PUT afterwards."""
+        path = str(tmp_path / "state.db")
+        existing = {"carol@example.com": {"display_name": "Old"}}
+        planned = [self._user("carol@example.com")]
+
+        repository = self._repo_404()
+        service = UserSyncService(
+            repository, missing_roles=MissingRoles(StateCache(path), "t|system")
+        )
+        stats = service.sync_users(planned, existing)
+        assert stats.unchanged == 1
+        assert stats.skipped_known_missing == 0
+        assert repository.update_user.call_count == 1
+
+        repository = self._repo_404()
+        service = UserSyncService(
+            repository, missing_roles=MissingRoles(StateCache(path), "t|system")
+        )
+        stats = service.sync_users(planned, existing)
+        repository.update_user.assert_not_called()
+        assert stats.skipped_known_missing == 1
+        assert "skipped_known_missing=1" in stats.summary()
+        assert service.users_to_touch(planned, existing) == []
+
+    def test_successful_update_clears_entry(self, server, tmp_path, clock):
+        """A roles entry that reappears is removed from the negative cache."""
+        repo = _repo(server, tmp_path / "state.db", clock)
+        missing = repo.missing_roles()
+        missing.add("alice@example.com")
+        repo.update_user("alice@example.com", {"email": "alice@example.com"})
+        assert "alice@example.com" not in missing
+        assert repo.missing_roles() is missing
+
+
+class TestTouchedEntities:
+    """Test which entities a plan would touch."""
+
+    def test_groups_to_touch(self):
+        """New, changed and (with prune) orphaned groups are touched."""
+        planned = [
+            Group(name="admins", users=["a@example.com"]),
+            Group(name="devs", users=["b@example.com"]),
+            Group(name="ops", users=[]),
+        ]
+        existing = {
+            "admins": {"usernames": ["a@example.com"]},
+            "devs": {"usernames": []},
+            "old": {"usernames": []},
+        }
+        service = GroupSyncService(None)
+        assert service.groups_to_touch(planned, existing) == ["devs", "ops"]
+        assert service.groups_to_touch(planned, existing, prune=True) == [
+            "devs",
+            "old",
+            "ops",
+        ]
+
+    def test_users_to_touch(self):
+        """New, changed and (with delete) removed users are touched."""
+        same = User(
+            email="a@example.com", display_name="A", first_name="A", last_name=""
+        )
+        changed = User(
+            email="B@example.com", display_name="B", first_name="B", last_name=""
+        )
+        new = User(
+            email="c@example.com", display_name="C", first_name="C", last_name=""
+        )
+        existing = {
+            "a@example.com": {
+                "display_name": "A",
+                "first_name": "A",
+                "last_name": "",
+                "active": True,
+                "groups": [],
+            },
+            "b@example.com": {"display_name": "Old"},
+            "gone@example.com": {},
+        }
+        service = UserSyncService(None)
+        planned = [same, changed, new]
+        assert service.users_to_touch(planned, existing) == [
+            "b@example.com",
+            "c@example.com",
+        ]
+        assert "gone@example.com" in service.users_to_touch(
+            planned, existing, delete_users=True
+        )
+
+
+def test_cli_second_run_uses_cache(server, xc_env, tmp_path):
+    """A dry run with a warm cache makes no listing requests."""
+    csv_file = tmp_path / "users.csv"
+    csv_file.write_text(
+        "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+        "alice@example.com,Alice A,A,CN=ADMINS,DC=example,DC=com\n"
+        "erin@example.com,Erin E,A,CN=ADMINS,DC=example,DC=com\n"
+    )
+    args = ["--csv", str(csv_file), "--dry-run", "--state-cache", str(tmp_path / "s")]
+    runner = CliRunner()
+
+    first = runner.invoke(cli, args)
+    assert first.exit_code == 0, first.output
+    gets = server.requests["GET"]
+
+    second = runner.invoke(cli, args)
+    assert second.exit_code == 0, second.output
+    assert "Using cached F5 XC users (1 refreshed)" in second.output
+    assert "Using cached F5 XC groups (1 refreshed)" in second.output
+    # Only targeted GETs for cached entities the plan touches: alice + admins
+    assert server.requests["GET"] == gets + 2
@@ -1,11 +1,16 @@
 """Unit tests for UserSyncService."""
 
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pytest
 
 from xc_user_group_sync.models import User
-from xc_user_group_sync.user_sync_service import UserSyncService, UserSyncStats
+from xc_user_group_sync.user_sync_service import (
+    UserSyncService,
+    UserSyncStats,
+    merge_duplicate_users,
+)
+from xc_user_group_sync.user_utils import email_key
 
 
 class TestUserSyncStats:
@@ -159,6 +164,105 @@ class TestParseCSVToUsers:
         assert "GROUP2" in users[0].groups
         assert "GROUP3" in users[0].groups
 
+    def test_rows_of_one_user_are_merged(self, tmp_path):
+        """One row per entitlement becomes one user with the union of groups."""
+        csv_file = tmp_path / "entitlements.csv"
+        csv_file.write_text(
+            "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+            "alice@example.com,Alice Anderson,A,CN=ONE\n"
+            "bob@example.com,Bob Smith,I,\n"
+            "Alice@Example.com,Alice B Anderson,I,CN=TWO|CN=ONE\n"
+            "alice@example.com,Alice Anderson,A,CN=THREE\n"
+        )
+
+        result = UserSyncService(Mock()).parse_csv_to_users(str(csv_file))
+
+        assert result.total_count == 2
+        alice, bob = result.users
+        # The first row supplies the attributes
+        assert (alice.email, alice.display_name, alice.active) == (
+            "alice@example.com",
+            "Alice Anderson",
+            True,
+        )
+        assert alice.groups == ["ONE", "TWO", "THREE"]
+        assert (result.active_count, result.inactive_count) == (1, 1)
+        assert result.users_without_groups == 1
+        assert result.duplicate_emails == {"alice@example.com": [2, 4, 5]}
+
+    def test_merged_user_is_updated_once(self):
+        """A multi-row user is diffed and written once, with all its groups."""
+        rows = [
+            User(
+                email="alice@example.com",
+                display_name="Alice A",
+                first_name="Alice",
+                last_name="A",
+                groups=[group],
+            )
+            for group in ("ONE", "TWO")
+        ]
+        existing = {
+            "alice@example.com": {
+                "display_name": "Alice A",
+                "first_name": "Alice",
+                "last_name": "A",
+                "active": True,
+                "groups": ["ONE"],
+            }
+        }
+        mock_repo = Mock()
+
+        users = merge_duplicate_users(rows)
+        UserSyncService(mock_repo).sync_users(users, existing)
+
+        mock_repo.update_user.assert_called_once()
+        assert mock_repo.update_user.call_args[0][1]["groups"] == ["ONE", "TWO"]
+        assert rows[0].groups == ["ONE"]  # inputs are not modified
+
+    def test_repeated_rows_validate_email_once(self, tmp_path):
+        """Rows repeating an email reuse its validation but keep every warning."""
+        csv_file = tmp_path / "repeated.csv"
+        csv_file.write_text(
+            "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+            "alice@example.com,Alice Anderson,A,CN=ONE\n"
+            "bob@example.c,Bob Smith,A,CN=ONE\n"
+            " alice@example.com ,Alice B Anderson,I,CN=TWO\n"
+            "bob@example.c,Bob Smith,A,CN=TWO\n"
+        )
+
+        with patch("xc_user_group_sync.user_sync_service.User", wraps=User) as user:
+            result = UserSyncService(Mock()).parse_csv_to_users(str(csv_file))
+
+        assert user.call_count == 2
+        assert result.invalid_emails == [("bob@example.c", 3), ("bob@example.c", 5)]
+        assert result.duplicate_emails == {
+            "alice@example.com": [2, 4],
+            "bob@example.c": [3, 5],
+        }
+        assert [u.email for u in result.users] == ["alice@example.com", "bob@example.c"]
+
+    def test_email_key_is_computed_once_per_email(self, tmp_path):
+        """Rows differing only in case share one User build and email key."""
+        csv_file = tmp_path / "cased.csv"
+        csv_file.write_text(
+            "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+            "Alice@Example.com,Alice Anderson,A,CN=ONE\n"
+            "alice@example.com,Alice Anderson,A,CN=TWO\n"
+        )
+
+        with (
+            patch("xc_user_group_sync.models.email_key", wraps=email_key) as key,
+            patch("xc_user_group_sync.user_sync_service.User", wraps=User) as user,
+        ):
+            result = UserSyncService(Mock()).parse_csv_to_users(str(csv_file))
+            (merged,) = result.users
+            assert merged.email_key == "alice@example.com"
+
+        assert user.call_count == 1
+        assert key.call_count == 1
+        assert merged.groups == ["ONE", "TWO"]
+
 
 class TestSyncUsersOperations:
     """Test sync_users reconciliation logic."""
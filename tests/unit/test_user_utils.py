@@ -1,6 +1,11 @@
 """Unit tests for user utility functions."""
 
-from xc_user_group_sync.user_utils import parse_active_status, parse_display_name
+from xc_user_group_sync.user_utils import (
+    email_key,
+    parse_active_status,
+    parse_display_name,
+    validate_email_format,
+)
 
 
 class TestParseDisplayName:
@@ -84,3 +89,21 @@ class TestParseActiveStatus:
     def test_unknown_status_code(self):
         """Test unknown status code maps to False (safe default)."""
         assert parse_active_status("X") is False
+
+
+class TestEmailNormalization:
+    """Test cases for email_key and validate_email_format."""
+
+    def test_key_is_stripped_and_lowercase(self):
+        """Test the canonical key ignores case and surrounding whitespace."""
+        assert email_key("  Alice@Example.COM ") == "alice@example.com"
+
+    def test_key_is_interned(self):
+        """Test equal keys are the same string object."""
+        assert email_key("Bob@example.com") is email_key("bob@EXAMPLE.com")
+
+    def test_format_check(self):
+        """Test the simple format pattern."""
+        assert validate_email_format("alice.b+tag@example.co.uk") is True
+        assert validate_email_format("no-at-sign") is False
+        assert validate_email_format("bob@example.c") is False
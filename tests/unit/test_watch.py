@@ -0,0 +1,132 @@
+"""Tests for watch mode."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from xc_user_group_sync import cli as cli_module
+from xc_user_group_sync.cli import cli
+from xc_user_group_sync.watch import Watcher, snapshot
+
+HEADER = "Email,User Display Name,Employee Status,Entitlement Display Name\n"
+
+
+def _touch(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, ns=(mtime, mtime))
+
+
+class TestWatcher:
+    """Test change detection and debouncing."""
+
+    def test_existing_file_then_settled_change(self, tmp_path, clock):
+        """A file is reported at start, then only after a change settles."""
+        export = tmp_path / "users.csv"
+        _touch(export, "a", 1_000)
+        watcher = Watcher(export, debounce=5, clock=clock)
+
+        assert watcher.poll() == str(export)
+        assert watcher.poll() is None
+
+        _touch(export, "ab", 2_000)
+        assert watcher.poll() is None
+        clock.now += 3
+        _touch(export, "abc", 3_000)  # still being written
+        assert watcher.poll() is None
+        clock.now += 4
+        assert watcher.poll() is None
+        clock.now += 1
+        assert watcher.poll() == str(export)
+
+    def test_drop_directory_uses_newest_file(self, tmp_path):
+        """Hidden and temporary files are ignored."""
+        _touch(tmp_path / "old.csv", "a", 1_000)
+        _touch(tmp_path / "new.csv", "a", 2_000)
+        _touch(tmp_path / "newer.csv.part", "a", 3_000)
+        _touch(tmp_path / ".hidden.csv", "a", 4_000)
+        (tmp_path / "subdir").mkdir()
+
+        assert snapshot(tmp_path)[0] == str(tmp_path / "new.csv")
+        assert snapshot(tmp_path / "missing") is None
+
+    def test_changes_sleeps_between_polls(self, tmp_path, clock):
+        """The iterator sleeps until a settled change appears."""
+        export = tmp_path / "users.csv"
+
+        def sleep(seconds):
+            clock.sleep(seconds)
+            if len(clock.sleeps) == 1:
+                _touch(export, "a", 1_000)
+
+        watcher = Watcher(export, interval=2, debounce=3, clock=clock, sleep=sleep)
+        assert next(watcher.changes()) == str(export)
+        assert clock.sleeps == [2, 2, 2]
+
+
+class FakeWatcher:
+    """Yields preset paths, then stops like Ctrl-C."""
+
+    paths = []
+
+    def __init__(self, path, interval, debounce):
+        self.path = path
+
+    def changes(self):
+        yield from self.paths
+        raise KeyboardInterrupt
+
+
+@pytest.fixture
+def server(xc_env):
+    xc_env.seed_state(users=[{"email": "alice@example.com"}])
+    return xc_env
+
+
+def test_watch_dir_keeps_state_warm(server, tmp_path, monkeypatch):
+    """Later syncs reuse the in-memory state; failed syncs do not stop watching."""
+    first = tmp_path / "1.csv"
+    first.write_text(HEADER + "alice@example.com,Alice A,A,CN=ADMINS,DC=example\n")
+    broken = tmp_path / "2.csv"
+    broken.write_text("not,a,valid,header\n")
+    second = tmp_path / "3.csv"
+    second.write_text(
+        HEADER
+        + "alice@example.com,Alice A,A,CN=ADMINS,DC=example\n"
+        + "bob@example.com,Bob B,A,CN=ADMINS,DC=example\n"
+    )
+    monkeypatch.setattr(FakeWatcher, "paths", [str(first), str(broken), str(second)])
+    monkeypatch.setattr(cli_module, "Watcher", FakeWatcher)
+
+    result = CliRunner().invoke(cli, ["--watch-dir", str(tmp_path)])
+
+    assert result.exit_code == 0, result.output
+    assert result.output.count("SYNCHRONIZATION COMPLETE") == 2
+    assert "Error: CSV validation error" in result.output
+    assert "Using cached F5 XC groups (1 refreshed)" in result.output
+    assert "Stopped watching" in result.output
+    assert set(server.groups["admins"]["usernames"]) == {
+        "alice@example.com",
+        "bob@example.com",
+    }
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["--watch", "--ldap-url", "ldap://x", "--ldap-base-dn", "dc=x"], "--csv"),
+        (["--watch-dir", ".", "--csv", "users.csv"], "cannot be combined"),
+        (["--watch", "--csv", "users.csv", "--deadline", "60"], "watch mode"),
+    ],
+)
+def test_watch_option_conflicts(tmp_path, monkeypatch, args, message):
+    """Watch mode needs a file source and no run deadline."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "users.csv").write_text(HEADER)
+
+    result = CliRunner().invoke(cli, args)
+
+    assert result.exit_code == 2
+    assert message in result.output